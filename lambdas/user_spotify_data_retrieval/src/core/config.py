@@ -1,7 +1,9 @@
 from pathlib import Path
-from pydantic import Field, computed_field
+from pydantic import Field, computed_field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from src.models.enums import EmotionalProfileScorer, LyricsExtractorType
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
@@ -9,18 +11,63 @@ class Settings(BaseSettings):
     spotify_base_url: str
 
     db_connection_string: str
+    db_pool_size: int = 5
+    db_pool_recycle_seconds: int = 300
+
+    max_concurrent_users: int = 5
+    # across users, unlimited by default
+    max_concurrent_top_emotions: int | None = None
+
+    # left of the Lambda timeout for responding, every stage stops before it
+    deadline_reserve_seconds: float = 2.0
+    # top emotions stops this much earlier again to save what it finished
+    top_emotions_flush_seconds: float = 3.0
+    # unfinished stages are sent here as a follow-up run, or the message is retried
+    follow_up_queue_url: str | None = None
+    max_follow_ups: int = 3
+
+    artist_cache_ttl_hours: float = 24.0
+
+    http_max_connections: int = 20
+    http_keepalive_expiry_seconds: float = 60.0
+
+    spotify_requests_per_second: float = 10.0
+    spotify_burst_size: int = 10
+    spotify_max_retries: int = 3
+    spotify_max_retry_after_seconds: float = 30.0
+    spotify_max_concurrent_requests_per_endpoint: int = 4
+    spotify_top_items_limit: int = 50  # Spotify caps this at about 100
 
     lyrics_base_url: str
     lyrics_user_agent: str
     lyrics_max_concurrent_scrapes: int
+    lyrics_requests_per_second: float = 4.0
+    lyrics_min_requests_per_second: float = 0.5
+    lyrics_max_requests_per_second: float = 10.0
+    lyrics_extractor: LyricsExtractorType = LyricsExtractorType.SCANNER
+    lyrics_streaming_fetch: bool = True
 
     model_api_key: str
     model_name: str
     model_temp: float
     model_max_tokens: int
     model_top_p: float
+    model_batching_enabled: bool = True
+    model_max_batch_input_tokens: int = 8000
+    model_max_batch_size: int = 20
+    emotional_profile_scorer: EmotionalProfileScorer = EmotionalProfileScorer.MODEL
     model_prompt_path: Path = Field(..., description="Path to prompt file")
 
+    @model_validator(mode="after")
+    def check_lyrics_streaming_extractor(self) -> "Settings":
+        # streamed pages are scanned incrementally, which only the scanner matches
+        if (
+            self.lyrics_streaming_fetch
+            and self.lyrics_extractor != LyricsExtractorType.SCANNER
+        ):
+            raise ValueError("lyrics_streaming_fetch only works with the scanner")
+        return self
+
     @computed_field
     @property
     def model_instructions(self) -> str:
@@ -1,28 +1,194 @@
-from contextlib import contextmanager
-from typing import Generator
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, AsyncGenerator, Awaitable, Callable, Iterator, TypeVar
+import sqlalchemy.exc
+from sqlalchemy import Executable, make_url, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from loguru import logger
 
-from src.models.db import Base
+ASYNC_DRIVER_NAME = "postgresql+psycopg"
 
+T = TypeVar("T")
 
-def create_session_factory(connection_string: str):
-    engine = create_engine(connection_string)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine, autocommit=False, autoflush=True)
 
+def to_async_connection_string(connection_string: str) -> str:
+    """Point a postgres connection string at the async psycopg driver.
 
-@contextmanager
-def get_db_session(connection_string: str) -> Generator[Session, None, None]:
-    SessionLocal = create_session_factory(connection_string)
-    session = SessionLocal()
+    libpq query parameters such as sslmode and channel_binding are understood by
+    psycopg, so only the driver name needs to change.
+    """
+    url = make_url(connection_string).set(drivername=ASYNC_DRIVER_NAME)
+    return url.render_as_string(hide_password=False)
+
+
+def create_db_engine(
+    connection_string: str, pool_size: int, pool_recycle_seconds: int
+) -> AsyncEngine:
+    return create_async_engine(
+        to_async_connection_string(connection_string),
+        pool_size=pool_size,
+        pool_recycle=pool_recycle_seconds,
+        pool_pre_ping=True,
+    )
+
+
+class RoundTripCounter:
+    """Counts the DB round trips made while it's tracking, across every session.
+
+    Tasks started while tracking count towards it too, so one counter covers a
+    run whose stages each have their own session.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    @contextmanager
+    def track(self) -> Iterator["RoundTripCounter"]:
+        token = _round_trip_counter.set(self)
+        try:
+            yield self
+        finally:
+            _round_trip_counter.reset(token)
+
+
+_round_trip_counter: ContextVar[RoundTripCounter | None] = ContextVar(
+    "round_trip_counter", default=None
+)
+
+
+class SerializedAsyncSession(AsyncSession):
+    """AsyncSession that concurrent tasks can share.
+
+    A session runs one statement at a time on its connection, so statements
+    from concurrent tasks, e.g. the stages of a streaming pipeline, queue up
+    for it instead of failing. A cancelled task's statement still runs to the
+    end, so a stage stopped at a deadline can commit what it finished.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.statement_lock = asyncio.Lock()
+
+    async def _run_statement(self, statement: Callable[[], Awaitable[T]]) -> T:
+        round_trip_counter = _round_trip_counter.get()
+        if round_trip_counter is not None:
+            round_trip_counter.count += 1
+
+        async with self.statement_lock:
+            task = asyncio.ensure_future(statement())
+
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # a statement cut off mid-flight would leave the connection
+                # unusable, so let it finish and keep the session committable
+                await asyncio.wait([task])
+                raise
+
+    async def execute(self, *args: Any, **kwargs: Any):
+        # scalars and friends go through execute
+        return await self._run_statement(partial(super().execute, *args, **kwargs))
+
+    async def commit(self) -> None:
+        await self._run_statement(super().commit)
+
+
+async def run_on_driver_connection(
+    db_session: AsyncSession, operation: Callable[[Any], Awaitable[T]]
+) -> T:
+    """Run an operation SQLAlchemy doesn't wrap, e.g. COPY, on the psycopg connection.
+
+    It runs in the session's transaction and queues behind the statements of a
+    SerializedAsyncSession like any other statement. Driver errors are raised as
+    the SQLAlchemy exceptions session.execute would raise, e.g. IntegrityError.
+    """
+
+    async def run() -> T:
+        connection = await db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        dbapi = connection.dialect.loaded_dbapi
+        try:
+            return await operation(raw_connection.driver_connection)
+        except dbapi.Error as e:
+            raise sqlalchemy.exc.DBAPIError.instance(
+                None, None, e, dbapi.Error, dialect=connection.dialect
+            ) from e
+
+    if isinstance(db_session, SerializedAsyncSession):
+        return await db_session._run_statement(run)
+
+    return await run()
+
+
+async def execute_pipelined(
+    db_session: AsyncSession, statements: list[Executable]
+) -> None:
+    """Send write statements in one psycopg pipeline, so they cost one round trip.
+
+    Statements are compiled and their parameters converted the way SQLAlchemy
+    would. Their results aren't returned.
+    """
+    if not statements:
+        return
+
+    dialect = db_session.get_bind().dialect
+    queries = []
+    for statement in statements:
+        compiled = statement.compile(dialect=dialect)
+        # IN lists are rendered as one parameter per value, like at execution
+        expanded = compiled.construct_expanded_state()
+        processors = {
+            name: bind.type.dialect_impl(dialect).bind_processor(dialect)
+            for name, bind in compiled.binds.items()
+        } | expanded.processors
+        params = {}
+        for name, value in expanded.parameters.items():
+            process = processors.get(name)
+            params[name] = process(value) if process else value
+        queries.append((expanded.statement, params))
+
+    async def run_pipeline(driver_connection: Any) -> None:
+        async with driver_connection.pipeline():
+            async with driver_connection.cursor() as cursor:
+                for query, params in queries:
+                    await cursor.execute(query, params)
+
+    await run_on_driver_connection(db_session, run_pipeline)
+
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=engine,
+        class_=SerializedAsyncSession,
+        autoflush=True,
+        expire_on_commit=False,
+    )
+
+
+async def check_db_connection(engine: AsyncEngine) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+@asynccontextmanager
+async def get_db_session(
+    session_factory: async_sessionmaker[AsyncSession],
+) -> AsyncGenerator[AsyncSession, None]:
+    session = session_factory()
 
     try:
         yield session
-        session.commit()
+        await session.commit()
     except Exception:
         logger.exception("Transaction failed, rolling back")
-        session.rollback()
+        await session.rollback()
+        raise
     finally:
-        session.close()
+        await session.close()
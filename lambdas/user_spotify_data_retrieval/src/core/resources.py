@@ -0,0 +1,190 @@
+import asyncio
+from typing import Coroutine, TypeVar
+
+import httpx
+from loguru import logger
+
+from src.core.config import Settings
+from src.core.db import (
+    check_db_connection,
+    create_db_engine,
+    create_session_factory,
+)
+from src.migrations.runner import (
+    MigrationException,
+    check_schema_version,
+    get_schema_version,
+    migrate,
+)
+from src.services.emotional_profiles.batch_model_service import BatchModelService
+from src.services.emotional_profiles.lexicon_calculator import (
+    LexiconEmotionalProfileCalculator,
+)
+from src.services.emotional_profiles.model_service import ModelService
+from src.services.follow_up_queue import FollowUpQueue
+from src.services.lyrics.lyrics_extractor import create_lyrics_extractor
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+from src.services.lyrics.lyrics_scraper import LyricsScraper
+from src.services.music.spotify_service import SpotifyService
+from src.services.music.spotify_transport import SpotifyTransport, TokenBucket
+
+T = TypeVar("T")
+
+
+class Resources:
+    """Long-lived resources shared across warm Lambda invocations.
+
+    Created once during the Lambda init phase. Every invocation runs on the same
+    event loop so pooled DB connections, keep-alive HTTP connections and the
+    model agent stay usable between invocations.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        self.engine = create_db_engine(
+            connection_string=settings.db_connection_string,
+            pool_size=settings.db_pool_size,
+            pool_recycle_seconds=settings.db_pool_recycle_seconds,
+        )
+        # read by the first check_schema, so a cold start with the DB down can
+        # still warm up and report its health
+        self.schema_version: int | None = None
+        self.session_factory = create_session_factory(self.engine)
+
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        )
+        self.spotify_client = httpx.AsyncClient(limits=limits)
+        self.lyrics_client = httpx.AsyncClient(limits=limits)
+
+        # one bucket for the whole container, shared by every concurrent user
+        self.spotify_transport = SpotifyTransport(
+            client=self.spotify_client,
+            rate_limiter=TokenBucket(
+                rate=settings.spotify_requests_per_second,
+                capacity=settings.spotify_burst_size,
+            ),
+            max_retries=settings.spotify_max_retries,
+            max_retry_after_seconds=settings.spotify_max_retry_after_seconds,
+            max_concurrent_requests_per_endpoint=settings.spotify_max_concurrent_requests_per_endpoint,
+        )
+        self.spotify_service = SpotifyService(
+            client=self.spotify_client,
+            base_url=settings.spotify_base_url,
+            transport=self.spotify_transport,
+            top_items_limit=settings.spotify_top_items_limit,
+        )
+        # pacing and in-flight concurrency are limited separately, both per container
+        self.lyrics_pacer = AdaptivePacer(
+            rate=settings.lyrics_requests_per_second,
+            min_rate=settings.lyrics_min_requests_per_second,
+            max_rate=settings.lyrics_max_requests_per_second,
+        )
+        self.lyrics_scraper = LyricsScraper(
+            client=self.lyrics_client,
+            base_url=settings.lyrics_base_url,
+            headers=settings.lyrics_headers,
+            semaphore=asyncio.Semaphore(settings.lyrics_max_concurrent_scrapes),
+            pacer=self.lyrics_pacer,
+            extractor=create_lyrics_extractor(settings.lyrics_extractor),
+            streaming=settings.lyrics_streaming_fetch,
+        )
+        self.model_service = self._create_model_service(settings)
+        self.lexicon_calculator = LexiconEmotionalProfileCalculator()
+        self.follow_up_queue = FollowUpQueue(queue_url=settings.follow_up_queue_url)
+
+    @staticmethod
+    def _create_model_service(settings: Settings) -> ModelService:
+        if settings.model_batching_enabled:
+            return BatchModelService(
+                api_key=settings.model_api_key,
+                model_name=settings.model_name,
+                temperature=settings.model_temp,
+                max_tokens=settings.model_max_tokens,
+                top_p=settings.model_top_p,
+                instructions=settings.model_instructions,
+                max_batch_input_tokens=settings.model_max_batch_input_tokens,
+                max_batch_size=settings.model_max_batch_size,
+            )
+
+        return ModelService(
+            api_key=settings.model_api_key,
+            model_name=settings.model_name,
+            temperature=settings.model_temp,
+            max_tokens=settings.model_max_tokens,
+            top_p=settings.model_top_p,
+            instructions=settings.model_instructions,
+        )
+
+    def run(self, coroutine: Coroutine[None, None, T]) -> T:
+        """Run a coroutine on the shared event loop"""
+        return self.loop.run_until_complete(coroutine)
+
+    @staticmethod
+    async def _check_http_connection(client: httpx.AsyncClient, url: str) -> bool:
+        try:
+            # any response means the TLS connection is open and pooled
+            await client.head(url)
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Health check failed for {url}: {e}")
+            return False
+
+    async def _check_db_connection(self) -> bool:
+        try:
+            await check_db_connection(self.engine)
+            return True
+        except Exception as e:
+            logger.warning(f"Health check failed for database: {e}")
+            return False
+
+    async def check_health(self) -> dict[str, bool]:
+        """Check each resource, opening pooled connections as a side effect"""
+        db_healthy, spotify_healthy, lyrics_healthy = await asyncio.gather(
+            self._check_db_connection(),
+            self._check_http_connection(
+                self.spotify_client, self.settings.spotify_base_url
+            ),
+            self._check_http_connection(
+                self.lyrics_client, self.settings.lyrics_base_url
+            ),
+        )
+        return {
+            "db": db_healthy,
+            "spotify": spotify_healthy,
+            "lyrics": lyrics_healthy,
+        }
+
+    async def warm_up(self) -> dict[str, bool]:
+        """Open DB and TLS connections ahead of real traffic"""
+        health = await self.check_health()
+        logger.info(f"Warmed up resources: {health}")
+        return health
+
+    def check_schema(self) -> None:
+        """Raise if the database is behind the schema version this code expects"""
+        if self.schema_version is not None:
+            try:
+                check_schema_version(self.schema_version)
+                return
+            except MigrationException:
+                # migrations may have run since the version was read
+                pass
+
+        self.schema_version = self.run(get_schema_version(self.engine))
+        check_schema_version(self.schema_version)
+
+    async def migrate(self) -> int:
+        """Apply pending migrations and record the new schema version"""
+        self.schema_version = await migrate(self.engine, self.settings)
+        return self.schema_version
+
+    async def aclose(self) -> None:
+        await self.spotify_client.aclose()
+        await self.lyrics_client.aclose()
+        await self.engine.dispose()
@@ -1,4 +1,5 @@
-from sqlalchemy.orm import Session
+from datetime import timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.emotional_profiles.emotional_profiles_service import (
     EmotionalProfilesService,
@@ -6,12 +7,31 @@ from src.services.emotional_profiles.emotional_profiles_service import (
 from src.services.lyrics.lyrics_service import LyricsService
 from src.pipelines.top_emotions_pipeline import TopEmotionsPipeline
 from src.repositories.top_items.top_emotions_repository import TopEmotionsRepository
+from src.repositories.emotional_profile_results_repository import (
+    EmotionalProfileResultsRepository,
+)
 from src.repositories.track_emotional_profiles_repository import (
     TrackEmotionalProfilesRepository,
 )
+from src.repositories.track_lyrics_failures_repository import (
+    TrackLyricsFailuresRepository,
+)
 from src.repositories.track_lyrics_repository import TrackLyricsRepository
-from src.services.emotional_profiles.model_service import ModelService
+from src.services.emotional_profiles.cached_calculator import (
+    CachedEmotionalProfileCalculator,
+)
+from src.services.emotional_profiles.lexicon_calculator import (
+    LexiconEmotionalProfileCalculator,
+)
+from src.services.emotional_profiles.model_service import (
+    EmotionalProfileCalculator,
+    ModelService,
+)
+from src.services.emotional_profiles.shadow_calculator import (
+    ShadowEmotionalProfileCalculator,
+)
 from src.services.lyrics.lyrics_scraper import LyricsScraper
+from src.models.enums import EmotionalProfileScorer
 from src.pipelines.top_genres_pipeline import TopGenresPipeline
 from src.repositories.top_items.top_genres_repository import TopGenresRepository
 from src.pipelines.profile_pipeline import ProfilePipeline
@@ -22,61 +42,130 @@ from src.repositories.profile_repository import ProfileRepository
 from src.repositories.top_items.top_artists_repository import TopArtistsRepository
 from src.repositories.top_items.top_tracks_repository import TopTracksRepository
 from src.repositories.tracks_repository import TracksRepository
-from src.services.spotify_service import SpotifyService
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.music.artist_registry import ArtistRegistry
+from src.services.music.spotify_service import SpotifyService
 
 
 class PipelineFactory:
     def __init__(
         self,
         spotify_service: SpotifyService,
-        db_session: Session,
+        db_session: AsyncSession,
         lyrics_scraper: LyricsScraper,
         model_service: ModelService,
+        artist_cache_ttl: timedelta = timedelta(0),
+        lexicon_calculator: LexiconEmotionalProfileCalculator | None = None,
+        emotional_profile_scorer: EmotionalProfileScorer = EmotionalProfileScorer.MODEL,
+        unit_of_work: UnitOfWork | None = None,
     ):
         self.spotify_service = spotify_service
         self.db_session = db_session
         self.lyrics_scraper = lyrics_scraper
         self.model_service = model_service
+        self.artist_cache_ttl = artist_cache_ttl
+        self.lexicon_calculator = (
+            lexicon_calculator or LexiconEmotionalProfileCalculator()
+        )
+        self.emotional_profile_scorer = emotional_profile_scorer
+        # repositories buffer their writes in it until it's flushed
+        self.unit_of_work = unit_of_work
 
     def create_profile_pipeline(self) -> ProfilePipeline:
         return ProfilePipeline(
             spotify_service=self.spotify_service,
-            profile_repository=ProfileRepository(self.db_session),
+            profile_repository=ProfileRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
         )
 
-    def create_top_artists_pipeline(self) -> TopArtistsPipeline:
+    def create_top_artists_pipeline(
+        self, artist_registry: ArtistRegistry | None = None
+    ) -> TopArtistsPipeline:
         return TopArtistsPipeline(
             spotify_service=self.spotify_service,
-            artists_repository=ArtistsRepository(self.db_session),
-            top_artists_repository=TopArtistsRepository(self.db_session),
+            artists_repository=ArtistsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            top_artists_repository=TopArtistsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            artist_registry=artist_registry,
         )
 
-    def create_top_tracks_pipeline(self) -> TopTracksPipeline:
+    def create_top_tracks_pipeline(
+        self, artist_registry: ArtistRegistry | None = None
+    ) -> TopTracksPipeline:
         return TopTracksPipeline(
             spotify_service=self.spotify_service,
-            artists_repository=ArtistsRepository(self.db_session),
-            tracks_repository=TracksRepository(self.db_session),
-            top_tracks_repository=TopTracksRepository(self.db_session),
+            artists_repository=ArtistsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            tracks_repository=TracksRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            top_tracks_repository=TopTracksRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            artist_registry=artist_registry,
+            artist_cache_ttl=self.artist_cache_ttl,
         )
 
     def create_top_genres_pipeline(self) -> TopGenresPipeline:
         return TopGenresPipeline(
-            top_genres_repository=TopGenresRepository(self.db_session)
+            top_genres_repository=TopGenresRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            )
         )
 
-    def create_top_emotions_pipeline(self) -> TopEmotionsPipeline:
-        lyrics_service = LyricsService(
-            lyrics_repository=TrackLyricsRepository(self.db_session),
-            lyrics_scraper=self.lyrics_scraper,
+    def _create_emotional_profiles_service(self) -> EmotionalProfilesService:
+        if self.emotional_profile_scorer == EmotionalProfileScorer.LEXICON:
+            scorer = self.lexicon_calculator
+        else:
+            scorer = self.model_service
+
+        cached_calculator = CachedEmotionalProfileCalculator(
+            calculator=scorer,
+            results_repository=EmotionalProfileResultsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            config=scorer.config,
         )
-        emotional_profile_service = EmotionalProfilesService(
+        emotional_profile_calculator: EmotionalProfileCalculator = cached_calculator
+        if self.emotional_profile_scorer == EmotionalProfileScorer.SHADOW:
+            emotional_profile_calculator = ShadowEmotionalProfileCalculator(
+                calculator=cached_calculator, shadow_calculator=self.lexicon_calculator
+            )
+
+        return EmotionalProfilesService(
             emotional_profile_repository=TrackEmotionalProfilesRepository(
-                self.db_session
+                self.db_session,
+                config_key=cached_calculator.config_key,
+                unit_of_work=self.unit_of_work,
+            ),
+            emotional_profile_calculator=emotional_profile_calculator,
+            fallback_calculator=(
+                self.lexicon_calculator
+                if self.emotional_profile_scorer == EmotionalProfileScorer.FALLBACK
+                else None
+            ),
+        )
+
+    def create_top_emotions_pipeline(self) -> TopEmotionsPipeline:
+        lyrics_service = LyricsService(
+            lyrics_repository=TrackLyricsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
             ),
-            emotional_profile_calculator=self.model_service,
+            lyrics_failures_repository=TrackLyricsFailuresRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
+            lyrics_scraper=self.lyrics_scraper,
         )
+        emotional_profile_service = self._create_emotional_profiles_service()
         return TopEmotionsPipeline(
             lyrics_service=lyrics_service,
             emotional_profile_service=emotional_profile_service,
-            top_emotions_repository=TopEmotionsRepository(self.db_session),
+            top_emotions_repository=TopEmotionsRepository(
+                self.db_session, unit_of_work=self.unit_of_work
+            ),
         )
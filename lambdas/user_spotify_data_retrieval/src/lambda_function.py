@@ -1,26 +1,60 @@
-import asyncio
-
 from aws_lambda_typing import context as context_
+from loguru import logger
 
 from src.core.config import Settings
-from src.models.event import LambdaEvent, parse_event
+from src.core.resources import Resources
+from src.models.event import (
+    LambdaEvent,
+    SQSBatchResponse,
+    build_batch_response,
+    is_migrate_event,
+    is_sqs_event,
+    is_warmup_event,
+    parse_event,
+    parse_sqs_records,
+)
 from src.services.data_collection_service import DataCollectionService
+from src.utils.deadline import Deadline
 
+# created during the init phase and reused across warm invocations
 settings = Settings()
-data_collection_service = DataCollectionService(settings)
+resources = Resources(settings)
+data_collection_service = DataCollectionService(settings=settings, resources=resources)
+
+
+def handle_sqs_event(event: LambdaEvent, deadline: Deadline) -> SQSBatchResponse:
+    configs, failed_message_ids = parse_sqs_records(event)
+
+    if configs:
+        failed_message_ids += resources.run(
+            data_collection_service.collect_many_users_data(configs, deadline)
+        )
+
+    return build_batch_response(failed_message_ids)
 
 
-def handler(event: LambdaEvent, _: context_.Context) -> None:
+def handler(
+    event: LambdaEvent, context: context_.Context
+) -> SQSBatchResponse | dict[str, bool] | dict[str, int] | None:
+    deadline = Deadline.from_context(
+        context, reserve_seconds=settings.deadline_reserve_seconds
+    )
+
     try:
+        if is_warmup_event(event):
+            return resources.run(resources.warm_up())
+
+        if is_migrate_event(event):
+            return {"schema_version": resources.run(resources.migrate())}
+
+        resources.check_schema()
+
+        if is_sqs_event(event):
+            return handle_sqs_event(event, deadline)
+
         config = parse_event(event)
 
-        asyncio.run(
-            data_collection_service.collect_user_data(
-                access_token=config.access_token,
-                time_range=config.time_range,
-                collection_date=config.collection_date,
-            )
-        )
+        resources.run(data_collection_service.collect_config_data(config, deadline))
     except Exception as e:
-        print(f"Lambda execution failed: {str(e)}")
+        logger.error(f"Lambda execution failed: {str(e)}")
         raise
@@ -0,0 +1,25 @@
+"""Apply pending migrations: `python -m src.migrations`"""
+
+import asyncio
+
+from src.core.config import Settings
+from src.core.db import create_db_engine
+from src.migrations.runner import migrate
+
+
+async def main() -> None:
+    settings = Settings()
+    engine = create_db_engine(
+        connection_string=settings.db_connection_string,
+        pool_size=1,
+        pool_recycle_seconds=settings.db_pool_recycle_seconds,
+    )
+
+    try:
+        await migrate(engine, settings)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
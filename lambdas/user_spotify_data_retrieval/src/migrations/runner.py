@@ -0,0 +1,115 @@
+from types import ModuleType
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import Settings
+
+from src.migrations.versions import (
+    v0001_initial_schema,
+    v0002_top_item_snapshot_indexes,
+    v0003_artist_updated_at,
+    v0004_track_lyrics_failure,
+    v0005_emotional_profile_result_cache,
+    v0006_deferred_track_foreign_keys,
+    v0007_run_checkpoint,
+)
+
+MIGRATIONS: list[ModuleType] = [
+    v0001_initial_schema,
+    v0002_top_item_snapshot_indexes,
+    v0003_artist_updated_at,
+    v0004_track_lyrics_failure,
+    v0005_emotional_profile_result_cache,
+    v0006_deferred_track_foreign_keys,
+    v0007_run_checkpoint,
+]
+SCHEMA_VERSION = MIGRATIONS[-1].VERSION
+
+# arbitrary key so concurrent migrate runs queue up instead of racing
+MIGRATION_LOCK_ID = 727_001
+
+
+class MigrationException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """Return the applied schema version, or 0 if migrations have never run"""
+    async with engine.connect() as connection:
+        try:
+            version = await connection.scalar(
+                text("SELECT max(version) FROM schema_version")
+            )
+        except ProgrammingError:
+            return 0
+
+    return version or 0
+
+
+def check_schema_version(version: int) -> None:
+    if version < SCHEMA_VERSION:
+        raise MigrationException(
+            f"Database schema is at version {version} but version {SCHEMA_VERSION} is required. Run migrations first."
+        )
+
+
+async def migrate(engine: AsyncEngine, settings: Settings | None = None) -> int:
+    """Apply any pending migrations in a single transaction.
+
+    A migration can also define `backfill(connection, settings)` for data that
+    depends on the deployed settings. It's skipped without settings, e.g. on a
+    new database with nothing to backfill.
+    """
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": MIGRATION_LOCK_ID},
+        )
+        await connection.execute(
+            text(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER NOT NULL PRIMARY KEY,
+                    description VARCHAR NOT NULL,
+                    applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+                )
+                """
+            )
+        )
+        current_version = (
+            await connection.scalar(text("SELECT max(version) FROM schema_version"))
+            or 0
+        )
+
+        for migration in MIGRATIONS:
+            if migration.VERSION <= current_version:
+                continue
+
+            logger.info(
+                f"Applying migration {migration.VERSION}: {migration.DESCRIPTION}"
+            )
+
+            for statement in migration.STATEMENTS:
+                await connection.execute(text(statement))
+
+            if hasattr(migration, "backfill"):
+                if settings is None:
+                    logger.warning(
+                        f"Skipping backfill of migration {migration.VERSION} without settings"
+                    )
+                else:
+                    await migration.backfill(connection, settings)
+
+            await connection.execute(
+                text(
+                    "INSERT INTO schema_version (version, description) VALUES (:version, :description)"
+                ),
+                {"version": migration.VERSION, "description": migration.DESCRIPTION},
+            )
+            current_version = migration.VERSION
+
+    logger.info(f"Database schema is at version {current_version}")
+    return current_version
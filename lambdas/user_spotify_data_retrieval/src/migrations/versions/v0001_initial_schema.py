@@ -0,0 +1,155 @@
+"""Initial schema, matching what Base.metadata.create_all used to build.
+
+Every statement is idempotent so databases bootstrapped by create_all can be
+brought under migration control without changes.
+"""
+
+VERSION = 1
+DESCRIPTION = "Initial schema"
+
+STATEMENTS = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE time_range_enum AS ENUM ('SHORT_TERM', 'MEDIUM_TERM', 'LONG_TERM');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE position_change_enum AS ENUM ('UP', 'DOWN', 'NEW');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS artist (
+        id VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        images JSONB NOT NULL,
+        spotify_url VARCHAR NOT NULL,
+        genres JSONB NOT NULL,
+        followers INTEGER NOT NULL,
+        popularity INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS profile (
+        id VARCHAR NOT NULL,
+        display_name VARCHAR NOT NULL,
+        email VARCHAR,
+        images JSONB NOT NULL,
+        spotify_url VARCHAR NOT NULL,
+        creation_timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        followers INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS track (
+        id VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        images JSONB NOT NULL,
+        spotify_url VARCHAR NOT NULL,
+        album_name VARCHAR NOT NULL,
+        release_date VARCHAR NOT NULL,
+        explicit BOOLEAN NOT NULL,
+        duration_ms INTEGER NOT NULL,
+        popularity INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS top_artist (
+        artist_id VARCHAR NOT NULL,
+        user_id VARCHAR NOT NULL,
+        collection_date DATE NOT NULL,
+        time_range time_range_enum NOT NULL,
+        position INTEGER NOT NULL,
+        position_change position_change_enum,
+        PRIMARY KEY (artist_id, user_id, collection_date, time_range),
+        FOREIGN KEY (artist_id) REFERENCES artist (id),
+        FOREIGN KEY (user_id) REFERENCES profile (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS top_emotion (
+        emotion_id VARCHAR NOT NULL,
+        percentage DOUBLE PRECISION NOT NULL,
+        user_id VARCHAR NOT NULL,
+        collection_date DATE NOT NULL,
+        time_range time_range_enum NOT NULL,
+        position INTEGER NOT NULL,
+        position_change position_change_enum,
+        PRIMARY KEY (emotion_id, user_id, collection_date, time_range),
+        UNIQUE (user_id, emotion_id, collection_date, time_range),
+        FOREIGN KEY (user_id) REFERENCES profile (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS top_genre (
+        genre_id VARCHAR NOT NULL,
+        percentage DOUBLE PRECISION NOT NULL,
+        user_id VARCHAR NOT NULL,
+        collection_date DATE NOT NULL,
+        time_range time_range_enum NOT NULL,
+        position INTEGER NOT NULL,
+        position_change position_change_enum,
+        PRIMARY KEY (genre_id, user_id, collection_date, time_range),
+        UNIQUE (user_id, genre_id, collection_date, time_range),
+        FOREIGN KEY (user_id) REFERENCES profile (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS top_track (
+        track_id VARCHAR NOT NULL,
+        user_id VARCHAR NOT NULL,
+        collection_date DATE NOT NULL,
+        time_range time_range_enum NOT NULL,
+        position INTEGER NOT NULL,
+        position_change position_change_enum,
+        PRIMARY KEY (track_id, user_id, collection_date, time_range),
+        UNIQUE (user_id, track_id, collection_date, time_range),
+        FOREIGN KEY (track_id) REFERENCES track (id),
+        FOREIGN KEY (user_id) REFERENCES profile (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS track_artist (
+        track_id VARCHAR NOT NULL,
+        artist_id VARCHAR NOT NULL,
+        PRIMARY KEY (track_id, artist_id),
+        FOREIGN KEY (track_id) REFERENCES track (id),
+        FOREIGN KEY (artist_id) REFERENCES artist (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS track_emotional_profile (
+        track_id VARCHAR NOT NULL,
+        joy DOUBLE PRECISION NOT NULL,
+        sadness DOUBLE PRECISION NOT NULL,
+        anger DOUBLE PRECISION NOT NULL,
+        fear DOUBLE PRECISION NOT NULL,
+        love DOUBLE PRECISION NOT NULL,
+        hope DOUBLE PRECISION NOT NULL,
+        nostalgia DOUBLE PRECISION NOT NULL,
+        loneliness DOUBLE PRECISION NOT NULL,
+        confidence DOUBLE PRECISION NOT NULL,
+        despair DOUBLE PRECISION NOT NULL,
+        excitement DOUBLE PRECISION NOT NULL,
+        mystery DOUBLE PRECISION NOT NULL,
+        defiance DOUBLE PRECISION NOT NULL,
+        gratitude DOUBLE PRECISION NOT NULL,
+        spirituality DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (track_id),
+        FOREIGN KEY (track_id) REFERENCES track (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS track_lyrics (
+        track_id VARCHAR NOT NULL,
+        lyrics VARCHAR NOT NULL,
+        PRIMARY KEY (track_id),
+        FOREIGN KEY (track_id) REFERENCES track (id)
+    )
+    """,
+]
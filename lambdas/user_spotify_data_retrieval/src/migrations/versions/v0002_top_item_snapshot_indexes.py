@@ -0,0 +1,18 @@
+"""Index the top_* tables for the latest-snapshot lookup.
+
+The primary keys lead with the item id, so they can't serve the lookups used
+when working out position changes: `max(collection_date)` for a
+`user_id = ? AND time_range = ?`, then the rows with `collection_date` equal
+to it.
+"""
+
+VERSION = 2
+DESCRIPTION = "Add (user_id, time_range, collection_date) indexes to top_* tables"
+
+STATEMENTS = [
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_{table}_user_id_time_range_collection_date
+    ON {table} (user_id, time_range, collection_date)
+    """
+    for table in ["top_artist", "top_track", "top_genre", "top_emotion"]
+]
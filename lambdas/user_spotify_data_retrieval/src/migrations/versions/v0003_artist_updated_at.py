@@ -0,0 +1,14 @@
+"""Track when artist details were last fetched from Spotify.
+
+Existing rows are left null so they count as stale and get refreshed on the
+next run that needs them.
+"""
+
+VERSION = 3
+DESCRIPTION = "Add artist.updated_at"
+
+STATEMENTS = [
+    """
+    ALTER TABLE artist ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE
+    """,
+]
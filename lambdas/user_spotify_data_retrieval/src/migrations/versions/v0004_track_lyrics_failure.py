@@ -0,0 +1,24 @@
+"""Remember lyrics that couldn't be scraped so they aren't retried every run."""
+
+VERSION = 4
+DESCRIPTION = "Add track_lyrics_failure table"
+
+STATEMENTS = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE lyrics_failure_reason_enum AS ENUM ('NOT_FOUND', 'NO_LYRICS');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS track_lyrics_failure (
+        track_id VARCHAR NOT NULL,
+        reason lyrics_failure_reason_enum NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_attempted_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        retry_after TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (track_id),
+        FOREIGN KEY (track_id) REFERENCES track (id)
+    )
+    """,
+]
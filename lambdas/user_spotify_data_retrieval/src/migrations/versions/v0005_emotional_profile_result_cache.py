@@ -0,0 +1,91 @@
+"""Cache model results by content and record which config produced each profile.
+
+Existing track profiles were scored by the model config deployed with this
+migration, so they're backfilled with its key. Left null, they would no longer
+match it and the whole catalogue would be scored again.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.core.config import Settings
+from src.models.domain import EmotionalProfileConfig
+from src.services.emotional_profiles.cached_calculator import get_config_key
+
+VERSION = 5
+DESCRIPTION = "Add emotional_profile_config and emotional_profile_result tables"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS emotional_profile_config (
+        config_key VARCHAR NOT NULL,
+        model_name VARCHAR NOT NULL,
+        temperature DOUBLE PRECISION NOT NULL,
+        top_p DOUBLE PRECISION NOT NULL,
+        prompt VARCHAR NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (config_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS emotional_profile_result (
+        content_key VARCHAR NOT NULL,
+        config_key VARCHAR NOT NULL,
+        joy DOUBLE PRECISION NOT NULL,
+        sadness DOUBLE PRECISION NOT NULL,
+        anger DOUBLE PRECISION NOT NULL,
+        fear DOUBLE PRECISION NOT NULL,
+        love DOUBLE PRECISION NOT NULL,
+        hope DOUBLE PRECISION NOT NULL,
+        nostalgia DOUBLE PRECISION NOT NULL,
+        loneliness DOUBLE PRECISION NOT NULL,
+        confidence DOUBLE PRECISION NOT NULL,
+        despair DOUBLE PRECISION NOT NULL,
+        excitement DOUBLE PRECISION NOT NULL,
+        mystery DOUBLE PRECISION NOT NULL,
+        defiance DOUBLE PRECISION NOT NULL,
+        gratitude DOUBLE PRECISION NOT NULL,
+        spirituality DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (content_key),
+        FOREIGN KEY (config_key) REFERENCES emotional_profile_config (config_key)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_emotional_profile_result_config_key
+    ON emotional_profile_result (config_key)
+    """,
+    """
+    ALTER TABLE track_emotional_profile ADD COLUMN IF NOT EXISTS config_key VARCHAR
+    REFERENCES emotional_profile_config (config_key)
+    """,
+]
+
+
+async def backfill(connection: AsyncConnection, settings: Settings) -> None:
+    config = EmotionalProfileConfig(
+        model_name=settings.model_name,
+        temperature=settings.model_temp,
+        top_p=settings.model_top_p,
+        prompt=settings.model_instructions,
+    )
+    config_key = get_config_key(config)
+
+    await connection.execute(
+        text(
+            """
+            INSERT INTO emotional_profile_config
+                (config_key, model_name, temperature, top_p, prompt)
+            VALUES (:config_key, :model_name, :temperature, :top_p, :prompt)
+            ON CONFLICT (config_key) DO NOTHING
+            """
+        ),
+        {"config_key": config_key, **config.model_dump()},
+    )
+    await connection.execute(
+        text(
+            "UPDATE track_emotional_profile SET config_key = :config_key "
+            "WHERE config_key IS NULL"
+        ),
+        {"config_key": config_key},
+    )
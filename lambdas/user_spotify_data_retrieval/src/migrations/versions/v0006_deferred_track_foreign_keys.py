@@ -0,0 +1,24 @@
+"""Check lyrics and emotional profile track references on commit.
+
+The emotions stage starts as soon as the top tracks are fetched, so it can
+write lyrics and profiles for tracks the tracks stage hasn't stored yet. It
+commits after the tracks stage, when the tracks it references exist.
+"""
+
+VERSION = 6
+DESCRIPTION = "Defer track foreign keys on lyrics and emotional profile tables"
+
+STATEMENTS = [
+    """
+    ALTER TABLE track_lyrics ALTER CONSTRAINT track_lyrics_track_id_fkey
+    DEFERRABLE INITIALLY DEFERRED
+    """,
+    """
+    ALTER TABLE track_lyrics_failure ALTER CONSTRAINT track_lyrics_failure_track_id_fkey
+    DEFERRABLE INITIALLY DEFERRED
+    """,
+    """
+    ALTER TABLE track_emotional_profile ALTER CONSTRAINT track_emotional_profile_track_id_fkey
+    DEFERRABLE INITIALLY DEFERRED
+    """,
+]
@@ -0,0 +1,22 @@
+"""Record which stages of a run have committed.
+
+A redelivered message for the same user, time range and collection date skips
+the stages already recorded here instead of redoing every Spotify call.
+"""
+
+VERSION = 7
+DESCRIPTION = "Add run_checkpoint table"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS run_checkpoint (
+        user_id VARCHAR NOT NULL,
+        time_range time_range_enum NOT NULL,
+        collection_date DATE NOT NULL,
+        completed_stages JSONB NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (user_id, time_range, collection_date),
+        FOREIGN KEY (user_id) REFERENCES profile (id)
+    )
+    """,
+]
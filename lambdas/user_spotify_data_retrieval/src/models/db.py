@@ -9,10 +9,12 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Column,
+    Index,
+    func,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from src.models.enums import PositionChange, TimeRange
+from src.models.enums import LyricsFailureReason, PositionChange, TimeRange
 
 
 # -----------------------------
@@ -63,6 +65,8 @@ class ArtistDB(Base):
     genres: Mapped[list[str]] = mapped_column(JSONB)
     followers: Mapped[int]
     popularity: Mapped[int]
+    # when the details were last fetched from Spotify, null for rows from before it was tracked
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     tracks: Mapped[list["TrackDB"]] = relationship(
         secondary=track_artist_association, back_populates="artists"
@@ -118,6 +122,15 @@ class TopArtistDB(TopItemDBBase):
 
     artist: Mapped[ArtistDB] = relationship()
 
+    __table_args__ = (
+        Index(
+            "ix_top_artist_user_id_time_range_collection_date",
+            "user_id",
+            "time_range",
+            "collection_date",
+        ),
+    )
+
 
 # -----------------------------
 # TopTrack
@@ -131,6 +144,12 @@ class TopTrackDB(TopItemDBBase):
 
     __table_args__ = (
         UniqueConstraint("user_id", "track_id", "collection_date", "time_range"),
+        Index(
+            "ix_top_track_user_id_time_range_collection_date",
+            "user_id",
+            "time_range",
+            "collection_date",
+        ),
     )
 
 
@@ -145,6 +164,12 @@ class TopGenreDB(TopItemDBBase):
 
     __table_args__ = (
         UniqueConstraint("user_id", "genre_id", "collection_date", "time_range"),
+        Index(
+            "ix_top_genre_user_id_time_range_collection_date",
+            "user_id",
+            "time_range",
+            "collection_date",
+        ),
     )
 
 
@@ -159,6 +184,12 @@ class TopEmotionDB(TopItemDBBase):
 
     __table_args__ = (
         UniqueConstraint("user_id", "emotion_id", "collection_date", "time_range"),
+        Index(
+            "ix_top_emotion_user_id_time_range_collection_date",
+            "user_id",
+            "time_range",
+            "collection_date",
+        ),
     )
 
 
@@ -168,17 +199,46 @@ class TopEmotionDB(TopItemDBBase):
 class TrackLyricsDB(Base):
     __tablename__ = "track_lyrics"
 
-    track_id: Mapped[str] = mapped_column(ForeignKey("track.id"), primary_key=True)
+    # checked on commit so lyrics can be written before the track is stored
+    track_id: Mapped[str] = mapped_column(
+        ForeignKey("track.id", deferrable=True, initially="DEFERRED"),
+        primary_key=True,
+    )
     lyrics: Mapped[str]
 
 
+# -----------------------------
+# TrackLyricsFailure
+# -----------------------------
+class TrackLyricsFailureDB(Base):
+    __tablename__ = "track_lyrics_failure"
+
+    track_id: Mapped[str] = mapped_column(
+        ForeignKey("track.id", deferrable=True, initially="DEFERRED"),
+        primary_key=True,
+    )
+    reason: Mapped[LyricsFailureReason] = mapped_column(
+        Enum(LyricsFailureReason, name="lyrics_failure_reason_enum")
+    )
+    attempts: Mapped[int]
+    last_attempted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    retry_after: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
 # -----------------------------
 # TrackEmotionalProfile
 # -----------------------------
 class TrackEmotionalProfileDB(Base):
     __tablename__ = "track_emotional_profile"
 
-    track_id: Mapped[str] = mapped_column(ForeignKey("track.id"), primary_key=True)
+    track_id: Mapped[str] = mapped_column(
+        ForeignKey("track.id", deferrable=True, initially="DEFERRED"),
+        primary_key=True,
+    )
+    # null for profiles calculated before configs were recorded
+    config_key: Mapped[str | None] = mapped_column(
+        ForeignKey("emotional_profile_config.config_key")
+    )
 
     joy: Mapped[float]
     sadness: Mapped[float]
@@ -195,3 +255,70 @@ class TrackEmotionalProfileDB(Base):
     defiance: Mapped[float]
     gratitude: Mapped[float]
     spirituality: Mapped[float]
+
+
+# -----------------------------
+# EmotionalProfileConfig
+# -----------------------------
+class EmotionalProfileConfigDB(Base):
+    __tablename__ = "emotional_profile_config"
+
+    config_key: Mapped[str] = mapped_column(primary_key=True)
+    model_name: Mapped[str]
+    temperature: Mapped[float]
+    top_p: Mapped[float]
+    prompt: Mapped[str]
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+# -----------------------------
+# EmotionalProfileResult
+# -----------------------------
+class EmotionalProfileResultDB(Base):
+    __tablename__ = "emotional_profile_result"
+    __table_args__ = (Index("ix_emotional_profile_result_config_key", "config_key"),)
+
+    content_key: Mapped[str] = mapped_column(primary_key=True)
+    config_key: Mapped[str] = mapped_column(
+        ForeignKey("emotional_profile_config.config_key")
+    )
+
+    joy: Mapped[float]
+    sadness: Mapped[float]
+    anger: Mapped[float]
+    fear: Mapped[float]
+    love: Mapped[float]
+    hope: Mapped[float]
+    nostalgia: Mapped[float]
+    loneliness: Mapped[float]
+    confidence: Mapped[float]
+    despair: Mapped[float]
+    excitement: Mapped[float]
+    mystery: Mapped[float]
+    defiance: Mapped[float]
+    gratitude: Mapped[float]
+    spirituality: Mapped[float]
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+# -----------------------------
+# RunCheckpoint
+# -----------------------------
+class RunCheckpointDB(Base):
+    __tablename__ = "run_checkpoint"
+
+    user_id: Mapped[str] = mapped_column(ForeignKey("profile.id"), primary_key=True)
+    time_range: Mapped[TimeRange] = mapped_column(
+        Enum(TimeRange, name="time_range_enum"), primary_key=True
+    )
+    collection_date: Mapped[date] = mapped_column(primary_key=True)
+    # names of the stages that committed for this run
+    completed_stages: Mapped[list[str]] = mapped_column(JSONB)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
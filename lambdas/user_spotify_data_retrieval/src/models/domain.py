@@ -2,11 +2,12 @@ import abc
 import datetime
 from typing import Annotated
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
 import pydantic
 
 from src.models.shared import Image, TrackArtist
-from src.models.enums import PositionChange, TimeRange
+from src.models.enums import LyricsFailureReason, PositionChange, TimeRange
 
 
 # -----------------------------
@@ -125,6 +126,11 @@ class TrackLyrics(BaseModel):
     lyrics: str
 
 
+class TrackLyricsFailure(BaseModel):
+    track_id: str
+    reason: LyricsFailureReason
+
+
 # -----------------------------
 # Track Emotional Profile
 # -----------------------------
@@ -154,6 +160,51 @@ class EmotionalProfile(BaseModel):
     spirituality: EmotionPercentage
 
 
+# column order of emotional profile matrices
+EMOTIONS: list[str] = list(EmotionalProfile.model_fields)
+
+
 class TrackEmotionalProfile(BaseModel):
     track_id: str
     emotional_profile: EmotionalProfile
+
+
+class EmotionalProfileMatrix(BaseModel):
+    """Emotional profiles as a tracks x EMOTIONS array, rows in track_ids order"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    track_ids: list[str]
+    values: np.ndarray
+
+    @classmethod
+    def from_profiles(
+        cls, profiles: list[TrackEmotionalProfile]
+    ) -> "EmotionalProfileMatrix":
+        values = np.array(
+            [
+                [getattr(profile.emotional_profile, emotion) for emotion in EMOTIONS]
+                for profile in profiles
+            ],
+            dtype=np.float64,
+        ).reshape(len(profiles), len(EMOTIONS))
+        return cls(track_ids=[profile.track_id for profile in profiles], values=values)
+
+    def concat(self, other: "EmotionalProfileMatrix") -> "EmotionalProfileMatrix":
+        return EmotionalProfileMatrix(
+            track_ids=[*self.track_ids, *other.track_ids],
+            values=np.vstack([self.values, other.values]),
+        )
+
+
+class TrackEmotionalProfileBatch(BaseModel):
+    profiles: list[TrackEmotionalProfile]
+
+
+class EmotionalProfileConfig(BaseModel):
+    """Everything about a model call that can change the profile it returns"""
+
+    model_name: str
+    temperature: float
+    top_p: float
+    prompt: str
@@ -7,6 +7,23 @@ class TimeRange(str, Enum):
     LONG_TERM = "long_term"  # approx last 12 months
 
 
+class LyricsFailureReason(str, Enum):
+    NOT_FOUND = "not_found"  # lyrics page doesn't exist
+    NO_LYRICS = "no_lyrics"  # page exists but has no lyrics containers
+
+
+class LyricsExtractorType(str, Enum):
+    BEAUTIFUL_SOUP = "bs4"  # reference implementation, parses the whole page
+    SCANNER = "scanner"  # only parses the lyrics container regions
+
+
+class EmotionalProfileScorer(str, Enum):
+    MODEL = "model"  # every profile comes from the model
+    LEXICON = "lexicon"  # local word counts only, no model calls
+    FALLBACK = "fallback"  # model, with the lexicon for tracks the model fails on
+    SHADOW = "shadow"  # model, with the lexicon run alongside and compared in logs
+
+
 class PositionChange(Enum):
     UP = "up"
     DOWN = "down"
@@ -3,6 +3,7 @@ import json
 import pydantic
 import typing
 from aws_lambda_typing import events
+from loguru import logger
 
 from src.models.enums import TimeRange
 
@@ -11,13 +12,33 @@ class RunConfig(pydantic.BaseModel):
     """Configuration for running the data collection pipeline"""
 
     access_token: str
-    time_range: typing.Annotated[
-        TimeRange, pydantic.BeforeValidator(lambda v: TimeRange(v))
-    ]
+    time_range: (
+        typing.Annotated[TimeRange, pydantic.BeforeValidator(lambda v: TimeRange(v))]
+        | None
+    ) = None
     collection_date: typing.Annotated[
         datetime.date,
         pydantic.BeforeValidator(lambda v: datetime.date.fromisoformat(v)),
     ] = pydantic.Field(default_factory=datetime.date.today)
+    # optional, lets a run that already completed be skipped without calling Spotify
+    user_id: str | None = None
+    # set on follow-up runs, which only run the stages left unfinished
+    stages: list[str] | None = None
+    follow_up_count: int = 0
+
+    @property
+    def time_ranges(self) -> list[TimeRange]:
+        """Time ranges to collect - every range when no single range is given"""
+        if self.time_range is None:
+            return list(TimeRange)
+
+        return [self.time_range]
+
+    def create_follow_up(self, stages: list[str]) -> "RunConfig":
+        """Config for a run that carries on with the stages this run left unfinished"""
+        return self.model_copy(
+            update={"stages": stages, "follow_up_count": self.follow_up_count + 1}
+        )
 
 
 class ParseEventException(Exception):
@@ -28,19 +49,80 @@ class ParseEventException(Exception):
 
 # AWS Lambda event types
 SQSEvent = events.SQSEvent
+SQSMessage = events.sqs.SQSMessage
 DirectEvent = typing.Dict[str, typing.Any]
 LambdaEvent = typing.Union[SQSEvent, DirectEvent]
 
 
+# AWS Lambda response types
+class SQSBatchItemFailure(typing.TypedDict):
+    itemIdentifier: str
+
+
+class SQSBatchResponse(typing.TypedDict):
+    batchItemFailures: list[SQSBatchItemFailure]
+
+
+WARMUP_EVENT_TYPE = "warmup"
+MIGRATE_EVENT_TYPE = "migrate"
+
+
+def is_warmup_event(event: LambdaEvent) -> bool:
+    """Check whether the event only asks the function to warm up its resources"""
+    return event.get("type") == WARMUP_EVENT_TYPE
+
+
+def is_migrate_event(event: LambdaEvent) -> bool:
+    """Check whether the event asks the function to apply pending migrations"""
+    return event.get("type") == MIGRATE_EVENT_TYPE
+
+
+def is_sqs_event(event: LambdaEvent) -> bool:
+    """Check whether the Lambda event was delivered by an SQS event source"""
+    return "Records" in event
+
+
 def parse_event(event: LambdaEvent) -> RunConfig:
-    """Parse Lambda event and return RunConfig"""
+    """Parse a directly invoked Lambda event, SQS events go to parse_sqs_records"""
     try:
-        config_data = event
+        return RunConfig.model_validate(event)
+    except pydantic.ValidationError as e:
+        raise ParseEventException(f"Failed to parse event: {str(e)}") from e
 
-        if "Records" in event and len(event["Records"]) > 0:
-            message_body = event["Records"][0]["body"]
-            config_data = json.loads(message_body)
 
-        return RunConfig.model_validate(config_data)
+def parse_sqs_record(record: SQSMessage) -> RunConfig:
+    """Parse a single SQS record body and return RunConfig"""
+    try:
+        return RunConfig.model_validate(json.loads(record["body"]))
     except (json.JSONDecodeError, pydantic.ValidationError) as e:
-        raise ParseEventException(f"Failed to parse event: {str(e)}") from e
+        raise ParseEventException(
+            f"Failed to parse record {record['messageId']}: {str(e)}"
+        ) from e
+
+
+def parse_sqs_records(event: SQSEvent) -> tuple[dict[str, RunConfig], list[str]]:
+    """Parse every record in an SQS event.
+
+    Returns the configs keyed by message ID, plus the IDs of any records that
+    could not be parsed so they can be reported as batch item failures.
+    """
+    configs = {}
+    failed_message_ids = []
+
+    for record in event["Records"]:
+        try:
+            configs[record["messageId"]] = parse_sqs_record(record)
+        except ParseEventException as e:
+            logger.warning(str(e))
+            failed_message_ids.append(record["messageId"])
+
+    return configs, failed_message_ids
+
+
+def build_batch_response(failed_message_ids: list[str]) -> SQSBatchResponse:
+    """Build the partial batch response so only failed records are redelivered"""
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id} for message_id in failed_message_ids
+        ]
+    }
@@ -0,0 +1,317 @@
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Iterable
+
+from loguru import logger
+
+from src.utils.deadline import Deadline, DeadlineExceededException
+from src.utils.timings import StageTimings
+
+
+class DagSchedulerException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class DagRunUnfinishedException(DagSchedulerException):
+    """Raised when nodes stopped at the deadline, after saving what they finished"""
+
+    def __init__(self, message: str, unfinished_nodes: list[str]):
+        super().__init__(message)
+        self.unfinished_nodes = unfinished_nodes
+
+
+class Node:
+    """A stage of a run, declared by the values it reads and the value it produces.
+
+    `run` is called with each of `inputs` as a keyword argument and its result
+    is stored under `output`. `max_concurrency` caps how many runs of the node
+    are in flight across every run of the scheduler, and `timeout_seconds`
+    caps how long one run of the node may take. `runs_with` names nodes that
+    hand this one values through a run input as they go, e.g. a Channel, so
+    they're selected along with it but not waited on.
+
+    A node that can be resumed may stop itself before the run's deadline by
+    raising DeadlineExceededException once its finished work is saved. It and
+    the nodes depending on it are then reported as unfinished, not failed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[..., Awaitable[Any]],
+        inputs: list[str] | None = None,
+        output: str | None = None,
+        max_concurrency: int | None = None,
+        timeout_seconds: float | None = None,
+        runs_with: list[str] | None = None,
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or []
+        self.output = output
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.runs_with = runs_with or []
+
+
+class DagScheduler:
+    """Runs each node as soon as the nodes producing its inputs have finished.
+
+    Dependencies come from the declared inputs and outputs, so adding a stage
+    means adding a node rather than reordering the others. A failed node skips
+    the nodes that depend on it, but independent nodes still run to the end.
+    A run's deadline caps every node on top of its own timeout, and a node
+    still running at the deadline is reported as unfinished rather than failed.
+    """
+
+    def __init__(self, nodes: list[Node], inputs: list[str]):
+        self.nodes = {node.name: node for node in nodes}
+        self.inputs = inputs
+
+        if len(self.nodes) != len(nodes):
+            raise DagSchedulerException("Node names must be unique")
+
+        producers: dict[str, str] = {}
+        for node in nodes:
+            if node.output is None:
+                continue
+            if node.output in producers or node.output in inputs:
+                raise DagSchedulerException(
+                    f"Value {node.output} is produced more than once"
+                )
+            producers[node.output] = node.name
+
+        self.dependencies: dict[str, list[str]] = {}
+        for node in nodes:
+            unknown_nodes = [name for name in node.runs_with if name not in self.nodes]
+            if unknown_nodes:
+                raise DagSchedulerException(
+                    f"Node {node.name} runs with unknown nodes: {unknown_nodes}"
+                )
+
+            missing_inputs = [
+                name
+                for name in node.inputs
+                if name not in producers and name not in inputs
+            ]
+            if missing_inputs:
+                raise DagSchedulerException(
+                    f"Node {node.name} reads values nothing provides: {missing_inputs}"
+                )
+            self.dependencies[node.name] = list(
+                dict.fromkeys(
+                    producers[name] for name in node.inputs if name in producers
+                )
+            )
+
+        self.order = self._sort()
+        # shared by every run so limits hold across concurrent runs
+        self.semaphores = {
+            node.name: asyncio.Semaphore(node.max_concurrency)
+            for node in nodes
+            if node.max_concurrency is not None
+        }
+
+    def _sort(self) -> list[str]:
+        """Order nodes so each comes after its dependencies, failing on cycles"""
+        order: list[str] = []
+        remaining = dict(self.dependencies)
+
+        while remaining:
+            ready = [
+                name
+                for name, dependencies in remaining.items()
+                if all(dependency in order for dependency in dependencies)
+            ]
+            if not ready:
+                raise DagSchedulerException(
+                    f"Nodes depend on each other in a cycle: {sorted(remaining)}"
+                )
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+
+        return order
+
+    def select_nodes(
+        self, names: list[str] | None = None, provided: Iterable[str] = ()
+    ) -> list[str]:
+        """Return the named nodes and every node they depend on or run with, in run order.
+
+        Nodes producing a `provided` value aren't depended on, as that value
+        was already worked out, e.g. by an earlier run.
+        """
+        provided = set(provided)
+        if names is None:
+            names = [
+                name for name in self.order if self.nodes[name].output not in provided
+            ]
+
+        unknown_names = [name for name in names if name not in self.nodes]
+        if unknown_names:
+            raise DagSchedulerException(f"Unknown nodes: {unknown_names}")
+
+        selected = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in selected or (
+                name not in names and self.nodes[name].output in provided
+            ):
+                continue
+
+            selected.add(name)
+            pending.extend(self.dependencies[name])
+            pending.extend(self.nodes[name].runs_with)
+
+        return [name for name in self.order if name in selected]
+
+    async def _run_node(
+        self,
+        node: Node,
+        values: dict[str, Any],
+        tasks: dict[str, asyncio.Task],
+        stage_timings: StageTimings,
+        deadline: Deadline,
+    ) -> None:
+        dependencies = [
+            tasks[name] for name in self.dependencies[node.name] if name in tasks
+        ]
+
+        if dependencies:
+            await asyncio.wait(dependencies)
+
+            if any(task.cancelled() or task.exception() for task in dependencies):
+                logger.warning(
+                    f"Skipping {node.name}, a node it depends on didn't finish"
+                )
+                raise asyncio.CancelledError()
+
+        # timed from when the node is ready, so waiting for a slot counts
+        with stage_timings.stage(node.name):
+            async with self.semaphores.get(node.name, nullcontext()):
+                async with asyncio.timeout(node.timeout_seconds), deadline.limit():
+                    result = await node.run(
+                        **{name: values[name] for name in node.inputs}
+                    )
+
+        if node.output is not None:
+            values[node.output] = result
+
+    def get_critical_path(self, stage_timings: StageTimings) -> list[str]:
+        """Return the chain of nodes, each waiting on the previous, that finished last"""
+        finished = [name for name in self.order if name in stage_timings.stages]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda name: stage_timings.stages[name][1])]
+
+        while True:
+            dependencies = [
+                name
+                for name in self.dependencies[path[-1]]
+                if name in stage_timings.stages
+            ]
+            if not dependencies:
+                break
+            path.append(
+                max(dependencies, key=lambda name: stage_timings.stages[name][1])
+            )
+
+        return path[::-1]
+
+    def _log_critical_path(self, stage_timings: StageTimings) -> None:
+        critical_path = self.get_critical_path(stage_timings)
+        if not critical_path:
+            return
+
+        steps = []
+        for name in critical_path:
+            start, end = stage_timings.stages[name]
+            steps.append(f"{name} {end - start:.2f}s")
+
+        logger.info(
+            f"Critical path: {' -> '.join(steps)}, "
+            f"finished at {stage_timings.stages[critical_path[-1]][1]:.2f}s"
+        )
+
+    def _get_unfinished_nodes(self, tasks: dict[str, asyncio.Task]) -> list[str]:
+        unfinished_nodes = []
+
+        for name, task in tasks.items():
+            if task.cancelled():
+                # skipped because a node it depends on didn't finish in time
+                if any(
+                    dependency in unfinished_nodes
+                    for dependency in self.dependencies[name]
+                ):
+                    unfinished_nodes.append(name)
+            elif isinstance(task.exception(), DeadlineExceededException):
+                unfinished_nodes.append(name)
+
+        return unfinished_nodes
+
+    async def run(
+        self,
+        inputs: dict[str, Any],
+        stage_timings: StageTimings | None = None,
+        deadline: Deadline | None = None,
+        nodes: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Run the given nodes, or every node, and return all the values produced.
+
+        Only the nodes the given ones depend on are run alongside them, so a
+        run can be resumed from the nodes that were unfinished last time. Values
+        passed in with the inputs aren't produced again.
+        """
+        selected_nodes = self.select_nodes(nodes, provided=inputs)
+        missing_inputs = [
+            name
+            for name in self.inputs
+            if name not in inputs
+            and any(name in self.nodes[node].inputs for node in selected_nodes)
+        ]
+        if missing_inputs:
+            raise DagSchedulerException(f"Missing run inputs: {missing_inputs}")
+
+        stage_timings = stage_timings or StageTimings()
+        deadline = deadline or Deadline()
+        values = dict(inputs)
+        tasks: dict[str, asyncio.Task] = {}
+
+        for name in selected_nodes:
+            tasks[name] = asyncio.create_task(
+                self._run_node(
+                    node=self.nodes[name],
+                    values=values,
+                    tasks=tasks,
+                    stage_timings=stage_timings,
+                    deadline=deadline,
+                )
+            )
+
+        try:
+            await asyncio.wait(tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        stage_timings.log()
+        self._log_critical_path(stage_timings)
+
+        for name, task in tasks.items():
+            if task.cancelled():
+                continue
+
+            exception = task.exception()
+            if exception and not isinstance(exception, DeadlineExceededException):
+                raise DagSchedulerException(f"Node {name} failed") from exception
+
+        unfinished_nodes = self._get_unfinished_nodes(tasks)
+        if unfinished_nodes:
+            raise DagRunUnfinishedException(
+                f"Nodes ran out of time: {unfinished_nodes}", unfinished_nodes
+            )
+
+        return values
@@ -1,141 +1,540 @@
 import asyncio
 import datetime
-import httpx
-import sqlalchemy
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.core.config import Settings
+from src.core.db import RoundTripCounter, get_db_session
 from src.factories.pipeline_factory import PipelineFactory
-from src.models.enums import TimeRange
+from src.models.domain import Artist, Track
+from src.models.enums import EmotionalProfileScorer, TimeRange
 from src.pipelines.profile_pipeline import ProfilePipeline
 from src.pipelines.top_artists_pipeline import TopArtistsPipeline
 from src.pipelines.top_tracks_pipeline import TopTracksPipeline
 from src.pipelines.top_genres_pipeline import TopGenresPipeline
 from src.pipelines.top_emotions_pipeline import TopEmotionsPipeline
+from src.orchestrators.dag_scheduler import (
+    DagRunUnfinishedException,
+    DagScheduler,
+    Node,
+)
+from src.repositories.run_checkpoints_repository import RunCheckpointsRepository
+from src.repositories.unit_of_work import UnitOfWork
+from src.services.emotional_profiles.lexicon_calculator import (
+    LexiconEmotionalProfileCalculator,
+)
 from src.services.emotional_profiles.model_service import ModelService
 from src.services.lyrics.lyrics_scraper import LyricsScraper
-from src.services.spotify_service import SpotifyService
+from src.services.music.artist_registry import ArtistRegistry
+from src.services.music.spotify_service import SpotifyService
+from src.utils.deadline import Deadline, DeadlineExceededException
+from src.utils.streams import Channel
+from src.utils.timings import StageTimings
 
 
 class DataCollectionOrchestrator:
-    """Orchestrates the execution of data collection pipelines"""
-    
-    def __init__(self, settings: Settings, lyrics_semaphore: asyncio.Semaphore):
-        self.settings = settings
-        self.lyrics_semaphore = lyrics_semaphore
-    
-    async def run_top_artists_and_genres_pipelines(
+    """Orchestrates the execution of data collection pipelines.
+
+    Each pipeline is a node of a DAG that declares the values it reads and
+    produces, and runs as soon as they are ready. Each node runs in its own DB
+    session, so concurrent nodes never share a session. The emotions node runs
+    alongside fetching top tracks, starting on each page's lyrics as the page
+    arrives, and alongside storing them. It commits after the tracks its
+    lyrics and profiles reference are stored.
+
+    Every node is stopped at the run's deadline. The emotions node stops a
+    little earlier to commit the lyrics and profiles it finished, and is
+    reported as unfinished so a follow-up run can pick up where it left off.
+
+    Nodes that write mark themselves done in the same transaction as their
+    writes, so a redelivered run skips them and only fetches from Spotify what
+    the remaining nodes need. Their writes are buffered in a unit of work and
+    flushed in one round trip just before they're marked done.
+    """
+
+    # the nodes that write, each marks itself done in the run's checkpoint
+    CHECKPOINTED_STAGES = [
+        "store top artists",
+        "top genres",
+        "store top tracks",
+        "top emotions",
+    ]
+
+    def __init__(
         self,
-        top_artists_pipeline: TopArtistsPipeline,
-        top_genres_pipeline: TopGenresPipeline,
-        access_token: str,
+        session_factory: async_sessionmaker[AsyncSession],
+        spotify_service: SpotifyService,
+        lyrics_scraper: LyricsScraper,
+        model_service: ModelService,
+        artist_cache_ttl: datetime.timedelta = datetime.timedelta(0),
+        lexicon_calculator: LexiconEmotionalProfileCalculator | None = None,
+        emotional_profile_scorer: EmotionalProfileScorer = EmotionalProfileScorer.MODEL,
+        max_concurrent_top_emotions: int | None = None,
+        top_emotions_flush_seconds: float = 0.0,
+    ):
+        self.session_factory = session_factory
+        self.spotify_service = spotify_service
+        self.lyrics_scraper = lyrics_scraper
+        self.model_service = model_service
+        self.artist_cache_ttl = artist_cache_ttl
+        self.lexicon_calculator = lexicon_calculator
+        self.emotional_profile_scorer = emotional_profile_scorer
+        self.top_emotions_flush_seconds = top_emotions_flush_seconds
+        self.scheduler = self._create_scheduler(max_concurrent_top_emotions)
+
+    def _create_pipeline_factory(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ) -> PipelineFactory:
+        return PipelineFactory(
+            spotify_service=self.spotify_service,
+            db_session=db_session,
+            lyrics_scraper=self.lyrics_scraper,
+            model_service=self.model_service,
+            artist_cache_ttl=self.artist_cache_ttl,
+            lexicon_calculator=self.lexicon_calculator,
+            emotional_profile_scorer=self.emotional_profile_scorer,
+            unit_of_work=unit_of_work,
+        )
+
+    def _create_run_checkpoints_repository(
+        self, db_session: AsyncSession
+    ) -> RunCheckpointsRepository:
+        return RunCheckpointsRepository(db_session)
+
+    def _create_scheduler(
+        self, max_concurrent_top_emotions: int | None
+    ) -> DagScheduler:
+        return DagScheduler(
+            inputs=[
+                "access_token",
+                "time_ranges",
+                "collection_date",
+                "artist_registry",
+                "tracks_stored",
+                "top_track_pages",
+                "deadline",
+            ],
+            nodes=[
+                Node(
+                    name="profile",
+                    run=self._run_profile_pipeline,
+                    inputs=["access_token"],
+                    output="user_id",
+                ),
+                Node(
+                    name="fetch top artists",
+                    run=self._fetch_top_artists,
+                    inputs=["access_token", "time_ranges", "artist_registry"],
+                    output="top_artists_by_time_range",
+                ),
+                Node(
+                    name="store top artists",
+                    run=self._store_top_artists,
+                    inputs=[
+                        "user_id",
+                        "time_ranges",
+                        "top_artists_by_time_range",
+                        "collection_date",
+                    ],
+                ),
+                Node(
+                    name="top genres",
+                    run=self._run_top_genres_pipeline,
+                    inputs=[
+                        "user_id",
+                        "time_ranges",
+                        "collection_date",
+                        "top_artists_by_time_range",
+                    ],
+                ),
+                Node(
+                    name="fetch top tracks",
+                    run=self._fetch_top_tracks,
+                    inputs=["access_token", "time_ranges", "top_track_pages"],
+                    output="top_tracks_by_time_range",
+                ),
+                Node(
+                    name="store top tracks",
+                    run=self._store_top_tracks,
+                    inputs=[
+                        "access_token",
+                        "user_id",
+                        "time_ranges",
+                        "top_tracks_by_time_range",
+                        "collection_date",
+                        "artist_registry",
+                        "tracks_stored",
+                    ],
+                ),
+                Node(
+                    name="top emotions",
+                    run=self._run_top_emotions_pipeline,
+                    inputs=[
+                        "user_id",
+                        "time_ranges",
+                        "top_track_pages",
+                        "collection_date",
+                        "tracks_stored",
+                        "deadline",
+                    ],
+                    max_concurrency=max_concurrent_top_emotions,
+                    # reads the fetched pages as they arrive
+                    runs_with=["fetch top tracks"],
+                ),
+            ],
+        )
+
+    async def _run_profile_pipeline(self, access_token: str) -> str:
+        async with get_db_session(self.session_factory) as db_session:
+            unit_of_work = UnitOfWork(db_session)
+            profile_pipeline: ProfilePipeline = self._create_pipeline_factory(
+                db_session, unit_of_work
+            ).create_profile_pipeline()
+            profile = await profile_pipeline.run(access_token)
+            await unit_of_work.flush()
+
+        return profile.id
+
+    async def _mark_completed(
+        self,
+        db_session: AsyncSession,
+        stage: str,
         user_id: str,
-        time_range: TimeRange,
+        time_ranges: list[TimeRange],
         collection_date: datetime.date,
     ) -> None:
-        """Run top artists and genres pipelines"""
-        top_artists = await top_artists_pipeline.run(
-            access_token=access_token,
+        """Mark a stage done, committed along with the stage's writes"""
+        await self._create_run_checkpoints_repository(db_session).mark_completed(
             user_id=user_id,
-            time_range=time_range,
+            time_ranges=time_ranges,
             collection_date=collection_date,
-        )
-        top_genres_pipeline.run(
-            user_id=user_id,
-            time_range=time_range,
-            collection_date=collection_date,
-            artists=top_artists,
+            stage=stage,
         )
 
-    async def run_top_tracks_and_emotions_pipelines(
+    async def _get_remaining_stages(
+        self,
+        user_id: str,
+        time_ranges: list[TimeRange],
+        collection_date: datetime.date,
+        stages: list[str],
+    ) -> list[str]:
+        """Get the stages that haven't committed for this run yet"""
+        async with get_db_session(self.session_factory) as db_session:
+            completed_stages = await self._create_run_checkpoints_repository(
+                db_session
+            ).get_completed_stages(
+                user_id=user_id,
+                time_ranges=time_ranges,
+                collection_date=collection_date,
+            )
+
+        if completed_stages:
+            logger.info(f"Skipping stages already completed: {completed_stages}")
+
+        return [stage for stage in stages if stage not in completed_stages]
+
+    async def _fetch_top_artists(
         self,
-        top_tracks_pipeline: TopTracksPipeline,
-        top_emotions_pipeline: TopEmotionsPipeline,
         access_token: str,
+        time_ranges: list[TimeRange],
+        artist_registry: ArtistRegistry,
+    ) -> dict[TimeRange, list[Artist]]:
+        try:
+            async with get_db_session(self.session_factory) as db_session:
+                top_artists_pipeline: TopArtistsPipeline = (
+                    self._create_pipeline_factory(
+                        db_session
+                    ).create_top_artists_pipeline(artist_registry)
+                )
+                return await top_artists_pipeline.fetch_many(
+                    access_token=access_token, time_ranges=time_ranges
+                )
+        finally:
+            # never leave the tracks node waiting on artists that won't come
+            artist_registry.close()
+
+    async def _store_top_artists(
+        self,
         user_id: str,
-        time_range: TimeRange,
+        time_ranges: list[TimeRange],
+        top_artists_by_time_range: dict[TimeRange, list[Artist]],
         collection_date: datetime.date,
     ) -> None:
-        """Run top tracks and emotions pipelines"""
-        top_tracks = await top_tracks_pipeline.run(
-            access_token=access_token,
+        async with get_db_session(self.session_factory) as db_session:
+            unit_of_work = UnitOfWork(db_session)
+            top_artists_pipeline: TopArtistsPipeline = self._create_pipeline_factory(
+                db_session, unit_of_work
+            ).create_top_artists_pipeline()
+
+            await top_artists_pipeline.store_many(
+                user_id=user_id,
+                artists_by_time_range=top_artists_by_time_range,
+                collection_date=collection_date,
+            )
+            await unit_of_work.flush()
+            await self._mark_completed(
+                db_session=db_session,
+                stage="store top artists",
+                user_id=user_id,
+                time_ranges=time_ranges,
+                collection_date=collection_date,
+            )
+
+    async def _run_top_genres_pipeline(
+        self,
+        user_id: str,
+        time_ranges: list[TimeRange],
+        collection_date: datetime.date,
+        top_artists_by_time_range: dict[TimeRange, list[Artist]],
+    ) -> None:
+        async with get_db_session(self.session_factory) as db_session:
+            unit_of_work = UnitOfWork(db_session)
+            top_genres_pipeline: TopGenresPipeline = self._create_pipeline_factory(
+                db_session, unit_of_work
+            ).create_top_genres_pipeline()
+
+            for time_range, top_artists in top_artists_by_time_range.items():
+                await top_genres_pipeline.run(
+                    user_id=user_id,
+                    time_range=time_range,
+                    collection_date=collection_date,
+                    artists=top_artists,
+                )
+
+            await unit_of_work.flush()
+            await self._mark_completed(
+                db_session=db_session,
+                stage="top genres",
+                user_id=user_id,
+                time_ranges=time_ranges,
+                collection_date=collection_date,
+            )
+
+    async def _fetch_top_tracks(
+        self,
+        access_token: str,
+        time_ranges: list[TimeRange],
+        top_track_pages: Channel[tuple[TimeRange, int, list[Track]]],
+    ) -> dict[TimeRange, list[Track]]:
+        """Fetch top tracks without storing them.
+
+        Lyrics only need each track's name and artist names, which come with
+        the top tracks, so each page is handed to the emotions node as it
+        arrives rather than after the last page or after storing.
+        """
+        try:
+            async with get_db_session(self.session_factory) as db_session:
+                top_tracks_pipeline: TopTracksPipeline = self._create_pipeline_factory(
+                    db_session
+                ).create_top_tracks_pipeline()
+
+                top_tracks_by_time_range = await top_tracks_pipeline.fetch_many(
+                    access_token=access_token,
+                    time_ranges=time_ranges,
+                    on_page=lambda *page: top_track_pages.put(page),
+                )
+        except BaseException as e:
+            # the emotions node mustn't rank top emotions from some of the pages
+            top_track_pages.close(e)
+            raise
+
+        top_track_pages.close()
+        return top_tracks_by_time_range
+
+    async def _store_top_tracks(
+        self,
+        access_token: str,
+        user_id: str,
+        time_ranges: list[TimeRange],
+        top_tracks_by_time_range: dict[TimeRange, list[Track]],
+        collection_date: datetime.date,
+        artist_registry: ArtistRegistry,
+        tracks_stored: asyncio.Event,
+    ) -> None:
+        try:
+            async with get_db_session(self.session_factory) as db_session:
+                unit_of_work = UnitOfWork(db_session)
+                top_tracks_pipeline: TopTracksPipeline = self._create_pipeline_factory(
+                    db_session, unit_of_work
+                ).create_top_tracks_pipeline(artist_registry)
+
+                await top_tracks_pipeline.store_many(
+                    access_token=access_token,
+                    user_id=user_id,
+                    tracks_by_time_range=top_tracks_by_time_range,
+                    collection_date=collection_date,
+                )
+                await unit_of_work.flush()
+                await self._mark_completed(
+                    db_session=db_session,
+                    stage="store top tracks",
+                    user_id=user_id,
+                    time_ranges=time_ranges,
+                    collection_date=collection_date,
+                )
+        finally:
+            # if storing failed, lyrics for unstored tracks fail their foreign
+            # key check on commit and the emotions node rolls back
+            tracks_stored.set()
+
+    async def _run_top_emotions_pipeline(
+        self,
+        user_id: str,
+        time_ranges: list[TimeRange],
+        top_track_pages: Channel[tuple[TimeRange, int, list[Track]]],
+        collection_date: datetime.date,
+        tracks_stored: asyncio.Event,
+        deadline: Deadline,
+    ) -> None:
+        stopped_early = False
+
+        async with get_db_session(self.session_factory) as db_session:
+            unit_of_work = UnitOfWork(db_session)
+            top_emotions_pipeline: TopEmotionsPipeline = self._create_pipeline_factory(
+                db_session, unit_of_work
+            ).create_top_emotions_pipeline()
+
+            try:
+                async with deadline.limit(
+                    reserve_seconds=self.top_emotions_flush_seconds
+                ):
+                    await top_emotions_pipeline.run_pages(
+                        pages=top_track_pages,
+                        user_id=user_id,
+                        collection_date=collection_date,
+                    )
+                    # track foreign keys are deferred, so commit once the tracks
+                    # exist, waiting inside the limit so the reserve is left for
+                    # flushing and committing
+                    await tracks_stored.wait()
+            except DeadlineExceededException:
+                # scrapes and model calls are cancelled, what they finished is kept
+                stopped_early = True
+                await unit_of_work.flush()
+                # only still waiting if storing tracks ran out of time as well
+                await tracks_stored.wait()
+            else:
+                await unit_of_work.flush()
+                await self._mark_completed(
+                    db_session=db_session,
+                    stage="top emotions",
+                    user_id=user_id,
+                    time_ranges=time_ranges,
+                    collection_date=collection_date,
+                )
+
+        if stopped_early:
+            raise DeadlineExceededException(
+                "Top emotions ran out of time, finished lyrics and profiles were saved"
+            )
+
+    async def _run_stages(
+        self,
+        access_token: str,
+        time_ranges: list[TimeRange],
+        collection_date: datetime.date,
+        stage_timings: StageTimings,
+        deadline: Deadline,
+        stages: list[str],
+        user_id: str | None,
+    ) -> None:
+        # 1. A redelivered run that already completed is skipped before any
+        # Spotify call, when the message says which user it is for
+        if user_id is not None and not await self._get_remaining_stages(
             user_id=user_id,
-            time_range=time_range,
+            time_ranges=time_ranges,
             collection_date=collection_date,
-        )
-        await top_emotions_pipeline.run(
+            stages=stages,
+        ):
+            logger.info(f"Run for {collection_date} was already completed")
+            return
+
+        # 2. Otherwise the user's ID is needed to find what an earlier run finished
+        try:
+            values = await self.scheduler.run(
+                inputs={"access_token": access_token},
+                stage_timings=stage_timings,
+                deadline=deadline,
+                nodes=["profile"],
+            )
+        except DagRunUnfinishedException as e:
+            # every stage waits on the profile, so none of them got to run
+            raise DagRunUnfinishedException(str(e), stages) from e
+        user_id = values["user_id"]
+
+        stages = await self._get_remaining_stages(
             user_id=user_id,
-            time_range=time_range,
+            time_ranges=time_ranges,
             collection_date=collection_date,
-            tracks=top_tracks,
+            stages=stages,
+        )
+        if not stages:
+            logger.info(f"Run for {collection_date} was already completed")
+            return
+
+        # 3. Run the remaining stages and only the fetches they need
+        nodes = self.scheduler.select_nodes(stages, provided=["user_id"])
+        tracks_stored = asyncio.Event()
+
+        # stored by the run that left these stages unfinished
+        if "store top tracks" not in nodes:
+            tracks_stored.set()
+
+        await self.scheduler.run(
+            inputs={
+                "access_token": access_token,
+                "user_id": user_id,
+                "time_ranges": time_ranges,
+                "collection_date": collection_date,
+                # shared so each artist is fetched and stored once across nodes
+                "artist_registry": ArtistRegistry(
+                    expect_top_artists="fetch top artists" in nodes
+                ),
+                "tracks_stored": tracks_stored,
+                "top_track_pages": Channel(),
+                "deadline": deadline,
+            },
+            stage_timings=stage_timings,
+            deadline=deadline,
+            nodes=nodes,
         )
 
     async def run_data_collection_pipeline(
         self,
-        client: httpx.AsyncClient,
-        db_session: sqlalchemy.orm.Session,
         access_token: str,
-        time_range: TimeRange,
+        time_ranges: list[TimeRange],
         collection_date: datetime.date,
+        stage_timings: StageTimings | None = None,
+        deadline: Deadline | None = None,
+        stages: list[str] | None = None,
+        user_id: str | None = None,
     ) -> None:
-        """Run the complete data collection pipeline"""
-        spotify_service = SpotifyService(client=client, base_url=self.settings.spotify_base_url)
-        lyrics_scraper = LyricsScraper(
-            client=client,
-            base_url=self.settings.lyrics_base_url,
-            headers=self.settings.lyrics_headers,
-            semaphore=self.lyrics_semaphore,
-        )
-        model_service = ModelService(
-            api_key=self.settings.model_api_key,
-            model=self.settings.model_name,
-            temperature=self.settings.model_temp,
-            max_tokens=self.settings.model_max_tokens,
-            top_p=self.settings.model_top_p,
-            instructions=self.settings.model_instructions,
-        )
+        """Run the complete data collection pipeline, or only the given stages.
 
-        pipeline_factory = PipelineFactory(
-            spotify_service=spotify_service,
-            db_session=db_session,
-            lyrics_scraper=lyrics_scraper,
-            model_service=model_service,
-        )
-
-        profile_pipeline: ProfilePipeline = pipeline_factory.create_profile_pipeline()
-        top_artists_pipeline: TopArtistsPipeline = (
-            pipeline_factory.create_top_artists_pipeline()
-        )
-        top_tracks_pipeline: TopTracksPipeline = (
-            pipeline_factory.create_top_tracks_pipeline()
-        )
-        top_genres_pipeline: TopGenresPipeline = (
-            pipeline_factory.create_top_genres_pipeline()
-        )
-        top_emotions_pipeline: TopEmotionsPipeline = (
-            pipeline_factory.create_top_emotions_pipeline()
-        )
-
-        profile = await profile_pipeline.run(access_token)
-
-        tasks = [
-            self.run_top_artists_and_genres_pipelines(
-                top_artists_pipeline=top_artists_pipeline,
-                top_genres_pipeline=top_genres_pipeline,
-                access_token=access_token,
-                user_id=profile.id,
-                time_range=time_range,
-                collection_date=collection_date,
-            ),
-            self.run_top_tracks_and_emotions_pipelines(
-                top_tracks_pipeline=top_tracks_pipeline,
-                top_emotions_pipeline=top_emotions_pipeline,
-                access_token=access_token,
-                user_id=profile.id,
-                time_range=time_range,
-                collection_date=collection_date,
-            ),
-        ]
+        Profile, artist and track data are fetched once and shared across all
+        requested time ranges, and lyrics and emotional profiles are worked out
+        once per unique track. Stages that already committed for this user,
+        time range and collection date are skipped, so a redelivered run
+        resumes from the first incomplete stage, and with `user_id` given a
+        completed run returns after a single checkpoint lookup. Stages that ran
+        out of time are raised in a DagRunUnfinishedException, and passing them
+        back in as `stages` runs them with only the stages they depend on.
+        """
+        deadline = deadline or Deadline()
+        stage_timings = stage_timings or StageTimings()
+        stages = stages or self.CHECKPOINTED_STAGES
 
-        await asyncio.gather(*tasks)
+        with RoundTripCounter().track() as round_trips:
+            try:
+                await self._run_stages(
+                    access_token=access_token,
+                    time_ranges=time_ranges,
+                    collection_date=collection_date,
+                    stage_timings=stage_timings,
+                    deadline=deadline,
+                    stages=stages,
+                    user_id=user_id,
+                )
+            finally:
+                logger.info(f"Run made {round_trips.count} DB round trips")
 
-        print("Completed pipeline runs")
+        logger.info("Completed pipeline runs")
@@ -1,5 +1,5 @@
 from src.models.domain import Profile
-from src.services.spotify_service import SpotifyService, SpotifyServiceException
+from src.services.music.spotify_service import SpotifyService, SpotifyServiceException
 from src.repositories.profile_repository import ProfileRepository
 
 
@@ -21,7 +21,7 @@ class ProfilePipeline:
             profile = await self.spotify_service.get_user_profile(access_token)
 
             # 2. Store in DB
-            self.profile_repository.upsert(profile)
+            await self.profile_repository.upsert(profile)
 
             # 3. Return profile so caller can use it
             return profile
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import date
 from src.models.domain import Artist, TopArtist
 from src.repositories.top_items.top_artists_repository import (
@@ -7,7 +8,8 @@ from src.repositories.top_items.top_artists_repository import (
 from src.utils.calculations import calculate_position_changes
 from src.models.enums import TimeRange
 from src.repositories.artists_repository import ArtistsRepository
-from src.services.spotify_service import SpotifyService, SpotifyServiceException
+from src.services.music.artist_registry import ArtistRegistry
+from src.services.music.spotify_service import SpotifyService, SpotifyServiceException
 
 
 class TopArtistsPipelineException(Exception):
@@ -20,10 +22,44 @@ class TopArtistsPipeline:
         spotify_service: SpotifyService,
         artists_repository: ArtistsRepository,
         top_artists_repository: TopArtistsRepository,
+        artist_registry: ArtistRegistry | None = None,
     ):
         self.spotify_service = spotify_service
         self.artists_repository = artists_repository
         self.top_artists_repository = top_artists_repository
+        self.artist_registry = artist_registry or ArtistRegistry()
+
+    async def _store_top_artists(
+        self,
+        artists: list[Artist],
+        user_id: str,
+        time_range: TimeRange,
+        collection_date: date,
+    ) -> None:
+        # 1. Create top artist objects
+        top_artists: list[TopArtist] = [
+            TopArtist(
+                user_id=user_id,
+                artist_id=artist.id,
+                collection_date=collection_date,
+                time_range=time_range,
+                position=index + 1,
+            )
+            for index, artist in enumerate(artists)
+        ]
+
+        # 2. Calculate position changes
+        previous_top_artists: list[
+            TopArtist
+        ] = await self.top_artists_repository.get_previous_top_items(
+            user_id=user_id, time_range=time_range
+        )
+        calculate_position_changes(
+            previous_items=previous_top_artists, current_items=top_artists
+        )
+
+        # 3. Store in DB
+        await self.top_artists_repository.add_many(top_artists)
 
     async def run(
         self,
@@ -38,37 +74,85 @@ class TopArtistsPipeline:
                 access_token=access_token, time_range=time_range
             )
 
-            # 2. Store in DB
-            self.artists_repository.upsert_many(artists)
+            # 2. Share with the tracks branch and store in DB
+            artists_to_store = self.artist_registry.register_top_artists(artists)
+            await self.artists_repository.upsert_many(artists_to_store)
 
-            # 3. Create top artist objects
-            top_artists: list[TopArtist] = [
-                TopArtist(
-                    user_id=user_id,
-                    artist_id=artist.id,
-                    collection_date=collection_date,
-                    time_range=time_range,
-                    position=index + 1,
-                )
-                for index, artist in enumerate(artists)
-            ]
+            # 3. Create, rank and store top artists
+            await self._store_top_artists(
+                artists=artists,
+                user_id=user_id,
+                time_range=time_range,
+                collection_date=collection_date,
+            )
 
-            # 4. Calculate position changes
-            previous_top_artists: list[TopArtist] = (
-                self.top_artists_repository.get_previous_top_items(
-                    user_id=user_id, time_range=time_range
-                )
+            # 4. Return the list of spotify artists
+            return artists
+        except (SpotifyServiceException, TopArtistsRepositoryException) as e:
+            raise TopArtistsPipelineException("Top artists pipeline failed.") from e
+        except Exception as e:
+            raise TopArtistsPipelineException(
+                "Unexpected error in top artists pipeline."
+            ) from e
+
+    async def fetch_many(
+        self, access_token: str, time_ranges: list[TimeRange]
+    ) -> dict[TimeRange, list[Artist]]:
+        """Get the top artists for every time range without storing anything.
+
+        The artists are registered straight away, so the tracks branch doesn't
+        fetch them again, and store_many owns writing them.
+        """
+        try:
+            # 1. Get top artists for every time range from Spotify API concurrently
+            results: list[list[Artist]] = await asyncio.gather(
+                *[
+                    self.spotify_service.get_user_top_artists(
+                        access_token=access_token, time_range=time_range
+                    )
+                    for time_range in time_ranges
+                ]
             )
-            calculate_position_changes(
-                previous_items=previous_top_artists, current_items=top_artists
+
+            # 2. Share with the tracks branch
+            self.artist_registry.register_top_artists(
+                [artist for artists in results for artist in artists]
             )
 
-            # 5. Store in DB
-            self.top_artists_repository.add_many(top_artists)
+            # 3. Return the spotify artists for each time range
+            return dict(zip(time_ranges, results))
+        except SpotifyServiceException as e:
+            raise TopArtistsPipelineException("Top artists pipeline failed.") from e
+        except Exception as e:
+            raise TopArtistsPipelineException(
+                "Unexpected error in top artists pipeline."
+            ) from e
 
-            # 6. Return the list of spotify artists
-            return artists
-        except (SpotifyServiceException, TopArtistsRepositoryException) as e:
+    async def store_many(
+        self,
+        user_id: str,
+        artists_by_time_range: dict[TimeRange, list[Artist]],
+        collection_date: date,
+    ) -> None:
+        """Store the artists and top artists of already fetched top artists"""
+        try:
+            # 1. Store each unique artist in DB once
+            unique_artists: dict[str, Artist] = {
+                artist.id: artist
+                for artists in artists_by_time_range.values()
+                for artist in artists
+            }
+            await self.artists_repository.upsert_many(list(unique_artists.values()))
+
+            # 2. Create, rank and store top artists per time range
+            for time_range, artists in artists_by_time_range.items():
+                await self._store_top_artists(
+                    artists=artists,
+                    user_id=user_id,
+                    time_range=time_range,
+                    collection_date=collection_date,
+                )
+        except TopArtistsRepositoryException as e:
             raise TopArtistsPipelineException("Top artists pipeline failed.") from e
         except Exception as e:
             raise TopArtistsPipelineException(
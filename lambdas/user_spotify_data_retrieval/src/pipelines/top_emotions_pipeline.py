@@ -1,7 +1,7 @@
-from collections import defaultdict
+import asyncio
+from contextlib import aclosing
 from datetime import date
-from statistics import mean
-import heapq
+from typing import AsyncGenerator, AsyncIterator
 from loguru import logger
 
 from src.services.emotional_profiles.emotional_profiles_service import (
@@ -13,14 +13,20 @@ from src.repositories.top_items.top_emotions_repository import (
     TopEmotionsRepository,
     TopEmotionsRepositoryException,
 )
-from src.utils.calculations import calculate_position_changes
+from src.utils.streams import batch_stream, flatten_streams
+from src.utils.calculations import (
+    average_emotions,
+    calculate_position_changes,
+    rank_top_emotions,
+)
 from src.models.domain import (
+    EMOTIONS,
+    EmotionalProfileMatrix,
     TrackEmotionalProfileRequest,
     TrackLyrics,
     TrackLyricsRequest,
     TopEmotion,
     Track,
-    TrackEmotionalProfile,
 )
 from src.models.enums import TimeRange
 
@@ -36,82 +42,89 @@ class TopEmotionsPipeline:
         lyrics_service: LyricsService,
         emotional_profile_service: EmotionalProfilesService,
         top_emotions_repository: TopEmotionsRepository,
+        profile_batch_size: int = 50,
+        max_concurrent_profile_batches: int = 4,
+        max_buffered_lyrics: int = 100,
     ):
         self.lyrics_service = lyrics_service
         self.emotional_profile_service = emotional_profile_service
         self.top_emotions_repository = top_emotions_repository
+        self.profile_batch_size = profile_batch_size
+        self.max_concurrent_profile_batches = max_concurrent_profile_batches
+        self.max_buffered_lyrics = max_buffered_lyrics
 
     @staticmethod
-    def _aggregate_emotions(
-        emotional_profile_responses: list[TrackEmotionalProfile],
-    ) -> dict[str, float]:
-        all_emotion_percentages = defaultdict(list)
-
-        # collect all percentages for each emotion
-        for profile_response in emotional_profile_responses:
-            emotional_profile_dict = profile_response.emotional_profile.model_dump()
-
-            for emotion, percentage in emotional_profile_dict.items():
-                all_emotion_percentages[emotion].append(percentage)
-
-        # find average percentage for each emotion
-        return {
-            emotion: mean(percentages)
-            for emotion, percentages in all_emotion_percentages.items()
-        }
-
-    @staticmethod
-    def _rank_and_normalise_emotions(
-        average_emotions: dict[str, float], n: int
-    ) -> dict[str, float]:
-        top_n_emotions = heapq.nlargest(
-            n, average_emotions.items(), key=lambda item: item[1]
-        )
-
-        total = sum(percentage for _, percentage in top_n_emotions)
-
-        return {
-            emotion: round(percentage / total, 2)
-            for emotion, percentage in top_n_emotions
-        }
-
-    @staticmethod
-    def _get_top_emotions(
-        emotional_profiles: list[TrackEmotionalProfile],
+    def _create_top_emotions(
+        emotion_indices: list[int],
+        shares: list[float],
         user_id: str,
         time_range: TimeRange,
         collection_date: date,
-        n: int = 5,
     ) -> list[TopEmotion]:
-        average_emotion_percentages = TopEmotionsPipeline._aggregate_emotions(
-            emotional_profiles
-        )
-
-        top_emotions_dict = TopEmotionsPipeline._rank_and_normalise_emotions(
-            average_emotions=average_emotion_percentages, n=n
-        )
-
         return [
             TopEmotion(
                 user_id=user_id,
                 collection_date=collection_date,
                 time_range=time_range,
-                position=index + 1,
-                emotion_id=emotion,
-                percentage=percentage,
+                position=position + 1,
+                emotion_id=EMOTIONS[index],
+                percentage=round(share, 2),
             )
-            for index, (emotion, percentage) in enumerate(top_emotions_dict.items())
+            for position, (index, share) in enumerate(zip(emotion_indices, shares))
         ]
 
-    async def run(
-        self,
-        tracks: list[Track],
+    @staticmethod
+    def _get_top_emotions_by_time_range(
+        profile_matrix: EmotionalProfileMatrix,
+        tracks_by_time_range: dict[TimeRange, list[Track]],
         user_id: str,
-        time_range: TimeRange,
         collection_date: date,
-    ) -> None:
+        n: int = 5,
+    ) -> dict[TimeRange, list[TopEmotion]]:
+        # every time range is averaged and ranked in one pass over the matrix
+        time_ranges = list(tracks_by_time_range)
+        average_emotions_by_time_range = average_emotions(
+            profile_matrix,
+            [
+                [track.id for track in tracks_by_time_range[time_range]]
+                for time_range in time_ranges
+            ],
+        )
+        order, shares = rank_top_emotions(average_emotions_by_time_range, n)
+
+        return {
+            time_range: TopEmotionsPipeline._create_top_emotions(
+                emotion_indices=emotion_indices,
+                shares=time_range_shares,
+                user_id=user_id,
+                time_range=time_range,
+                collection_date=collection_date,
+            )
+            for time_range, emotion_indices, time_range_shares in zip(
+                time_ranges, order.tolist(), shares.tolist()
+            )
+        }
+
+    async def _get_batch_emotional_profile_matrix(
+        self, track_lyrics: list[TrackLyrics], slots: asyncio.Semaphore
+    ) -> EmotionalProfileMatrix:
         try:
-            lyrics_requests = [
+            emotional_profile_requests = [
+                TrackEmotionalProfileRequest(
+                    track_id=lyrics.track_id,
+                    lyrics=lyrics.lyrics,
+                )
+                for lyrics in track_lyrics
+            ]
+            return await self.emotional_profile_service.get_emotional_profile_matrix(
+                emotional_profile_requests
+            )
+        finally:
+            slots.release()
+
+    def _stream_lyrics(self, tracks: list[Track]) -> AsyncGenerator[TrackLyrics, None]:
+        return self.lyrics_service.stream_lyrics(
+            [
                 TrackLyricsRequest(
                     track_id=track.id,
                     track_name=track.name,
@@ -119,41 +132,233 @@ class TopEmotionsPipeline:
                 )
                 for track in tracks
             ]
-            track_lyrics: list[TrackLyrics] = await self.lyrics_service.get_many_lyrics(
-                lyrics_requests
+        )
+
+    async def _stream_pages_lyrics(
+        self,
+        pages: AsyncIterator[tuple[TimeRange, int, list[Track]]],
+        tracks_by_time_range: dict[TimeRange, list[Track]],
+    ) -> AsyncIterator[AsyncGenerator[TrackLyrics, None]]:
+        """Start a lyrics stream for each page's new tracks as the page arrives"""
+        requested_track_ids: set[str] = set()
+
+        async for time_range, _, tracks in pages:
+            # rank order doesn't change the averages, so pages aren't reordered
+            tracks_by_time_range.setdefault(time_range, []).extend(tracks)
+            new_tracks = {
+                track.id: track
+                for track in tracks
+                if track.id not in requested_track_ids
+            }
+            requested_track_ids.update(new_tracks)
+
+            if new_tracks:
+                yield self._stream_lyrics(list(new_tracks.values()))
+
+    async def _get_emotional_profile_matrix(
+        self, lyrics_stream: AsyncIterator[TrackLyrics]
+    ) -> EmotionalProfileMatrix:
+        """Profile tracks as their lyrics arrive instead of after every scrape.
+
+        Lyrics stream in from the DB and the scraper, and whatever has arrived
+        is sent on for profiling as a batch as soon as a slot is free. While
+        every slot is busy, lyrics are buffered up to a limit, after which the
+        lyrics stream waits.
+        """
+        slots = asyncio.Semaphore(self.max_concurrent_profile_batches)
+        tasks = []
+
+        try:
+            async with aclosing(lyrics_stream):
+                async for track_lyrics in batch_stream(
+                    lyrics_stream,
+                    max_batch_size=self.profile_batch_size,
+                    max_buffered=self.max_buffered_lyrics,
+                ):
+                    await slots.acquire()
+                    tasks.append(
+                        asyncio.create_task(
+                            self._get_batch_emotional_profile_matrix(
+                                track_lyrics, slots
+                            )
+                        )
+                    )
+
+            profile_matrices = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # batches stopped early finish any write they started first
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if not tasks:
+            logger.warning("No lyrics available, skipping emotional profiles")
+
+        profile_matrix = EmotionalProfileMatrix.from_profiles([])
+        for batch_profile_matrix in profile_matrices:
+            profile_matrix = profile_matrix.concat(batch_profile_matrix)
+
+        return profile_matrix
+
+    async def _store_top_emotions(
+        self,
+        top_emotions: list[TopEmotion],
+        user_id: str,
+        time_range: TimeRange,
+    ) -> None:
+        previous_top_emotions = (
+            await self.top_emotions_repository.get_previous_top_items(
+                user_id=user_id, time_range=time_range
             )
+        )
+        calculate_position_changes(
+            previous_items=previous_top_emotions, current_items=top_emotions
+        )
 
-            emotional_profile_requests = [
-                TrackEmotionalProfileRequest(
-                    track_id=lyrics.track_id,
-                    lyrics=lyrics.lyrics,
+        await self.top_emotions_repository.add_many(top_emotions)
+
+    async def _store_many(
+        self,
+        profile_matrix: EmotionalProfileMatrix,
+        tracks_by_time_range: dict[TimeRange, list[Track]],
+        user_id: str,
+        collection_date: date,
+    ) -> None:
+        profiled_track_ids = set(profile_matrix.track_ids)
+        profiled_tracks_by_time_range = {}
+        for time_range, tracks in tracks_by_time_range.items():
+            if not any(track.id in profiled_track_ids for track in tracks):
+                logger.warning(
+                    f"No emotional profiles available for {time_range.value}, skipping top emotions"
                 )
-                for lyrics in track_lyrics
-            ]
-            track_emotional_profiles: list[TrackEmotionalProfile] = (
-                await self.emotional_profile_service.get_many_emotional_profiles(
-                    emotional_profile_requests
+                continue
+
+            profiled_tracks_by_time_range[time_range] = tracks
+
+        if not profiled_tracks_by_time_range:
+            return
+
+        top_emotions_by_time_range = self._get_top_emotions_by_time_range(
+            profile_matrix=profile_matrix,
+            tracks_by_time_range=profiled_tracks_by_time_range,
+            user_id=user_id,
+            collection_date=collection_date,
+        )
+
+        for time_range, top_emotions in top_emotions_by_time_range.items():
+            await self._store_top_emotions(
+                top_emotions=top_emotions, user_id=user_id, time_range=time_range
+            )
+
+    async def _run_many(
+        self,
+        tracks_by_time_range: dict[TimeRange, list[Track]],
+        user_id: str,
+        collection_date: date,
+    ) -> None:
+        # lyrics and emotional profiles are fetched once per unique track
+        unique_tracks = {
+            track.id: track
+            for tracks in tracks_by_time_range.values()
+            for track in tracks
+        }
+        profile_matrix = await self._get_emotional_profile_matrix(
+            self._stream_lyrics(list(unique_tracks.values()))
+        )
+        await self._store_many(
+            profile_matrix=profile_matrix,
+            tracks_by_time_range=tracks_by_time_range,
+            user_id=user_id,
+            collection_date=collection_date,
+        )
+
+    async def _run_pages(
+        self,
+        pages: AsyncIterator[tuple[TimeRange, int, list[Track]]],
+        user_id: str,
+        collection_date: date,
+    ) -> None:
+        tracks_by_time_range: dict[TimeRange, list[Track]] = {}
+        profile_matrix = await self._get_emotional_profile_matrix(
+            flatten_streams(
+                self._stream_pages_lyrics(
+                    pages=pages, tracks_by_time_range=tracks_by_time_range
                 )
             )
+        )
+        await self._store_many(
+            profile_matrix=profile_matrix,
+            tracks_by_time_range=tracks_by_time_range,
+            user_id=user_id,
+            collection_date=collection_date,
+        )
 
-            top_emotions: list[TopEmotion] = self._get_top_emotions(
-                emotional_profiles=track_emotional_profiles,
+    async def run(
+        self,
+        tracks: list[Track],
+        user_id: str,
+        time_range: TimeRange,
+        collection_date: date,
+    ) -> None:
+        try:
+            await self._run_many(
+                tracks_by_time_range={time_range: tracks},
                 user_id=user_id,
-                time_range=time_range,
                 collection_date=collection_date,
             )
+        except (
+            LyricsServiceException,
+            EmotionalProfilesServiceException,
+            TopEmotionsRepositoryException,
+        ) as e:
+            logger.error(f"Top emotions pipeline failed: {e}")
+            raise TopEmotionsPipelineException("Top emotions pipeline failed.") from e
+        except Exception as e:
+            logger.error(f"Unexpected error in top emotions pipeline: {e}")
+            raise TopEmotionsPipelineException(
+                "Unexpected error in top emotions pipeline."
+            ) from e
 
-            # store in db
-            previous_top_emotions: list[TopEmotion] = (
-                self.top_emotions_repository.get_previous_top_items(
-                    user_id=user_id, time_range=time_range
-                )
-            )
-            calculate_position_changes(
-                previous_items=previous_top_emotions, current_items=top_emotions
+    async def run_many(
+        self,
+        tracks_by_time_range: dict[TimeRange, list[Track]],
+        user_id: str,
+        collection_date: date,
+    ) -> None:
+        try:
+            await self._run_many(
+                tracks_by_time_range=tracks_by_time_range,
+                user_id=user_id,
+                collection_date=collection_date,
             )
+        except (
+            LyricsServiceException,
+            EmotionalProfilesServiceException,
+            TopEmotionsRepositoryException,
+        ) as e:
+            logger.error(f"Top emotions pipeline failed: {e}")
+            raise TopEmotionsPipelineException("Top emotions pipeline failed.") from e
+        except Exception as e:
+            logger.error(f"Unexpected error in top emotions pipeline: {e}")
+            raise TopEmotionsPipelineException(
+                "Unexpected error in top emotions pipeline."
+            ) from e
 
-            self.top_emotions_repository.add_many(top_emotions)
+    async def run_pages(
+        self,
+        pages: AsyncIterator[tuple[TimeRange, int, list[Track]]],
+        user_id: str,
+        collection_date: date,
+    ) -> None:
+        """Like run_many, but starts on the lyrics of each page of top tracks as it arrives.
+
+        `pages` yields each time range's pages as (time range, offset, tracks).
+        Top emotions are only ranked and stored once every page has arrived.
+        """
+        try:
+            await self._run_pages(
+                pages=pages, user_id=user_id, collection_date=collection_date
+            )
         except (
             LyricsServiceException,
             EmotionalProfilesServiceException,
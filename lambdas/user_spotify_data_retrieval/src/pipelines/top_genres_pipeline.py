@@ -43,7 +43,7 @@ class TopGenresPipeline:
             for index, (genre, count) in enumerate(most_common_genres)
         ]
 
-    def run(
+    async def run(
         self,
         artists: list[Artist],
         user_id: str,
@@ -59,7 +59,7 @@ class TopGenresPipeline:
             )
 
             previous_top_genres: list[TopGenre] = (
-                self.top_genres_repository.get_previous_top_items(
+                await self.top_genres_repository.get_previous_top_items(
                     user_id=user_id, time_range=time_range
                 )
             )
@@ -67,7 +67,7 @@ class TopGenresPipeline:
                 previous_items=previous_top_genres, current_items=top_genres
             )
 
-            self.top_genres_repository.add_many(top_genres)
+            await self.top_genres_repository.add_many(top_genres)
         except Exception as e:
             raise TopGenresPipelineException(
                 "Unexpected error in top genres pipeline."
@@ -1,4 +1,6 @@
-from datetime import date
+from datetime import date, timedelta
+from typing import AsyncIterator, Callable
+from loguru import logger
 from src.repositories.artists_repository import ArtistsRepository
 from src.models.domain import Artist, TopTrack, Track
 from src.utils.calculations import calculate_position_changes
@@ -8,7 +10,9 @@ from src.repositories.top_items.top_tracks_repository import (
     TopTracksRepositoryException,
 )
 from src.repositories.tracks_repository import TracksRepository
-from src.services.spotify_service import SpotifyService, SpotifyServiceException
+from src.services.music.artist_registry import ArtistRegistry
+from src.services.music.spotify_service import SpotifyService, SpotifyServiceException
+from src.utils.streams import merge_streams
 
 
 class TopTracksPipelineException(Exception):
@@ -23,11 +27,113 @@ class TopTracksPipeline:
         artists_repository: ArtistsRepository,
         tracks_repository: TracksRepository,
         top_tracks_repository: TopTracksRepository,
+        artist_registry: ArtistRegistry | None = None,
+        artist_cache_ttl: timedelta = timedelta(0),
     ):
         self.spotify_service = spotify_service
         self.artists_repository = artists_repository
         self.tracks_repository = tracks_repository
         self.top_tracks_repository = top_tracks_repository
+        self.artist_registry = artist_registry or ArtistRegistry()
+        self.artist_cache_ttl = artist_cache_ttl
+
+    async def _get_artists(
+        self, access_token: str, artist_ids: list[str], cached_artist_ids: set[str]
+    ) -> list[Artist]:
+        """Serve artists fetched within the TTL from DB and fetch the rest from Spotify API"""
+        cached_artists: list[Artist] = []
+
+        if self.artist_cache_ttl > timedelta(0):
+            cached_artists = await self.artists_repository.get_fresh_by_ids(
+                artist_ids=artist_ids, max_age=self.artist_cache_ttl
+            )
+            cached_artist_ids.update(artist.id for artist in cached_artists)
+
+        stale_artist_ids = [
+            artist_id for artist_id in artist_ids if artist_id not in cached_artist_ids
+        ]
+        logger.info(
+            f"Artist cache: {len(cached_artists)} hits, {len(stale_artist_ids)} misses"
+        )
+
+        fetched_artists: list[Artist] = []
+
+        if stale_artist_ids:
+            fetched_artists = await self.spotify_service.get_artists_by_ids(
+                access_token=access_token, artist_ids=stale_artist_ids
+            )
+
+        return cached_artists + fetched_artists
+
+    async def _store_tracks(self, access_token: str, tracks: list[Track]) -> None:
+        # 1. Extract unique artist ids from tracks
+        unique_artist_ids: set[str] = set(
+            artist.id for track in tracks for artist in track.artists
+        )
+
+        # 2. Get full artist details, only calling Spotify API for artists not
+        # already resolved this run or fetched within the cache TTL
+        cached_artist_ids: set[str] = set()
+        artists: list[Artist] = await self.artist_registry.get_many(
+            artist_ids=list(unique_artist_ids),
+            fetch_artists=lambda artist_ids: self._get_artists(
+                access_token=access_token,
+                artist_ids=artist_ids,
+                cached_artist_ids=cached_artist_ids,
+            ),
+        )
+
+        # 3. Persist every artist not served from DB, including top artists whose
+        # transaction may not have committed yet, since track_artist checks its
+        # artist foreign key straight away. A conflicting upsert waits for the
+        # other transaction instead of failing.
+        fetched_artists = [
+            artist for artist in artists if artist.id not in cached_artist_ids
+        ]
+        await self.artists_repository.upsert_many(fetched_artists)
+
+        # 4. Persist tracks to DB
+        await self.tracks_repository.upsert_many(tracks)
+
+    async def _stream_top_tracks(
+        self, access_token: str, time_range: TimeRange
+    ) -> AsyncIterator[tuple[TimeRange, int, list[Track]]]:
+        async for offset, tracks in self.spotify_service.stream_user_top_tracks(
+            access_token=access_token, time_range=time_range
+        ):
+            yield time_range, offset, tracks
+
+    async def _store_top_tracks(
+        self,
+        tracks: list[Track],
+        user_id: str,
+        time_range: TimeRange,
+        collection_date: date,
+    ) -> None:
+        # 1. Create TopTracks
+        top_tracks: list[TopTrack] = [
+            TopTrack(
+                user_id=user_id,
+                track_id=track.id,
+                collection_date=collection_date,
+                time_range=time_range,
+                position=index + 1,
+            )
+            for index, track in enumerate(tracks)
+        ]
+
+        # 2. Calculate position changes
+        previous_top_tracks: list[
+            TopTrack
+        ] = await self.top_tracks_repository.get_previous_top_items(
+            user_id=user_id, time_range=time_range
+        )
+        calculate_position_changes(
+            previous_items=previous_top_tracks, current_items=top_tracks
+        )
+
+        # 3. Store in DB
+        await self.top_tracks_repository.add_many(top_tracks)
 
     async def run(
         self,
@@ -42,49 +148,112 @@ class TopTracksPipeline:
                 access_token=access_token, time_range=time_range
             )
 
-            # 2. Extract unique artist ids from tracks
-            unique_artist_ids: set[str] = set(
-                artist.id for track in tracks for artist in track.artists
-            )
+            # 2. Get track artists and persist artists and tracks to DB
+            await self._store_tracks(access_token=access_token, tracks=tracks)
 
-            # 3. Get full artist details from Spotify API
-            artists: list[Artist] = await self.spotify_service.get_artists_by_ids(
-                access_token=access_token, artist_ids=list(unique_artist_ids)
+            # 3. Create, rank and store top tracks
+            await self._store_top_tracks(
+                tracks=tracks,
+                user_id=user_id,
+                time_range=time_range,
+                collection_date=collection_date,
             )
 
-            # 4. Persist artists to DB
-            self.artists_repository.upsert_many(artists)
-
-            # 5. Persist tracks to DB
-            self.tracks_repository.upsert_many(tracks)
+            # 4. Return the list of tracks
+            return tracks
+        except (SpotifyServiceException, TopTracksRepositoryException) as e:
+            raise TopTracksPipelineException("Top tracks pipeline failed.") from e
+        except Exception as e:
+            raise TopTracksPipelineException(
+                "Unexpected error in top tracks pipeline."
+            ) from e
 
-            # 6. Create TopTracks
-            top_tracks: list[TopTrack] = [
-                TopTrack(
-                    user_id=user_id,
-                    track_id=track.id,
-                    collection_date=collection_date,
-                    time_range=time_range,
-                    position=index + 1,
+    def _stream_many_top_tracks(
+        self, access_token: str, time_ranges: list[TimeRange]
+    ) -> AsyncIterator[tuple[TimeRange, int, list[Track]]]:
+        return merge_streams(
+            *[
+                self._stream_top_tracks(
+                    access_token=access_token, time_range=time_range
                 )
-                for index, track in enumerate(tracks)
+                for time_range in time_ranges
             ]
+        )
 
-            # 7. Calculate position changes
-            previous_top_tracks: list[TopTrack] = (
-                self.top_tracks_repository.get_previous_top_items(
-                    user_id=user_id, time_range=time_range
-                )
-            )
-            calculate_position_changes(
-                previous_items=previous_top_tracks, current_items=top_tracks
-            )
+    @staticmethod
+    def _order_pages(
+        pages: dict[TimeRange, dict[int, list[Track]]],
+    ) -> dict[TimeRange, list[Track]]:
+        return {
+            time_range: [
+                track
+                for offset in sorted(time_range_pages)
+                for track in time_range_pages[offset]
+            ]
+            for time_range, time_range_pages in pages.items()
+        }
 
-            # 8. Store in DB
-            self.top_tracks_repository.add_many(top_tracks)
+    async def fetch_many(
+        self,
+        access_token: str,
+        time_ranges: list[TimeRange],
+        on_page: Callable[[TimeRange, int, list[Track]], None] | None = None,
+    ) -> dict[TimeRange, list[Track]]:
+        """Get the top tracks for every time range without storing anything.
 
-            # 9. Return the list of tracks
-            return tracks
+        Tracks already carry their artists' names, so work that only needs those
+        can start before store_many has fetched the full artists. `on_page` is
+        called with each page as it arrives, so that work needn't wait for the
+        last page either.
+        """
+        try:
+            pages: dict[TimeRange, dict[int, list[Track]]] = {
+                time_range: {} for time_range in time_ranges
+            }
+
+            async for time_range, offset, tracks in self._stream_many_top_tracks(
+                access_token=access_token, time_ranges=time_ranges
+            ):
+                pages[time_range][offset] = tracks
+
+                if on_page is not None:
+                    on_page(time_range, offset, tracks)
+
+            return self._order_pages(pages)
+        except SpotifyServiceException as e:
+            raise TopTracksPipelineException("Top tracks pipeline failed.") from e
+        except Exception as e:
+            raise TopTracksPipelineException(
+                "Unexpected error in top tracks pipeline."
+            ) from e
+
+    async def store_many(
+        self,
+        access_token: str,
+        user_id: str,
+        tracks_by_time_range: dict[TimeRange, list[Track]],
+        collection_date: date,
+    ) -> None:
+        """Store the artists, tracks and top tracks of already fetched top tracks"""
+        try:
+            # 1. Get track artists and persist artists and each unique track once
+            unique_tracks: dict[str, Track] = {
+                track.id: track
+                for tracks in tracks_by_time_range.values()
+                for track in tracks
+            }
+            await self._store_tracks(
+                access_token=access_token, tracks=list(unique_tracks.values())
+            )
+
+            # 2. Create, rank and store top tracks per time range
+            for time_range, tracks in tracks_by_time_range.items():
+                await self._store_top_tracks(
+                    tracks=tracks,
+                    user_id=user_id,
+                    time_range=time_range,
+                    collection_date=collection_date,
+                )
         except (SpotifyServiceException, TopTracksRepositoryException) as e:
             raise TopTracksPipelineException("Top tracks pipeline failed.") from e
         except Exception as e:
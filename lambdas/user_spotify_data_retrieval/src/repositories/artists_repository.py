@@ -1,27 +1,61 @@
-from sqlalchemy.orm import Session
+from datetime import timedelta
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.domain import Artist
 from src.models.db import ArtistDB
-from sqlalchemy.dialects.postgresql import insert
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class ArtistsRepository:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
         self.db_session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
 
-    def upsert_many(self, artists: list[Artist]) -> None:
-        values = [artist.model_dump() for artist in artists]
+    async def upsert_many(self, artists: list[Artist]) -> None:
+        if not artists:
+            return
 
-        stmt = insert(ArtistDB).values(values)
-        stmt = stmt.on_conflict_do_update(
+        # sorted so concurrent branches lock rows in the same order
+        values = [artist.model_dump() for artist in sorted(artists, key=lambda a: a.id)]
+
+        await self.writer.upsert(
+            table_=ArtistDB.__table__,
+            rows=values,
             index_elements=["id"],
-            set_={
-                "name": stmt.excluded.name,
-                "images": stmt.excluded.images,
-                "spotify_url": stmt.excluded.spotify_url,
-                "genres": stmt.excluded.genres,
-                "followers": stmt.excluded.followers,
-                "popularity": stmt.excluded.popularity,
-            },
+            update_columns=[
+                "name",
+                "images",
+                "spotify_url",
+                "genres",
+                "followers",
+                "popularity",
+                "updated_at",
+            ],
+            defaults={"updated_at": func.now()},
         )
 
-        self.db_session.execute(stmt)
+    async def get_fresh_by_ids(
+        self, artist_ids: list[str], max_age: timedelta
+    ) -> list[Artist]:
+        """Get the artists whose details were fetched within max_age"""
+        db_artists = await self.db_session.scalars(
+            select(ArtistDB).where(
+                ArtistDB.id.in_(artist_ids),
+                ArtistDB.updated_at >= func.now() - max_age,
+            )
+        )
+        return [
+            Artist(
+                id=artist.id,
+                name=artist.name,
+                images=artist.images,
+                spotify_url=artist.spotify_url,
+                genres=artist.genres,
+                followers=artist.followers,
+                popularity=artist.popularity,
+            )
+            for artist in db_artists
+        ]
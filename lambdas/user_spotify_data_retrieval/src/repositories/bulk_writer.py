@@ -0,0 +1,197 @@
+import uuid
+from typing import Any
+
+from sqlalchemy import (
+    ColumnElement,
+    Table,
+    UpdateBase,
+    column,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.db import run_on_driver_connection
+
+# Postgres caps a statement at this many bind parameters
+MAX_BIND_PARAMETERS = 65535
+# below this many rows a multi-values INSERT beats creating and merging a staging table
+COPY_THRESHOLD_ROWS = 5000
+
+
+class BulkWriter:
+    """Upserts rows in bulk, picking the write path by batch size.
+
+    Small batches are written with multi-values INSERT ... ON CONFLICT
+    statements, split to stay under the bind parameter limit. Large batches are
+    streamed with COPY into a temporary staging table and merged with one
+    INSERT ... SELECT, so nothing is compiled or bound per row.
+    """
+
+    def __init__(
+        self, db_session: AsyncSession, copy_threshold_rows: int = COPY_THRESHOLD_ROWS
+    ):
+        self.db_session = db_session
+        self.copy_threshold_rows = copy_threshold_rows
+
+    @staticmethod
+    def _on_conflict(
+        stmt: Insert, index_elements: list[str], update_columns: list[str]
+    ) -> Insert:
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={name: stmt.excluded[name] for name in update_columns},
+        )
+
+    @staticmethod
+    def dedupe(
+        rows: list[dict[str, Any]], index_elements: list[str]
+    ) -> list[dict[str, Any]]:
+        """Keep one row per conflict key, the last one given, in first-seen order.
+
+        One INSERT ... ON CONFLICT DO UPDATE can't affect the same row twice.
+        """
+        return list(
+            {tuple(row[name] for name in index_elements): row for row in rows}.values()
+        )
+
+    @classmethod
+    def build_upserts(
+        cls,
+        table_: Table,
+        rows: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: list[str],
+        defaults: dict[str, ColumnElement],
+    ) -> list[Insert]:
+        """Multi-values upserts for the rows, split to stay under the bind parameter limit"""
+        rows_per_statement = max(MAX_BIND_PARAMETERS // len(rows[0]), 1)
+
+        return [
+            cls._on_conflict(
+                insert(table_).values(
+                    [
+                        {**row, **defaults}
+                        for row in rows[start : start + rows_per_statement]
+                    ]
+                ),
+                index_elements,
+                update_columns,
+            )
+            for start in range(0, len(rows), rows_per_statement)
+        ]
+
+    async def _insert_values(
+        self,
+        table_: Table,
+        rows: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: list[str],
+        defaults: dict[str, ColumnElement],
+    ) -> None:
+        for stmt in self.build_upserts(
+            table_, rows, index_elements, update_columns, defaults
+        ):
+            await self.db_session.execute(stmt)
+
+    async def _copy_and_merge(
+        self,
+        table_: Table,
+        rows: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: list[str],
+        defaults: dict[str, ColumnElement],
+    ) -> None:
+        columns = list(rows[0])
+        column_list = ", ".join(columns)
+        staging_name = f"{table_.name}_staging_{uuid.uuid4().hex[:8]}"
+
+        # 1. Create a staging table with the target's column types but no constraints
+        await self.db_session.execute(
+            text(
+                f"CREATE TEMP TABLE {staging_name} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table_.name} WITH NO DATA"
+            )
+        )
+
+        # 2. Stream the rows in, converted the way SQLAlchemy would bind them
+        dialect = self.db_session.get_bind().dialect
+        bind_processors = [
+            table_.c[name].type.dialect_impl(dialect).bind_processor(dialect)
+            for name in columns
+        ]
+
+        async def copy_rows(driver_connection: Any) -> None:
+            async with driver_connection.cursor() as cursor:
+                async with cursor.copy(
+                    f"COPY {staging_name} ({column_list}) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        await copy.write_row(
+                            [
+                                process(row[name]) if process else row[name]
+                                for name, process in zip(columns, bind_processors)
+                            ]
+                        )
+
+        await run_on_driver_connection(self.db_session, copy_rows)
+
+        # 3. Merge into the target in index order, so concurrent writers lock
+        # rows in the same order
+        staging = table(staging_name, *[column(name) for name in columns])
+        stmt = insert(table_).from_select(
+            [*columns, *defaults],
+            select(
+                *[staging.c[name] for name in columns],
+                *[expression.label(name) for name, expression in defaults.items()],
+            ).order_by(*[staging.c[name] for name in index_elements]),
+        )
+        await self.db_session.execute(
+            self._on_conflict(stmt, index_elements, update_columns)
+        )
+        await self.db_session.execute(text(f"DROP TABLE {staging_name}"))
+
+    async def upsert(
+        self,
+        table_: Table,
+        rows: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: list[str] | None = None,
+        defaults: dict[str, ColumnElement] | None = None,
+    ) -> None:
+        """Insert rows, updating `update_columns` of the rows that already exist.
+
+        Existing rows are left as they are when there are no `update_columns`.
+        `defaults` are SQL expressions set on every row, e.g. func.now(). Rows
+        must all have the same keys. When several share their `index_elements`,
+        the last one is written.
+        """
+        if not rows:
+            return
+
+        rows = self.dedupe(rows, index_elements)
+
+        write = (
+            self._copy_and_merge
+            if len(rows) >= self.copy_threshold_rows
+            else self._insert_values
+        )
+        await write(
+            table_=table_,
+            rows=rows,
+            index_elements=index_elements,
+            update_columns=update_columns or [],
+            defaults=defaults or {},
+        )
+
+    async def execute(self, statement: UpdateBase) -> None:
+        """Run a write that isn't a plain upsert, e.g. a delete"""
+        await self.db_session.execute(statement)
+
+    async def flush(self) -> None:
+        """Nothing to do, rows are written straight away unlike with a UnitOfWork"""
@@ -0,0 +1,60 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.db import EmotionalProfileConfigDB, EmotionalProfileResultDB
+from src.models.domain import EmotionalProfile, EmotionalProfileConfig
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
+
+
+class EmotionalProfileResultsRepository:
+    """Model results keyed by a hash of the lyrics and the config that scored them"""
+
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
+        self.db_session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
+
+    async def add_config(self, config_key: str, config: EmotionalProfileConfig) -> None:
+        await self.writer.upsert(
+            table_=EmotionalProfileConfigDB.__table__,
+            rows=[{"config_key": config_key, **config.model_dump()}],
+            index_elements=["config_key"],
+        )
+
+    async def get_many(self, content_keys: set[str]) -> dict[str, EmotionalProfile]:
+        if not content_keys:
+            return {}
+
+        db_results = await self.db_session.scalars(
+            select(EmotionalProfileResultDB).where(
+                EmotionalProfileResultDB.content_key.in_(content_keys)
+            )
+        )
+        return {
+            result.content_key: EmotionalProfile.model_validate(
+                result, from_attributes=True
+            )
+            for result in db_results
+        }
+
+    async def add_many(
+        self, config_key: str, results: dict[str, EmotionalProfile]
+    ) -> None:
+        if not results:
+            return
+
+        values = [
+            {
+                "content_key": content_key,
+                "config_key": config_key,
+                **profile.model_dump(),
+            }
+            for content_key, profile in sorted(results.items())
+        ]
+        await self.writer.upsert(
+            table_=EmotionalProfileResultDB.__table__,
+            rows=values,
+            index_elements=["content_key"],
+        )
@@ -1,26 +1,27 @@
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.domain import Profile
 from src.models.db import ProfileDB
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class ProfileRepository:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
         self.session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
 
-    def upsert(self, profile: Profile) -> None:
-        values = profile.model_dump()
-
-        stmt = insert(ProfileDB).values(values)
-        stmt = stmt.on_conflict_do_update(
+    async def upsert(self, profile: Profile) -> None:
+        await self.writer.upsert(
+            table_=ProfileDB.__table__,
+            rows=[profile.model_dump()],
             index_elements=["id"],
-            set_={
-                "display_name": stmt.excluded.display_name,
-                "email": stmt.excluded.email,
-                "images": stmt.excluded.images,
-                "spotify_url": stmt.excluded.spotify_url,
-                "followers": stmt.excluded.followers,
-            },
+            update_columns=[
+                "display_name",
+                "email",
+                "images",
+                "spotify_url",
+                "followers",
+            ],
         )
-
-        self.session.execute(stmt)
@@ -0,0 +1,73 @@
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.db import RunCheckpointDB
+from src.models.enums import TimeRange
+
+
+class RunCheckpointsRepository:
+    """Stages of a run that have committed, keyed by user, time range and date.
+
+    A stage is marked done in its own transaction, so the mark is only saved
+    along with the stage's writes.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def get_completed_stages(
+        self, user_id: str, time_ranges: list[TimeRange], collection_date: date
+    ) -> set[str]:
+        """Get the stages completed for every one of the time ranges"""
+        result = await self.db_session.execute(
+            select(RunCheckpointDB.time_range, RunCheckpointDB.completed_stages).where(
+                RunCheckpointDB.user_id == user_id,
+                RunCheckpointDB.time_range.in_(time_ranges),
+                RunCheckpointDB.collection_date == collection_date,
+            )
+        )
+        completed_stages_by_time_range = {
+            time_range: set(completed_stages)
+            for time_range, completed_stages in result.all()
+        }
+
+        if not time_ranges or set(completed_stages_by_time_range) != set(time_ranges):
+            return set()
+
+        return set.intersection(*completed_stages_by_time_range.values())
+
+    async def mark_completed(
+        self,
+        user_id: str,
+        time_ranges: list[TimeRange],
+        collection_date: date,
+        stage: str,
+    ) -> None:
+        values = [
+            {
+                "user_id": user_id,
+                "time_range": time_range,
+                "collection_date": collection_date,
+                "completed_stages": [stage],
+            }
+            for time_range in sorted(set(time_ranges), key=lambda t: t.value)
+        ]
+
+        stmt = insert(RunCheckpointDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "time_range", "collection_date"],
+            set_={
+                "completed_stages": RunCheckpointDB.completed_stages.op("||")(
+                    stmt.excluded.completed_stages
+                ),
+                "updated_at": func.now(),
+            },
+            # a stage run twice is only recorded once
+            where=~RunCheckpointDB.completed_stages.contains(
+                stmt.excluded.completed_stages
+            ),
+        )
+
+        await self.db_session.execute(stmt)
@@ -1,49 +1,62 @@
 from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.domain import TopItemBase
 from src.models.db import TopItemDBBase
 from src.models.enums import TimeRange
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 TopItemDBType = TypeVar("TopItemDBType", bound=TopItemDBBase)
 TopItemDomainType = TypeVar("TopItemDomainType", bound=TopItemBase)
 
 
 class TopItemsBaseRepository(ABC, Generic[TopItemDBType, TopItemDomainType]):
-    def __init__(self, db_session: Session, db_model: TopItemDBType):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        db_model: TopItemDBType,
+        unit_of_work: UnitOfWork | None = None,
+    ):
         self.db_session = db_session
         self.db_model = db_model
+        # writes wait for the unit of work's flush when there is one
+        self.writer = unit_of_work or BulkWriter(db_session)
 
-    def add_many(self, top_items: list[TopItemDomainType]) -> None:
+    async def add_many(self, top_items: list[TopItemDomainType]) -> None:
         values = [item.model_dump() for item in top_items]
-        stmt = insert(self.db_model).values(values)
-        self.db_session.execute(stmt)
+        # a snapshot already stored by a duplicate delivery is kept as it is
+        await self.writer.upsert(
+            table_=self.db_model.__table__,
+            rows=values,
+            index_elements=[
+                column.name for column in self.db_model.__table__.primary_key
+            ],
+        )
 
-    def _get_latest_snapshot(
+    async def _get_latest_snapshot(
         self,
         user_id: str,
         time_range: TimeRange,
     ) -> list[TopItemDBType]:
         latest_date_subquery = (
-            self.db_session.query(func.max(self.db_model.collection_date))
-            .filter(
+            select(func.max(self.db_model.collection_date))
+            .where(
                 self.db_model.user_id == user_id, self.db_model.time_range == time_range
             )
             .scalar_subquery()
         )
 
-        return (
-            self.db_session.query(self.db_model)
-            .filter(
+        db_items = await self.db_session.scalars(
+            select(self.db_model).where(
                 self.db_model.user_id == user_id,
                 self.db_model.time_range == time_range,
                 self.db_model.collection_date == latest_date_subquery,
             )
-            .all()
         )
+        return list(db_items)
 
     @staticmethod
     @abstractmethod
@@ -51,8 +64,10 @@ class TopItemsBaseRepository(ABC, Generic[TopItemDBType, TopItemDomainType]):
         db_items: list[TopItemDBType],
     ) -> list[TopItemDomainType]: ...
 
-    def get_previous_top_items(
+    async def get_previous_top_items(
         self, user_id: str, time_range: TimeRange
-    ) -> TopItemDomainType:
-        db_top_items = self._get_latest_snapshot(user_id=user_id, time_range=time_range)
+    ) -> list[TopItemDomainType]:
+        db_top_items = await self._get_latest_snapshot(
+            user_id=user_id, time_range=time_range
+        )
         return self._to_domain_objects(db_top_items)
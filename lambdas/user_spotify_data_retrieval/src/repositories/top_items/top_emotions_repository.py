@@ -1,9 +1,10 @@
 import sqlalchemy
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.db import TopEmotionDB
 from src.models.domain import TopEmotion
 from src.repositories.top_items.base import TopItemsBaseRepository
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class TopEmotionsRepositoryException(Exception):
@@ -12,12 +13,16 @@ class TopEmotionsRepositoryException(Exception):
 
 
 class TopEmotionsRepository(TopItemsBaseRepository[TopEmotionDB, TopEmotion]):
-    def __init__(self, db_session: Session):
-        super().__init__(db_session=db_session, db_model=TopEmotionDB)
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
+        super().__init__(
+            db_session=db_session, db_model=TopEmotionDB, unit_of_work=unit_of_work
+        )
 
-    def add_many(self, top_items):
+    async def add_many(self, top_items):
         try:
-            super().add_many(top_items)
+            await super().add_many(top_items)
         except sqlalchemy.exc.IntegrityError as e:
             raise TopEmotionsRepositoryException(
                 "Cannot overwrite a top emotion entry."
@@ -1,7 +1,8 @@
 import sqlalchemy
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.domain import TopGenre
 from src.repositories.top_items.base import TopItemsBaseRepository
+from src.repositories.unit_of_work import UnitOfWork
 from src.models.db import TopGenreDB
 
 
@@ -11,12 +12,16 @@ class TopGenresRepositoryException(Exception):
 
 
 class TopGenresRepository(TopItemsBaseRepository):
-    def __init__(self, db_session: Session):
-        super().__init__(db_session=db_session, db_model=TopGenreDB)
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
+        super().__init__(
+            db_session=db_session, db_model=TopGenreDB, unit_of_work=unit_of_work
+        )
 
-    def add_many(self, top_items: list[TopGenre]) -> None:
+    async def add_many(self, top_items: list[TopGenre]) -> None:
         try:
-            super().add_many(top_items)
+            await super().add_many(top_items)
         except sqlalchemy.exc.IntegrityError as e:
             raise TopGenresRepositoryException(
                 "Cannot overwrite a top genre entry."
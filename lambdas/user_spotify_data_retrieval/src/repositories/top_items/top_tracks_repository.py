@@ -1,7 +1,8 @@
 import sqlalchemy
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.domain import TopTrack
 from src.repositories.top_items.base import TopItemsBaseRepository
+from src.repositories.unit_of_work import UnitOfWork
 from src.models.db import TopTrackDB
 
 
@@ -11,12 +12,16 @@ class TopTracksRepositoryException(Exception):
 
 
 class TopTracksRepository(TopItemsBaseRepository):
-    def __init__(self, db_session: Session):
-        super().__init__(db_session=db_session, db_model=TopTrackDB)
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
+        super().__init__(
+            db_session=db_session, db_model=TopTrackDB, unit_of_work=unit_of_work
+        )
 
-    def add_many(self, top_items):
+    async def add_many(self, top_items):
         try:
-            super().add_many(top_items)
+            await super().add_many(top_items)
         except sqlalchemy.exc.IntegrityError as e:
             raise TopTracksRepositoryException(
                 "Cannot overwrite a top track entry."
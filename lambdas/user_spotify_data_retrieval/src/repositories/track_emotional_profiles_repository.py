@@ -1,9 +1,17 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
+import numpy as np
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 import sqlalchemy.exc
 
 from src.models.db import TrackEmotionalProfileDB
-from src.models.domain import TrackEmotionalProfile
+from src.models.domain import (
+    EMOTIONS,
+    EmotionalProfile,
+    EmotionalProfileMatrix,
+    TrackEmotionalProfile,
+)
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class TrackEmotionalProfilesRepositoryException(Exception):
@@ -12,29 +20,74 @@ class TrackEmotionalProfilesRepositoryException(Exception):
 
 
 class TrackEmotionalProfilesRepository:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        config_key: str | None = None,
+        unit_of_work: UnitOfWork | None = None,
+    ):
         self.db_session = db_session
+        # only profiles calculated with this config count as existing
+        self.config_key = config_key
+        self.writer = unit_of_work or BulkWriter(db_session)
 
-    def add_many(self, top_items: list[TrackEmotionalProfile]) -> None:
+    async def add_many(self, top_items: list[TrackEmotionalProfile]) -> None:
         try:
             values = [
-                {"track_id": item.track_id, **item.emotional_profile.model_dump()}
+                {
+                    "track_id": item.track_id,
+                    "config_key": self.config_key,
+                    **item.emotional_profile.model_dump(),
+                }
                 for item in top_items
             ]
-            stmt = insert(TrackEmotionalProfileDB).values(values)
-            self.db_session.execute(stmt)
+            # profiles from an older config are replaced by the recalculation
+            await self.writer.upsert(
+                table_=TrackEmotionalProfileDB.__table__,
+                rows=values,
+                index_elements=["track_id"],
+                update_columns=["config_key", *EmotionalProfile.model_fields],
+            )
         except sqlalchemy.exc.IntegrityError as e:
             raise TrackEmotionalProfilesRepositoryException(
                 "Cannot overwrite an existing emotional profile entry."
             ) from e
 
-    def get_many(self, track_ids: set[str]) -> list[TrackEmotionalProfile]:
-        db_track_emotional_profiles = (
-            self.db_session.query(TrackEmotionalProfileDB)
-            .filter(TrackEmotionalProfileDB.track_id.in_(track_ids))
-            .all()
+    def _filter(self, query: Select, track_ids: set[str]) -> Select:
+        query = query.where(TrackEmotionalProfileDB.track_id.in_(track_ids))
+        if self.config_key is not None:
+            query = query.where(TrackEmotionalProfileDB.config_key == self.config_key)
+        return query
+
+    async def get_many(self, track_ids: set[str]) -> list[TrackEmotionalProfile]:
+        db_track_emotional_profiles = await self.db_session.scalars(
+            self._filter(select(TrackEmotionalProfileDB), track_ids)
         )
         return [
-            TrackEmotionalProfile(track_id=profile.track_id)
+            TrackEmotionalProfile(
+                track_id=profile.track_id,
+                emotional_profile=EmotionalProfile.model_validate(
+                    profile, from_attributes=True
+                ),
+            )
             for profile in db_track_emotional_profiles
         ]
+
+    async def get_many_matrix(self, track_ids: set[str]) -> EmotionalProfileMatrix:
+        """Stored profiles read straight from the emotion columns, no ORM objects"""
+        emotion_columns = [
+            getattr(TrackEmotionalProfileDB, emotion) for emotion in EMOTIONS
+        ]
+        result = await self.db_session.execute(
+            self._filter(
+                select(TrackEmotionalProfileDB.track_id, *emotion_columns), track_ids
+            )
+        )
+        rows = result.all()
+
+        return EmotionalProfileMatrix(
+            track_ids=[row[0] for row in rows],
+            values=np.array([row[1:] for row in rows], dtype=np.float64).reshape(
+                len(rows), len(EMOTIONS)
+            ),
+        )
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.db import TrackLyricsFailureDB
+from src.models.domain import TrackLyricsFailure
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
+
+
+class TrackLyricsFailuresRepository:
+    """Negative cache of tracks whose lyrics couldn't be scraped.
+
+    Each repeated failure doubles the wait before the track is tried again, up
+    to RETRY_MAX_DELAY.
+    """
+
+    RETRY_BASE_DELAY = timedelta(days=1)
+    RETRY_MAX_DELAY = timedelta(days=30)
+
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
+        self.db_session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
+
+    async def get_blocked_track_ids(self, track_ids: set[str]) -> set[str]:
+        """Get the tracks that shouldn't be scraped again yet"""
+        blocked_track_ids = await self.db_session.scalars(
+            select(TrackLyricsFailureDB.track_id).where(
+                TrackLyricsFailureDB.track_id.in_(track_ids),
+                TrackLyricsFailureDB.retry_after > func.now(),
+            )
+        )
+        return set(blocked_track_ids)
+
+    async def record_many(self, failures: list[TrackLyricsFailure]) -> None:
+        if not failures:
+            return
+
+        values = [
+            {
+                **failure.model_dump(),
+                "attempts": 1,
+                "last_attempted_at": func.now(),
+                "retry_after": func.now() + self.RETRY_BASE_DELAY,
+            }
+            for failure in sorted(failures, key=lambda f: f.track_id)
+        ]
+
+        stmt = insert(TrackLyricsFailureDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["track_id"],
+            set_={
+                "reason": stmt.excluded.reason,
+                "attempts": TrackLyricsFailureDB.attempts + 1,
+                "last_attempted_at": stmt.excluded.last_attempted_at,
+                "retry_after": func.now()
+                + func.least(
+                    self.RETRY_BASE_DELAY
+                    * func.power(2, TrackLyricsFailureDB.attempts),
+                    self.RETRY_MAX_DELAY,
+                ),
+            },
+        )
+        await self.writer.execute(stmt)
+
+    async def delete_many(self, track_ids: set[str]) -> None:
+        """Forget failures for tracks whose lyrics have now been scraped"""
+        if not track_ids:
+            return
+
+        await self.writer.execute(
+            delete(TrackLyricsFailureDB).where(
+                TrackLyricsFailureDB.track_id.in_(track_ids)
+            )
+        )
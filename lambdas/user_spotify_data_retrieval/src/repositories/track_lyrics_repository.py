@@ -1,9 +1,11 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import sqlalchemy.exc
 
 from src.models.db import TrackLyricsDB
 from src.models.domain import TrackLyrics
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class TrackLyricsRepositoryException(Exception):
@@ -12,24 +14,33 @@ class TrackLyricsRepositoryException(Exception):
 
 
 class TrackLyricsRepository:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
         self.db_session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
 
-    def add_many(self, top_items: list[TrackLyrics]) -> None:
+    async def add_many(self, top_items: list[TrackLyrics]) -> None:
         try:
             values = [item.model_dump() for item in top_items]
-            stmt = insert(TrackLyricsDB).values(values)
-            self.db_session.execute(stmt)
+            # another run scraped the same track first, its lyrics are the same
+            await self.writer.upsert(
+                table_=TrackLyricsDB.__table__,
+                rows=values,
+                index_elements=["track_id"],
+            )
         except sqlalchemy.exc.IntegrityError as e:
             raise TrackLyricsRepositoryException(
                 "Cannot overwrite an existing lyrics entry."
             ) from e
 
-    def get_many(self, track_ids: set[str]) -> list[TrackLyrics]:
-        db_track_lyrics = (
-            self.db_session.query(TrackLyricsDB)
-            .filter(TrackLyricsDB.track_id.in_(track_ids))
-            .all()
+    async def flush(self) -> None:
+        """Write the lyrics added so far, and anything else the unit of work holds"""
+        await self.writer.flush()
+
+    async def get_many(self, track_ids: set[str]) -> list[TrackLyrics]:
+        db_track_lyrics = await self.db_session.scalars(
+            select(TrackLyricsDB).where(TrackLyricsDB.track_id.in_(track_ids))
         )
         return [
             TrackLyrics(track_id=profile.track_id, lyrics=profile.lyrics)
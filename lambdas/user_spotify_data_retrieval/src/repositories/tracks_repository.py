@@ -1,35 +1,40 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.domain import Track
 from src.models.db import TrackDB, track_artist_association
-from sqlalchemy.dialects.postgresql import insert
+from src.repositories.bulk_writer import BulkWriter
+from src.repositories.unit_of_work import UnitOfWork
 
 
 class TracksRepository:
-    def __init__(self, db_session: Session):
+    def __init__(
+        self, db_session: AsyncSession, unit_of_work: UnitOfWork | None = None
+    ):
         self.session = db_session
+        self.writer = unit_of_work or BulkWriter(db_session)
+
+    async def upsert_many(self, tracks: list[Track]) -> None:
+        if not tracks:
+            return
+
+        # sorted so concurrent branches lock rows in the same order
+        tracks = sorted(tracks, key=lambda t: t.id)
 
-    def upsert_many(self, tracks: list[Track]) -> None:
         # upsert tracks
-        values = []
-        
-        for track in tracks:
-            track_data = track.model_dump()
-            track_data.pop("artists")
-            values.append(track_data)
-        
-        stmt = insert(TrackDB).values(values)
-        stmt = stmt.on_conflict_do_update(
+        values = [track.model_dump(exclude={"artists"}) for track in tracks]
+
+        await self.writer.upsert(
+            table_=TrackDB.__table__,
+            rows=values,
             index_elements=["id"],
-            set_={
-                "name": stmt.excluded.name,
-                "spotify_url": stmt.excluded.spotify_url,
-                "release_date": stmt.excluded.release_date,
-                "explicit": stmt.excluded.explicit,
-                "duration_ms": stmt.excluded.duration_ms,
-                "popularity": stmt.excluded.popularity,
-            },
+            update_columns=[
+                "name",
+                "spotify_url",
+                "release_date",
+                "explicit",
+                "duration_ms",
+                "popularity",
+            ],
         )
-        self.session.execute(stmt)
 
         # upsert track artist association
         association_values = [
@@ -37,10 +42,8 @@ class TracksRepository:
             for track in tracks
             for artist in track.artists
         ]
-
-        if association_values:
-            assoc_stmt = insert(track_artist_association).values(association_values)
-            assoc_stmt = assoc_stmt.on_conflict_do_nothing(
-                index_elements=["track_id", "artist_id"]
-            )
-            self.session.execute(assoc_stmt)
+        await self.writer.upsert(
+            table_=track_artist_association,
+            rows=association_values,
+            index_elements=["track_id", "artist_id"],
+        )
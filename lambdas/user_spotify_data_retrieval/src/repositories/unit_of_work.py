@@ -0,0 +1,164 @@
+import asyncio
+from typing import Any
+
+import sqlalchemy.exc
+from loguru import logger
+from sqlalchemy import ColumnElement, Table, UpdateBase
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.db import execute_pipelined
+from src.models.db import Base
+from src.repositories.bulk_writer import COPY_THRESHOLD_ROWS, BulkWriter
+
+# tables in the order their foreign keys need them written
+TABLE_ORDER = {
+    table.name: index for index, table in enumerate(Base.metadata.sorted_tables)
+}
+
+
+class UnitOfWorkException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class PendingWrites:
+    """Rows waiting to be upserted into a table, keyed by their index elements"""
+
+    def __init__(
+        self,
+        table_: Table,
+        index_elements: list[str],
+        update_columns: list[str],
+        defaults: dict[str, ColumnElement],
+    ):
+        self.table = table_
+        self.index_elements = index_elements
+        self.update_columns = update_columns
+        self.defaults = defaults
+        self.rows: dict[tuple, dict[str, Any]] = {}
+
+    def add(self, rows: list[dict[str, Any]]) -> None:
+        for row in rows:
+            # a row written again replaces the earlier one, e.g. an artist
+            # stored by both the top artists and the top tracks of a stage
+            self.rows[tuple(row[name] for name in self.index_elements)] = row
+
+    def get_sorted_rows(self) -> list[dict[str, Any]]:
+        # sorted so concurrent transactions lock rows in the same order
+        return [
+            self.rows[key]
+            for key in sorted(self.rows, key=lambda key: tuple(map(str, key)))
+        ]
+
+
+class UnitOfWork:
+    """Buffers a transaction's writes and sends them together on flush.
+
+    Repositories given a unit of work add their rows, or other write
+    statements, here instead of writing them straight away. Flushing writes
+    every table in foreign key order in one psycopg pipeline, so a stage's
+    writes cost one round trip rather than one per statement. A table with at
+    least `copy_threshold_rows` pending rows is written by the BulkWriter's
+    COPY path instead, between the pipelines of the tables before and after
+    it. Reads aren't buffered and won't see pending writes.
+    """
+
+    def __init__(
+        self, db_session: AsyncSession, copy_threshold_rows: int = COPY_THRESHOLD_ROWS
+    ):
+        self.db_session = db_session
+        self.bulk_writer = BulkWriter(db_session, copy_threshold_rows)
+        self.pending: dict[tuple, PendingWrites] = {}
+        self.statements: list[UpdateBase] = []
+        # a checkpoint flush and the final one mustn't overtake each other
+        self._flush_lock = asyncio.Lock()
+
+    async def upsert(
+        self,
+        table_: Table,
+        rows: list[dict[str, Any]],
+        index_elements: list[str],
+        update_columns: list[str] | None = None,
+        defaults: dict[str, ColumnElement] | None = None,
+    ) -> None:
+        """Queue rows to upsert on flush, same arguments as BulkWriter.upsert"""
+        if not rows:
+            return
+
+        update_columns = update_columns or []
+        defaults = defaults or {}
+        key = (
+            table_.name,
+            tuple(index_elements),
+            tuple(update_columns),
+            tuple(defaults),
+        )
+
+        if key not in self.pending:
+            self.pending[key] = PendingWrites(
+                table_=table_,
+                index_elements=index_elements,
+                update_columns=update_columns,
+                defaults=defaults,
+            )
+
+        self.pending[key].add(rows)
+
+    async def execute(self, statement: UpdateBase) -> None:
+        """Queue a write that isn't a plain upsert, e.g. a delete, to run on flush"""
+        self.statements.append(statement)
+
+    async def _write(self, writes: list[PendingWrites | UpdateBase]) -> None:
+        statements: list[UpdateBase] = []
+
+        for write in writes:
+            if isinstance(write, UpdateBase):
+                statements.append(write)
+            elif len(write.rows) < self.bulk_writer.copy_threshold_rows:
+                statements += BulkWriter.build_upserts(
+                    table_=write.table,
+                    rows=write.get_sorted_rows(),
+                    index_elements=write.index_elements,
+                    update_columns=write.update_columns,
+                    defaults=write.defaults,
+                )
+            else:
+                # the tables before it have to be written first
+                await execute_pipelined(self.db_session, statements)
+                statements = []
+                await self.bulk_writer.upsert(
+                    table_=write.table,
+                    rows=list(write.rows.values()),
+                    index_elements=write.index_elements,
+                    update_columns=write.update_columns,
+                    defaults=write.defaults,
+                )
+
+        await execute_pipelined(self.db_session, statements)
+
+    async def flush(self) -> None:
+        """Write everything pending, e.g. at the end of a stage or at a checkpoint"""
+        async with self._flush_lock:
+            if not self.pending and not self.statements:
+                return
+
+            writes: list[tuple[Table, PendingWrites | UpdateBase]] = [
+                (pending_writes.table, pending_writes)
+                for pending_writes in self.pending.values()
+            ]
+            # after a table's upserts, in the order they were queued
+            writes += [(statement.table, statement) for statement in self.statements]
+            writes.sort(key=lambda write: TABLE_ORDER[write[0].name])
+            row_count = sum(
+                len(pending_writes.rows) for pending_writes in self.pending.values()
+            )
+            self.pending = {}
+            self.statements = []
+
+            logger.info(f"Flushing {row_count} rows in {len(writes)} writes")
+            try:
+                await self._write([write for _, write in writes])
+            except sqlalchemy.exc.IntegrityError as e:
+                raise UnitOfWorkException(
+                    "Pending writes conflict with rows already stored."
+                ) from e
@@ -1,37 +1,122 @@
 import asyncio
 import datetime
-import httpx
+from loguru import logger
 
 from src.core.config import Settings
-from src.core.db import get_db_session
+from src.core.resources import Resources
 from src.models.enums import TimeRange
+from src.models.event import RunConfig
+from src.orchestrators.dag_scheduler import DagRunUnfinishedException
 from src.orchestrators.data_collection_orchestrator import DataCollectionOrchestrator
+from src.utils.deadline import Deadline
 
 
 class DataCollectionService:
     """Service for executing data collection operations"""
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, resources: Resources):
         self.settings = settings
-        self.lyrics_semaphore = asyncio.Semaphore(
-            settings.lyrics_max_concurrent_scrapes
-        )
+        self.resources = resources
         self.orchestrator = DataCollectionOrchestrator(
-            settings=self.settings, lyrics_semaphore=self.lyrics_semaphore
+            session_factory=resources.session_factory,
+            spotify_service=resources.spotify_service,
+            lyrics_scraper=resources.lyrics_scraper,
+            model_service=resources.model_service,
+            lexicon_calculator=resources.lexicon_calculator,
+            emotional_profile_scorer=settings.emotional_profile_scorer,
+            max_concurrent_top_emotions=settings.max_concurrent_top_emotions,
+            top_emotions_flush_seconds=settings.top_emotions_flush_seconds,
+            artist_cache_ttl=datetime.timedelta(hours=settings.artist_cache_ttl_hours),
         )
 
     async def collect_user_data(
         self,
         access_token: str,
-        time_range: TimeRange,
+        time_ranges: list[TimeRange],
         collection_date: datetime.date,
+        deadline: Deadline | None = None,
+        stages: list[str] | None = None,
+        user_id: str | None = None,
+    ) -> None:
+        try:
+            await self.orchestrator.run_data_collection_pipeline(
+                access_token=access_token,
+                time_ranges=time_ranges,
+                collection_date=collection_date,
+                deadline=deadline,
+                stages=stages,
+                user_id=user_id,
+            )
+        finally:
+            # totals for the container, shared by every user it has served
+            logger.info(
+                f"Spotify throttle metrics: {self.resources.spotify_transport.metrics.snapshot()}"
+            )
+            logger.info(
+                f"Lyrics pacer metrics: {self.resources.lyrics_pacer.snapshot()}"
+            )
+
+    async def collect_config_data(
+        self, config: RunConfig, deadline: Deadline | None = None
     ) -> None:
-        async with httpx.AsyncClient() as client:
-            with get_db_session(self.settings.db_connection_string) as db_session:
-                await self.orchestrator.run_data_collection_pipeline(
-                    client=client,
-                    db_session=db_session,
-                    access_token=access_token,
-                    time_range=time_range,
-                    collection_date=collection_date,
+        """Collect data for a run config, following up on stages that ran out of time.
+
+        Raises if the follow-up can't be sent or the run has already been
+        followed up too many times, so the message is retried instead.
+        """
+        try:
+            await self.collect_user_data(
+                access_token=config.access_token,
+                time_ranges=config.time_ranges,
+                collection_date=config.collection_date,
+                deadline=deadline,
+                stages=config.stages,
+                user_id=config.user_id,
+            )
+        except DagRunUnfinishedException as e:
+            if config.follow_up_count >= self.settings.max_follow_ups:
+                logger.error(
+                    f"Run still unfinished after {config.follow_up_count} follow-ups"
                 )
+                raise
+
+            await self.resources.follow_up_queue.send(
+                config.create_follow_up(stages=e.unfinished_nodes)
+            )
+
+    async def _collect_limited_user_data(
+        self,
+        config: RunConfig,
+        semaphore: asyncio.Semaphore,
+        deadline: Deadline | None = None,
+    ) -> None:
+        async with semaphore:
+            await self.collect_config_data(config=config, deadline=deadline)
+
+    async def collect_many_users_data(
+        self, configs: dict[str, RunConfig], deadline: Deadline | None = None
+    ) -> list[str]:
+        """Collect data for many users concurrently.
+
+        Takes run configs keyed by message ID and returns the IDs of the runs
+        that failed, so that only those messages are redelivered.
+        """
+        semaphore = asyncio.Semaphore(self.settings.max_concurrent_users)
+        tasks = [
+            self._collect_limited_user_data(
+                config=config, semaphore=semaphore, deadline=deadline
+            )
+            for config in configs.values()
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        failed_message_ids = []
+        for message_id, result in zip(configs, results):
+            # a cancelled run raised CancelledError, which isn't an Exception
+            if isinstance(result, BaseException):
+                logger.error(
+                    f"Data collection failed for message {message_id}: {result}"
+                )
+                failed_message_ids.append(message_id)
+
+        return failed_message_ids
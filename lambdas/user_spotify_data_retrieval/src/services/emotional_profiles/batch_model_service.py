@@ -0,0 +1,237 @@
+import asyncio
+import json
+from pydantic_ai.exceptions import (
+    AgentRunError,
+    UsageLimitExceeded,
+    UnexpectedModelBehavior,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.models.google import GoogleModelSettings
+from loguru import logger
+
+from src.models.domain import (
+    EmotionalProfile,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileBatch,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.model_service import (
+    ModelService,
+    ModelServiceException,
+)
+
+BATCH_INSTRUCTIONS = """
+
+**Batches:**
+The input is a JSON list of songs, each with a "track_id" and its "lyrics". Analyse every song on its own and return one emotional profile per song in "profiles", with the song's "track_id" copied exactly. Do not skip, merge or add songs."""
+
+# rough average for English text, only used to size batches
+CHARS_PER_TOKEN = 4
+# JSON keys and quoting around each song in the prompt
+TOKENS_PER_REQUEST_OVERHEAD = 20
+
+
+class BatchModelService(ModelService):
+    """Scores many tracks per model call instead of one call per track.
+
+    Requests are packed into batches that fit an input token budget, so the
+    instructions are sent once per batch rather than once per track. A batch
+    the model can't answer validly is split in half until the bad tracks are
+    isolated.
+    """
+
+    output_type = TrackEmotionalProfileBatch
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        instructions: str,
+        max_batch_input_tokens: int,
+        max_batch_size: int,
+        model: Model | None = None,
+    ):
+        self.max_batch_input_tokens = max_batch_input_tokens
+        self.max_batch_size = max_batch_size
+        super().__init__(
+            api_key=api_key,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            instructions=instructions + BATCH_INSTRUCTIONS,
+            model=model,
+        )
+
+    def _create_model_settings(self) -> GoogleModelSettings:
+        # max_tokens is the budget for one profile, a batch answers for many
+        return GoogleModelSettings(
+            temperature=self.temperature,
+            max_tokens=self.max_tokens * self.max_batch_size,
+            top_p=self.top_p,
+        )
+
+    @staticmethod
+    def _estimate_tokens(request: TrackEmotionalProfileRequest) -> int:
+        return (
+            len(request.lyrics) + len(request.track_id)
+        ) // CHARS_PER_TOKEN + TOKENS_PER_REQUEST_OVERHEAD
+
+    def _create_batches(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[list[TrackEmotionalProfileRequest]]:
+        batches = []
+        batch = []
+        batch_tokens = 0
+
+        for request in requests:
+            tokens = self._estimate_tokens(request)
+
+            # an oversized song still gets a batch of its own
+            if batch and (
+                batch_tokens + tokens > self.max_batch_input_tokens
+                or len(batch) == self.max_batch_size
+            ):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+
+            batch.append(request)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    async def _run_batch(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> dict[str, EmotionalProfile]:
+        user_prompt = json.dumps(
+            [
+                {"track_id": request.track_id, "lyrics": request.lyrics}
+                for request in requests
+            ]
+        )
+
+        try:
+            result = await self.agent.run(user_prompt=user_prompt)
+        except UsageLimitExceeded as e:
+            logger.warning(
+                f"Usage limit exceeded for emotional profile generation: {str(e)}"
+            )
+            raise ModelServiceException(f"Usage limit exceeded: {str(e)}") from e
+        except UnexpectedModelBehavior:
+            raise
+        except AgentRunError as e:
+            logger.warning(
+                f"Agent run error during emotional profile generation: {str(e)}"
+            )
+            raise ModelServiceException(f"Agent run error: {str(e)}") from e
+
+        # ignore any track IDs the model made up
+        track_ids = {request.track_id for request in requests}
+        return {
+            profile.track_id: profile.emotional_profile
+            for profile in result.output.profiles
+            if profile.track_id in track_ids
+        }
+
+    async def _split_batch(
+        self, requests: list[TrackEmotionalProfileRequest], reason: str
+    ) -> list[TrackEmotionalProfile]:
+        if len(requests) == 1:
+            logger.warning(
+                f"Failed to calculate emotional profile for track {requests[0].track_id}: {reason}"
+            )
+            return []
+
+        logger.warning(
+            f"Splitting batch of {len(requests)} emotional profiles: {reason}"
+        )
+        middle = len(requests) // 2
+        halves = [requests[:middle], requests[middle:]]
+        results = await asyncio.gather(
+            *[self._get_batch_profiles(half) for half in halves],
+            return_exceptions=True,
+        )
+
+        # with nothing to keep, or when cancelled, the caller handles the error
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if len(errors) == len(results) or any(
+            not isinstance(error, Exception) for error in errors
+        ):
+            raise errors[0]
+
+        track_profiles = []
+        for half, result in zip(halves, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    f"Failed to calculate emotional profiles for {len(half)} tracks of a split batch: {result}"
+                )
+            else:
+                track_profiles.extend(result)
+
+        return track_profiles
+
+    async def _get_batch_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        try:
+            profiles = await self._run_batch(requests)
+        except UnexpectedModelBehavior as e:
+            return await self._split_batch(requests, f"invalid output - {e}")
+
+        missing_requests = [
+            request for request in requests if request.track_id not in profiles
+        ]
+
+        if len(missing_requests) == len(requests):
+            return await self._split_batch(requests, "no profiles returned")
+
+        track_profiles = [
+            TrackEmotionalProfile(track_id=track_id, emotional_profile=profile)
+            for track_id, profile in profiles.items()
+        ]
+
+        if missing_requests:
+            # retried on their own, a smaller batch is more likely to be answered
+            track_profiles += await self._get_batch_profiles(missing_requests)
+
+        return track_profiles
+
+    async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
+        request = TrackEmotionalProfileRequest(track_id="track", lyrics=lyrics)
+        track_profiles = await self._get_batch_profiles([request])
+
+        if not track_profiles:
+            raise ModelServiceException("No valid emotional profile returned")
+
+        return track_profiles[0].emotional_profile
+
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        batches = self._create_batches(requests)
+        logger.info(
+            f"Calculating {len(requests)} emotional profiles in {len(batches)} batches"
+        )
+
+        results = await asyncio.gather(
+            *[self._get_batch_profiles(batch) for batch in batches],
+            return_exceptions=True,
+        )
+
+        successful_results = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    f"Failed to calculate emotional profiles for a batch of {len(batch)} tracks: {result}"
+                )
+            else:
+                successful_results.extend(result)
+
+        return successful_results
@@ -0,0 +1,124 @@
+import hashlib
+import html
+import json
+import re
+import unicodedata
+from loguru import logger
+
+from src.models.domain import (
+    EmotionalProfile,
+    EmotionalProfileConfig,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.repositories.emotional_profile_results_repository import (
+    EmotionalProfileResultsRepository,
+)
+from src.services.emotional_profiles.model_service import (
+    EmotionalProfileCalculator,
+    ModelServiceException,
+)
+
+
+def get_config_key(config: EmotionalProfileConfig) -> str:
+    """Hash of the prompt, model and sampling params"""
+    return hashlib.sha256(
+        json.dumps(config.model_dump(), sort_keys=True).encode()
+    ).hexdigest()
+
+
+def normalize_lyrics(lyrics: str) -> str:
+    """Reduce lyrics to their words so formatting differences share a cache entry"""
+    text = re.sub(r"<br\s*/?>", "\n", lyrics, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]*>", "", text)
+    text = html.unescape(text)
+    # section labels like [Chorus] or [Verse 2: Artist] vary between releases
+    text = re.sub(r"\[[^\]]*\]", "", text)
+    text = unicodedata.normalize("NFKC", text).casefold()
+
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def get_content_key(config_key: str, lyrics: str) -> str:
+    return hashlib.sha256(
+        f"{config_key}\n{normalize_lyrics(lyrics)}".encode()
+    ).hexdigest()
+
+
+class CachedEmotionalProfileCalculator(EmotionalProfileCalculator):
+    """Serves profiles from a content-addressed cache before asking the model.
+
+    Results are keyed by the normalised lyrics and the config key, so the same
+    lyrics on a remaster or live version are only scored once, and changing
+    the prompt or model misses the cache without touching older results.
+    """
+
+    def __init__(
+        self,
+        calculator: EmotionalProfileCalculator,
+        results_repository: EmotionalProfileResultsRepository,
+        config: EmotionalProfileConfig,
+    ):
+        self.calculator = calculator
+        self.results_repository = results_repository
+        self.config = config
+        self.config_key = get_config_key(config)
+
+    async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
+        request = TrackEmotionalProfileRequest(track_id="track", lyrics=lyrics)
+        track_profiles = await self.get_emotional_profiles([request])
+
+        if not track_profiles:
+            raise ModelServiceException("No emotional profile calculated")
+
+        return track_profiles[0].emotional_profile
+
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        content_keys = {
+            request.track_id: get_content_key(self.config_key, request.lyrics)
+            for request in requests
+        }
+        results = await self.results_repository.get_many(set(content_keys.values()))
+
+        # one request per distinct content the cache doesn't have
+        uncached_requests: dict[str, TrackEmotionalProfileRequest] = {}
+        for request in requests:
+            content_key = content_keys[request.track_id]
+            if content_key not in results:
+                uncached_requests.setdefault(content_key, request)
+
+        cache_misses = sum(
+            content_keys[request.track_id] not in results for request in requests
+        )
+        logger.info(
+            f"Emotional profiles: {len(requests) - cache_misses} from content cache, "
+            f"{cache_misses - len(uncached_requests)} duplicate lyrics, "
+            f"{len(uncached_requests)} sent to model"
+        )
+
+        if uncached_requests:
+            new_profiles = await self.calculator.get_emotional_profiles(
+                list(uncached_requests.values())
+            )
+            new_results = {
+                content_keys[profile.track_id]: profile.emotional_profile
+                for profile in new_profiles
+            }
+
+            if new_results:
+                await self.results_repository.add_config(self.config_key, self.config)
+                await self.results_repository.add_many(self.config_key, new_results)
+
+            results |= new_results
+
+        return [
+            TrackEmotionalProfile(
+                track_id=request.track_id,
+                emotional_profile=results[content_keys[request.track_id]],
+            )
+            for request in requests
+            if content_keys[request.track_id] in results
+        ]
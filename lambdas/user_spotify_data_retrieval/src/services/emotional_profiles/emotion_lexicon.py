@@ -0,0 +1,66 @@
+# Whitespace separated base forms, plurals and verb endings are added when the
+# lexicon is built. A word can sit under more than one emotion, it then counts
+# towards each.
+EMOTION_LEXICON: dict[str, str] = {
+    "joy": """
+        happy happiness joy glad smile laugh sunshine dance celebrate delight
+        cheer fun bright sing party bliss sweet good beautiful paradise
+    """,
+    "sadness": """
+        sad cry tear sorrow grief pain hurt blue broken heartbreak miss rain
+        goodbye weep ache mourn lose lost gone sorry
+    """,
+    "anger": """
+        anger angry mad rage hate fury fight burn scream kill blood damn hell
+        bitter fire revenge violent smash furious enemy
+    """,
+    "fear": """
+        fear afraid scare scared terror panic nightmare danger shake tremble
+        hide run worry anxious nervous dread haunt ghost monster creep
+    """,
+    "love": """
+        love lover heart kiss baby darling honey hold touch embrace romance
+        desire adore forever together mine yours passion tender sweetheart
+    """,
+    "hope": """
+        hope wish dream tomorrow someday believe faith rise light future
+        promise heal better new begin morning chance trust wait sunrise
+    """,
+    "nostalgia": """
+        remember memory yesterday past old used young childhood again ago back
+        photograph once summer school home time years forget reminisce
+    """,
+    "loneliness": """
+        alone lonely lonesome empty nobody isolate solitude silence abandon
+        leave left without cold distant stranger apart missing void hollow
+        myself
+    """,
+    "confidence": """
+        confident strong boss king queen win winner best top power champion
+        proud fearless shine money rich fly unstoppable legend greatest
+    """,
+    "despair": """
+        despair hopeless die death dead end darkness drown fall suffer misery
+        numb pointless grave helpless defeat sink bleed collapse surrender
+    """,
+    "excitement": """
+        excite wild crazy rush thrill alive jump loud fast electric energy
+        tonight night go move feel high adrenaline boom ride
+    """,
+    "mystery": """
+        mystery secret shadow strange unknown dark hidden whisper maze riddle
+        moon midnight fog mask wonder curious puzzle veil spell illusion
+    """,
+    "defiance": """
+        defy rebel resist never refuse stand against break free freedom
+        control rules revolution scream loud riot chains fight wall shout
+    """,
+    "gratitude": """
+        thank thanks grateful thankful bless blessed appreciate gift lucky
+        fortunate owe grace kind kindness give share help saved cherish honor
+    """,
+    "spirituality": """
+        god lord heaven soul spirit pray prayer angel holy church jesus divine
+        sacred eternal faith amen hallelujah miracle universe salvation
+    """,
+}
@@ -1,6 +1,9 @@
-import asyncio
 from loguru import logger
-from src.models.domain import TrackEmotionalProfile, TrackEmotionalProfileRequest
+from src.models.domain import (
+    EmotionalProfileMatrix,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
 from src.services.emotional_profiles.model_service import (
     EmotionalProfileCalculator,
 )
@@ -19,62 +22,102 @@ class EmotionalProfilesService:
         self,
         emotional_profile_repository: TrackEmotionalProfilesRepository,
         emotional_profile_calculator: EmotionalProfileCalculator,
+        fallback_calculator: EmotionalProfileCalculator | None = None,
     ):
         self.emotional_profile_repository = emotional_profile_repository
         self.emotional_profile_calculator = emotional_profile_calculator
-
-    async def _calculate_emotional_profile(
-        self, request: TrackEmotionalProfileRequest
-    ) -> TrackEmotionalProfile:
-        emotional_profile = (
-            await self.emotional_profile_calculator.get_emotional_profile(
-                request.lyrics
-            )
-        )
-        return TrackEmotionalProfile(
-            track_id=request.track_id, emotional_profile=emotional_profile
-        )
+        self.fallback_calculator = fallback_calculator
 
     async def _calculate_many_emotional_profiles(
         self, requests: list[TrackEmotionalProfileRequest]
     ) -> list[TrackEmotionalProfile]:
-        tasks = [self._calculate_emotional_profile(request) for request in requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if not requests:
+            return []
 
-        successful_results = []
-        for request, result in zip(requests, results):
-            if isinstance(result, TrackEmotionalProfile):
-                successful_results.append(result)
-            elif isinstance(result, Exception):
-                logger.warning(
-                    f"Failed to calculate emotional profile for track {request.track_id}: {result}"
-                )
+        profiles = await self.emotional_profile_calculator.get_emotional_profiles(
+            requests
+        )
 
-        if not successful_results:
-            raise EmotionalProfilesServiceException(
-                "No emotional profiles were successfully calculated"
-            )
+        if not profiles:
+            logger.warning("No emotional profiles were successfully calculated")
 
-        return successful_results
+        return profiles
 
-    async def get_many_emotional_profiles(
-        self, requests: list[TrackEmotionalProfileRequest]
+    async def _calculate_fallback_emotional_profiles(
+        self,
+        requests: list[TrackEmotionalProfileRequest],
+        profiles: list[TrackEmotionalProfile],
     ) -> list[TrackEmotionalProfile]:
-        # Check which emotional profiles are already in the DB
-        track_ids = set(request.track_id for request in requests)
-        existing_profiles = self.emotional_profile_repository.get_many(track_ids)
-        track_ids -= set(profile.track_id for profile in existing_profiles)
+        track_ids = set(profile.track_id for profile in profiles)
+        fallback_requests = [
+            request for request in requests if request.track_id not in track_ids
+        ]
+
+        if not fallback_requests or self.fallback_calculator is None:
+            return []
 
+        fallback_profiles = await self.fallback_calculator.get_emotional_profiles(
+            fallback_requests
+        )
+        logger.info(
+            f"Fallback calculated {len(fallback_profiles)} of {len(fallback_requests)} "
+            f"emotional profiles the calculator couldn't"
+        )
+        return fallback_profiles
+
+    async def _get_missing_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest], existing_track_ids: set[str]
+    ) -> list[TrackEmotionalProfile]:
         # Determine which requests need emotional profile calculation
         profile_requests = [
-            request for request in requests if request.track_id in track_ids
+            request
+            for request in requests
+            if request.track_id not in existing_track_ids
         ]
 
         # Calculate missing emotional profiles
         new_profiles = await self._calculate_many_emotional_profiles(profile_requests)
 
         # Store newly calculated emotional profiles in the DB
-        self.emotional_profile_repository.add_many(new_profiles)
+        if new_profiles:
+            await self.emotional_profile_repository.add_many(new_profiles)
+
+        # Fill in tracks the calculator failed on, e.g. when the model quota runs
+        # out. Not stored, so the calculator gets another go on the next run
+        fallback_profiles = await self._calculate_fallback_emotional_profiles(
+            profile_requests, new_profiles
+        )
+
+        return [*new_profiles, *fallback_profiles]
+
+    async def get_many_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        # Check which emotional profiles are already in the DB
+        track_ids = set(request.track_id for request in requests)
+        existing_profiles = await self.emotional_profile_repository.get_many(track_ids)
+
+        new_profiles = await self._get_missing_emotional_profiles(
+            requests, set(profile.track_id for profile in existing_profiles)
+        )
 
         # Combine existing and newly calculated emotional profiles
         return [*existing_profiles, *new_profiles]
+
+    async def get_emotional_profile_matrix(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> EmotionalProfileMatrix:
+        """Same as get_many_emotional_profiles, as a tracks x emotions matrix"""
+        # Stored profiles are loaded straight into the matrix
+        track_ids = set(request.track_id for request in requests)
+        existing_matrix = await self.emotional_profile_repository.get_many_matrix(
+            track_ids
+        )
+
+        new_profiles = await self._get_missing_emotional_profiles(
+            requests, set(existing_matrix.track_ids)
+        )
+
+        return existing_matrix.concat(
+            EmotionalProfileMatrix.from_profiles(new_profiles)
+        )
@@ -0,0 +1,146 @@
+import json
+import re
+from itertools import chain
+import numpy as np
+from loguru import logger
+
+from src.models.domain import (
+    EMOTIONS,
+    EmotionalProfile,
+    EmotionalProfileConfig,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.cached_calculator import normalize_lyrics
+from src.services.emotional_profiles.emotion_lexicon import EMOTION_LEXICON
+from src.services.emotional_profiles.model_service import EmotionalProfileCalculator
+
+WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+# lovin' -> loving
+DROPPED_G_RE = re.compile(r"\b([a-z]+)in'")
+
+
+class LexiconCalculatorException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+def _get_word_forms(word: str) -> set[str]:
+    forms = {word, word + "s", word + "ing"}
+
+    if word.endswith("e"):
+        forms |= {word + "d", word[:-1] + "ing"}
+    elif word.endswith("y"):
+        forms |= {word[:-1] + "ies", word[:-1] + "ied"}
+    else:
+        forms |= {word + "es", word + "ed"}
+
+    return forms
+
+
+class LexiconEmotionalProfileCalculator(EmotionalProfileCalculator):
+    """Scores lyrics in-process by counting emotion words, without a model.
+
+    Each batch of lyrics becomes a tracks x vocabulary word count matrix that
+    is multiplied by the vocabulary x emotions weight matrix in one go, then
+    normalised so every profile sums to 1 like the model's. Much cruder than
+    the model, but free and never rate limited.
+    """
+
+    def __init__(self, lexicon: dict[str, str] = EMOTION_LEXICON):
+        self.lexicon = {
+            emotion: sorted(set(words.split())) for emotion, words in lexicon.items()
+        }
+        self.vocabulary, self.weights = self._create_weights(self.lexicon)
+
+    @property
+    def config(self) -> EmotionalProfileConfig:
+        return EmotionalProfileConfig(
+            model_name="lexicon",
+            temperature=0.0,
+            top_p=1.0,
+            prompt=json.dumps(self.lexicon, sort_keys=True),
+        )
+
+    @staticmethod
+    def _create_weights(
+        lexicon: dict[str, list[str]],
+    ) -> tuple[dict[str, int], np.ndarray]:
+        forms_by_emotion = {
+            emotion: set(chain.from_iterable(_get_word_forms(word) for word in words))
+            for emotion, words in lexicon.items()
+        }
+        vocabulary = {
+            form: index
+            for index, form in enumerate(
+                sorted(set(chain.from_iterable(forms_by_emotion.values())))
+            )
+        }
+
+        weights = np.zeros((len(vocabulary), len(EMOTIONS)))
+        for emotion, forms in forms_by_emotion.items():
+            column = EMOTIONS.index(emotion)
+            for form in forms:
+                weights[vocabulary[form], column] = 1.0
+
+        return vocabulary, weights
+
+    def _get_word_ids(self, lyrics: str) -> list[int]:
+        text = DROPPED_G_RE.sub(r"\1ing", normalize_lyrics(lyrics))
+        return [
+            self.vocabulary[word]
+            for word in WORD_RE.findall(text)
+            if word in self.vocabulary
+        ]
+
+    def score(self, lyrics: list[str]) -> np.ndarray:
+        """Emotion proportions for each lyrics, rows are all 0 with no lexicon words"""
+        word_ids = [self._get_word_ids(track_lyrics) for track_lyrics in lyrics]
+        rows = np.repeat(np.arange(len(lyrics)), [len(ids) for ids in word_ids])
+        columns = np.fromiter(
+            chain.from_iterable(word_ids), dtype=np.intp, count=len(rows)
+        )
+
+        vocabulary_size = len(self.vocabulary)
+        counts = np.bincount(
+            rows * vocabulary_size + columns, minlength=len(lyrics) * vocabulary_size
+        ).reshape(len(lyrics), vocabulary_size)
+        scores = counts @ self.weights
+
+        totals = scores.sum(axis=1, keepdims=True)
+        return np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+    async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
+        request = TrackEmotionalProfileRequest(track_id="track", lyrics=lyrics)
+        track_profiles = await self.get_emotional_profiles([request])
+
+        if not track_profiles:
+            raise LexiconCalculatorException("No lexicon words found in lyrics")
+
+        return track_profiles[0].emotional_profile
+
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        if not requests:
+            return []
+
+        scores = self.score([request.lyrics for request in requests])
+
+        track_profiles = []
+        for request, row in zip(requests, scores.tolist()):
+            # an all zero profile would drag the averages down, better left out
+            if not any(row):
+                logger.warning(
+                    f"No lexicon words found in lyrics for track {request.track_id}"
+                )
+                continue
+
+            track_profiles.append(
+                TrackEmotionalProfile(
+                    track_id=request.track_id,
+                    emotional_profile=EmotionalProfile(**dict(zip(EMOTIONS, row))),
+                )
+            )
+
+        return track_profiles
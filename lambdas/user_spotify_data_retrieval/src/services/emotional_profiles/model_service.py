@@ -1,5 +1,8 @@
+import asyncio
 import typing
+from pydantic import BaseModel
 from pydantic_ai import Agent
+from pydantic_ai.models import Model
 from pydantic_ai.models.google import GoogleModel, GoogleModelSettings
 from pydantic_ai.providers.google import GoogleProvider
 from pydantic_ai.exceptions import (
@@ -9,12 +12,45 @@ from pydantic_ai.exceptions import (
 )
 from loguru import logger
 
-from src.models.domain import EmotionalProfile
+from src.models.domain import (
+    EmotionalProfile,
+    EmotionalProfileConfig,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
 
 
 class EmotionalProfileCalculator(typing.Protocol):
     async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile: ...
 
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        """Profiles for the requests that succeeded, failures are logged and left out.
+
+        Defaults to one get_emotional_profile call per track.
+        """
+
+        async def calculate(request: TrackEmotionalProfileRequest):
+            emotional_profile = await self.get_emotional_profile(request.lyrics)
+            return TrackEmotionalProfile(
+                track_id=request.track_id, emotional_profile=emotional_profile
+            )
+
+        tasks = [calculate(request) for request in requests]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        successful_results = []
+        for request, result in zip(requests, results):
+            if isinstance(result, TrackEmotionalProfile):
+                successful_results.append(result)
+            elif isinstance(result, Exception):
+                logger.warning(
+                    f"Failed to calculate emotional profile for track {request.track_id}: {result}"
+                )
+
+        return successful_results
+
 
 class ModelServiceException(Exception):
     def __init__(self, message: str):
@@ -22,6 +58,8 @@ class ModelServiceException(Exception):
 
 
 class ModelService(EmotionalProfileCalculator):
+    output_type: type[BaseModel] = EmotionalProfile
+
     def __init__(
         self,
         api_key: str,
@@ -30,6 +68,7 @@ class ModelService(EmotionalProfileCalculator):
         max_tokens: int,
         top_p: float,
         instructions: str,
+        model: Model | None = None,
     ):
         self.api_key = api_key
         self.model_name = model_name
@@ -37,21 +76,36 @@ class ModelService(EmotionalProfileCalculator):
         self.max_tokens = max_tokens
         self.top_p = top_p
         self.instructions = instructions
+        self.model = model
+        self.agent = self._create_agent()
 
     @property
-    def agent(self) -> Agent:
-        settings = GoogleModelSettings(
+    def config(self) -> EmotionalProfileConfig:
+        return EmotionalProfileConfig(
+            model_name=self.model_name,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            prompt=self.instructions,
+        )
+
+    def _create_model_settings(self) -> GoogleModelSettings:
+        return GoogleModelSettings(
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             top_p=self.top_p,
         )
-        provider = GoogleProvider(api_key=self.api_key)
-        model = GoogleModel(model_name=self.model_name, provider=provider)
+
+    def _create_agent(self) -> Agent:
+        # a model can be passed in, e.g. a local fake in tests
+        model = self.model or GoogleModel(
+            model_name=self.model_name,
+            provider=GoogleProvider(api_key=self.api_key),
+        )
         return Agent(
             model=model,
-            model_settings=settings,
+            model_settings=self._create_model_settings(),
             instructions=self.instructions,
-            output_type=EmotionalProfile,
+            output_type=self.output_type,
         )
 
     async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
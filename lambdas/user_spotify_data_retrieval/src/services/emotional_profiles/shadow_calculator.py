@@ -0,0 +1,85 @@
+from statistics import mean
+from loguru import logger
+
+from src.models.domain import (
+    EmotionalProfile,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.model_service import EmotionalProfileCalculator
+
+
+def _get_top_emotion(emotional_profile: EmotionalProfile) -> str:
+    emotions = emotional_profile.model_dump()
+    return max(emotions, key=emotions.__getitem__)
+
+
+class ShadowEmotionalProfileCalculator(EmotionalProfileCalculator):
+    """Returns the primary calculator's profiles and logs how a shadow compares.
+
+    Used to judge a cheaper calculator against the model on real traffic
+    before relying on it. The shadow never changes the result, even if it
+    fails.
+    """
+
+    def __init__(
+        self,
+        calculator: EmotionalProfileCalculator,
+        shadow_calculator: EmotionalProfileCalculator,
+    ):
+        self.calculator = calculator
+        self.shadow_calculator = shadow_calculator
+
+    async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
+        return await self.calculator.get_emotional_profile(lyrics)
+
+    async def _compare(
+        self,
+        requests: list[TrackEmotionalProfileRequest],
+        track_profiles: list[TrackEmotionalProfile],
+    ) -> None:
+        profiles = {
+            profile.track_id: profile.emotional_profile for profile in track_profiles
+        }
+        shadow_profiles = {
+            profile.track_id: profile.emotional_profile
+            for profile in await self.shadow_calculator.get_emotional_profiles(
+                [request for request in requests if request.track_id in profiles]
+            )
+        }
+
+        if not shadow_profiles:
+            logger.info("Shadow emotional profiles: none to compare")
+            return
+
+        differences = []
+        top_emotion_matches = 0
+        for track_id, shadow_profile in shadow_profiles.items():
+            profile = profiles[track_id]
+            differences.append(
+                mean(
+                    abs(value - getattr(shadow_profile, emotion))
+                    for emotion, value in profile.model_dump().items()
+                )
+            )
+            top_emotion_matches += _get_top_emotion(profile) == _get_top_emotion(
+                shadow_profile
+            )
+
+        logger.info(
+            f"Shadow emotional profiles: {len(shadow_profiles)}/{len(profiles)} "
+            f"compared, mean absolute difference {mean(differences):.3f}, "
+            f"top emotion agrees for {top_emotion_matches}"
+        )
+
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        track_profiles = await self.calculator.get_emotional_profiles(requests)
+
+        try:
+            await self._compare(requests, track_profiles)
+        except Exception as e:
+            logger.warning(f"Shadow emotional profile comparison failed: {e}")
+
+        return track_profiles
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Any
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+from loguru import logger
+
+from src.models.event import RunConfig
+
+
+class FollowUpQueueException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class FollowUpQueue:
+    """Sends runs that ran out of time back to SQS to carry on in a new invocation"""
+
+    def __init__(self, queue_url: str | None, client: Any | None = None):
+        self.queue_url = queue_url
+        self.client = client
+
+    def _get_client(self) -> Any:
+        # created on first use so invocations that never follow up don't pay for it
+        if self.client is None:
+            self.client = boto3.client("sqs")
+
+        return self.client
+
+    async def send(self, config: RunConfig) -> None:
+        if self.queue_url is None:
+            raise FollowUpQueueException("No follow-up queue is configured")
+
+        try:
+            await asyncio.to_thread(
+                self._get_client().send_message,
+                QueueUrl=self.queue_url,
+                MessageBody=config.model_dump_json(),
+            )
+        except (BotoCoreError, ClientError) as e:
+            raise FollowUpQueueException(f"Failed to send follow-up: {e}") from e
+
+        logger.info(
+            f"Sent follow-up {config.follow_up_count} for stages {config.stages}"
+        )
@@ -0,0 +1,325 @@
+import re
+import typing
+from html.parser import HTMLParser
+
+import bs4
+
+from src.models.enums import LyricsExtractorType
+
+
+class LyricsExtractor(typing.Protocol):
+    def extract_lyrics(self, html: str) -> str | None: ...
+
+
+class BeautifulSoupLyricsExtractor(LyricsExtractor):
+    """Reference extractor, parses the whole page into a BeautifulSoup tree"""
+
+    def extract_lyrics(self, html: str) -> str | None:
+        soup = bs4.BeautifulSoup(html, "html.parser")
+        lyrics_containers = soup.select("div[data-lyrics-container='true']")
+
+        if not lyrics_containers:
+            return
+
+        cleaned_lyrics = []
+
+        for container in lyrics_containers:
+            section = ""
+
+            for element in container.contents:
+                if isinstance(element, bs4.Tag):
+                    if element.name in ["br", "i", "b"]:
+                        section += str(element)
+                    elif element.name == "a":
+                        section += "".join([str(el) for el in element.find("span")])
+                else:
+                    section += str(element)
+
+            cleaned_lyrics.append(section)
+
+        return "<br/>".join(cleaned_lyrics)
+
+
+# Tags bs4 treats as empty and serialises as <tag/>
+VOID_TAGS = {
+    "area",
+    "base",
+    "basefont",
+    "bgsound",
+    "br",
+    "col",
+    "command",
+    "embed",
+    "frame",
+    "hr",
+    "image",
+    "img",
+    "input",
+    "isindex",
+    "keygen",
+    "link",
+    "menuitem",
+    "meta",
+    "nextid",
+    "param",
+    "source",
+    "spacer",
+    "track",
+    "wbr",
+}
+
+# Attributes bs4 splits on whitespace and joins back with single spaces
+WHITESPACE_LIST_ATTRIBUTES = {"accesskey", "class", "dropzone", "rel", "rev"}
+
+CONTAINER_OPEN_RE = re.compile(
+    r"""<div\b[^>]*?\sdata-lyrics-container\s*=\s*(?:"true"|'true'|true\b)[^>]*>""",
+    re.IGNORECASE,
+)
+DIV_TAG_RE = re.compile(r"<(/?)div\b[^>]*>", re.IGNORECASE)
+# the element every lyrics container on the page sits somewhere inside
+LYRICS_ROOT_OPEN_RE = re.compile(
+    r"""<div\b[^>]*?\sid\s*=\s*(?:"lyrics-root"|'lyrics-root'|lyrics-root(?=[\s>]))[^>]*>""",
+    re.IGNORECASE,
+)
+
+
+class _Comment(str):
+    pass
+
+
+class _Element:
+    __slots__ = ("name", "attrs", "children")
+
+    def __init__(self, name: str, attrs: dict[str, str]):
+        self.name = name
+        self.attrs = attrs
+        self.children: list[_Element | str] = []
+
+
+class _ContainerParser(HTMLParser):
+    """Builds a minimal tree of one lyrics container, closing tags the way bs4 does"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root: _Element | None = None
+        self.stack: list[_Element] = []
+
+    def _append(self, node: "_Element | str") -> bool:
+        if not self.stack:
+            return False
+        self.stack[-1].children.append(node)
+        return True
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        element = _Element(tag, {key: value or "" for key, value in attrs})
+
+        if self.root is None:
+            self.root = element
+            self.stack.append(element)
+        elif self._append(element) and tag not in VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self.root is None:
+            self.handle_starttag(tag, attrs)
+            return
+
+        self._append(_Element(tag, {key: value or "" for key, value in attrs}))
+
+    def handle_endtag(self, tag: str) -> None:
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].name == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self._append(_Comment(data))
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _serialise_attribute(key: str, value: str) -> str:
+    if key in WHITESPACE_LIST_ATTRIBUTES:
+        value = " ".join(value.split())
+
+    value = _escape(value)
+
+    if '"' not in value:
+        return f' {key}="{value}"'
+    if "'" not in value:
+        return f" {key}='{value}'"
+    return f' {key}="{value.replace(chr(34), "&quot;")}"'
+
+
+def _serialise(node: "_Element | str") -> str:
+    if isinstance(node, _Comment):
+        return f"<!--{node}-->"
+    if isinstance(node, str):
+        return _escape(node)
+
+    # bs4 writes attributes in sorted order
+    attrs = "".join(
+        _serialise_attribute(key, value) for key, value in sorted(node.attrs.items())
+    )
+
+    if node.name in VOID_TAGS and not node.children:
+        return f"<{node.name}{attrs}/>"
+
+    children = "".join(_serialise(child) for child in node.children)
+    return f"<{node.name}{attrs}>{children}</{node.name}>"
+
+
+def _find_span(element: _Element) -> _Element | None:
+    for child in element.children:
+        if isinstance(child, _Element):
+            if child.name == "span":
+                return child
+            span = _find_span(child)
+            if span:
+                return span
+
+
+class ScanningLyricsExtractor(LyricsExtractor):
+    """Finds the lyrics containers with a regex scan and only parses those regions.
+
+    Produces the same output as BeautifulSoupLyricsExtractor without building a
+    tree of the rest of the page, which is most of its size.
+    """
+
+    @staticmethod
+    def _find_container_regions(html: str) -> typing.Iterator[str]:
+        position = 0
+
+        while match := CONTAINER_OPEN_RE.search(html, position):
+            depth = 0
+            end = len(html)
+
+            for div_tag in DIV_TAG_RE.finditer(html, match.end()):
+                if not div_tag.group(1):
+                    depth += 1
+                elif depth:
+                    depth -= 1
+                else:
+                    end = div_tag.end()
+                    break
+
+            yield html[match.start() : end]
+            position = end
+
+    @staticmethod
+    def _extract_section(container: _Element) -> str:
+        section = []
+
+        for child in container.children:
+            if not isinstance(child, _Element):
+                # text and comment contents are kept as plain text
+                section.append(child)
+            elif child.name in ("br", "i", "b"):
+                section.append(_serialise(child))
+            elif child.name == "a" and (span := _find_span(child)):
+                section.extend(
+                    node if isinstance(node, str) else _serialise(node)
+                    for node in span.children
+                )
+
+        return "".join(section)
+
+    def extract_lyrics(self, html: str) -> str | None:
+        return _render_regions(self._find_container_regions(html))
+
+
+class IncrementalLyricsExtractor:
+    """Scans a page chunk by chunk, keeping only the lyrics container regions.
+
+    Containers needn't be siblings, so the whole page is scanned unless it has
+    a lyrics root. Every container is inside that root, so once it closes the
+    rest of the page can be skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.scan_from = 0
+        self.regions: list[str] = []
+        self.region_start: int | None = None
+        self.region_depth = 0
+        # div depth inside the lyrics root, None until it opens
+        self.root_depth: int | None = None
+        self.done = False
+
+    def _scan(self) -> None:
+        position = self.scan_from
+
+        for div_tag in DIV_TAG_RE.finditer(self.buffer, self.scan_from):
+            position = div_tag.end()
+            closing = bool(div_tag.group(1))
+
+            if self.region_start is not None:
+                if not closing:
+                    self.region_depth += 1
+                elif self.region_depth:
+                    self.region_depth -= 1
+                else:
+                    self.regions.append(self.buffer[self.region_start : position])
+                    self.region_start = None
+            elif not closing and CONTAINER_OPEN_RE.fullmatch(div_tag.group(0)):
+                self.region_start = div_tag.start()
+                self.region_depth = 0
+            elif self.root_depth is not None:
+                self.root_depth += -1 if closing else 1
+                if self.root_depth < 0:
+                    self.done = True
+                    self.buffer = ""
+                    return
+            elif not closing and LYRICS_ROOT_OPEN_RE.fullmatch(div_tag.group(0)):
+                self.root_depth = 0
+
+        if self.region_start is not None:
+            # keep the open region and carry on scanning after its last full tag
+            self.buffer = self.buffer[self.region_start :]
+            self.scan_from = position - self.region_start
+            self.region_start = 0
+            return
+
+        # outside a region only a partial tag at the end is worth keeping
+        partial_tag_start = self.buffer.rfind("<", position)
+        self.buffer = self.buffer[partial_tag_start:] if partial_tag_start >= 0 else ""
+        self.scan_from = 0
+
+    def feed(self, chunk: str) -> bool:
+        """Scan the next chunk and return True once every container has been seen"""
+        if not self.done:
+            self.buffer += chunk
+            self._scan()
+        return self.done
+
+    def close(self) -> str | None:
+        if self.region_start is not None:
+            # page ended inside a container, keep what there was like a full parse
+            self.regions.append(self.buffer[self.region_start :])
+        return _render_regions(self.regions)
+
+
+def _render_regions(regions: typing.Iterable[str]) -> str | None:
+    cleaned_lyrics = []
+
+    for region in regions:
+        parser = _ContainerParser()
+        parser.feed(region)
+        parser.close()
+        cleaned_lyrics.append(ScanningLyricsExtractor._extract_section(parser.root))
+
+    if not cleaned_lyrics:
+        return
+
+    return "<br/>".join(cleaned_lyrics)
+
+
+def create_lyrics_extractor(extractor_type: LyricsExtractorType) -> LyricsExtractor:
+    if extractor_type == LyricsExtractorType.BEAUTIFUL_SOUP:
+        return BeautifulSoupLyricsExtractor()
+    return ScanningLyricsExtractor()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+
+class PacerMetrics:
+    """Running totals of how the lyrics pacer has been spacing requests"""
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled_responses = 0
+        self.rate_decreases = 0
+        self.wait_seconds = 0.0
+
+    def snapshot(self, rate: float) -> dict[str, int | float]:
+        return {
+            "requests": self.requests,
+            "throttled_responses": self.throttled_responses,
+            "rate_decreases": self.rate_decreases,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "requests_per_second": round(rate, 3),
+        }
+
+
+class AdaptivePacer:
+    """Spaces lyrics requests out at a rate that adapts to throttling.
+
+    Callers wait for their slot before taking a concurrency slot, so pacing
+    never leaves an in-flight slot idle. The rate grows additively with each
+    successful response and is cut multiplicatively on a 429 or 503 (AIMD). One
+    pacer is shared by every user the container processes.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        decrease_cooldown_seconds: float = 1.0,
+        max_pause_seconds: float = 30.0,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown_seconds = decrease_cooldown_seconds
+        self.max_pause_seconds = max_pause_seconds
+        self.next_slot_at = 0.0
+        self.last_decrease_at = float("-inf")
+        self.metrics = PacerMetrics()
+
+    async def acquire(self) -> float:
+        """Wait for the next request slot and return how long the caller waited"""
+        now = time.monotonic()
+
+        # reserve the slot before sleeping so concurrent callers queue up behind it
+        slot_at = max(now, self.next_slot_at)
+        self.next_slot_at = slot_at + 1 / self.rate
+
+        waited = slot_at - now
+        if waited > 0:
+            await asyncio.sleep(waited)
+
+        self.metrics.requests += 1
+        self.metrics.wait_seconds += waited
+        return waited
+
+    def on_success(self) -> None:
+        """Speed up a little after a response that wasn't throttled"""
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """Slow down after a 429 or 503, pausing for Retry-After when given"""
+        now = time.monotonic()
+        self.metrics.throttled_responses += 1
+
+        if retry_after:
+            pause = min(retry_after, self.max_pause_seconds)
+            self.next_slot_at = max(self.next_slot_at, now + pause)
+
+        # requests already in flight get throttled together, count that as one signal
+        if now - self.last_decrease_at < self.decrease_cooldown_seconds:
+            return
+
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.last_decrease_at = now
+        self.metrics.rate_decreases += 1
+
+    def snapshot(self) -> dict[str, int | float]:
+        return self.metrics.snapshot(self.rate)
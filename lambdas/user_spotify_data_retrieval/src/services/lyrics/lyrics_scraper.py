@@ -1,30 +1,58 @@
 import asyncio
-import random
 import re
 import string
 import unicodedata
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
 import httpx
-import bs4
 from loguru import logger
 
+from src.models.enums import LyricsFailureReason
+from src.services.lyrics.lyrics_extractor import (
+    IncrementalLyricsExtractor,
+    LyricsExtractor,
+    ScanningLyricsExtractor,
+)
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+
 
 class LyricsScraperException(Exception):
-    def __init__(self, message: str):
+    def __init__(self, message: str, reason: LyricsFailureReason | None = None):
         super().__init__(message)
+        # set when retrying soon won't help, e.g. the page doesn't exist
+        self.reason = reason
 
 
 class LyricsScraper:
+    THROTTLE_STATUS_CODES = {429, 503}
+
     def __init__(
         self,
         client: httpx.AsyncClient,
         base_url: str,
         headers: dict[str, str],
         semaphore: asyncio.Semaphore,
+        pacer: AdaptivePacer,
+        max_retries: int = 2,
+        extractor: LyricsExtractor | None = None,
+        streaming: bool = False,
     ):
         self.client = client
         self.base_url = base_url
         self.headers = headers
         self.semaphore = semaphore
+        self.pacer = pacer
+        self.max_retries = max_retries
+        self.extractor = extractor or ScanningLyricsExtractor()
+        self.streaming = streaming
+
+        # the incremental extractor gives the scanner's output, nothing else streams
+        if streaming and not isinstance(self.extractor, ScanningLyricsExtractor):
+            raise LyricsScraperException(
+                f"Streaming fetch can't use {type(self.extractor).__name__}, "
+                "only ScanningLyricsExtractor"
+            )
 
     @staticmethod
     def _format_string_for_url(s: str) -> str:
@@ -59,66 +87,97 @@ class LyricsScraper:
 
         return f"{self.base_url}/{artist}-{title}-lyrics"
 
-    async def _make_limited_request(self, url: str, delay: float) -> httpx.Response:
+    @staticmethod
+    def _get_retry_after_seconds(response: httpx.Response) -> float | None:
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+    @asynccontextmanager
+    async def _make_limited_request(self, url: str) -> AsyncIterator[httpx.Response]:
+        # wait for pacing outside the semaphore so slots are only held during I/O
+        await self.pacer.acquire()
+
         async with self.semaphore:
-            await asyncio.sleep(delay)
-            response = await self.client.get(
-                url=url, headers=self.headers, follow_redirects=True
-            )
+            async with self.client.stream(
+                "GET", url=url, headers=self.headers, follow_redirects=True
+            ) as response:
+                yield response
+
+    async def _make_paced_request(
+        self, url: str, read: Callable[[httpx.Response], Awaitable[str | None]]
+    ) -> str | None:
+        for attempt in range(self.max_retries + 1):
+            async with self._make_limited_request(url) as response:
+                if response.status_code not in self.THROTTLE_STATUS_CODES:
+                    self.pacer.on_success()
+                else:
+                    self.pacer.on_throttle(self._get_retry_after_seconds(response))
 
-        return response
+                    if attempt < self.max_retries:
+                        logger.warning(
+                            f"Lyrics request throttled with {response.status_code}, "
+                            f"pacing at {self.pacer.rate:.2f} requests/s"
+                        )
+                        continue
 
-    async def _get_html(self, url: str) -> str:
-        try:
-            response = await self._make_limited_request(
-                url=url, delay=random.uniform(0.25, 1)
-            )
-            response.raise_for_status()
-            return response.text
-        except httpx.HTTPStatusError as e:
-            raise LyricsScraperException(f"Failed to get page html - {e}")
-        except httpx.RequestError as e:
-            raise LyricsScraperException(f"Request failed - {e}")
+                response.raise_for_status()
+                return await read(response)
 
     def _extract_lyrics_from_html(self, html: str) -> str | None:
-        soup = bs4.BeautifulSoup(html, "html.parser")
-        lyrics_containers = soup.select("div[data-lyrics-container='true']")
+        lyrics = self.extractor.extract_lyrics(html)
 
-        if not lyrics_containers:
+        if lyrics is None:
             logger.info("Lyrics containers not found")
-            return
 
-        cleaned_lyrics = []
+        return lyrics
 
-        for container in lyrics_containers:
-            section = ""
+    async def _read_lyrics(self, response: httpx.Response) -> str | None:
+        await response.aread()
+        return self._extract_lyrics_from_html(response.text)
 
-            for element in container.contents:
-                if isinstance(element, bs4.Tag):
-                    if element.name in ["br", "i", "b"]:
-                        section += str(element)
-                    elif element.name == "a":
-                        section += "".join([str(el) for el in element.find("span")])
-                else:
-                    section += str(element)
+    @staticmethod
+    async def _read_lyrics_streamed(response: httpx.Response) -> str | None:
+        extractor = IncrementalLyricsExtractor()
+
+        async for chunk in response.aiter_text():
+            if extractor.feed(chunk):
+                # leaving the stream early closes the connection mid-body
+                logger.info(
+                    f"Lyrics complete after {response.num_bytes_downloaded} bytes"
+                )
+                break
 
-            cleaned_lyrics.append(section)
+        return extractor.close()
 
-        return "<br/>".join(cleaned_lyrics)
+    async def _get_page_lyrics(self, url: str) -> str | None:
+        read = self._read_lyrics_streamed if self.streaming else self._read_lyrics
+
+        try:
+            return await self._make_paced_request(url, read)
+        except httpx.HTTPStatusError as e:
+            reason = (
+                LyricsFailureReason.NOT_FOUND if e.response.status_code == 404 else None
+            )
+            raise LyricsScraperException(
+                f"Failed to get page html - {e}", reason=reason
+            )
+        except httpx.RequestError as e:
+            raise LyricsScraperException(f"Request failed - {e}")
 
     async def get_lyrics(self, artist_name: str, track_title: str) -> str:
         logger.info(f"Scraping lyrics for {artist_name} - {track_title}")
         url = self._get_url(artist_name, track_title)
 
         logger.info(f"Making request to {url}")
-        html = await self._get_html(url)
-
-        lyrics = self._extract_lyrics_from_html(html)
+        lyrics = await self._get_page_lyrics(url)
 
         if not lyrics:
             logger.error(f"Lyrics not found for {artist_name} - {track_title}")
             raise LyricsScraperException(
-                f"Lyrics not found for {artist_name} - {track_title}"
+                f"Lyrics not found for {artist_name} - {track_title}",
+                reason=LyricsFailureReason.NO_LYRICS,
             )
 
         logger.info(f"Successfully scraped lyrics for {artist_name} - {track_title}")
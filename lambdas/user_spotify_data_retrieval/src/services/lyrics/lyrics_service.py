@@ -1,8 +1,12 @@
 import asyncio
+from typing import AsyncIterator
 from loguru import logger
-from src.models.domain import TrackLyrics, TrackLyricsRequest
+from src.models.domain import TrackLyrics, TrackLyricsFailure, TrackLyricsRequest
+from src.repositories.track_lyrics_failures_repository import (
+    TrackLyricsFailuresRepository,
+)
 from src.repositories.track_lyrics_repository import TrackLyricsRepository
-from src.services.lyrics.lyrics_scraper import LyricsScraper
+from src.services.lyrics.lyrics_scraper import LyricsScraper, LyricsScraperException
 
 
 class LyricsServiceException(Exception):
@@ -14,10 +18,14 @@ class LyricsService:
     def __init__(
         self,
         lyrics_repository: TrackLyricsRepository,
+        lyrics_failures_repository: TrackLyricsFailuresRepository,
         lyrics_scraper: LyricsScraper,
+        write_batch_size: int = 10,
     ):
         self.lyrics_repository = lyrics_repository
+        self.lyrics_failures_repository = lyrics_failures_repository
         self.lyrics_scraper = lyrics_scraper
+        self.write_batch_size = write_batch_size
 
     async def _scrape_lyrics(self, request: TrackLyricsRequest) -> TrackLyrics:
         lyrics = await self.lyrics_scraper.get_lyrics(
@@ -25,44 +33,106 @@ class LyricsService:
         )
         return TrackLyrics(track_id=request.track_id, lyrics=lyrics)
 
+    async def _try_scrape_lyrics(
+        self, request: TrackLyricsRequest
+    ) -> tuple[TrackLyricsRequest, TrackLyrics | Exception]:
+        try:
+            return request, await self._scrape_lyrics(request)
+        except Exception as e:
+            logger.warning(
+                f"Failed to scrape lyrics for {request.track_artist} - {request.track_name}: {e}"
+            )
+            return request, e
+
+    async def _store_lyrics(self, track_lyrics: list[TrackLyrics]) -> None:
+        if not track_lyrics:
+            return
+
+        await self.lyrics_repository.add_many(track_lyrics)
+        await self.lyrics_failures_repository.delete_many(
+            set(lyrics.track_id for lyrics in track_lyrics)
+        )
+
     async def _scrape_many_lyrics(
         self, lyrics_requests: list[TrackLyricsRequest]
-    ) -> list[TrackLyrics]:
-        tasks = [self._scrape_lyrics(request) for request in lyrics_requests]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    ) -> AsyncIterator[TrackLyrics]:
+        tasks = [
+            asyncio.create_task(self._try_scrape_lyrics(request))
+            for request in lyrics_requests
+        ]
+        unstored_lyrics = []
+        failures = {}
 
-        successful_results = []
-        for request, result in zip(lyrics_requests, results):
-            if isinstance(result, TrackLyrics):
-                successful_results.append(result)
-            elif isinstance(result, Exception):
-                logger.warning(
-                    f"Failed to scrape lyrics for {request.track_artist} - {request.track_name}: {result}"
-                )
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                request, result = await next_result
 
-        if not successful_results:
-            raise LyricsServiceException("No lyrics were successfully scraped")
+                if isinstance(result, TrackLyrics):
+                    yield result
 
-        return successful_results
+                    # stored in small batches as they arrive rather than all at the end
+                    unstored_lyrics.append(result)
+                    if len(unstored_lyrics) >= self.write_batch_size:
+                        await self._store_lyrics(unstored_lyrics)
+                        # written now, not held until the stage's writes are flushed
+                        await self.lyrics_repository.flush()
+                        unstored_lyrics = []
 
-    async def get_many_lyrics(
+                # only remember failures that won't fix themselves by the next run
+                elif isinstance(result, LyricsScraperException) and result.reason:
+                    failures[request.track_id] = TrackLyricsFailure(
+                        track_id=request.track_id, reason=result.reason
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # also saved when the stream is closed early, e.g. out of time, and
+            # written with the rest of the stage's writes
+            await self._store_lyrics(unstored_lyrics)
+            # recorded even when nothing was scraped so failures aren't retried next run
+            await self.lyrics_failures_repository.record_many(
+                [
+                    failures[request.track_id]
+                    for request in lyrics_requests
+                    if request.track_id in failures
+                ]
+            )
+
+    async def stream_lyrics(
         self, lyrics_requests: list[TrackLyricsRequest]
-    ) -> list[TrackLyrics]:
+    ) -> AsyncIterator[TrackLyrics]:
+        """Yield stored lyrics straight away, then scraped lyrics as each one arrives"""
         # Check which lyrics are already in the DB
         track_ids = set(request.track_id for request in lyrics_requests)
-        existing_track_lyrics = self.lyrics_repository.get_many(track_ids)
+        existing_track_lyrics = await self.lyrics_repository.get_many(track_ids)
         track_ids -= set(lyric.track_id for lyric in existing_track_lyrics)
 
-        # Determine which requests need to be scraped
+        # Skip tracks that recently failed to scrape
+        blocked_track_ids = await self.lyrics_failures_repository.get_blocked_track_ids(
+            track_ids
+        )
+        track_ids = track_ids - blocked_track_ids
+
+        logger.info(
+            f"Lyrics: {len(existing_track_lyrics)} cached, "
+            f"{len(blocked_track_ids)} scrapes avoided by negative cache, "
+            f"{len(track_ids)} to scrape"
+        )
+
+        for track_lyrics in existing_track_lyrics:
+            yield track_lyrics
+
+        # Scrape missing lyrics, storing them and any failures as they come in
         lyrics_requests = [
             request for request in lyrics_requests if request.track_id in track_ids
         ]
+        async for track_lyrics in self._scrape_many_lyrics(lyrics_requests):
+            yield track_lyrics
 
-        # Scrape missing lyrics
-        new_track_lyrics = await self._scrape_many_lyrics(lyrics_requests)
-
-        # Store newly scraped lyrics in the DB
-        self.lyrics_repository.add_many(new_track_lyrics)
-
-        # Combine existing and newly scraped lyrics
-        return [*existing_track_lyrics, *new_track_lyrics]
+    async def get_many_lyrics(
+        self, lyrics_requests: list[TrackLyricsRequest]
+    ) -> list[TrackLyrics]:
+        return [
+            track_lyrics async for track_lyrics in self.stream_lyrics(lyrics_requests)
+        ]
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from src.models.domain import Artist
+
+
+class ArtistRegistry:
+    """In-run map of artist details shared by the top artists and top tracks branches.
+
+    The top artists branch registers the artists it fetched. The top tracks
+    branch waits for that, then only fetches the track artists nobody has
+    resolved yet. It still writes every artist its tracks reference, because the
+    top artists transaction may not have committed when its track_artist rows are
+    checked. Both transactions write artists in ID order, so one waits for the
+    other rather than deadlocking.
+    """
+
+    def __init__(self, expect_top_artists: bool = False):
+        self._artists: dict[str, asyncio.Future[Artist | None]] = {}
+        self._stored_artist_ids: set[str] = set()
+        self._top_artists_registered = asyncio.Event()
+
+        if not expect_top_artists:
+            self._top_artists_registered.set()
+
+    def _resolve(self, artists: list[Artist]) -> None:
+        for artist in artists:
+            future = self._artists.get(artist.id)
+
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._artists[artist.id] = future
+
+            if not future.done():
+                future.set_result(artist)
+
+    def register_top_artists(self, artists: list[Artist]) -> list[Artist]:
+        """Register the user's top artists and return the ones the caller should store"""
+        self._resolve(artists)
+        artists_to_store = self.claim_unstored(artists)
+        self._top_artists_registered.set()
+        return artists_to_store
+
+    def close(self) -> None:
+        """Stop waiting for top artists, e.g. because that branch failed"""
+        self._top_artists_registered.set()
+
+    def claim_unstored(self, artists: list[Artist]) -> list[Artist]:
+        """Return the artists not yet stored this run and mark them as stored"""
+        artists_to_store = {
+            artist.id: artist
+            for artist in artists
+            if artist.id not in self._stored_artist_ids
+        }
+        self._stored_artist_ids.update(artists_to_store)
+        return list(artists_to_store.values())
+
+    async def get_many(
+        self,
+        artist_ids: list[str],
+        fetch_artists: Callable[[list[str]], Awaitable[list[Artist]]],
+    ) -> list[Artist]:
+        """Get artists by ID, fetching only the ones nobody has resolved yet"""
+        await self._top_artists_registered.wait()
+
+        unique_artist_ids = list(dict.fromkeys(artist_ids))
+        missing_artist_ids = [
+            artist_id
+            for artist_id in unique_artist_ids
+            if artist_id not in self._artists
+        ]
+
+        if missing_artist_ids:
+            loop = asyncio.get_running_loop()
+            for artist_id in missing_artist_ids:
+                self._artists[artist_id] = loop.create_future()
+
+            try:
+                self._resolve(await fetch_artists(missing_artist_ids))
+            except BaseException as e:
+                # hand the failure to anyone waiting and let later callers retry
+                for artist_id in missing_artist_ids:
+                    future = self._artists.pop(artist_id)
+                    if future.done():
+                        continue
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                        future.exception()  # mark retrieved, the caller re-raises it
+                    else:
+                        future.cancel()
+                raise
+
+            # IDs the API didn't return an artist for
+            for artist_id in missing_artist_ids:
+                future = self._artists[artist_id]
+                if not future.done():
+                    future.set_result(None)
+
+        artists = await asyncio.gather(
+            *[self._artists[artist_id] for artist_id in unique_artist_ids]
+        )
+        return [artist for artist in artists if artist is not None]
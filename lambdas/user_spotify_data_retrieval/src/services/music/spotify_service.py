@@ -1,5 +1,6 @@
 import asyncio
 from itertools import batched
+from typing import AsyncIterator, Callable, TypeVar
 import httpx
 from loguru import logger
 import pydantic
@@ -7,6 +8,10 @@ import pydantic
 from src.models.enums import TimeRange
 from src.models.spotify import SpotifyProfile, SpotifyArtist, SpotifyTrack
 from src.models.domain import Profile, Artist, Track
+from src.services.music.spotify_transport import SpotifyTransport
+
+
+T = TypeVar("T")
 
 
 class SpotifyServiceException(Exception):
@@ -16,10 +21,20 @@ class SpotifyServiceException(Exception):
 
 class SpotifyService:
     BATCH_SIZE = 50
+    TOP_ITEMS_PAGE_SIZE = 50
+    TOP_ITEMS_MAX_LIMIT = 100  # Spotify stops returning top items after about 100
 
-    def __init__(self, client: httpx.AsyncClient, base_url: str):
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        base_url: str,
+        transport: SpotifyTransport | None = None,
+        top_items_limit: int = 50,
+    ):
         self.client = client
         self.base_url = base_url
+        self.transport = transport or SpotifyTransport(client=client)
+        self.top_items_limit = top_items_limit
 
     @staticmethod
     def _get_bearer_auth_headers(access_token: str) -> dict[str, str]:
@@ -29,7 +44,7 @@ class SpotifyService:
         self, url: str, headers: dict[str, str], params: dict | None = None
     ) -> dict:
         try:
-            response = await self.client.get(url=url, headers=headers, params=params)
+            response = await self.transport.get(url=url, headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except (httpx.HTTPStatusError, httpx.RequestError) as e:
@@ -87,16 +102,88 @@ class SpotifyService:
                 "Invalid artists data received from API."
             ) from e
 
-    async def get_user_top_artists(
-        self, access_token: str, time_range: TimeRange, limit: int = 50
-    ) -> list[Artist]:
-        url = f"{self.base_url}/me/top/artists"
+    def _get_top_items_pages(self, limit: int | None) -> list[tuple[int, int]]:
+        """Return the (offset, limit) of every page needed to get limit items"""
+        limit = min(limit or self.top_items_limit, self.TOP_ITEMS_MAX_LIMIT)
+        return [
+            (offset, min(self.TOP_ITEMS_PAGE_SIZE, limit - offset))
+            for offset in range(0, limit, self.TOP_ITEMS_PAGE_SIZE)
+        ]
+
+    async def _get_top_items_page(
+        self,
+        url: str,
+        access_token: str,
+        time_range: TimeRange,
+        offset: int,
+        limit: int,
+        validate_and_transform: Callable[[list[dict]], list[T]],
+    ) -> tuple[int, list[T]]:
         headers = self._get_bearer_auth_headers(access_token)
-        params = {"time_range": time_range.value, "limit": limit}
+        params = {"time_range": time_range.value, "limit": limit, "offset": offset}
         data = await self._get_data_from_api(url=url, headers=headers, params=params)
 
         items = data.get("items", [])
-        return self._validate_and_transform_artists_data(items)
+        return offset, validate_and_transform(items)
+
+    async def _stream_top_items(
+        self,
+        url: str,
+        access_token: str,
+        time_range: TimeRange,
+        limit: int | None,
+        validate_and_transform: Callable[[list[dict]], list[T]],
+    ) -> AsyncIterator[tuple[int, list[T]]]:
+        """Request every page at once and yield (offset, items) as each page arrives"""
+        tasks = [
+            asyncio.create_task(
+                self._get_top_items_page(
+                    url=url,
+                    access_token=access_token,
+                    time_range=time_range,
+                    offset=offset,
+                    limit=page_limit,
+                    validate_and_transform=validate_and_transform,
+                )
+            )
+            for offset, page_limit in self._get_top_items_pages(limit)
+        ]
+
+        try:
+            for page in asyncio.as_completed(tasks):
+                yield await page
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _collect_pages(pages: AsyncIterator[tuple[int, list[T]]]) -> list[T]:
+        pages_by_offset = {offset: items async for offset, items in pages}
+        return [
+            item
+            for offset in sorted(pages_by_offset)
+            for item in pages_by_offset[offset]
+        ]
+
+    def stream_user_top_artists(
+        self, access_token: str, time_range: TimeRange, limit: int | None = None
+    ) -> AsyncIterator[tuple[int, list[Artist]]]:
+        return self._stream_top_items(
+            url=f"{self.base_url}/me/top/artists",
+            access_token=access_token,
+            time_range=time_range,
+            limit=limit,
+            validate_and_transform=self._validate_and_transform_artists_data,
+        )
+
+    async def get_user_top_artists(
+        self, access_token: str, time_range: TimeRange, limit: int | None = None
+    ) -> list[Artist]:
+        return await self._collect_pages(
+            self.stream_user_top_artists(
+                access_token=access_token, time_range=time_range, limit=limit
+            )
+        )
 
     def _spotify_track_to_track(self, spotify_track: SpotifyTrack) -> Track:
         return Track(
@@ -124,16 +211,25 @@ class SpotifyService:
                 "Invalid tracks data received from API."
             ) from e
 
+    def stream_user_top_tracks(
+        self, access_token: str, time_range: TimeRange, limit: int | None = None
+    ) -> AsyncIterator[tuple[int, list[Track]]]:
+        return self._stream_top_items(
+            url=f"{self.base_url}/me/top/tracks",
+            access_token=access_token,
+            time_range=time_range,
+            limit=limit,
+            validate_and_transform=self._validate_and_transform_tracks_data,
+        )
+
     async def get_user_top_tracks(
-        self, access_token: str, time_range: TimeRange, limit: int = 50
+        self, access_token: str, time_range: TimeRange, limit: int | None = None
     ) -> list[Track]:
-        url = f"{self.base_url}/me/top/tracks"
-        headers = self._get_bearer_auth_headers(access_token)
-        params = {"time_range": time_range.value, "limit": limit}
-        data = await self._get_data_from_api(url=url, headers=headers, params=params)
-
-        items = data.get("items", [])
-        return self._validate_and_transform_tracks_data(items)
+        return await self._collect_pages(
+            self.stream_user_top_tracks(
+                access_token=access_token, time_range=time_range, limit=limit
+            )
+        )
 
     async def _get_artists_by_ids(
         self, access_token: str, artist_ids: list[str]
@@ -0,0 +1,182 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+import httpx
+from loguru import logger
+
+
+class TokenBucket:
+    """Async token bucket shared by every request made through one transport.
+
+    A 429 pauses the whole bucket, so every concurrent user backs off together
+    instead of each finding out about the throttling separately.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self) -> float:
+        """Wait for a token and return how long the caller waited"""
+        start = time.monotonic()
+
+        # lock so waiters are served in order rather than racing for each token
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    self.updated_at = time.monotonic()
+                    continue
+
+                self._refill(now)
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - start
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ThrottleMetrics:
+    """Running totals of time spent waiting on Spotify rate limits"""
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled_responses = 0
+        self.retries = 0
+        self.token_wait_seconds = 0.0
+        self.retry_wait_seconds = 0.0
+
+    def snapshot(self) -> dict[str, int | float]:
+        return {
+            "requests": self.requests,
+            "throttled_responses": self.throttled_responses,
+            "retries": self.retries,
+            "token_wait_seconds": round(self.token_wait_seconds, 3),
+            "retry_wait_seconds": round(self.retry_wait_seconds, 3),
+        }
+
+
+class SpotifyTransport:
+    """Sends Spotify API requests within the rate limit.
+
+    Every request takes a token from the shared bucket and a slot from its
+    endpoint's semaphore. 429 and 5xx responses are retried a bounded number of
+    times, honouring Retry-After when given and otherwise backing off
+    exponentially with full jitter.
+    """
+
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        rate_limiter: TokenBucket | None = None,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        max_backoff_seconds: float = 8.0,
+        max_retry_after_seconds: float = 30.0,
+        max_concurrent_requests_per_endpoint: int = 4,
+    ):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_retry_after_seconds = max_retry_after_seconds
+        self.endpoint_semaphores: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(max_concurrent_requests_per_endpoint)
+        )
+        self.metrics = ThrottleMetrics()
+
+    @staticmethod
+    def _get_retry_after_seconds(response: httpx.Response) -> float | None:
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+    def _get_backoff_seconds(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_backoff_seconds, self.backoff_base_seconds * 2**attempt)
+        )
+
+    async def _send(
+        self, endpoint: str, url: str, headers: dict[str, str], params: dict | None
+    ) -> httpx.Response:
+        async with self.endpoint_semaphores[endpoint]:
+            if self.rate_limiter:
+                # awaited first, `+= await` would read the total before suspending
+                waited = await self.rate_limiter.acquire()
+                self.metrics.token_wait_seconds += waited
+
+            self.metrics.requests += 1
+            return await self.client.get(url=url, headers=headers, params=params)
+
+    async def get(
+        self, url: str, headers: dict[str, str], params: dict | None = None
+    ) -> httpx.Response:
+        """GET the url, retrying throttled and server error responses.
+
+        The last response is returned once retries run out, so the caller
+        decides how to handle the failure.
+        """
+        endpoint = httpx.URL(url).path
+
+        for attempt in range(self.max_retries + 1):
+            response = await self._send(
+                endpoint=endpoint, url=url, headers=headers, params=params
+            )
+
+            if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                return response
+
+            retry_after = self._get_retry_after_seconds(response)
+
+            if response.status_code == 429:
+                self.metrics.throttled_responses += 1
+
+                if retry_after and self.rate_limiter:
+                    self.rate_limiter.pause(
+                        min(retry_after, self.max_retry_after_seconds)
+                    )
+
+            if attempt == self.max_retries:
+                break
+
+            if retry_after is not None and retry_after > self.max_retry_after_seconds:
+                logger.warning(
+                    f"Not retrying {endpoint}, Retry-After of {retry_after}s is too long"
+                )
+                break
+
+            delay = (
+                retry_after + random.uniform(0, self.backoff_base_seconds)
+                if retry_after is not None
+                else self._get_backoff_seconds(attempt)
+            )
+            logger.warning(
+                f"{endpoint} returned {response.status_code}, retrying in {delay:.2f}s"
+            )
+            self.metrics.retries += 1
+            self.metrics.retry_wait_seconds += delay
+            await asyncio.sleep(delay)
+
+        return response
@@ -1,4 +1,6 @@
-from src.models.domain import TopItemBase
+import numpy as np
+
+from src.models.domain import EmotionalProfileMatrix, TopItemBase
 from src.models.enums import PositionChange
 
 
@@ -32,3 +34,52 @@ def calculate_position_changes(
             item.position_change = PositionChange.UP
         elif item.position > previous_position:
             item.position_change = PositionChange.DOWN
+
+
+def average_emotions(
+    profile_matrix: EmotionalProfileMatrix, track_id_groups: list[list[str]]
+) -> np.ndarray:
+    """
+    Average emotional profile of each group of tracks, as a groups x EMOTIONS array.
+
+    Groups can share tracks, e.g. one per time range, and are all averaged with a
+    single multiplication by a groups x tracks membership matrix. Tracks missing
+    from the profile matrix are ignored and a group with none left averages to 0.
+    """
+
+    row_by_track_id = {
+        track_id: row for row, track_id in enumerate(profile_matrix.track_ids)
+    }
+    membership = np.zeros((len(track_id_groups), len(profile_matrix.track_ids)))
+
+    for group, track_ids in enumerate(track_id_groups):
+        rows = [
+            row_by_track_id[track_id]
+            for track_id in track_ids
+            if track_id in row_by_track_id
+        ]
+        membership[group, rows] = 1
+
+    totals = membership @ profile_matrix.values
+    counts = membership.sum(axis=1, keepdims=True)
+    return np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+
+
+def rank_top_emotions(
+    average_emotions: np.ndarray, n: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Column indices of the n largest values in each row, largest first, and each
+    one's share of the row's top n total.
+
+    Ties keep column order. A row whose top n are all 0 gets shares of 0.
+    """
+
+    order = np.argsort(-average_emotions, axis=1, kind="stable")[:, :n]
+    top_values = np.take_along_axis(average_emotions, order, axis=1)
+
+    totals = top_values.sum(axis=1, keepdims=True)
+    shares = np.divide(
+        top_values, totals, out=np.zeros_like(top_values), where=totals > 0
+    )
+    return order, shares
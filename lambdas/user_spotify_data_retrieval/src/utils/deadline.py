@@ -0,0 +1,62 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from aws_lambda_typing import context as context_
+
+
+# Lambda's longest timeout, the budget of a run invoked without a Lambda context
+DEFAULT_BUDGET_SECONDS = 900.0
+
+
+class DeadlineExceededException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class Deadline:
+    """Point in time a run has to finish by, or no limit when `seconds` is None"""
+
+    def __init__(self, seconds: float | None = None):
+        self.at = None if seconds is None else time.monotonic() + seconds
+
+    @classmethod
+    def from_context(
+        cls, context: context_.Context | None, reserve_seconds: float
+    ) -> "Deadline":
+        """Deadline a little before Lambda stops the invocation, leaving time to respond.
+
+        Without a context, e.g. when invoked locally, the default budget is used.
+        """
+        if context is None:
+            return cls(DEFAULT_BUDGET_SECONDS - reserve_seconds)
+
+        return cls(context.get_remaining_time_in_millis() / 1000 - reserve_seconds)
+
+    def remaining(self, reserve_seconds: float = 0.0) -> float | None:
+        if self.at is None:
+            return None
+
+        return max(self.at - reserve_seconds - time.monotonic(), 0.0)
+
+    @asynccontextmanager
+    async def limit(self, reserve_seconds: float = 0.0) -> AsyncIterator[None]:
+        """Cancel the block `reserve_seconds` before the deadline.
+
+        The reserve is time left over for saving what the block finished.
+        Running out of time raises DeadlineExceededException, so it can't be
+        confused with a timeout from inside the block.
+        """
+        timeout = asyncio.timeout(self.remaining(reserve_seconds))
+
+        try:
+            async with timeout:
+                yield
+        except TimeoutError as e:
+            if not timeout.expired():
+                raise
+
+            raise DeadlineExceededException(
+                "Ran out of time before the deadline"
+            ) from e
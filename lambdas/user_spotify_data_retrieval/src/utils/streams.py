@@ -0,0 +1,202 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterator, Generic, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def merge_streams(*streams: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Yield items from every stream as soon as any of them produces one.
+
+    The first stream to fail cancels the rest and its exception is raised.
+    """
+    queue: asyncio.Queue[tuple[object, Exception | None]] = asyncio.Queue()
+
+    async def drain(stream: AsyncIterator[T]) -> None:
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_DONE, e))
+            return
+
+        await queue.put((_DONE, None))
+
+    tasks = [asyncio.create_task(drain(stream)) for stream in streams]
+    remaining = len(tasks)
+
+    try:
+        while remaining:
+            item, error = await queue.get()
+
+            if error:
+                raise error
+
+            if item is _DONE:
+                remaining -= 1
+                continue
+
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def flatten_streams(
+    streams: AsyncIterator[AsyncGenerator[T, None]],
+) -> AsyncIterator[T]:
+    """Yield items from every stream `streams` produces, as soon as any has one.
+
+    Each stream is read from as soon as it arrives, alongside the ones before
+    it. The first stream to fail cancels the rest and its exception is raised.
+    Streams are closed before returning, so they can save what they finished.
+    """
+    queue: asyncio.Queue[tuple[object, Exception | None]] = asyncio.Queue()
+    tasks: list[asyncio.Task] = []
+    remaining = 1
+
+    async def drain(stream: AsyncGenerator[T, None]) -> None:
+        try:
+            async with aclosing(stream):
+                async for item in stream:
+                    await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_DONE, e))
+            return
+
+        await queue.put((_DONE, None))
+
+    async def start() -> None:
+        nonlocal remaining
+
+        try:
+            async for stream in streams:
+                remaining += 1
+                tasks.append(asyncio.create_task(drain(stream)))
+        except Exception as e:
+            await queue.put((_DONE, e))
+            return
+
+        await queue.put((_DONE, None))
+
+    tasks.append(asyncio.create_task(start()))
+
+    try:
+        while remaining:
+            item, error = await queue.get()
+
+            if error:
+                raise error
+
+            if item is _DONE:
+                remaining -= 1
+                continue
+
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+
+
+class ChannelClosedException(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+
+
+class Channel(Generic[T]):
+    """Hands items from one task to another as they're produced.
+
+    The reader iterates the channel until the writer closes it. A writer that
+    stops early closes it with the reason, which reaches the reader as a
+    ChannelClosedException, so part of a stream isn't mistaken for all of it.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue[tuple[object, BaseException | None]] = (
+            asyncio.Queue()
+        )
+        self._closed = False
+
+    def put(self, item: T) -> None:
+        if self._closed:
+            raise ChannelClosedException("Cannot put items in a closed channel")
+
+        self._queue.put_nowait((item, None))
+
+    def close(self, error: BaseException | None = None) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put_nowait((_DONE, error))
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        while True:
+            item, error = await self._queue.get()
+
+            if error is not None:
+                raise ChannelClosedException(
+                    "Channel was closed before every item was put"
+                ) from error
+
+            if item is _DONE:
+                return
+
+            yield item
+
+
+async def batch_stream(
+    stream: AsyncIterator[T], max_batch_size: int, max_buffered: int
+) -> AsyncIterator[list[T]]:
+    """Yield batches of whatever items arrived while the last batch was being used.
+
+    Nothing waits for a batch to fill, so the first item goes out on its own
+    and items that pile up behind a slow consumer go out together. The stream
+    is read ahead into a buffer of at most `max_buffered` items, after which
+    it isn't read again until the consumer catches up.
+    """
+    queue: asyncio.Queue[tuple[object, Exception | None]] = asyncio.Queue(
+        maxsize=max_buffered
+    )
+
+    async def fill() -> None:
+        try:
+            async for item in stream:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_DONE, e))
+            return
+
+        await queue.put((_DONE, None))
+
+    task = asyncio.create_task(fill())
+
+    try:
+        done = False
+        while not done:
+            batch = []
+            item, error = await queue.get()
+
+            while True:
+                if error:
+                    raise error
+
+                if item is _DONE:
+                    done = True
+                    break
+
+                batch.append(item)
+                if len(batch) == max_batch_size or queue.empty():
+                    break
+
+                item, error = queue.get_nowait()
+
+            if batch:
+                yield batch
+    finally:
+        task.cancel()
+        # let the stream clean up, e.g. save what it finished, before returning
+        await asyncio.wait([task])
@@ -0,0 +1,30 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from loguru import logger
+
+
+class StageTimings:
+    """Records when each stage of a run started and ended, relative to the run start"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, tuple[float, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter() - self.start
+
+        try:
+            yield
+        finally:
+            self.stages[name] = (start, time.perf_counter() - self.start)
+
+    def log(self) -> None:
+        for name, (start, end) in sorted(
+            self.stages.items(), key=lambda stage: stage[1]
+        ):
+            logger.info(
+                f"Stage {name}: {start:.2f}s to {end:.2f}s, took {end - start:.2f}s"
+            )
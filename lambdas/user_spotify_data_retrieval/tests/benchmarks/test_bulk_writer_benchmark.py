@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import delete
+
+from src.core.db import create_db_engine, create_session_factory
+from src.migrations.runner import migrate
+from src.models.db import TrackDB
+from src.repositories.bulk_writer import BulkWriter
+
+# Point this at a disposable database, the benchmark writes to the track table
+connection_string = os.environ.get("BENCHMARK_DB_CONNECTION_STRING")
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(
+        connection_string is None, reason="BENCHMARK_DB_CONNECTION_STRING not set"
+    ),
+]
+
+UPDATE_COLUMNS = ["name", "popularity"]
+
+
+def _track_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"benchmark-track-{index:06d}",
+            "name": f"Benchmark Track {index}",
+            "images": [],
+            "spotify_url": f"https://open.spotify.com/track/benchmark-track-{index}",
+            "album_name": "Benchmark Album",
+            "release_date": "2024-01-01",
+            "explicit": False,
+            "duration_ms": 180000,
+            "popularity": 50,
+        }
+        for index in range(count)
+    ]
+
+
+async def _time_upsert(
+    session_factory, rows: list[dict], copy_threshold_rows: int
+) -> float:
+    """Insert then update every row in one transaction and roll it back"""
+    async with session_factory() as session:
+        bulk_writer = BulkWriter(session, copy_threshold_rows=copy_threshold_rows)
+
+        start = time.perf_counter()
+        for _ in range(2):
+            await bulk_writer.upsert(
+                table_=TrackDB.__table__,
+                rows=rows,
+                index_elements=["id"],
+                update_columns=UPDATE_COLUMNS,
+            )
+        elapsed = time.perf_counter() - start
+
+        await session.rollback()
+
+    return elapsed
+
+
+@pytest.mark.parametrize("row_count", [1_000, 10_000, 100_000])
+async def test_copy_and_multi_values_upserts(row_count: int) -> None:
+    """Compare multi-values INSERT and COPY into staging across batch sizes."""
+    engine = create_db_engine(connection_string, pool_size=1, pool_recycle_seconds=300)
+    await migrate(engine)
+    session_factory = create_session_factory(engine)
+    rows = _track_rows(row_count)
+
+    values_elapsed = await _time_upsert(
+        session_factory, rows, copy_threshold_rows=row_count + 1
+    )
+    copy_elapsed = await _time_upsert(session_factory, rows, copy_threshold_rows=0)
+
+    async with session_factory() as session:
+        await session.execute(
+            delete(TrackDB).where(TrackDB.id.like("benchmark-track-%"))
+        )
+        await session.commit()
+    await engine.dispose()
+
+    print(
+        f"\n{row_count} rows: multi-values {values_elapsed:.3f}s "
+        f"({2 * row_count / values_elapsed:.0f} rows/s), "
+        f"copy {copy_elapsed:.3f}s ({2 * row_count / copy_elapsed:.0f} rows/s)"
+    )
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+
+import pytest
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+
+from src.core.db import create_db_engine, to_async_connection_string
+from src.migrations.runner import migrate
+from src.models.db import TrackDB
+
+# Point this at a disposable database, the benchmark writes to the track table
+connection_string = os.environ.get("BENCHMARK_DB_CONNECTION_STRING")
+
+pytestmark = [
+    pytest.mark.slow,
+    pytest.mark.skipif(
+        connection_string is None, reason="BENCHMARK_DB_CONNECTION_STRING not set"
+    ),
+]
+
+TRACK_COUNT = 50
+NETWORK_LATENCY_SECONDS = 0.05
+
+
+def _track_values(index: int) -> dict:
+    return {
+        "id": f"benchmark-track-{index}",
+        "name": f"Benchmark Track {index}",
+        "images": [],
+        "spotify_url": f"https://open.spotify.com/track/benchmark-track-{index}",
+        "album_name": "Benchmark Album",
+        "release_date": "2024-01-01",
+        "explicit": False,
+        "duration_ms": 180000,
+        "popularity": 50,
+    }
+
+
+def _upsert_track_stmt(index: int):
+    stmt = insert(TrackDB).values(_track_values(index))
+    return stmt.on_conflict_do_update(
+        index_elements=["id"], set_={"name": stmt.excluded.name}
+    )
+
+
+async def _run_sync_session() -> float:
+    """Each track does its network I/O then writes through a blocking session."""
+    engine = create_engine(to_async_connection_string(connection_string))
+
+    async def process_track(index: int) -> None:
+        await asyncio.sleep(NETWORK_LATENCY_SECONDS)
+        with Session(engine) as session:
+            session.execute(_upsert_track_stmt(index))
+            session.commit()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[process_track(index) for index in range(TRACK_COUNT)])
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    return elapsed
+
+
+async def _run_async_session() -> float:
+    """Each track does its network I/O then writes through its own AsyncSession."""
+    engine = create_db_engine(connection_string, pool_size=5, pool_recycle_seconds=300)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def process_track(index: int) -> None:
+        await asyncio.sleep(NETWORK_LATENCY_SECONDS)
+        async with session_factory() as session:
+            await session.execute(_upsert_track_stmt(index))
+            await session.commit()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[process_track(index) for index in range(TRACK_COUNT)])
+    elapsed = time.perf_counter() - start
+
+    async with session_factory() as session:
+        count = await session.scalar(
+            select(func.count())
+            .select_from(TrackDB)
+            .where(TrackDB.id.like("benchmark-track-%"))
+        )
+        await session.execute(
+            delete(TrackDB).where(TrackDB.id.like("benchmark-track-%"))
+        )
+        await session.commit()
+
+    await engine.dispose()
+    assert count == TRACK_COUNT
+    return elapsed
+
+
+async def test_async_session_wall_clock_for_50_tracks() -> None:
+    """Compare wall-clock time of blocking vs async DB writes for 50 tracks."""
+    engine = create_db_engine(connection_string, pool_size=1, pool_recycle_seconds=300)
+    await migrate(engine)
+    await engine.dispose()
+
+    sync_elapsed = await _run_sync_session()
+    async_elapsed = await _run_async_session()
+
+    print(
+        f"\n{TRACK_COUNT} tracks: sync session {sync_elapsed:.3f}s, "
+        f"async session {async_elapsed:.3f}s "
+        f"({sync_elapsed / async_elapsed:.2f}x)"
+    )
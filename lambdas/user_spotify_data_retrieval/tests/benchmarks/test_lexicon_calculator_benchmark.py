@@ -0,0 +1,66 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from src.models.domain import TrackEmotionalProfileRequest
+from src.services.emotional_profiles.lexicon_calculator import (
+    LexiconEmotionalProfileCalculator,
+)
+from src.services.lyrics.lyrics_extractor import ScanningLyricsExtractor
+
+pytestmark = pytest.mark.slow
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "lyrics_pages"
+TRACK_COUNT = 2000
+# about what a user's top tracks across all time ranges come to
+BATCH_SIZE = 150
+# a model call takes seconds per batch, anything near this is effectively free
+MIN_TRACKS_PER_SECOND = 500
+
+
+def _requests() -> list[TrackEmotionalProfileRequest]:
+    html = (FIXTURES_DIR / "annotated_song.html").read_text(encoding="utf-8")
+    lyrics = ScanningLyricsExtractor().extract_lyrics(html)
+    # repeated so the whole song is realistic length, numbered so no two match
+    return [
+        TrackEmotionalProfileRequest(
+            track_id=str(index), lyrics=f"{lyrics * 4}<br/>Track {index}"
+        )
+        for index in range(TRACK_COUNT)
+    ]
+
+
+async def test_lexicon_calculator_throughput() -> None:
+    """Report tracks per second on one core, batched and one at a time."""
+    lexicon_calculator = LexiconEmotionalProfileCalculator()
+    requests = _requests()
+
+    affinity = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    if affinity:
+        os.sched_setaffinity(0, {min(affinity)})
+
+    try:
+        start = time.perf_counter()
+        for index in range(0, TRACK_COUNT, BATCH_SIZE):
+            profiles = await lexicon_calculator.get_emotional_profiles(
+                requests[index : index + BATCH_SIZE]
+            )
+            assert len(profiles) == len(requests[index : index + BATCH_SIZE])
+        batched_rate = TRACK_COUNT / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for request in requests:
+            await lexicon_calculator.get_emotional_profile(request.lyrics)
+        single_rate = TRACK_COUNT / (time.perf_counter() - start)
+    finally:
+        if affinity:
+            os.sched_setaffinity(0, affinity)
+
+    print(
+        f"\n{TRACK_COUNT} tracks of {len(requests[0].lyrics) // 1024} KB lyrics: "
+        f"batches of {BATCH_SIZE} {batched_rate:.0f} tracks/s, "
+        f"one at a time {single_rate:.0f} tracks/s"
+    )
+    assert batched_rate > MIN_TRACKS_PER_SECOND
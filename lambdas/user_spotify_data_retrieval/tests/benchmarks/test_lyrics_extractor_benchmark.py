@@ -0,0 +1,60 @@
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from src.services.lyrics.lyrics_extractor import (
+    BeautifulSoupLyricsExtractor,
+    LyricsExtractor,
+    ScanningLyricsExtractor,
+)
+
+pytestmark = pytest.mark.slow
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "lyrics_pages"
+PAGE_COUNT = 20
+# real lyrics pages are a few hundred KB, mostly markup and scripts around the lyrics
+PADDING_BLOCKS = 1200
+
+
+def _realistic_page() -> str:
+    html = (FIXTURES_DIR / "annotated_song.html").read_text(encoding="utf-8")
+    padding = (
+        '<div class="RightSidebar__Item"><a href="/songs/1"><span class="Title">'
+        "Related song</span></a><ul><li>Chart</li><li>Album</li></ul></div>\n"
+        '<script type="application/ld+json">{"@type": "MusicRecording", '
+        '"name": "Related song", "byArtist": {"name": "Artist"}}</script>\n'
+    ) * PADDING_BLOCKS
+    return html.replace("<footer>", padding + "<footer>")
+
+
+def _measure(extractor: LyricsExtractor, html: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(PAGE_COUNT):
+        extractor.extract_lyrics(html)
+    elapsed = time.perf_counter() - start
+
+    # traced separately, tracemalloc slows allocation-heavy code down a lot
+    tracemalloc.start()
+    extractor.extract_lyrics(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return PAGE_COUNT / elapsed, peak
+
+
+def test_lyrics_extractor_throughput() -> None:
+    """Compare pages per second and peak memory of the extractor backends."""
+    html = _realistic_page()
+
+    reference_rate, reference_peak = _measure(BeautifulSoupLyricsExtractor(), html)
+    scanner_rate, scanner_peak = _measure(ScanningLyricsExtractor(), html)
+
+    print(
+        f"\n{len(html) // 1024} KB page: "
+        f"bs4 {reference_rate:.1f} pages/s, {reference_peak / 1024:.0f} KB peak; "
+        f"scanner {scanner_rate:.1f} pages/s, {scanner_peak / 1024:.0f} KB peak"
+    )
+    assert scanner_rate > reference_rate
+    assert scanner_peak < reference_peak
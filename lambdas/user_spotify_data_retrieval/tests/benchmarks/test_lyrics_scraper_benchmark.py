@@ -0,0 +1,91 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+from src.services.lyrics.lyrics_scraper import LyricsScraper
+
+pytestmark = pytest.mark.slow
+
+TRACK_COUNT = 40
+MAX_CONCURRENT_SCRAPES = 5
+RESPONSE_LATENCY_SECONDS = 0.15
+LYRICS_HTML = (
+    "<html><body><div data-lyrics-container='true'>"
+    + "A line of lyrics<br/>" * 60
+    + "</div></body></html>"
+).encode()
+
+
+class StubLyricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(RESPONSE_LATENCY_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(LYRICS_HTML)))
+        self.end_headers()
+        self.wfile.write(LYRICS_HTML)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SleepInSlotLyricsScraper(LyricsScraper):
+    """The previous design, sleeping a random delay while holding a slot"""
+
+    @asynccontextmanager
+    async def _make_limited_request(self, url: str) -> AsyncIterator[httpx.Response]:
+        async with self.semaphore:
+            await asyncio.sleep(random.uniform(0.25, 1))
+            async with self.client.stream(
+                "GET", url=url, headers=self.headers, follow_redirects=True
+            ) as response:
+                yield response
+
+
+async def _scrape_all(scraper_class: type[LyricsScraper], base_url: str) -> float:
+    async with httpx.AsyncClient() as client:
+        lyrics_scraper = scraper_class(
+            client=client,
+            base_url=base_url,
+            headers={"User-Agent": "benchmark"},
+            semaphore=asyncio.Semaphore(MAX_CONCURRENT_SCRAPES),
+            pacer=AdaptivePacer(rate=10, min_rate=0.5, max_rate=10),
+        )
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                lyrics_scraper.get_lyrics("Artist", f"Song {index}")
+                for index in range(TRACK_COUNT)
+            ]
+        )
+        return time.perf_counter() - start
+
+
+async def test_paced_scraper_throughput() -> None:
+    """Compare scrapes per second of the sleep-in-slot and paced designs."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLyricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        sleep_in_slot_elapsed = await _scrape_all(SleepInSlotLyricsScraper, base_url)
+        paced_elapsed = await _scrape_all(LyricsScraper, base_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(
+        f"\n{TRACK_COUNT} scrapes, {MAX_CONCURRENT_SCRAPES} slots: "
+        f"sleep in slot {TRACK_COUNT / sleep_in_slot_elapsed:.1f}/s, "
+        f"paced {TRACK_COUNT / paced_elapsed:.1f}/s"
+    )
+    assert paced_elapsed < sleep_in_slot_elapsed
@@ -0,0 +1,176 @@
+import asyncio
+import socket
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+from src.services.lyrics.lyrics_scraper import LyricsScraper
+
+pytestmark = pytest.mark.slow
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "lyrics_pages"
+TRACK_COUNT = 20
+MAX_CONCURRENT_SCRAPES = 5
+CHUNK_SIZE = 16 * 1024
+# roughly 8 MB/s per connection
+CHUNK_DELAY_SECONDS = 0.002
+# real lyrics pages are a few hundred KB, most of it after the lyrics
+PADDING_BLOCKS = 1200
+
+
+def _realistic_page() -> bytes:
+    html = (FIXTURES_DIR / "annotated_song.html").read_text(encoding="utf-8")
+    padding = (
+        '<div class="RightSidebar__Item"><a href="/songs/1"><span class="Title">'
+        "Related song</span></a><ul><li>Chart</li><li>Album</li></ul></div>\n"
+        '<script type="application/ld+json">{"@type": "MusicRecording", '
+        '"name": "Related song", "byArtist": {"name": "Artist"}}</script>\n'
+    ) * PADDING_BLOCKS
+    return html.replace("<footer>", padding + "<footer>").encode()
+
+
+class StubLyricsServer(ThreadingHTTPServer):
+    def __init__(self, page: bytes):
+        super().__init__(("127.0.0.1", 0), StubLyricsHandler)
+        self.page = page
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubLyricsHandler(BaseHTTPRequestHandler):
+    server: StubLyricsServer
+
+    def setup(self):
+        super().setup()
+        # keep the kernel from buffering the whole page ahead of the client
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CHUNK_SIZE)
+
+    def do_GET(self):
+        page = self.server.page
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+
+        for start in range(0, len(page), CHUNK_SIZE):
+            try:
+                self.wfile.write(page[start : start + CHUNK_SIZE])
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+            with self.server.lock:
+                self.server.bytes_sent += len(page[start : start + CHUNK_SIZE])
+            time.sleep(CHUNK_DELAY_SECONDS)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """Counts the response body bytes the client actually reads"""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_read = 0
+
+    async def _count(self, stream: httpx.AsyncByteStream) -> AsyncIterator[bytes]:
+        async for chunk in stream:
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=CountingStream(self._count(response.stream), response.stream),
+            extensions=response.extensions,
+        )
+
+
+class CountingStream(httpx.AsyncByteStream):
+    def __init__(self, chunks: AsyncIterator[bytes], stream: httpx.AsyncByteStream):
+        self.chunks = chunks
+        self.stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.stream.aclose()
+
+
+async def _scrape_all(server: StubLyricsServer, streaming: bool) -> dict:
+    server.bytes_sent = 0
+    transport = CountingTransport()
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        lyrics_scraper = LyricsScraper(
+            client=client,
+            base_url=server.base_url,
+            headers={"User-Agent": "benchmark"},
+            semaphore=asyncio.Semaphore(MAX_CONCURRENT_SCRAPES),
+            pacer=AdaptivePacer(rate=1000, min_rate=1, max_rate=1000),
+            streaming=streaming,
+        )
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        lyrics = await asyncio.gather(
+            *[
+                lyrics_scraper.get_lyrics("Artist", f"Song {index}")
+                for index in range(TRACK_COUNT)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "lyrics": lyrics,
+        "elapsed": elapsed,
+        "peak": peak,
+        "bytes_sent": server.bytes_sent,
+        "bytes_read": transport.bytes_read,
+    }
+
+
+async def test_streaming_fetch_transfer_and_memory() -> None:
+    """Compare bytes transferred and peak memory of full and streamed fetches."""
+    page = _realistic_page()
+    server = StubLyricsServer(page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        full = await _scrape_all(server, streaming=False)
+        streamed = await _scrape_all(server, streaming=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for name, result in [("full", full), ("streamed", streamed)]:
+        print(
+            f"\n{name}: {TRACK_COUNT} x {len(page) // 1024} KB pages, "
+            f"{result['bytes_read'] // 1024} KB read by the client, "
+            f"{result['bytes_sent'] // 1024} KB sent including socket buffers, "
+            f"{result['peak'] / 1024:.0f} KB peak, {result['elapsed']:.2f}s",
+            end="",
+        )
+
+    assert streamed["lyrics"] == full["lyrics"]
+    assert streamed["bytes_read"] < full["bytes_read"] / 2
+    assert streamed["bytes_sent"] < full["bytes_sent"]
+    assert streamed["peak"] < full["peak"]
@@ -3,13 +3,13 @@ import httpx
 import pytest
 
 import pytest_asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.db import ProfileDB
 from src.models.shared import Image
 from src.models.domain import Profile
 from src.repositories.profile_repository import ProfileRepository
-from src.services.spotify_service import SpotifyService
+from src.services.music.spotify_service import SpotifyService
 from src.pipelines.profile_pipeline import ProfilePipeline
 
 PROFILE_DATA = {
@@ -46,7 +46,7 @@ async def spotify_service(httpx_mock) -> AsyncGenerator[SpotifyService, None]:
 
 @pytest.fixture
 def profile_pipeline(
-    db_session: Session, spotify_service: SpotifyService
+    db_session: AsyncSession, spotify_service: SpotifyService
 ) -> ProfilePipeline:
     profile_repository = ProfileRepository(db_session)
 
@@ -82,13 +82,13 @@ async def test_profile_pipeline_run_returns_expected_profile(
 @pytest.mark.asyncio
 async def test_profile_pipeline_run_adds_profile_to_db(
     profile_pipeline: ProfilePipeline,
-    db_session: Session,
+    db_session: AsyncSession,
 ) -> None:
     access_token = "access_token"
 
     await profile_pipeline.run(access_token)
 
-    profile = db_session.get(ProfileDB, "123")
+    profile = await db_session.get(ProfileDB, "123", populate_existing=True)
     assert (
         profile.display_name == "First"
         and profile.email == "first.last@domain.com"
@@ -105,17 +105,19 @@ async def test_profile_pipeline_run_adds_profile_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_profile_pipeline_run_updates_profile_in_db_if_already_exists(
-    profile_pipeline: ProfilePipeline, db_session: Session, existing_profile: ProfileDB
+    profile_pipeline: ProfilePipeline,
+    db_session: AsyncSession,
+    existing_profile: ProfileDB,
 ) -> None:
-    creation_timestamp = db_session.get(
-        ProfileDB, existing_profile.id
+    creation_timestamp = (
+        await db_session.get(ProfileDB, existing_profile.id, populate_existing=True)
     ).creation_timestamp
     access_token = "access_token"
 
     await profile_pipeline.run(access_token)
 
-    db_session.commit()
-    profile = db_session.get(ProfileDB, "123")
+    await db_session.commit()
+    profile = await db_session.get(ProfileDB, "123", populate_existing=True)
     assert (
         profile.display_name == "First"
         and profile.email == "first.last@domain.com"
@@ -5,7 +5,8 @@ import httpx
 import pytest
 
 import pytest_asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.shared import Image
 from src.models.domain import Artist, TopArtist
@@ -16,11 +17,8 @@ from src.repositories.top_items.top_artists_repository import (
     TopArtistsRepository,
     TopArtistsRepositoryException,
 )
-from src.services.spotify_service import SpotifyService
-from src.pipelines.top_artists_pipeline import (
-    TopArtistsPipeline,
-    TopArtistsPipelineException,
-)
+from src.services.music.spotify_service import SpotifyService
+from src.pipelines.top_artists_pipeline import TopArtistsPipeline
 
 TOP_ARTISTS_DATA = {
     "items": [
@@ -597,7 +595,7 @@ async def spotify_service(httpx_mock) -> AsyncGenerator[SpotifyService, None]:
 
 @pytest.fixture
 def top_artists_pipeline(
-    db_session: Session, spotify_service: SpotifyService
+    db_session: AsyncSession, spotify_service: SpotifyService
 ) -> TopArtistsPipeline:
     artists_repository = ArtistsRepository(db_session)
     top_artists_repository = TopArtistsRepository(db_session)
@@ -632,7 +630,7 @@ async def test_top_artists_pipeline_run_returns_expected_artists(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_artists_pipeline_run_adds_artists_to_db(
-    db_session: Session,
+    db_session: AsyncSession,
     top_artists_pipeline: TopArtistsPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -648,7 +646,7 @@ async def test_top_artists_pipeline_run_adds_artists_to_db(
         collection_date=collection_date,
     )
 
-    db_artists = db_session.query(ArtistDB).all()
+    db_artists = (await db_session.scalars(select(ArtistDB))).all()
     db_artist_ids = {artist.id for artist in db_artists}
     expected_artist_ids = {artist.id for artist in EXPECTED_ARTISTS}
     assert db_artist_ids == expected_artist_ids
@@ -657,7 +655,7 @@ async def test_top_artists_pipeline_run_adds_artists_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_artists_pipeline_run_adds_top_artists_to_db(
-    db_session: Session,
+    db_session: AsyncSession,
     top_artists_pipeline: TopArtistsPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -682,7 +680,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db(
             position=artist.position,
             position_change=artist.position_change,
         )
-        for artist in db_session.query(TopArtistDB).all()
+        for artist in (await db_session.scalars(select(TopArtistDB))).all()
     ]
     expected_top_artists = [
         TopArtist(
@@ -701,7 +699,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_position_changes(
-    db_session: Session,
+    db_session: AsyncSession,
     top_artists_pipeline: TopArtistsPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -732,7 +730,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_pos
             for artist in artists_to_add
         ]
     )
-    db_session.commit()
+    await db_session.commit()
     positions = [4, 1, 6, 4, 2, 6, 8, 9, 10]  # Previous positions of the artists
     # Add previous top artists with different positions
     top_artists_to_add = [
@@ -747,7 +745,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_pos
         for index, artist in enumerate(artists_to_add)
     ]
     db_session.add_all(top_artists_to_add)
-    db_session.commit()
+    await db_session.commit()
 
     await top_artists_pipeline.run(
         access_token=access_token,
@@ -756,7 +754,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_pos
         collection_date=collection_date,
     )
 
-    db_session.commit()
+    await db_session.commit()
     top_artists = [
         TopArtist(
             user_id=artist.user_id,
@@ -766,9 +764,13 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_pos
             position=artist.position,
             position_change=artist.position_change,
         )
-        for artist in db_session.query(TopArtistDB)
-        .where(TopArtistDB.collection_date == collection_date)
-        .all()
+        for artist in (
+            await db_session.scalars(
+                select(TopArtistDB).where(
+                    TopArtistDB.collection_date == collection_date
+                )
+            )
+        ).all()
     ]
     expected_top_artists = [
         TopArtist(
@@ -794,7 +796,7 @@ async def test_top_artists_pipeline_run_adds_top_artists_to_db_with_expected_pos
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_artists_pipeline_run_updates_artist_if_already_exists(
-    db_session: Session,
+    db_session: AsyncSession,
     top_artists_pipeline: TopArtistsPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -814,7 +816,7 @@ async def test_top_artists_pipeline_run_updates_artist_if_already_exists(
             popularity=existing_artist.popularity,
         )
     )
-    db_session.commit()
+    await db_session.commit()
 
     await top_artists_pipeline.run(
         access_token=access_token,
@@ -823,7 +825,9 @@ async def test_top_artists_pipeline_run_updates_artist_if_already_exists(
         collection_date=collection_date,
     )
 
-    db_artist = db_session.get(ArtistDB, existing_artist.id)
+    db_artist = await db_session.get(
+        ArtistDB, existing_artist.id, populate_existing=True
+    )
     assert db_artist.id == existing_artist.id
     assert db_artist.name == existing_artist.name
     assert db_artist.images == [image.model_dump() for image in existing_artist.images]
@@ -835,8 +839,8 @@ async def test_top_artists_pipeline_run_updates_artist_if_already_exists(
 
 @pytest.mark.integration
 @pytest.mark.asyncio
-async def test_top_artists_pipeline_run_raises_exception_if_top_artist_exists(
-    db_session: Session,
+async def test_top_artists_pipeline_run_keeps_existing_top_artist_when_rerun(
+    db_session: AsyncSession,
     top_artists_pipeline: TopArtistsPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -856,7 +860,7 @@ async def test_top_artists_pipeline_run_raises_exception_if_top_artist_exists(
             popularity=existing_artist.popularity,
         )
     )
-    db_session.commit()
+    await db_session.commit()
     db_session.add(
         TopArtistDB(
             user_id=existing_profile.id,
@@ -867,12 +871,19 @@ async def test_top_artists_pipeline_run_raises_exception_if_top_artist_exists(
             position_change=None,
         )
     )
-    db_session.commit()
+    await db_session.commit()
 
-    with pytest.raises(TopArtistsPipelineException):
-        await top_artists_pipeline.run(
-            access_token=access_token,
-            user_id=user_id,
-            time_range=time_range,
-            collection_date=collection_date,
-        )
+    # a redelivered run writes the rest without failing on what's already there
+    await top_artists_pipeline.run(
+        access_token=access_token,
+        user_id=user_id,
+        time_range=time_range,
+        collection_date=collection_date,
+    )
+
+    await db_session.commit()
+    top_artist_ids = [
+        top_artist.artist_id
+        for top_artist in (await db_session.scalars(select(TopArtistDB))).all()
+    ]
+    assert sorted(top_artist_ids) == sorted(artist.id for artist in EXPECTED_ARTISTS)
@@ -4,7 +4,8 @@ from typing import AsyncGenerator
 import httpx
 import pytest
 import pytest_asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.emotional_profiles.model_service import (
     EmotionalProfileCalculator,
@@ -24,12 +25,16 @@ from src.models.db import (
     TrackLyricsDB,
     TrackEmotionalProfileDB,
 )
+from src.repositories.track_lyrics_failures_repository import (
+    TrackLyricsFailuresRepository,
+)
 from src.repositories.track_lyrics_repository import TrackLyricsRepository
 from src.repositories.track_emotional_profiles_repository import (
     TrackEmotionalProfilesRepository,
 )
 from src.repositories.top_items.top_emotions_repository import TopEmotionsRepository
 from src.services.lyrics.lyrics_service import LyricsService
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
 from src.services.lyrics.lyrics_scraper import LyricsScraper
 from src.services.emotional_profiles.emotional_profiles_service import (
     EmotionalProfilesService,
@@ -122,8 +127,8 @@ EXPECTED_TOP_EMOTIONS = [
 ]
 
 
-@pytest.fixture
-def db_tracks(db_session: Session) -> list[TrackDB]:
+@pytest_asyncio.fixture
+async def db_tracks(db_session: AsyncSession) -> list[TrackDB]:
     """Create test tracks in the database for foreign key constraints"""
     # Create tracks
     track1 = TrackDB(
@@ -151,14 +156,14 @@ def db_tracks(db_session: Session) -> list[TrackDB]:
 
     db_session.add(track1)
     db_session.add(track2)
-    db_session.commit()
+    await db_session.commit()
 
     return [track1, track2]
 
 
 @pytest_asyncio.fixture
 async def lyrics_service(
-    httpx_mock, db_session: Session
+    httpx_mock, db_session: AsyncSession
 ) -> AsyncGenerator[LyricsService, None]:
     # Mock Genius API responses - URLs are generated as {base_url}/{artist}-{title}-lyrics
     httpx_mock.add_response(
@@ -182,9 +187,11 @@ async def lyrics_service(
             base_url="https://genius.com",
             headers={"User-Agent": "test"},
             semaphore=semaphore,
+            pacer=AdaptivePacer(rate=100, min_rate=1, max_rate=100),
         )
         yield LyricsService(
             lyrics_repository=lyrics_repository,
+            lyrics_failures_repository=TrackLyricsFailuresRepository(db_session),
             lyrics_scraper=lyrics_scraper,
         )
 
@@ -203,7 +210,7 @@ def emotional_profile_calculator() -> EmotionalProfileCalculator:
 
 @pytest.fixture
 def emotional_profiles_service(
-    db_session: Session, emotional_profile_calculator: EmotionalProfileCalculator
+    db_session: AsyncSession, emotional_profile_calculator: EmotionalProfileCalculator
 ) -> EmotionalProfilesService:
     emotional_profile_repository = TrackEmotionalProfilesRepository(db_session)
 
@@ -215,7 +222,7 @@ def emotional_profiles_service(
 
 @pytest.fixture
 def top_emotions_pipeline(
-    db_session: Session,
+    db_session: AsyncSession,
     lyrics_service: LyricsService,
     emotional_profiles_service: EmotionalProfilesService,
 ) -> TopEmotionsPipeline:
@@ -232,7 +239,7 @@ def top_emotions_pipeline(
 async def test_top_emotions_pipeline_run_adds_top_emotions_to_db(
     top_emotions_pipeline: TopEmotionsPipeline,
     existing_profile: ProfileDB,
-    db_session: Session,
+    db_session: AsyncSession,
     db_tracks: list[TrackDB],
 ) -> None:
     user_id = existing_profile.id
@@ -255,7 +262,7 @@ async def test_top_emotions_pipeline_run_adds_top_emotions_to_db(
             position=emotion.position,
             percentage=emotion.percentage,
         )
-        for emotion in db_session.query(TopEmotionDB).all()
+        for emotion in (await db_session.scalars(select(TopEmotionDB))).all()
     ]
     expected_top_emotions = [
         TopEmotion(
@@ -276,7 +283,7 @@ async def test_top_emotions_pipeline_run_adds_top_emotions_to_db(
 async def test_top_emotions_pipeline_run_adds_top_emotions_to_db_with_expected_position_changes(
     top_emotions_pipeline: TopEmotionsPipeline,
     existing_profile: ProfileDB,
-    db_session: Session,
+    db_session: AsyncSession,
     db_tracks: list[TrackDB],
 ) -> None:
     user_id = existing_profile.id
@@ -306,7 +313,7 @@ async def test_top_emotions_pipeline_run_adds_top_emotions_to_db_with_expected_p
         ),
     ]
     db_session.add_all(previous_emotions)
-    db_session.commit()
+    await db_session.commit()
 
     await top_emotions_pipeline.run(
         tracks=TEST_TRACKS,
@@ -349,10 +356,13 @@ async def test_top_emotions_pipeline_run_adds_top_emotions_to_db_with_expected_p
             percentage=emotion.percentage,
             position_change=emotion.position_change,
         )
-        for emotion in db_session.query(TopEmotionDB)
-        .filter(TopEmotionDB.collection_date == collection_date)
-        .order_by(TopEmotionDB.position)
-        .all()
+        for emotion in (
+            await db_session.scalars(
+                select(TopEmotionDB)
+                .where(TopEmotionDB.collection_date == collection_date)
+                .order_by(TopEmotionDB.position)
+            )
+        ).all()
     ]
 
     assert top_emotions_in_db == expected_top_emotions
@@ -363,7 +373,7 @@ async def test_top_emotions_pipeline_run_adds_top_emotions_to_db_with_expected_p
 async def test_top_emotions_pipeline_run_stores_lyrics_in_database(
     top_emotions_pipeline: TopEmotionsPipeline,
     existing_profile: ProfileDB,
-    db_session: Session,
+    db_session: AsyncSession,
     db_tracks: list[TrackDB],
 ) -> None:
     """Test that lyrics are properly stored in the TrackLyricsDB table during pipeline execution."""
@@ -372,7 +382,7 @@ async def test_top_emotions_pipeline_run_stores_lyrics_in_database(
     collection_date = datetime.date(2024, 1, 15)
 
     # Verify no lyrics exist in DB before pipeline run
-    lyrics_before = db_session.query(TrackLyricsDB).all()
+    lyrics_before = (await db_session.scalars(select(TrackLyricsDB))).all()
     assert len(lyrics_before) == 0
 
     await top_emotions_pipeline.run(
@@ -383,7 +393,7 @@ async def test_top_emotions_pipeline_run_stores_lyrics_in_database(
     )
 
     # Verify lyrics were stored in the database
-    lyrics_after = db_session.query(TrackLyricsDB).all()
+    lyrics_after = (await db_session.scalars(select(TrackLyricsDB))).all()
     assert len(lyrics_after) == 2
 
     # Verify the correct lyrics were stored
@@ -406,7 +416,7 @@ async def test_top_emotions_pipeline_run_stores_lyrics_in_database(
 async def test_top_emotions_pipeline_run_stores_emotional_profiles_in_database(
     top_emotions_pipeline: TopEmotionsPipeline,
     existing_profile: ProfileDB,
-    db_session: Session,
+    db_session: AsyncSession,
     db_tracks: list[TrackDB],
 ) -> None:
     """Test that emotional profiles are properly stored in the TrackEmotionalProfileDB table during pipeline execution."""
@@ -415,7 +425,7 @@ async def test_top_emotions_pipeline_run_stores_emotional_profiles_in_database(
     collection_date = datetime.date(2024, 1, 15)
 
     # Verify no emotional profiles exist in DB before pipeline run
-    profiles_before = db_session.query(TrackEmotionalProfileDB).all()
+    profiles_before = (await db_session.scalars(select(TrackEmotionalProfileDB))).all()
     assert len(profiles_before) == 0
 
     await top_emotions_pipeline.run(
@@ -426,7 +436,7 @@ async def test_top_emotions_pipeline_run_stores_emotional_profiles_in_database(
     )
 
     # Verify emotional profiles were stored in the database
-    profiles_after = db_session.query(TrackEmotionalProfileDB).all()
+    profiles_after = (await db_session.scalars(select(TrackEmotionalProfileDB))).all()
     assert len(profiles_after) == 2
 
     # Verify the correct emotional profiles were stored
@@ -477,7 +487,7 @@ async def test_top_emotions_pipeline_run_stores_emotional_profiles_in_database(
 async def test_top_emotions_pipeline_run_complete_integration_flow(
     top_emotions_pipeline: TopEmotionsPipeline,
     existing_profile: ProfileDB,
-    db_session: Session,
+    db_session: AsyncSession,
     db_tracks: list[TrackDB],
 ) -> None:
     """Test the complete pipeline flow including all database operations."""
@@ -486,9 +496,15 @@ async def test_top_emotions_pipeline_run_complete_integration_flow(
     collection_date = datetime.date(2024, 1, 15)
 
     # Verify no data exists in any of the relevant tables before pipeline run
-    lyrics_before = db_session.query(TrackLyricsDB).count()
-    profiles_before = db_session.query(TrackEmotionalProfileDB).count()
-    top_emotions_before = db_session.query(TopEmotionDB).count()
+    lyrics_before = await db_session.scalar(
+        select(func.count()).select_from(TrackLyricsDB)
+    )
+    profiles_before = await db_session.scalar(
+        select(func.count()).select_from(TrackEmotionalProfileDB)
+    )
+    top_emotions_before = await db_session.scalar(
+        select(func.count()).select_from(TopEmotionDB)
+    )
 
     assert lyrics_before == 0
     assert profiles_before == 0
@@ -502,9 +518,15 @@ async def test_top_emotions_pipeline_run_complete_integration_flow(
     )
 
     # Verify all data was stored in the database
-    lyrics_after = db_session.query(TrackLyricsDB).count()
-    profiles_after = db_session.query(TrackEmotionalProfileDB).count()
-    top_emotions_after = db_session.query(TopEmotionDB).count()
+    lyrics_after = await db_session.scalar(
+        select(func.count()).select_from(TrackLyricsDB)
+    )
+    profiles_after = await db_session.scalar(
+        select(func.count()).select_from(TrackEmotionalProfileDB)
+    )
+    top_emotions_after = await db_session.scalar(
+        select(func.count()).select_from(TopEmotionDB)
+    )
 
     assert lyrics_after == 2
     assert profiles_after == 2
@@ -512,10 +534,12 @@ async def test_top_emotions_pipeline_run_complete_integration_flow(
 
     # Verify the complete data flow by checking that all track IDs are consistent
     lyrics_track_ids = {
-        lyric.track_id for lyric in db_session.query(TrackLyricsDB).all()
+        lyric.track_id
+        for lyric in (await db_session.scalars(select(TrackLyricsDB))).all()
     }
     profile_track_ids = {
-        profile.track_id for profile in db_session.query(TrackEmotionalProfileDB).all()
+        profile.track_id
+        for profile in (await db_session.scalars(select(TrackEmotionalProfileDB))).all()
     }
     expected_track_ids = {"track1", "track2"}
 
@@ -532,7 +556,7 @@ async def test_top_emotions_pipeline_run_complete_integration_flow(
             position=emotion.position,
             percentage=emotion.percentage,
         )
-        for emotion in db_session.query(TopEmotionDB).all()
+        for emotion in (await db_session.scalars(select(TopEmotionDB))).all()
     ]
     expected_top_emotions = [
         TopEmotion(
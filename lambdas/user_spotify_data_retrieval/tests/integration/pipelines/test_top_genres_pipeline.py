@@ -1,6 +1,7 @@
 import datetime
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.domain import Artist, TopGenre
 from src.models.shared import Image
@@ -264,15 +265,16 @@ ARTISTS = [
 
 
 @pytest.fixture
-def top_genres_pipeline(db_session: Session) -> TopGenresPipeline:
+def top_genres_pipeline(db_session: AsyncSession) -> TopGenresPipeline:
     top_genres_repository = TopGenresRepository(db_session=db_session)
 
     return TopGenresPipeline(top_genres_repository=top_genres_repository)
 
 
 @pytest.mark.integration
-def test_top_genres_pipeline_run_adds_top_genres_to_db(
-    db_session: Session,
+@pytest.mark.asyncio
+async def test_top_genres_pipeline_run_adds_top_genres_to_db(
+    db_session: AsyncSession,
     top_genres_pipeline: TopGenresPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -280,7 +282,7 @@ def test_top_genres_pipeline_run_adds_top_genres_to_db(
     time_range = TimeRange.SHORT_TERM
     collection_date = datetime.date.today()
 
-    top_genres_pipeline.run(
+    await top_genres_pipeline.run(
         artists=ARTISTS,
         user_id=user_id,
         time_range=time_range,
@@ -296,7 +298,7 @@ def test_top_genres_pipeline_run_adds_top_genres_to_db(
             position=genre.position,
             percentage=genre.percentage,
         )
-        for genre in db_session.query(TopGenreDB).all()
+        for genre in (await db_session.scalars(select(TopGenreDB))).all()
     ]
     expected_top_genres = [
         TopGenre(
@@ -5,7 +5,8 @@ import httpx
 import pytest
 
 import pytest_asyncio
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.repositories.artists_repository import ArtistsRepository
 from src.models.shared import Image, TrackArtist
@@ -17,11 +18,8 @@ from src.repositories.top_items.top_tracks_repository import (
     TopTracksRepository,
     TopTracksRepositoryException,
 )
-from src.services.spotify_service import SpotifyService
-from src.pipelines.top_tracks_pipeline import (
-    TopTracksPipeline,
-    TopTracksPipelineException,
-)
+from src.services.music.spotify_service import SpotifyService
+from src.pipelines.top_tracks_pipeline import TopTracksPipeline
 
 TOP_TRACKS_DATA = {
     "items": [
@@ -1510,7 +1508,7 @@ async def spotify_service(httpx_mock) -> AsyncGenerator[SpotifyService, None]:
 
 @pytest.fixture
 def top_tracks_pipeline(
-    db_session: Session, spotify_service: SpotifyService
+    db_session: AsyncSession, spotify_service: SpotifyService
 ) -> TopTracksPipeline:
     artists_repository = ArtistsRepository(db_session)
     tracks_repository = TracksRepository(db_session)
@@ -1547,7 +1545,7 @@ async def test_top_tracks_pipeline_run_returns_expected_tracks(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_adds_tracks_to_db(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1563,7 +1561,7 @@ async def test_top_tracks_pipeline_run_adds_tracks_to_db(
         collection_date=collection_date,
     )
 
-    db_tracks = db_session.query(TrackDB).all()
+    db_tracks = (await db_session.scalars(select(TrackDB))).all()
     db_track_ids = {track.id for track in db_tracks}
     expected_track_ids = {track.id for track in EXPECTED_TRACKS}
     assert db_track_ids == expected_track_ids
@@ -1572,7 +1570,7 @@ async def test_top_tracks_pipeline_run_adds_tracks_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_adds_top_tracks_to_db(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1597,7 +1595,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db(
             position=track.position,
             position_change=track.position_change,
         )
-        for track in db_session.query(TopTrackDB).all()
+        for track in (await db_session.scalars(select(TopTrackDB))).all()
     ]
     expected_top_tracks = [
         TopTrack(
@@ -1616,7 +1614,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_position_changes(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1649,7 +1647,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_posit
             for track in tracks_to_add
         ]
     )
-    db_session.commit()
+    await db_session.commit()
     positions = [4, 1, 6, 4, 2, 6, 8, 9, 10]  # Previous positions of the tracks
     # Add previous top tracks with different positions
     top_tracks_to_add = [
@@ -1664,7 +1662,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_posit
         for index, track in enumerate(tracks_to_add)
     ]
     db_session.add_all(top_tracks_to_add)
-    db_session.commit()
+    await db_session.commit()
 
     await top_tracks_pipeline.run(
         access_token=access_token,
@@ -1673,7 +1671,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_posit
         collection_date=collection_date,
     )
 
-    db_session.commit()
+    await db_session.commit()
     top_tracks = [
         TopTrack(
             user_id=track.user_id,
@@ -1683,9 +1681,11 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_posit
             position=track.position,
             position_change=track.position_change,
         )
-        for track in db_session.query(TopTrackDB)
-        .where(TopTrackDB.collection_date == collection_date)
-        .all()
+        for track in (
+            await db_session.scalars(
+                select(TopTrackDB).where(TopTrackDB.collection_date == collection_date)
+            )
+        ).all()
     ]
     expected_top_tracks = [
         TopTrack(
@@ -1711,7 +1711,7 @@ async def test_top_tracks_pipeline_run_adds_top_tracks_to_db_with_expected_posit
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_updates_track_if_already_exists(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1733,7 +1733,7 @@ async def test_top_tracks_pipeline_run_updates_track_if_already_exists(
             popularity=existing_track.popularity,
         )
     )
-    db_session.commit()
+    await db_session.commit()
 
     await top_tracks_pipeline.run(
         access_token=access_token,
@@ -1742,7 +1742,7 @@ async def test_top_tracks_pipeline_run_updates_track_if_already_exists(
         collection_date=collection_date,
     )
 
-    db_track = db_session.get(TrackDB, existing_track.id)
+    db_track = await db_session.get(TrackDB, existing_track.id, populate_existing=True)
     assert db_track.id == existing_track.id
     assert db_track.name == existing_track.name
     assert db_track.images == [image.model_dump() for image in existing_track.images]
@@ -1756,8 +1756,8 @@ async def test_top_tracks_pipeline_run_updates_track_if_already_exists(
 
 @pytest.mark.integration
 @pytest.mark.asyncio
-async def test_top_tracks_pipeline_run_raises_exception_if_top_track_exists(
-    db_session: Session,
+async def test_top_tracks_pipeline_run_keeps_existing_top_track_when_rerun(
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1779,7 +1779,7 @@ async def test_top_tracks_pipeline_run_raises_exception_if_top_track_exists(
             popularity=existing_track.popularity,
         )
     )
-    db_session.commit()
+    await db_session.commit()
     db_session.add(
         TopTrackDB(
             user_id=existing_profile.id,
@@ -1790,21 +1790,28 @@ async def test_top_tracks_pipeline_run_raises_exception_if_top_track_exists(
             position_change=None,
         )
     )
-    db_session.commit()
+    await db_session.commit()
 
-    with pytest.raises(TopTracksPipelineException):
-        await top_tracks_pipeline.run(
-            access_token=access_token,
-            user_id=user_id,
-            time_range=time_range,
-            collection_date=collection_date,
-        )
+    # a redelivered run writes the rest without failing on what's already there
+    await top_tracks_pipeline.run(
+        access_token=access_token,
+        user_id=user_id,
+        time_range=time_range,
+        collection_date=collection_date,
+    )
+
+    await db_session.commit()
+    top_track_ids = [
+        top_track.track_id
+        for top_track in (await db_session.scalars(select(TopTrackDB))).all()
+    ]
+    assert sorted(top_track_ids) == sorted(track.id for track in EXPECTED_TRACKS)
 
 
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_adds_artists_to_db(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1820,7 +1827,7 @@ async def test_top_tracks_pipeline_run_adds_artists_to_db(
         collection_date=collection_date,
     )
 
-    db_artists = db_session.query(ArtistDB).all()
+    db_artists = (await db_session.scalars(select(ArtistDB))).all()
     db_artist_ids = {artist.id for artist in db_artists}
     expected_artist_ids = {artist.id for artist in EXPECTED_ARTISTS}
     assert db_artist_ids == expected_artist_ids
@@ -1829,7 +1836,7 @@ async def test_top_tracks_pipeline_run_adds_artists_to_db(
 @pytest.mark.integration
 @pytest.mark.asyncio
 async def test_top_tracks_pipeline_run_updates_artist_if_already_exists(
-    db_session: Session,
+    db_session: AsyncSession,
     top_tracks_pipeline: TopTracksPipeline,
     existing_profile: ProfileDB,
 ) -> None:
@@ -1849,7 +1856,7 @@ async def test_top_tracks_pipeline_run_updates_artist_if_already_exists(
             popularity=existing_artist.popularity,
         )
     )
-    db_session.commit()
+    await db_session.commit()
 
     await top_tracks_pipeline.run(
         access_token=access_token,
@@ -1858,7 +1865,9 @@ async def test_top_tracks_pipeline_run_updates_artist_if_already_exists(
         collection_date=collection_date,
     )
 
-    db_artist = db_session.get(ArtistDB, existing_artist.id)
+    db_artist = await db_session.get(
+        ArtistDB, existing_artist.id, populate_existing=True
+    )
     assert db_artist.id == existing_artist.id
     assert db_artist.name == existing_artist.name
     assert db_artist.images == [image.model_dump() for image in existing_artist.images]
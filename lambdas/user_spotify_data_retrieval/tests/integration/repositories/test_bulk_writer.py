@@ -0,0 +1,159 @@
+import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.db import ArtistDB, ProfileDB, TopArtistDB, TrackDB
+from src.models.enums import TimeRange
+from src.repositories.bulk_writer import COPY_THRESHOLD_ROWS, BulkWriter
+
+# a threshold of 1 sends every batch through COPY
+WRITE_PATHS = pytest.mark.parametrize(
+    "copy_threshold_rows", [COPY_THRESHOLD_ROWS, 1], ids=["multi-values", "copy"]
+)
+
+
+def _artist_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"artist{index}",
+            "name": f"Artist {index}",
+            "images": [
+                {"url": f"https://i.scdn.co/image/{index}", "height": 64, "width": 64}
+            ],
+            "spotify_url": f"https://open.spotify.com/artist/{index}",
+            "genres": ["rock"],
+            "followers": index,
+            "popularity": 50,
+        }
+        for index in range(count)
+    ]
+
+
+def _track_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"track{index:06d}",
+            "name": f"Track {index}",
+            "images": [],
+            "spotify_url": f"https://open.spotify.com/track/{index}",
+            "album_name": "Album",
+            "release_date": "2024-01-01",
+            "explicit": False,
+            "duration_ms": 180000,
+            "popularity": 50,
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.integration
+@WRITE_PATHS
+async def test_upsert_inserts_then_updates_with_the_last_duplicate(
+    db_session: AsyncSession, copy_threshold_rows: int
+):
+    """Test rows are inserted, then updated, with repeated keys written once"""
+    bulk_writer = BulkWriter(db_session, copy_threshold_rows=copy_threshold_rows)
+    rows = _artist_rows(3)
+    upsert_kwargs = {
+        "table_": ArtistDB.__table__,
+        "index_elements": ["id"],
+        "update_columns": ["name", "updated_at"],
+        "defaults": {"updated_at": func.now()},
+    }
+
+    await bulk_writer.upsert(rows=rows, **upsert_kwargs)
+    await bulk_writer.upsert(
+        rows=[{**rows[0], "name": "Renamed"}, {**rows[0], "name": "Renamed again"}],
+        **upsert_kwargs,
+    )
+    await db_session.commit()
+
+    artists = (await db_session.scalars(select(ArtistDB).order_by(ArtistDB.id))).all()
+    assert [artist.name for artist in artists] == [
+        "Renamed again",
+        "Artist 1",
+        "Artist 2",
+    ]
+    assert artists[1].images == rows[1]["images"]
+    assert artists[1].genres == ["rock"]
+    assert all(artist.updated_at is not None for artist in artists)
+
+
+@pytest.mark.integration
+@WRITE_PATHS
+async def test_upsert_binds_enums_and_leaves_existing_rows(
+    db_session: AsyncSession, existing_profile: ProfileDB, copy_threshold_rows: int
+):
+    """Test enum columns round trip and existing rows are kept without update columns"""
+    bulk_writer = BulkWriter(db_session, copy_threshold_rows=copy_threshold_rows)
+    await bulk_writer.upsert(
+        table_=ArtistDB.__table__, rows=_artist_rows(2), index_elements=["id"]
+    )
+    index_elements = ["artist_id", "user_id", "collection_date", "time_range"]
+
+    for position in [1, 2]:
+        await bulk_writer.upsert(
+            table_=TopArtistDB.__table__,
+            rows=[
+                {
+                    "artist_id": f"artist{index}",
+                    "user_id": existing_profile.id,
+                    "collection_date": datetime.date(2024, 1, 1),
+                    "time_range": TimeRange.SHORT_TERM,
+                    "position": position + index,
+                    "position_change": None,
+                }
+                for index in range(2)
+            ],
+            index_elements=index_elements,
+        )
+    await db_session.commit()
+
+    top_artists = (
+        await db_session.scalars(select(TopArtistDB).order_by(TopArtistDB.position))
+    ).all()
+    assert [
+        (top_artist.artist_id, top_artist.time_range, top_artist.position)
+        for top_artist in top_artists
+    ] == [
+        ("artist0", TimeRange.SHORT_TERM, 1),
+        ("artist1", TimeRange.SHORT_TERM, 2),
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "row_count, uses_copy",
+    [(COPY_THRESHOLD_ROWS - 1, False), (COPY_THRESHOLD_ROWS, True)],
+)
+async def test_batches_either_side_of_the_copy_threshold_are_all_written(
+    db_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+    row_count: int,
+    uses_copy: bool,
+):
+    """Test the default threshold switches to COPY and both paths write every row"""
+    bulk_writer = BulkWriter(db_session)
+    copy_calls = []
+    copy_and_merge = bulk_writer._copy_and_merge
+
+    async def record_copy_and_merge(**kwargs):
+        copy_calls.append(len(kwargs["rows"]))
+        await copy_and_merge(**kwargs)
+
+    monkeypatch.setattr(bulk_writer, "_copy_and_merge", record_copy_and_merge)
+
+    await bulk_writer.upsert(
+        table_=TrackDB.__table__,
+        rows=_track_rows(row_count),
+        index_elements=["id"],
+        update_columns=["name"],
+    )
+    await db_session.commit()
+
+    assert await db_session.scalar(select(func.count()).select_from(TrackDB)) == (
+        row_count
+    )
+    assert copy_calls == ([row_count] if uses_copy else [])
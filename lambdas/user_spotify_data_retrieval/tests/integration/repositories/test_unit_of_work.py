@@ -0,0 +1,171 @@
+import datetime
+
+import pytest
+import sqlalchemy.exc
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.db import RoundTripCounter
+from src.models.db import (
+    ArtistDB,
+    EmotionalProfileResultDB,
+    ProfileDB,
+    TrackLyricsFailureDB,
+    track_artist_association,
+)
+from src.models.domain import (
+    Artist,
+    EmotionalProfile,
+    EmotionalProfileConfig,
+    TopArtist,
+    Track,
+    TrackLyricsFailure,
+)
+from src.models.enums import LyricsFailureReason, TimeRange
+from src.models.shared import TrackArtist
+from src.repositories.artists_repository import ArtistsRepository
+from src.repositories.emotional_profile_results_repository import (
+    EmotionalProfileResultsRepository,
+)
+from src.repositories.top_items.top_artists_repository import TopArtistsRepository
+from src.repositories.track_lyrics_failures_repository import (
+    TrackLyricsFailuresRepository,
+)
+from src.repositories.tracks_repository import TracksRepository
+from src.repositories.unit_of_work import UnitOfWork, UnitOfWorkException
+
+
+def _artist(artist_id: str) -> Artist:
+    return Artist(
+        id=artist_id,
+        name="Artist",
+        images=[],
+        spotify_url=f"https://open.spotify.com/artist/{artist_id}",
+        genres=["rock"],
+        followers=1,
+        popularity=50,
+    )
+
+
+def _track(track_id: str, artist_id: str) -> Track:
+    return Track(
+        id=track_id,
+        name="Track",
+        images=[],
+        spotify_url=f"https://open.spotify.com/track/{track_id}",
+        album_name="Album",
+        release_date="2024-01-01",
+        explicit=False,
+        duration_ms=180000,
+        popularity=50,
+        artists=[TrackArtist(id=artist_id, name="Artist")],
+    )
+
+
+@pytest.mark.integration
+async def test_flush_writes_every_queued_table_in_one_round_trip(
+    db_session: AsyncSession,
+):
+    """Test upserts and queued statements land in the database, parents first"""
+    unit_of_work = UnitOfWork(db_session)
+    failures_repository = TrackLyricsFailuresRepository(
+        db_session, unit_of_work=unit_of_work
+    )
+    results_repository = EmotionalProfileResultsRepository(
+        db_session, unit_of_work=unit_of_work
+    )
+
+    # queued children first, flush still has to write their parents before them
+    await TracksRepository(db_session, unit_of_work=unit_of_work).upsert_many(
+        [_track("t1", "a1"), _track("t2", "a1")]
+    )
+    await failures_repository.record_many(
+        [
+            TrackLyricsFailure(track_id="t1", reason=LyricsFailureReason.NOT_FOUND),
+            TrackLyricsFailure(track_id="t2", reason=LyricsFailureReason.NOT_FOUND),
+        ]
+    )
+    await failures_repository.delete_many({"t2"})
+    await results_repository.add_many(
+        "config",
+        {
+            "content": EmotionalProfile(
+                **dict.fromkeys(EmotionalProfile.model_fields, 0.5)
+            )
+        },
+    )
+    await results_repository.add_config(
+        "config",
+        EmotionalProfileConfig(
+            model_name="model", temperature=0.0, top_p=1.0, prompt="prompt"
+        ),
+    )
+    await ArtistsRepository(db_session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1")]
+    )
+
+    with RoundTripCounter().track() as round_trips:
+        await unit_of_work.flush()
+    await db_session.commit()
+
+    assert round_trips.count == 1
+    assert (await db_session.scalars(select(ArtistDB.id))).all() == ["a1"]
+    assert sorted(
+        (await db_session.scalars(select(track_artist_association.c.track_id))).all()
+    ) == [
+        "t1",
+        "t2",
+    ]
+    failures = (await db_session.scalars(select(TrackLyricsFailureDB))).all()
+    assert [(failure.track_id, failure.attempts) for failure in failures] == [("t1", 1)]
+    assert (
+        await db_session.scalars(select(EmotionalProfileResultDB.content_key))
+    ).all() == ["content"]
+
+
+@pytest.mark.integration
+async def test_flush_raises_unit_of_work_exception_for_a_missing_parent(
+    db_session: AsyncSession, existing_profile: ProfileDB
+):
+    """Test a failed pipelined write is raised with the IntegrityError behind it"""
+    unit_of_work = UnitOfWork(db_session)
+    await TopArtistsRepository(db_session, unit_of_work=unit_of_work).add_many(
+        [
+            TopArtist(
+                user_id=existing_profile.id,
+                artist_id="missing",
+                collection_date=datetime.date(2024, 1, 1),
+                time_range=TimeRange.SHORT_TERM,
+                position=1,
+            )
+        ]
+    )
+
+    with pytest.raises(UnitOfWorkException) as exc_info:
+        await unit_of_work.flush()
+
+    assert isinstance(exc_info.value.__cause__, sqlalchemy.exc.IntegrityError)
+
+
+@pytest.mark.integration
+async def test_flush_copies_tables_over_the_threshold(db_session: AsyncSession):
+    """Test a large table goes through COPY while its children are pipelined after it"""
+    unit_of_work = UnitOfWork(db_session, copy_threshold_rows=2)
+
+    await TracksRepository(db_session, unit_of_work=unit_of_work).upsert_many(
+        [_track("t1", "a1"), _track("t2", "a2")]
+    )
+    await ArtistsRepository(db_session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1"), _artist("a2"), _artist("a3")]
+    )
+    await unit_of_work.flush()
+    await db_session.commit()
+
+    assert sorted((await db_session.scalars(select(ArtistDB.id))).all()) == [
+        "a1",
+        "a2",
+        "a3",
+    ]
+    assert sorted(
+        (await db_session.scalars(select(track_artist_association.c.artist_id))).all()
+    ) == ["a1", "a2"]
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncGenerator, Generator
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.models.enums import LyricsFailureReason
+from src.services.lyrics.lyrics_extractor import BeautifulSoupLyricsExtractor
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+from src.services.lyrics.lyrics_scraper import LyricsScraper, LyricsScraperException
+
+LYRICS_HTML = (
+    "<html><body><div data-lyrics-container='true'>"
+    "Line one<br/>Line two</div></body></html>"
+)
+
+
+class MockLyricsServer(ThreadingHTTPServer):
+    """Local lyrics site stand-in that plays queued error responses before succeeding"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockLyricsHandler)
+        self.queued_responses: deque[tuple[int, dict[str, str]]] = deque()
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.response_delay = 0.0
+        self.page = LYRICS_HTML
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockLyricsHandler(BaseHTTPRequestHandler):
+    server: MockLyricsServer
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+            queued = (
+                self.server.queued_responses.popleft()
+                if self.server.queued_responses
+                else None
+            )
+
+        time.sleep(self.server.response_delay)
+
+        status_code, headers = queued or (200, {})
+        body = self.server.page.encode() if status_code == 200 else b"error"
+
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # streamed requests hang up once they have the lyrics
+
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server() -> Generator[MockLyricsServer, None, None]:
+    server = MockLyricsServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+def _lyrics_scraper(
+    client: httpx.AsyncClient,
+    base_url: str,
+    pacer: AdaptivePacer,
+    max_concurrent_scrapes: int = 5,
+    streaming: bool = False,
+) -> LyricsScraper:
+    return LyricsScraper(
+        client=client,
+        base_url=base_url,
+        headers={"User-Agent": "test"},
+        semaphore=asyncio.Semaphore(max_concurrent_scrapes),
+        pacer=pacer,
+        streaming=streaming,
+    )
+
+
+@pytest.mark.integration
+async def test_throttled_request_slows_pacer_and_retries(mock_server, client):
+    """Test a 429 halves the pacing rate and the request is retried"""
+    mock_server.queued_responses.append((429, {"Retry-After": "0.2"}))
+    pacer = AdaptivePacer(rate=10, min_rate=1, max_rate=10)
+    lyrics_scraper = _lyrics_scraper(client, mock_server.base_url, pacer)
+
+    start = time.monotonic()
+    lyrics = await lyrics_scraper.get_lyrics("Artist", "Song")
+    elapsed = time.monotonic() - start
+
+    assert lyrics == "Line one<br/>Line two"
+    assert mock_server.request_count == 2
+    assert elapsed >= 0.2
+    assert pacer.metrics.throttled_responses == 1
+    # halved on the 429, then nudged back up by the successful retry
+    assert pacer.rate == pytest.approx(5 + pacer.increase_step)
+
+
+@pytest.mark.integration
+async def test_persistent_throttling_is_a_transient_failure(mock_server, client):
+    """Test a request still throttled after retries isn't cached as a failure"""
+    mock_server.queued_responses.extend([(503, {})] * 3)
+    pacer = AdaptivePacer(
+        rate=100, min_rate=1, max_rate=100, decrease_cooldown_seconds=0
+    )
+    lyrics_scraper = _lyrics_scraper(client, mock_server.base_url, pacer)
+
+    with pytest.raises(LyricsScraperException) as exc_info:
+        await lyrics_scraper.get_lyrics("Artist", "Song")
+
+    assert exc_info.value.reason is None
+    assert mock_server.request_count == 3
+    assert pacer.rate == 12.5
+
+
+@pytest.mark.integration
+async def test_missing_page_is_not_retried(mock_server, client):
+    """Test a 404 fails straight away with a cacheable reason"""
+    mock_server.queued_responses.append((404, {}))
+    pacer = AdaptivePacer(rate=100, min_rate=1, max_rate=100)
+    lyrics_scraper = _lyrics_scraper(client, mock_server.base_url, pacer)
+
+    with pytest.raises(LyricsScraperException) as exc_info:
+        await lyrics_scraper.get_lyrics("Artist", "Song")
+
+    assert exc_info.value.reason == LyricsFailureReason.NOT_FOUND
+    assert mock_server.request_count == 1
+
+
+@pytest.mark.integration
+async def test_pacing_does_not_hold_concurrency_slots(mock_server, client):
+    """Test slow responses overlap up to the concurrency limit while paced"""
+    mock_server.response_delay = 0.2
+    pacer = AdaptivePacer(rate=50, min_rate=1, max_rate=50)
+    lyrics_scraper = _lyrics_scraper(
+        client, mock_server.base_url, pacer, max_concurrent_scrapes=4
+    )
+
+    await asyncio.gather(
+        *[lyrics_scraper.get_lyrics("Artist", f"Song {index}") for index in range(8)]
+    )
+
+    assert mock_server.max_in_flight == 4
+
+
+@pytest.mark.integration
+async def test_streamed_fetch_matches_full_fetch(mock_server, client):
+    """Test streaming stops early on a large page and still gets all the lyrics"""
+    mock_server.page = (
+        "<html><body><div id='lyrics-root'>"
+        "<div data-lyrics-container='true'>First<br/><i>section</i></div>"
+        "<div class='Ad'></div>"
+        "<div data-lyrics-container='true'>Second section</div>"
+        "</div>"
+        + "<div class='Recommendation'>Other song</div>" * 20000
+        + "</body></html>"
+    )
+    pacer = AdaptivePacer(rate=100, min_rate=1, max_rate=100)
+
+    full_lyrics = await _lyrics_scraper(client, mock_server.base_url, pacer).get_lyrics(
+        "Artist", "Song"
+    )
+    streamed_lyrics = await _lyrics_scraper(
+        client, mock_server.base_url, pacer, streaming=True
+    ).get_lyrics("Artist", "Song")
+
+    assert (
+        streamed_lyrics == full_lyrics == "First<br/><i>section</i><br/>Second section"
+    )
+
+
+@pytest.mark.integration
+async def test_streaming_rejects_extractors_it_cant_honour(client):
+    """Test streaming with an extractor other than the scanner fails instead of ignoring it"""
+    with pytest.raises(LyricsScraperException):
+        LyricsScraper(
+            client=client,
+            base_url="http://lyrics",
+            headers={"User-Agent": "test"},
+            semaphore=asyncio.Semaphore(1),
+            pacer=AdaptivePacer(rate=10, min_rate=1, max_rate=10),
+            extractor=BeautifulSoupLyricsExtractor(),
+            streaming=True,
+        )
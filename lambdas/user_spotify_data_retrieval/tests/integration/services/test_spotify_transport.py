@@ -0,0 +1,234 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncGenerator, Generator
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.services.music.spotify_service import SpotifyService, SpotifyServiceException
+from src.services.music.spotify_transport import SpotifyTransport, TokenBucket
+
+PROFILE_DATA = {
+    "display_name": "First",
+    "external_urls": {"spotify": "https://open.spotify.com/user/123"},
+    "followers": {"href": None, "total": 10},
+    "id": "123",
+    "images": [],
+}
+
+
+def _artist_data(artist_id: str) -> dict:
+    return {
+        "id": artist_id,
+        "name": f"Artist {artist_id}",
+        "images": [],
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "genres": [],
+        "followers": {"total": 0},
+        "popularity": 0,
+    }
+
+
+class MockSpotifyServer(ThreadingHTTPServer):
+    """Local Spotify stand-in that plays queued error responses before succeeding"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockSpotifyHandler)
+        self.queued_responses: deque[tuple[int, dict[str, str]]] = deque()
+        self.request_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.response_delay = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockSpotifyHandler(BaseHTTPRequestHandler):
+    server: MockSpotifyServer
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+            queued = (
+                self.server.queued_responses.popleft()
+                if self.server.queued_responses
+                else None
+            )
+
+        time.sleep(self.server.response_delay)
+
+        if queued:
+            status_code, headers = queued
+            body = b"{}"
+        else:
+            status_code, headers = 200, {}
+            if self.path.startswith("/artists"):
+                ids = self.path.split("ids=")[1].split("%2C")
+                data = {"artists": [_artist_data(artist_id) for artist_id in ids]}
+            else:
+                data = PROFILE_DATA
+            body = json.dumps(data).encode()
+
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server() -> Generator[MockSpotifyServer, None, None]:
+    server = MockSpotifyServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+def _spotify_service(
+    client: httpx.AsyncClient, base_url: str, **transport_kwargs
+) -> SpotifyService:
+    transport = SpotifyTransport(
+        client=client, backoff_base_seconds=0.01, **transport_kwargs
+    )
+    return SpotifyService(client=client, base_url=base_url, transport=transport)
+
+
+@pytest.mark.integration
+async def test_retries_429_after_retry_after_delay(mock_server, client):
+    """Test throttled requests wait for Retry-After and then succeed"""
+    mock_server.queued_responses.extend([(429, {"Retry-After": "0.2"})] * 2)
+    spotify_service = _spotify_service(client, mock_server.base_url)
+
+    start = time.monotonic()
+    profile = await spotify_service.get_user_profile("access_token")
+    elapsed = time.monotonic() - start
+
+    assert profile.id == "123"
+    assert mock_server.request_count == 3
+    assert elapsed >= 0.4
+    metrics = spotify_service.transport.metrics
+    assert metrics.throttled_responses == 2
+    assert metrics.retries == 2
+    assert metrics.retry_wait_seconds >= 0.4
+
+
+@pytest.mark.integration
+async def test_retry_after_pauses_shared_token_bucket(mock_server, client):
+    """Test a 429 on one request holds back other requests sharing the bucket"""
+    mock_server.queued_responses.append((429, {"Retry-After": "0.3"}))
+    spotify_service = _spotify_service(
+        client, mock_server.base_url, rate_limiter=TokenBucket(rate=100, capacity=100)
+    )
+
+    start = time.monotonic()
+    throttled_request = asyncio.create_task(
+        spotify_service.get_user_profile("access_token")
+    )
+    await asyncio.sleep(0.1)
+    await spotify_service.get_artists_by_ids("access_token", ["artist1"])
+    elapsed = time.monotonic() - start
+    await throttled_request
+
+    assert elapsed >= 0.3
+    assert spotify_service.transport.metrics.token_wait_seconds >= 0.15
+
+
+@pytest.mark.integration
+async def test_retries_server_errors_with_backoff(mock_server, client):
+    """Test 5xx responses are retried"""
+    mock_server.queued_responses.extend([(503, {}), (502, {})])
+    spotify_service = _spotify_service(client, mock_server.base_url)
+
+    profile = await spotify_service.get_user_profile("access_token")
+
+    assert profile.id == "123"
+    assert mock_server.request_count == 3
+    assert spotify_service.transport.metrics.throttled_responses == 0
+
+
+@pytest.mark.integration
+async def test_raises_once_retries_are_exhausted(mock_server, client):
+    """Test persistent throttling fails after a bounded number of attempts"""
+    mock_server.queued_responses.extend([(429, {"Retry-After": "0"})] * 10)
+    spotify_service = _spotify_service(client, mock_server.base_url, max_retries=2)
+
+    with pytest.raises(SpotifyServiceException):
+        await spotify_service.get_user_profile("access_token")
+
+    assert mock_server.request_count == 3
+
+
+@pytest.mark.integration
+async def test_does_not_wait_for_retry_after_longer_than_limit(mock_server, client):
+    """Test a Retry-After longer than the limit fails fast instead of sleeping"""
+    mock_server.queued_responses.append((429, {"Retry-After": "120"}))
+    spotify_service = _spotify_service(
+        client, mock_server.base_url, max_retry_after_seconds=1
+    )
+
+    with pytest.raises(SpotifyServiceException):
+        await spotify_service.get_user_profile("access_token")
+
+    assert mock_server.request_count == 1
+
+
+@pytest.mark.integration
+async def test_limits_concurrent_requests_per_endpoint(mock_server, client):
+    """Test batched artist requests are capped per endpoint"""
+    mock_server.response_delay = 0.05
+    spotify_service = _spotify_service(
+        client, mock_server.base_url, max_concurrent_requests_per_endpoint=2
+    )
+    artist_ids = [f"artist{index}" for index in range(SpotifyService.BATCH_SIZE * 6)]
+
+    artists = await spotify_service.get_artists_by_ids("access_token", artist_ids)
+
+    assert len(artists) == len(artist_ids)
+    assert mock_server.request_count == 6
+    assert mock_server.max_in_flight == 2
+
+
+@pytest.mark.integration
+async def test_token_bucket_limits_request_rate(mock_server, client):
+    """Test the token bucket spaces requests out once the burst is used up"""
+    spotify_service = _spotify_service(
+        client, mock_server.base_url, rate_limiter=TokenBucket(rate=20, capacity=2)
+    )
+
+    start = time.monotonic()
+    await asyncio.gather(
+        *[spotify_service.get_user_profile("access_token") for _ in range(6)]
+    )
+    elapsed = time.monotonic() - start
+
+    # 2 requests from the burst, then 4 more at 20/s
+    assert elapsed >= 0.18
+    assert spotify_service.transport.metrics.token_wait_seconds > 0
@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.models.domain import Artist
+from src.services.music.artist_registry import ArtistRegistry
+
+
+def _artist(artist_id: str) -> Artist:
+    return Artist(
+        id=artist_id,
+        name=f"Artist {artist_id}",
+        images=[],
+        spotify_url=f"https://open.spotify.com/artist/{artist_id}",
+        genres=[],
+        followers=0,
+        popularity=0,
+    )
+
+
+async def _fetch(artist_ids: list[str]) -> list[Artist]:
+    return [_artist(artist_id) for artist_id in artist_ids]
+
+
+async def test_get_many_only_fetches_artists_not_registered_as_top_artists():
+    """Test artists already returned by the top artists branch are not refetched"""
+    registry = ArtistRegistry()
+    registry.register_top_artists([_artist("a1"), _artist("a2")])
+    fetch_artists = AsyncMock(side_effect=_fetch)
+
+    artists = await registry.get_many(["a1", "a2", "a3"], fetch_artists)
+
+    fetch_artists.assert_awaited_once_with(["a3"])
+    assert [artist.id for artist in artists] == ["a1", "a2", "a3"]
+
+
+async def test_get_many_waits_for_top_artists():
+    """Test the tracks branch waits for top artists before fetching"""
+    registry = ArtistRegistry(expect_top_artists=True)
+    fetch_artists = AsyncMock(side_effect=_fetch)
+
+    task = asyncio.create_task(registry.get_many(["a1", "a2"], fetch_artists))
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    registry.register_top_artists([_artist("a1")])
+    artists = await task
+
+    fetch_artists.assert_awaited_once_with(["a2"])
+    assert [artist.id for artist in artists] == ["a1", "a2"]
+
+
+async def test_close_stops_waiting_for_top_artists():
+    """Test a failed top artists branch doesn't block the tracks branch"""
+    registry = ArtistRegistry(expect_top_artists=True)
+    fetch_artists = AsyncMock(side_effect=_fetch)
+
+    registry.close()
+    artists = await registry.get_many(["a1"], fetch_artists)
+
+    fetch_artists.assert_awaited_once_with(["a1"])
+    assert [artist.id for artist in artists] == ["a1"]
+
+
+async def test_concurrent_get_many_shares_in_flight_fetches():
+    """Test an artist being fetched by one caller is awaited, not refetched, by another"""
+    registry = ArtistRegistry()
+    fetch_artists = AsyncMock(side_effect=_fetch)
+
+    first, second = await asyncio.gather(
+        registry.get_many(["a1", "a2"], fetch_artists),
+        registry.get_many(["a2", "a3"], fetch_artists),
+    )
+
+    assert fetch_artists.await_args_list[0].args == (["a1", "a2"],)
+    assert fetch_artists.await_args_list[1].args == (["a3"],)
+    assert [artist.id for artist in first] == ["a1", "a2"]
+    assert [artist.id for artist in second] == ["a2", "a3"]
+
+
+async def test_get_many_failure_lets_later_callers_retry():
+    """Test a failed fetch is not cached"""
+    registry = ArtistRegistry()
+    fetch_artists = AsyncMock(side_effect=[RuntimeError("boom"), [_artist("a1")]])
+
+    with pytest.raises(RuntimeError):
+        await registry.get_many(["a1"], fetch_artists)
+    artists = await registry.get_many(["a1"], fetch_artists)
+
+    assert [artist.id for artist in artists] == ["a1"]
+
+
+async def test_claim_unstored_returns_each_artist_once():
+    """Test each artist is claimed for storage once per run"""
+    registry = ArtistRegistry()
+
+    top_artists_to_store = registry.register_top_artists([_artist("a1"), _artist("a1")])
+    track_artists_to_store = registry.claim_unstored([_artist("a1"), _artist("a2")])
+
+    assert [artist.id for artist in top_artists_to_store] == ["a1"]
+    assert [artist.id for artist in track_artists_to_store] == ["a2"]
+    assert registry.claim_unstored([_artist("a2")]) == []
@@ -0,0 +1,212 @@
+import json
+
+import pytest
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from src.models.domain import EmotionalProfile, TrackEmotionalProfileRequest
+from src.services.emotional_profiles.batch_model_service import BatchModelService
+from src.services.emotional_profiles.model_service import ModelServiceException
+
+EMOTIONS = list(EmotionalProfile.model_fields)
+
+
+def _profile(emotion: str) -> dict[str, float]:
+    return {name: 1.0 if name == emotion else 0.0 for name in EMOTIONS}
+
+
+class FakeModel:
+    """Local stand-in for the LLM that answers batches from the prompt.
+
+    Lyrics are the name of the emotion to score 1. Tracks listed in
+    `invalid_track_ids` get an out of range score and tracks in
+    `skipped_track_ids` are left out of the answer. Batches listed in
+    `failing_batches` raise as if the model's quota ran out.
+    """
+
+    def __init__(
+        self,
+        invalid_track_ids: set[str] | None = None,
+        skipped_track_ids: set[str] | None = None,
+        failing_batches: list[list[str]] | None = None,
+    ):
+        self.invalid_track_ids = invalid_track_ids or set()
+        self.skipped_track_ids = skipped_track_ids or set()
+        self.failing_batches = failing_batches or []
+        self.batches: list[list[str]] = []
+
+    def __call__(self, messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        # only the first prompt, validation retries keep answering the same batch
+        prompt = next(
+            part.content
+            for message in messages
+            for part in message.parts
+            if isinstance(part, UserPromptPart)
+        )
+        songs = json.loads(prompt)
+
+        if len(messages) == 1:
+            self.batches.append([song["track_id"] for song in songs])
+
+        if [song["track_id"] for song in songs] in self.failing_batches:
+            raise RuntimeError("quota exceeded")
+
+        profiles = []
+        for song in songs:
+            if song["track_id"] in self.skipped_track_ids:
+                continue
+
+            profile = _profile(song["lyrics"])
+            if song["track_id"] in self.invalid_track_ids:
+                profile["joy"] = 2.0
+
+            profiles.append(
+                {"track_id": song["track_id"], "emotional_profile": profile}
+            )
+
+        return ModelResponse(
+            parts=[ToolCallPart(info.output_tools[0].name, {"profiles": profiles})]
+        )
+
+
+def _batch_model_service(
+    fake_model: FakeModel,
+    max_batch_input_tokens: int = 1000,
+    max_batch_size: int = 10,
+) -> BatchModelService:
+    return BatchModelService(
+        api_key="key",
+        model_name="fake",
+        temperature=0.0,
+        max_tokens=100,
+        top_p=1.0,
+        instructions="instructions",
+        max_batch_input_tokens=max_batch_input_tokens,
+        max_batch_size=max_batch_size,
+        model=FunctionModel(fake_model),
+    )
+
+
+def _requests(count: int, lyrics: str = "joy") -> list[TrackEmotionalProfileRequest]:
+    return [
+        TrackEmotionalProfileRequest(track_id=f"track{index}", lyrics=lyrics)
+        for index in range(count)
+    ]
+
+
+async def test_scores_many_tracks_in_one_call():
+    """Test a batch that fits the budget is sent as a single request"""
+    fake_model = FakeModel()
+    batch_model_service = _batch_model_service(fake_model)
+    requests = [
+        TrackEmotionalProfileRequest(track_id="happy", lyrics="joy"),
+        TrackEmotionalProfileRequest(track_id="sad", lyrics="sadness"),
+    ]
+
+    profiles = await batch_model_service.get_emotional_profiles(requests)
+
+    assert fake_model.batches == [["happy", "sad"]]
+    assert {profile.track_id: profile.emotional_profile for profile in profiles} == {
+        "happy": EmotionalProfile(**_profile("joy")),
+        "sad": EmotionalProfile(**_profile("sadness")),
+    }
+
+
+async def test_batches_are_sized_by_token_budget():
+    """Test requests are split once the input token estimate is exceeded"""
+    fake_model = FakeModel()
+    # each request is about 20 tokens of overhead plus its lyrics
+    batch_model_service = _batch_model_service(fake_model, max_batch_input_tokens=50)
+
+    profiles = await batch_model_service.get_emotional_profiles(_requests(5))
+
+    assert len(profiles) == 5
+    assert sorted(len(batch) for batch in fake_model.batches) == [1, 2, 2]
+
+
+async def test_batches_are_capped_at_max_size():
+    """Test no batch holds more requests than the max batch size"""
+    fake_model = FakeModel()
+    batch_model_service = _batch_model_service(fake_model, max_batch_size=3)
+
+    await batch_model_service.get_emotional_profiles(_requests(7))
+
+    assert sorted(len(batch) for batch in fake_model.batches) == [1, 3, 3]
+
+
+async def test_invalid_batch_is_bisected_to_isolate_bad_track():
+    """Test one invalid profile only loses that track"""
+    fake_model = FakeModel(invalid_track_ids={"track2"})
+    batch_model_service = _batch_model_service(fake_model)
+
+    profiles = await batch_model_service.get_emotional_profiles(_requests(4))
+
+    assert sorted(profile.track_id for profile in profiles) == [
+        "track0",
+        "track1",
+        "track3",
+    ]
+    assert fake_model.batches == [
+        ["track0", "track1", "track2", "track3"],
+        ["track0", "track1"],
+        ["track2", "track3"],
+        ["track2"],
+        ["track3"],
+    ]
+
+
+async def test_failed_half_of_split_batch_keeps_the_other_half():
+    """Test an error in one half of a split batch doesn't lose the other half's profiles"""
+    fake_model = FakeModel(
+        invalid_track_ids={"track0"}, failing_batches=[["track2", "track3"]]
+    )
+    batch_model_service = _batch_model_service(fake_model)
+
+    profiles = await batch_model_service.get_emotional_profiles(_requests(4))
+
+    assert [profile.track_id for profile in profiles] == ["track1"]
+
+
+async def test_split_batch_raises_when_both_halves_fail():
+    """Test a split batch with nothing to keep raises for the caller to handle"""
+    fake_model = FakeModel(
+        invalid_track_ids={"track0"},
+        failing_batches=[["track0"], ["track1"]],
+    )
+    batch_model_service = _batch_model_service(fake_model)
+
+    with pytest.raises(RuntimeError):
+        await batch_model_service._get_batch_profiles(_requests(2))
+
+
+async def test_missing_tracks_are_retried():
+    """Test tracks the model skipped are asked for again on their own"""
+    fake_model = FakeModel(skipped_track_ids={"track1"})
+    batch_model_service = _batch_model_service(fake_model)
+
+    profiles = await batch_model_service.get_emotional_profiles(_requests(3))
+
+    assert sorted(profile.track_id for profile in profiles) == ["track0", "track2"]
+    assert fake_model.batches == [["track0", "track1", "track2"], ["track1"]]
+
+
+async def test_get_emotional_profile_scores_single_lyrics():
+    """Test the single track interface still works through a batch of one"""
+    batch_model_service = _batch_model_service(FakeModel())
+
+    profile = await batch_model_service.get_emotional_profile("love")
+
+    assert profile == EmotionalProfile(**_profile("love"))
+
+
+async def test_get_emotional_profile_raises_when_invalid():
+    """Test a single invalid profile raises rather than returning nothing"""
+    batch_model_service = _batch_model_service(FakeModel(invalid_track_ids={"track"}))
+
+    with pytest.raises(ModelServiceException):
+        await batch_model_service.get_emotional_profile("love")
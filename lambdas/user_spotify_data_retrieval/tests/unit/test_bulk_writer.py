@@ -0,0 +1,184 @@
+import datetime
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql.psycopg import PGDialectAsync_psycopg
+from sqlalchemy.sql import ClauseElement
+
+from src.models.db import ArtistDB, TopArtistDB
+from src.models.enums import TimeRange
+from src.repositories.bulk_writer import BulkWriter
+
+
+class FakeCopy:
+    def __init__(self, copied_rows: list[list]):
+        self.copied_rows = copied_rows
+
+    async def __aenter__(self) -> "FakeCopy":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def write_row(self, row: list) -> None:
+        self.copied_rows.append(row)
+
+
+class FakeDriverConnection:
+    """Stand-in for the psycopg connection that records COPY commands and rows"""
+
+    def __init__(self):
+        self.copy_commands: list[str] = []
+        self.copied_rows: list[list] = []
+
+    def cursor(self) -> "FakeDriverConnection":
+        return self
+
+    async def __aenter__(self) -> "FakeDriverConnection":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    def copy(self, command: str) -> FakeCopy:
+        self.copy_commands.append(command)
+        return FakeCopy(self.copied_rows)
+
+
+class FakeSession:
+    """Records each statement as the SQL and parameters Postgres would get"""
+
+    def __init__(self):
+        self.dialect = PGDialectAsync_psycopg(
+            dbapi=PGDialectAsync_psycopg.import_dbapi()
+        )
+        self.driver_connection = FakeDriverConnection()
+        self.statements: list[tuple[str, dict]] = []
+
+    def get_bind(self) -> "FakeSession":
+        return self
+
+    async def execute(self, statement: ClauseElement) -> None:
+        compiled = statement.compile(dialect=self.dialect)
+        self.statements.append((str(compiled), compiled.params))
+
+    async def connection(self) -> "FakeSession":
+        return self
+
+    async def get_raw_connection(self) -> "FakeSession":
+        return self
+
+
+def _artist_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"artist{index}",
+            "name": f"Artist {index}",
+            "images": [],
+            "spotify_url": f"https://open.spotify.com/artist/{index}",
+            "genres": ["rock"],
+            "followers": index,
+            "popularity": 50,
+        }
+        for index in range(count)
+    ]
+
+
+async def test_small_batch_is_one_multi_values_upsert():
+    """Test rows under the threshold are written in a single INSERT ... ON CONFLICT"""
+    session = FakeSession()
+
+    await BulkWriter(session).upsert(
+        table_=ArtistDB.__table__,
+        rows=_artist_rows(3),
+        index_elements=["id"],
+        update_columns=["name", "updated_at"],
+        defaults={"updated_at": func.now()},
+    )
+
+    [(sql, params)] = session.statements
+    assert sql.startswith("INSERT INTO artist")
+    assert sql.count("now()") == 3
+    assert "ON CONFLICT (id) DO UPDATE SET name = excluded.name" in sql
+    assert params["id_m2"] == "artist2"
+    assert session.driver_connection.copy_commands == []
+
+
+async def test_rows_sharing_a_conflict_key_are_written_once():
+    """Test a batch repeating a row keeps the last version, as ON CONFLICT can't update it twice"""
+    session = FakeSession()
+    rows = _artist_rows(2)
+    rows.append({**rows[0], "name": "Renamed"})
+
+    await BulkWriter(session).upsert(
+        table_=ArtistDB.__table__,
+        rows=rows,
+        index_elements=["id"],
+        update_columns=["name"],
+    )
+
+    [(_, params)] = session.statements
+    assert (params["id_m0"], params["name_m0"]) == ("artist0", "Renamed")
+    assert params["id_m1"] == "artist1"
+    assert "id_m2" not in params
+
+
+async def test_multi_values_batches_stay_under_the_bind_parameter_limit():
+    """Test a batch too big for one statement's parameters is split"""
+    session = FakeSession()
+
+    # 7 parameters per row, so 9362 rows fit in one statement
+    await BulkWriter(session, copy_threshold_rows=20_000).upsert(
+        table_=ArtistDB.__table__, rows=_artist_rows(10_000), index_elements=["id"]
+    )
+
+    assert [len(params) for _, params in session.statements] == [65534, 4466]
+    assert all("ON CONFLICT (id) DO NOTHING" in sql for sql, _ in session.statements)
+
+
+async def test_large_batch_is_copied_into_staging_and_merged():
+    """Test rows over the threshold are streamed with COPY then merged in one statement"""
+    session = FakeSession()
+    rows = [
+        {
+            "artist_id": f"artist{index}",
+            "user_id": "user",
+            "collection_date": datetime.date(2024, 1, 1),
+            "time_range": TimeRange.SHORT_TERM,
+            "position": index + 1,
+            "position_change": None,
+        }
+        for index in range(2)
+    ]
+
+    await BulkWriter(session, copy_threshold_rows=2).upsert(
+        table_=TopArtistDB.__table__,
+        rows=rows,
+        index_elements=["artist_id", "user_id", "collection_date", "time_range"],
+    )
+
+    create_sql, merge_sql, drop_sql = [sql for sql, _ in session.statements]
+    staging_name = create_sql.split()[3]
+    assert create_sql == (
+        f"CREATE TEMP TABLE {staging_name} ON COMMIT DROP AS SELECT artist_id, "
+        "user_id, collection_date, time_range, position, position_change "
+        "FROM top_artist WITH NO DATA"
+    )
+    assert session.driver_connection.copy_commands == [
+        f"COPY {staging_name} (artist_id, user_id, collection_date, time_range, "
+        "position, position_change) FROM STDIN"
+    ]
+    # enums are copied the way SQLAlchemy binds them
+    assert session.driver_connection.copied_rows[0] == [
+        "artist0",
+        "user",
+        datetime.date(2024, 1, 1),
+        "SHORT_TERM",
+        1,
+        None,
+    ]
+    assert merge_sql.startswith("INSERT INTO top_artist")
+    assert f"FROM {staging_name} ORDER BY {staging_name}.artist_id" in merge_sql
+    assert merge_sql.endswith(
+        "ON CONFLICT (artist_id, user_id, collection_date, time_range) DO NOTHING"
+    )
+    assert drop_sql == f"DROP TABLE {staging_name}"
@@ -0,0 +1,121 @@
+from unittest.mock import AsyncMock
+
+from src.models.domain import (
+    EmotionalProfile,
+    EmotionalProfileConfig,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.cached_calculator import (
+    CachedEmotionalProfileCalculator,
+    get_config_key,
+    get_content_key,
+    normalize_lyrics,
+)
+from src.services.emotional_profiles.model_service import EmotionalProfileCalculator
+
+EMOTIONAL_PROFILE = EmotionalProfile(
+    **{name: 0.0 for name in EmotionalProfile.model_fields} | {"joy": 1.0}
+)
+CONFIG = EmotionalProfileConfig(
+    model_name="model", temperature=0.0, top_p=1.0, prompt="prompt"
+)
+
+
+class CountingCalculator(EmotionalProfileCalculator):
+    def __init__(self):
+        self.requests: list[TrackEmotionalProfileRequest] = []
+
+    async def get_emotional_profile(self, lyrics: str) -> EmotionalProfile:
+        return EMOTIONAL_PROFILE
+
+    async def get_emotional_profiles(
+        self, requests: list[TrackEmotionalProfileRequest]
+    ) -> list[TrackEmotionalProfile]:
+        self.requests.extend(requests)
+        return await super().get_emotional_profiles(requests)
+
+
+def _cached_calculator(
+    cached_results: dict[str, EmotionalProfile] | None = None,
+) -> CachedEmotionalProfileCalculator:
+    results_repository = AsyncMock()
+    results_repository.get_many.return_value = dict(cached_results or {})
+
+    return CachedEmotionalProfileCalculator(
+        calculator=CountingCalculator(),
+        results_repository=results_repository,
+        config=CONFIG,
+    )
+
+
+def test_normalize_lyrics_ignores_formatting():
+    """Test markup, section labels, case and spacing don't change the content"""
+    assert normalize_lyrics(
+        "[Chorus]<br/><i>Hello</i>  World<br><br/>It&#x27;s  me"
+    ) == normalize_lyrics("hello world\n\nit's me")
+
+
+def test_config_changes_give_new_content_keys():
+    """Test a different prompt or model misses the cache for the same lyrics"""
+    changed_configs = [
+        CONFIG.model_copy(update={"prompt": "new prompt"}),
+        CONFIG.model_copy(update={"model_name": "new model"}),
+        CONFIG.model_copy(update={"temperature": 0.5}),
+        CONFIG.model_copy(update={"top_p": 0.9}),
+    ]
+
+    content_keys = {
+        get_content_key(get_config_key(config), "lyrics")
+        for config in [CONFIG, *changed_configs]
+    }
+
+    assert len(content_keys) == 5
+
+
+async def test_cached_content_skips_model():
+    """Test lyrics with a stored result aren't sent to the model"""
+    content_key = get_content_key(get_config_key(CONFIG), "lyrics")
+    cached_calculator = _cached_calculator({content_key: EMOTIONAL_PROFILE})
+
+    profiles = await cached_calculator.get_emotional_profiles(
+        [TrackEmotionalProfileRequest(track_id="1", lyrics="[Intro]<br/>Lyrics")]
+    )
+
+    assert profiles == [
+        TrackEmotionalProfile(track_id="1", emotional_profile=EMOTIONAL_PROFILE)
+    ]
+    assert cached_calculator.calculator.requests == []
+    cached_calculator.results_repository.add_many.assert_not_awaited()
+
+
+async def test_identical_content_is_sent_once():
+    """Test tracks sharing lyrics are scored by one request and stored once"""
+    cached_calculator = _cached_calculator()
+    requests = [
+        TrackEmotionalProfileRequest(track_id="1", lyrics="Same lyrics"),
+        TrackEmotionalProfileRequest(track_id="2", lyrics="same  LYRICS"),
+        TrackEmotionalProfileRequest(track_id="3", lyrics="Other lyrics"),
+    ]
+
+    profiles = await cached_calculator.get_emotional_profiles(requests)
+
+    assert [profile.track_id for profile in profiles] == ["1", "2", "3"]
+    assert [request.track_id for request in cached_calculator.calculator.requests] == [
+        "1",
+        "3",
+    ]
+    cached_calculator.results_repository.add_config.assert_awaited_once_with(
+        cached_calculator.config_key, CONFIG
+    )
+    cached_calculator.results_repository.add_many.assert_awaited_once_with(
+        cached_calculator.config_key,
+        {
+            get_content_key(cached_calculator.config_key, "Same lyrics"): (
+                EMOTIONAL_PROFILE
+            ),
+            get_content_key(cached_calculator.config_key, "Other lyrics"): (
+                EMOTIONAL_PROFILE
+            ),
+        },
+    )
@@ -1,8 +1,14 @@
+import numpy as np
 import pytest
 from unittest.mock import Mock
 
+from src.models.domain import EmotionalProfileMatrix
 from src.models.enums import PositionChange
-from src.utils.calculations import calculate_position_changes
+from src.utils.calculations import (
+    average_emotions,
+    calculate_position_changes,
+    rank_top_emotions,
+)
 
 
 class MockTopItem:
@@ -154,3 +160,29 @@ def test_large_position_numbers():
     calculate_position_changes(previous_items, current_items)
 
     assert current_items[0].position_change == PositionChange.UP
+
+
+def test_average_emotions_for_overlapping_groups():
+    """Test each group averages only its own tracks, shared tracks count in both"""
+    profile_matrix = EmotionalProfileMatrix(
+        track_ids=["track1", "track2", "track3"],
+        values=np.array([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]]),
+    )
+
+    result = average_emotions(
+        profile_matrix,
+        [["track1", "track2"], ["track2", "track3", "unprofiled"], ["unprofiled"]],
+    )
+
+    assert result.tolist() == [[0.5, 0.5], [0.25, 0.75], [0.0, 0.0]]
+
+
+def test_rank_top_emotions_per_row():
+    """Test the top n of each row are ordered and normalised, ties by column"""
+    order, shares = rank_top_emotions(
+        np.array([[0.1, 0.3, 0.6, 0.0], [0.2, 0.2, 0.0, 0.1], [0.0, 0.0, 0.0, 0.0]]),
+        n=2,
+    )
+
+    assert order.tolist() == [[2, 1], [0, 1], [0, 1]]
+    assert np.allclose(shares, [[2 / 3, 1 / 3], [0.5, 0.5], [0.0, 0.0]])
@@ -0,0 +1,242 @@
+import asyncio
+
+import pytest
+
+from src.orchestrators.dag_scheduler import (
+    DagRunUnfinishedException,
+    DagScheduler,
+    DagSchedulerException,
+    Node,
+)
+from src.utils.deadline import Deadline, DeadlineExceededException
+from src.utils.timings import StageTimings
+
+
+def _node(
+    name: str,
+    events: list[str],
+    inputs: list[str] | None = None,
+    output: str | None = None,
+    delay: float = 0.0,
+    **kwargs,
+) -> Node:
+    async def run(**values):
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+        return f"{name}({', '.join(str(values[key]) for key in sorted(values))})"
+
+    return Node(name=name, run=run, inputs=inputs, output=output, **kwargs)
+
+
+async def test_runs_each_node_once_its_inputs_are_ready():
+    """Test nodes start as soon as their own inputs exist, not in declared order"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=["token"],
+        nodes=[
+            _node("slow", events, inputs=["token"], output="a", delay=0.05),
+            _node("fast", events, inputs=["token"], output="b"),
+            _node("after fast", events, inputs=["b"], output="c"),
+            _node("join", events, inputs=["a", "c"], output="d"),
+        ],
+    )
+
+    values = await scheduler.run({"token": "t"})
+
+    assert values["d"] == "join(slow(t), after fast(fast(t)))"
+    assert events.index("end after fast") < events.index("end slow")
+    assert events[-2:] == ["start join", "end join"]
+
+
+async def test_critical_path_follows_the_slowest_dependencies():
+    """Test the critical path walks back from the last node through its latest input"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=[],
+        nodes=[
+            _node("profile", events, output="user"),
+            _node("slow", events, inputs=["user"], output="a", delay=0.05),
+            _node("fast", events, inputs=["user"], output="b"),
+            _node("join", events, inputs=["a", "b"]),
+        ],
+    )
+    stage_timings = StageTimings()
+
+    await scheduler.run({}, stage_timings=stage_timings)
+
+    assert scheduler.get_critical_path(stage_timings) == ["profile", "slow", "join"]
+
+
+async def test_failed_node_skips_dependents_but_not_independent_nodes():
+    """Test a failure only stops the nodes downstream of it"""
+    events: list[str] = []
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    scheduler = DagScheduler(
+        inputs=[],
+        nodes=[
+            Node(name="broken", run=fail, output="a"),
+            _node("dependent", events, inputs=["a"]),
+            _node("independent", events, delay=0.01),
+        ],
+    )
+
+    with pytest.raises(DagSchedulerException, match="broken") as exc_info:
+        await scheduler.run({})
+
+    assert isinstance(exc_info.value.__cause__, RuntimeError)
+    assert events == ["start independent", "end independent"]
+
+
+async def test_max_concurrency_is_shared_across_runs():
+    """Test a node's limit holds across concurrent runs of the scheduler"""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def run():
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    scheduler = DagScheduler(
+        inputs=[], nodes=[Node(name="limited", run=run, max_concurrency=2)]
+    )
+
+    await asyncio.gather(*[scheduler.run({}) for _ in range(5)])
+
+    assert max_in_flight == 2
+
+
+async def test_timed_out_node_fails_the_run():
+    """Test a node taking longer than its timeout is stopped"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=[], nodes=[_node("slow", events, delay=1, timeout_seconds=0.01)]
+    )
+
+    with pytest.raises(DagSchedulerException) as exc_info:
+        await scheduler.run({})
+
+    assert isinstance(exc_info.value.__cause__, TimeoutError)
+    assert events == ["start slow"]
+
+
+def test_rejects_cycles_and_unprovided_inputs():
+    """Test an invalid graph fails when it is built rather than when it runs"""
+    events: list[str] = []
+
+    with pytest.raises(DagSchedulerException, match="cycle"):
+        DagScheduler(
+            inputs=[],
+            nodes=[
+                _node("a", events, inputs=["y"], output="x"),
+                _node("b", events, inputs=["x"], output="y"),
+            ],
+        )
+
+    with pytest.raises(DagSchedulerException, match="nothing provides"):
+        DagScheduler(inputs=[], nodes=[_node("a", events, inputs=["missing"])])
+
+
+async def test_node_stopped_at_deadline_is_unfinished_with_its_dependents():
+    """Test a node that stops itself early is reported with the nodes waiting on it"""
+    events: list[str] = []
+
+    async def stop_early():
+        raise DeadlineExceededException("out of time")
+
+    scheduler = DagScheduler(
+        inputs=[],
+        nodes=[
+            Node(name="resumable", run=stop_early, output="a"),
+            _node("dependent", events, inputs=["a"]),
+            _node("independent", events),
+        ],
+    )
+
+    with pytest.raises(DagRunUnfinishedException) as exc_info:
+        await scheduler.run({})
+
+    assert exc_info.value.unfinished_nodes == ["resumable", "dependent"]
+    assert events == ["start independent", "end independent"]
+
+
+async def test_deadline_caps_every_node():
+    """Test a node still running at the run's deadline is stopped and left unfinished"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=[],
+        nodes=[
+            _node("slow", events, delay=1, output="a"),
+            _node("dependent", events, inputs=["a"]),
+        ],
+    )
+
+    with pytest.raises(DagRunUnfinishedException) as exc_info:
+        await scheduler.run({}, deadline=Deadline(seconds=0.01))
+
+    assert exc_info.value.unfinished_nodes == ["slow", "dependent"]
+    assert events == ["start slow"]
+
+
+async def test_runs_only_given_nodes_and_their_dependencies():
+    """Test a resumed run skips nodes that neither were asked for nor are needed"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=["token"],
+        nodes=[
+            _node("profile", events, inputs=["token"], output="user"),
+            _node("other", events, inputs=["user"]),
+            _node("resumed", events, inputs=["user"]),
+        ],
+    )
+
+    await scheduler.run({"token": "t"}, nodes=["resumed"])
+
+    assert scheduler.select_nodes(["resumed"]) == ["profile", "resumed"]
+    assert "start other" not in events
+    assert events[-1] == "end resumed"
+
+
+async def test_values_passed_in_are_not_produced_again():
+    """Test a node isn't run when the value it produces is already an input"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=["token"],
+        nodes=[
+            _node("profile", events, inputs=["token"], output="user"),
+            _node("resumed", events, inputs=["user"], output="a"),
+        ],
+    )
+
+    values = await scheduler.run({"token": "t", "user": "u"}, nodes=["resumed"])
+
+    assert scheduler.select_nodes(["resumed"], provided=["user"]) == ["resumed"]
+    assert scheduler.select_nodes(provided=["user"]) == ["resumed"]
+    assert events == ["start resumed", "end resumed"]
+    assert values["a"] == "resumed(u)"
+
+
+async def test_nodes_run_with_are_selected_and_started_alongside():
+    """Test a node feeding another through a run input runs with it, not before it"""
+    events: list[str] = []
+    scheduler = DagScheduler(
+        inputs=["token"],
+        nodes=[
+            _node("fetch", events, inputs=["token"], output="a", delay=0.05),
+            _node("reader", events, inputs=["token"], runs_with=["fetch"]),
+        ],
+    )
+
+    await scheduler.run({"token": "t"}, nodes=["reader"])
+
+    assert scheduler.select_nodes(["reader"]) == ["fetch", "reader"]
+    assert events.index("start reader") < events.index("end fetch")
+
+    with pytest.raises(DagSchedulerException):
+        DagScheduler(inputs=[], nodes=[_node("reader", events, runs_with=["missing"])])
@@ -0,0 +1,400 @@
+import asyncio
+import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.models.enums import TimeRange
+from src.orchestrators.dag_scheduler import (
+    DagRunUnfinishedException,
+    DagSchedulerException,
+)
+from src.orchestrators.data_collection_orchestrator import DataCollectionOrchestrator
+from src.utils.deadline import Deadline
+from src.utils.timings import StageTimings
+
+
+class FakeRunCheckpoints:
+    """In-memory checkpoint where a stage only counts as done once its session commits"""
+
+    def __init__(self, db_session: AsyncMock, completed_stages: set[str]):
+        self.db_session = db_session
+        self.completed_stages = completed_stages
+
+    async def get_completed_stages(self, **kwargs) -> set[str]:
+        return set(self.completed_stages)
+
+    async def mark_completed(self, stage: str, **kwargs) -> None:
+        self.db_session.marked_stages.append(stage)
+
+
+def _orchestrator(
+    events: list[str], top_emotions_flush_seconds: float = 0.0
+) -> DataCollectionOrchestrator:
+    completed_stages: set[str] = set()
+
+    def commit(session: AsyncMock) -> None:
+        events.append(f"commit {session.label}")
+        completed_stages.update(session.marked_stages)
+
+    def session_factory() -> AsyncMock:
+        session = AsyncMock()
+        session.label = "checkpoints"
+        session.marked_stages = []
+        session.commit.side_effect = lambda: commit(session)
+        return session
+
+    orchestrator = DataCollectionOrchestrator(
+        session_factory=session_factory,
+        spotify_service=Mock(),
+        lyrics_scraper=Mock(),
+        model_service=Mock(),
+        top_emotions_flush_seconds=top_emotions_flush_seconds,
+    )
+    pipelines = {
+        "profile": AsyncMock(),
+        "top_artists": AsyncMock(),
+        "top_genres": AsyncMock(),
+        "top_tracks": AsyncMock(),
+        "top_emotions": AsyncMock(),
+    }
+    pipelines["profile"].run.return_value = Mock(id="user")
+    pipelines["top_artists"].fetch_many.return_value = {}
+    pipelines["top_tracks"].fetch_many.return_value = {}
+
+    async def fetch_top_tracks(access_token, time_ranges, on_page):
+        top_tracks_by_time_range = pipelines["top_tracks"].fetch_many.return_value
+        for time_range, tracks in top_tracks_by_time_range.items():
+            on_page(time_range, 0, tracks)
+        return top_tracks_by_time_range
+
+    async def run_top_emotions(pages, **kwargs):
+        async for _ in pages:
+            pass
+
+    pipelines["top_tracks"].fetch_many.side_effect = fetch_top_tracks
+    pipelines["top_emotions"].run_pages.side_effect = run_top_emotions
+
+    def create_pipeline_factory(db_session: AsyncMock, unit_of_work=None) -> Mock:
+        def create_pipeline(name: str):
+            db_session.label = name
+            return pipelines[name]
+
+        return Mock(
+            create_profile_pipeline=lambda: create_pipeline("profile"),
+            create_top_artists_pipeline=lambda artist_registry=None: create_pipeline(
+                "top_artists"
+            ),
+            create_top_genres_pipeline=lambda: create_pipeline("top_genres"),
+            create_top_tracks_pipeline=lambda artist_registry=None: create_pipeline(
+                "top_tracks"
+            ),
+            create_top_emotions_pipeline=lambda: create_pipeline("top_emotions"),
+        )
+
+    orchestrator._create_pipeline_factory = create_pipeline_factory
+    orchestrator._create_run_checkpoints_repository = lambda db_session: (
+        FakeRunCheckpoints(db_session, completed_stages)
+    )
+    orchestrator.pipelines = pipelines
+    orchestrator.completed_stages = completed_stages
+    return orchestrator
+
+
+async def test_emotions_run_alongside_storing_tracks_and_commit_after_them():
+    """Test lyrics work starts before tracks are stored and commits once they are"""
+    events: list[str] = []
+    emotions_started = asyncio.Event()
+    received_pages = []
+    orchestrator = _orchestrator(events)
+    orchestrator.pipelines["top_tracks"].fetch_many.return_value = {
+        TimeRange.SHORT_TERM: []
+    }
+
+    async def store_many(**kwargs):
+        # only finishes once the emotions pipeline is already running
+        await emotions_started.wait()
+        events.append("tracks stored")
+
+    async def run_pages(pages, **kwargs):
+        events.append("emotions started")
+        emotions_started.set()
+        received_pages.extend([page async for page in pages])
+
+    orchestrator.pipelines["top_tracks"].store_many.side_effect = store_many
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = run_pages
+    stage_timings = StageTimings()
+
+    await asyncio.wait_for(
+        orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+            stage_timings=stage_timings,
+        ),
+        timeout=1,
+    )
+
+    tracks_events = [
+        event
+        for event in events
+        if not event.startswith("commit") or event.endswith(("tracks", "emotions"))
+    ]
+    assert tracks_events[tracks_events.index("emotions started") :] == [
+        "emotions started",
+        "tracks stored",
+        "commit top_tracks",
+        "commit top_emotions",
+    ]
+    run_pages_kwargs = orchestrator.pipelines[
+        "top_emotions"
+    ].run_pages.await_args.kwargs
+    assert received_pages == [(TimeRange.SHORT_TERM, 0, [])]
+    assert run_pages_kwargs["user_id"] == "user"
+    assert set(stage_timings.stages) == {
+        "profile",
+        "fetch top artists",
+        "store top artists",
+        "top genres",
+        "fetch top tracks",
+        "store top tracks",
+        "top emotions",
+    }
+    assert (
+        stage_timings.stages["top emotions"][0]
+        < stage_timings.stages["store top tracks"][1]
+    )
+
+
+async def test_emotions_start_on_the_first_page_before_the_last_is_fetched():
+    """Test the emotions node gets each page of top tracks as it arrives"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events)
+    first_page_received = asyncio.Event()
+
+    async def fetch_many(access_token, time_ranges, on_page):
+        on_page(TimeRange.SHORT_TERM, 0, [])
+        # the last page is only fetched once the first reached the emotions node
+        await first_page_received.wait()
+        events.append("last page")
+        on_page(TimeRange.SHORT_TERM, 50, [])
+        return {TimeRange.SHORT_TERM: []}
+
+    async def run_pages(pages, **kwargs):
+        async for _, offset, _ in pages:
+            events.append(f"page {offset}")
+            first_page_received.set()
+
+    orchestrator.pipelines["top_tracks"].fetch_many.side_effect = fetch_many
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = run_pages
+
+    await asyncio.wait_for(
+        orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+        ),
+        timeout=1,
+    )
+
+    assert [event for event in events if not event.startswith("commit")] == [
+        "page 0",
+        "last page",
+        "page 50",
+    ]
+    assert "top emotions" in orchestrator.completed_stages
+
+
+async def test_failed_top_tracks_fetch_fails_emotions_without_marking_them_done():
+    """Test top emotions aren't ranked from the pages that arrived before a failure"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events)
+
+    async def fetch_many(access_token, time_ranges, on_page):
+        on_page(TimeRange.SHORT_TERM, 0, [])
+        raise RuntimeError("spotify unavailable")
+
+    orchestrator.pipelines["top_tracks"].fetch_many.side_effect = fetch_many
+
+    with pytest.raises(DagSchedulerException):
+        await asyncio.wait_for(
+            orchestrator.run_data_collection_pipeline(
+                access_token="token",
+                time_ranges=[TimeRange.SHORT_TERM],
+                collection_date=datetime.date(2024, 1, 1),
+            ),
+            timeout=1,
+        )
+
+    assert "top emotions" not in orchestrator.completed_stages
+    assert "store top tracks" not in orchestrator.completed_stages
+
+
+async def test_slow_emotions_commit_finished_work_and_are_left_for_a_follow_up():
+    """Test emotions stop before the deadline, keep their writes and can be resumed"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events, top_emotions_flush_seconds=0.05)
+    orchestrator.pipelines["top_tracks"].fetch_many.return_value = {
+        TimeRange.SHORT_TERM: []
+    }
+
+    async def slow_run_pages(**kwargs):
+        events.append("emotions started")
+        await asyncio.sleep(1)
+        events.append("emotions finished")
+
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = slow_run_pages
+    context = Mock(get_remaining_time_in_millis=Mock(return_value=1_100))
+    deadline = Deadline.from_context(context, reserve_seconds=1)
+
+    with pytest.raises(DagRunUnfinishedException) as exc_info:
+        await orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+            deadline=deadline,
+        )
+
+    assert exc_info.value.unfinished_nodes == ["top emotions"]
+    assert "emotions finished" not in events
+    assert "commit top_emotions" in events
+    assert deadline.remaining() > 0
+
+    # the follow-up only redoes what the emotions node needs
+    events.clear()
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = None
+    orchestrator.pipelines["top_tracks"].store_many.reset_mock()
+    orchestrator.pipelines["top_artists"].fetch_many.reset_mock()
+
+    await asyncio.wait_for(
+        orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+            stages=exc_info.value.unfinished_nodes,
+        ),
+        timeout=1,
+    )
+
+    assert events == [
+        "commit profile",
+        "commit checkpoints",
+        "commit top_tracks",
+        "commit top_emotions",
+    ]
+    orchestrator.pipelines["top_tracks"].store_many.assert_not_awaited()
+    orchestrator.pipelines["top_artists"].fetch_many.assert_not_awaited()
+
+
+async def test_emotions_waiting_on_slow_tracks_still_commit_within_the_reserve():
+    """Test waiting for tracks stops at the emotions limit, leaving time to commit"""
+    events: list[str] = []
+    # emotions stop at 0.1s and tracks are stored at 0.2s, well before the 0.4s deadline
+    orchestrator = _orchestrator(events, top_emotions_flush_seconds=0.3)
+    orchestrator.pipelines["top_tracks"].fetch_many.return_value = {
+        TimeRange.SHORT_TERM: []
+    }
+
+    async def slow_store_many(**kwargs):
+        await asyncio.sleep(0.2)
+
+    orchestrator.pipelines["top_tracks"].store_many.side_effect = slow_store_many
+    context = Mock(get_remaining_time_in_millis=Mock(return_value=1_400))
+
+    with pytest.raises(DagRunUnfinishedException) as exc_info:
+        await orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+            deadline=Deadline.from_context(context, reserve_seconds=1),
+        )
+
+    assert exc_info.value.unfinished_nodes == ["top emotions"]
+    # the emotions commit waited for the tracks it references
+    assert events[-2:] == ["commit top_tracks", "commit top_emotions"]
+    assert "store top tracks" in orchestrator.completed_stages
+
+
+async def test_profile_stopped_at_deadline_leaves_every_stage_for_a_follow_up():
+    """Test a run cut off before it knows its user follows up on all of its stages"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events)
+
+    async def slow_profile(access_token):
+        await asyncio.sleep(1)
+
+    orchestrator.pipelines["profile"].run.side_effect = slow_profile
+
+    with pytest.raises(DagRunUnfinishedException) as exc_info:
+        await orchestrator.run_data_collection_pipeline(
+            access_token="token",
+            time_ranges=[TimeRange.SHORT_TERM],
+            collection_date=datetime.date(2024, 1, 1),
+            deadline=Deadline(seconds=0.01),
+        )
+
+    assert exc_info.value.unfinished_nodes == orchestrator.CHECKPOINTED_STAGES
+
+
+async def test_redelivered_run_resumes_from_the_first_incomplete_stage():
+    """Test stages that committed are skipped along with fetches only they needed"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events)
+    orchestrator.pipelines["top_tracks"].fetch_many.return_value = {
+        TimeRange.SHORT_TERM: []
+    }
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = RuntimeError(
+        "model unavailable"
+    )
+    run_kwargs = {
+        "access_token": "token",
+        "time_ranges": [TimeRange.SHORT_TERM],
+        "collection_date": datetime.date(2024, 1, 1),
+    }
+
+    with pytest.raises(DagSchedulerException):
+        await orchestrator.run_data_collection_pipeline(**run_kwargs)
+
+    # the failed stage rolled back without being marked done
+    assert orchestrator.completed_stages == {
+        "store top artists",
+        "top genres",
+        "store top tracks",
+    }
+
+    for pipeline in orchestrator.pipelines.values():
+        pipeline.reset_mock()
+    orchestrator.pipelines["top_emotions"].run_pages.side_effect = None
+
+    await asyncio.wait_for(
+        orchestrator.run_data_collection_pipeline(**run_kwargs), timeout=1
+    )
+
+    orchestrator.pipelines["top_artists"].fetch_many.assert_not_awaited()
+    orchestrator.pipelines["top_genres"].run.assert_not_awaited()
+    orchestrator.pipelines["top_tracks"].store_many.assert_not_awaited()
+    orchestrator.pipelines["top_emotions"].run_pages.assert_awaited_once()
+    assert "top emotions" in orchestrator.completed_stages
+
+    # once every stage is done a redelivery only looks up the user
+    events.clear()
+    await orchestrator.run_data_collection_pipeline(**run_kwargs)
+
+    assert events == ["commit profile", "commit checkpoints"]
+
+
+async def test_completed_run_for_a_known_user_skips_spotify():
+    """Test a redelivery naming its user returns after only the checkpoint lookup"""
+    events: list[str] = []
+    orchestrator = _orchestrator(events)
+    orchestrator.completed_stages.update(orchestrator.CHECKPOINTED_STAGES)
+
+    await orchestrator.run_data_collection_pipeline(
+        access_token="token",
+        time_ranges=[TimeRange.SHORT_TERM],
+        collection_date=datetime.date(2024, 1, 1),
+        user_id="user",
+    )
+
+    assert events == ["commit checkpoints"]
+    orchestrator.pipelines["profile"].run.assert_not_awaited()
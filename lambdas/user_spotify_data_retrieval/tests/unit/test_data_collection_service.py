@@ -0,0 +1,137 @@
+import asyncio
+import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.core.config import Settings
+from src.models.enums import TimeRange
+from src.models.event import RunConfig
+from src.orchestrators.dag_scheduler import DagRunUnfinishedException
+from src.services.data_collection_service import DataCollectionService
+
+
+@pytest.fixture
+def settings() -> Settings:
+    return Settings(
+        spotify_base_url="http://localhost:8000",
+        db_connection_string="postgresql://localhost/test",
+        max_concurrent_users=2,
+        lyrics_base_url="http://localhost:8001",
+        lyrics_user_agent="test",
+        lyrics_max_concurrent_scrapes=5,
+        model_api_key="key",
+        model_name="model",
+        model_temp=0.0,
+        model_max_tokens=100,
+        model_top_p=1.0,
+        model_prompt_path=Path("prompt.txt"),
+    )
+
+
+def _config(access_token: str) -> RunConfig:
+    return RunConfig(
+        access_token=access_token,
+        time_range=TimeRange.SHORT_TERM,
+        collection_date=datetime.date(2024, 1, 1).isoformat(),
+    )
+
+
+async def test_collect_many_users_data_returns_failed_message_ids(settings):
+    """Test that only the runs that raised are reported as failed"""
+    service = DataCollectionService(settings=settings, resources=Mock())
+
+    async def collect_user_data(access_token, time_ranges, collection_date, **kwargs):
+        if access_token == "bad":
+            raise RuntimeError("pipeline failed")
+
+    service.collect_user_data = collect_user_data
+
+    failed_message_ids = await service.collect_many_users_data(
+        {"msg1": _config("good"), "msg2": _config("bad"), "msg3": _config("good")}
+    )
+
+    assert failed_message_ids == ["msg2"]
+
+
+async def test_collect_many_users_data_reports_cancelled_runs_as_failed(settings):
+    """Test that a cancelled run is redelivered rather than counted as a success"""
+    service = DataCollectionService(settings=settings, resources=Mock())
+
+    async def collect_user_data(access_token, time_ranges, collection_date, **kwargs):
+        if access_token == "cancelled":
+            raise asyncio.CancelledError()
+
+    service.collect_user_data = collect_user_data
+
+    failed_message_ids = await service.collect_many_users_data(
+        {"msg1": _config("good"), "msg2": _config("cancelled")}
+    )
+
+    assert failed_message_ids == ["msg2"]
+
+
+async def test_collect_many_users_data_bounds_concurrency(settings):
+    """Test that no more than max_concurrent_users runs are in flight at once"""
+    service = DataCollectionService(settings=settings, resources=Mock())
+    in_flight = 0
+    max_in_flight = 0
+
+    async def collect_user_data(access_token, time_ranges, collection_date, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    service.collect_user_data = collect_user_data
+
+    failed_message_ids = await service.collect_many_users_data(
+        {f"msg{i}": _config(f"token{i}") for i in range(6)}
+    )
+
+    assert failed_message_ids == []
+    assert max_in_flight == settings.max_concurrent_users
+
+
+def _unfinished_service(settings: Settings) -> DataCollectionService:
+    resources = Mock()
+    resources.follow_up_queue.send = AsyncMock()
+    service = DataCollectionService(settings=settings, resources=resources)
+
+    async def collect_user_data(access_token, time_ranges, collection_date, **kwargs):
+        raise DagRunUnfinishedException(
+            "Nodes ran out of time", unfinished_nodes=["top emotions"]
+        )
+
+    service.collect_user_data = collect_user_data
+    return service
+
+
+async def test_unfinished_run_is_followed_up_instead_of_failed(settings):
+    """Test stages left at the deadline are sent on as a follow-up run"""
+    service = _unfinished_service(settings)
+
+    failed_message_ids = await service.collect_many_users_data(
+        {"msg1": _config("token")}
+    )
+
+    assert failed_message_ids == []
+    follow_up = service.resources.follow_up_queue.send.await_args.args[0]
+    assert follow_up.access_token == "token"
+    assert follow_up.stages == ["top emotions"]
+    assert follow_up.follow_up_count == 1
+
+
+async def test_unfinished_run_fails_after_max_follow_ups(settings):
+    """Test a run that keeps running out of time is retried rather than followed up forever"""
+    service = _unfinished_service(settings)
+    config = _config("token").model_copy(
+        update={"follow_up_count": settings.max_follow_ups}
+    )
+
+    failed_message_ids = await service.collect_many_users_data({"msg1": config})
+
+    assert failed_message_ids == ["msg1"]
+    service.resources.follow_up_queue.send.assert_not_awaited()
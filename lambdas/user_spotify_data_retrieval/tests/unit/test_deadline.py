@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from src.utils.deadline import (
+    DEFAULT_BUDGET_SECONDS,
+    Deadline,
+    DeadlineExceededException,
+)
+
+
+def _context(remaining_millis: int) -> Mock:
+    return Mock(get_remaining_time_in_millis=Mock(return_value=remaining_millis))
+
+
+def test_deadline_from_context_leaves_reserve():
+    """Test the deadline falls the reserve before Lambda's remaining time runs out"""
+    deadline = Deadline.from_context(_context(10_000), reserve_seconds=2)
+
+    assert deadline.remaining() == pytest.approx(8, abs=0.1)
+    assert deadline.remaining(reserve_seconds=3) == pytest.approx(5, abs=0.1)
+    assert Deadline().remaining() is None
+
+
+def test_deadline_without_context_uses_default_budget():
+    """Test a local invocation without a Lambda context still gets a deadline"""
+    deadline = Deadline.from_context(None, reserve_seconds=2)
+
+    assert deadline.remaining() == pytest.approx(DEFAULT_BUDGET_SECONDS - 2, abs=0.1)
+
+
+async def test_limit_stops_slow_work_at_the_deadline():
+    """Test work still running at the deadline is cancelled and reported"""
+    deadline = Deadline.from_context(_context(1_050), reserve_seconds=1)
+    cancelled = False
+
+    async def slow_work():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    with pytest.raises(DeadlineExceededException):
+        async with deadline.limit():
+            await slow_work()
+
+    assert cancelled
+
+
+async def test_limit_passes_through_timeouts_from_inside():
+    """Test a timeout raised by the work itself isn't mistaken for the deadline"""
+    with pytest.raises(TimeoutError):
+        async with Deadline(seconds=10).limit():
+            raise TimeoutError("scrape timed out")
@@ -0,0 +1,140 @@
+from unittest.mock import AsyncMock
+
+from src.models.domain import (
+    EmotionalProfile,
+    EmotionalProfileMatrix,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.emotional_profiles_service import (
+    EmotionalProfilesService,
+)
+
+EMOTIONAL_PROFILE = EmotionalProfile(
+    **{name: 0.0 for name in EmotionalProfile.model_fields} | {"joy": 1.0}
+)
+
+
+def _emotional_profiles_service(
+    cached_profiles: list[TrackEmotionalProfile],
+    calculated_profiles: list[TrackEmotionalProfile],
+    fallback_profiles: list[TrackEmotionalProfile] | None = None,
+) -> EmotionalProfilesService:
+    emotional_profile_repository = AsyncMock()
+    emotional_profile_repository.get_many.return_value = cached_profiles
+
+    emotional_profile_calculator = AsyncMock()
+    emotional_profile_calculator.get_emotional_profiles.return_value = (
+        calculated_profiles
+    )
+
+    fallback_calculator = None
+    if fallback_profiles is not None:
+        fallback_calculator = AsyncMock()
+        fallback_calculator.get_emotional_profiles.return_value = fallback_profiles
+
+    return EmotionalProfilesService(
+        emotional_profile_repository=emotional_profile_repository,
+        emotional_profile_calculator=emotional_profile_calculator,
+        fallback_calculator=fallback_calculator,
+    )
+
+
+async def test_all_cached_profiles_skip_calculation():
+    """Test nothing is calculated or stored when every profile is cached"""
+    cached_profile = TrackEmotionalProfile(
+        track_id="1", emotional_profile=EMOTIONAL_PROFILE
+    )
+    service = _emotional_profiles_service(
+        cached_profiles=[cached_profile], calculated_profiles=[]
+    )
+
+    profiles = await service.get_many_emotional_profiles(
+        [TrackEmotionalProfileRequest(track_id="1", lyrics="lyrics")]
+    )
+
+    assert profiles == [cached_profile]
+    service.emotional_profile_calculator.get_emotional_profiles.assert_not_awaited()
+    service.emotional_profile_repository.add_many.assert_not_awaited()
+
+
+async def test_missing_profiles_are_calculated_in_one_call():
+    """Test uncached tracks are handed to the calculator together"""
+    new_profile = TrackEmotionalProfile(
+        track_id="2", emotional_profile=EMOTIONAL_PROFILE
+    )
+    service = _emotional_profiles_service(
+        cached_profiles=[], calculated_profiles=[new_profile]
+    )
+    requests = [
+        TrackEmotionalProfileRequest(track_id="1", lyrics="lyrics"),
+        TrackEmotionalProfileRequest(track_id="2", lyrics="lyrics"),
+    ]
+
+    profiles = await service.get_many_emotional_profiles(requests)
+
+    assert profiles == [new_profile]
+    service.emotional_profile_calculator.get_emotional_profiles.assert_awaited_once_with(
+        requests
+    )
+    service.emotional_profile_repository.add_many.assert_awaited_once_with(
+        [new_profile]
+    )
+
+
+async def test_failed_profiles_use_fallback_without_storing():
+    """Test tracks the calculator fails on are scored by the fallback but not stored"""
+    new_profile = TrackEmotionalProfile(
+        track_id="1", emotional_profile=EMOTIONAL_PROFILE
+    )
+    fallback_profile = TrackEmotionalProfile(
+        track_id="2", emotional_profile=EMOTIONAL_PROFILE
+    )
+    service = _emotional_profiles_service(
+        cached_profiles=[],
+        calculated_profiles=[new_profile],
+        fallback_profiles=[fallback_profile],
+    )
+    requests = [
+        TrackEmotionalProfileRequest(track_id="1", lyrics="lyrics"),
+        TrackEmotionalProfileRequest(track_id="2", lyrics="lyrics"),
+    ]
+
+    profiles = await service.get_many_emotional_profiles(requests)
+
+    assert profiles == [new_profile, fallback_profile]
+    service.fallback_calculator.get_emotional_profiles.assert_awaited_once_with(
+        [requests[1]]
+    )
+    service.emotional_profile_repository.add_many.assert_awaited_once_with(
+        [new_profile]
+    )
+
+
+async def test_matrix_combines_stored_and_new_profiles():
+    """Test stored matrix rows come first and only missing tracks are calculated"""
+    stored_profile = TrackEmotionalProfile(
+        track_id="1", emotional_profile=EMOTIONAL_PROFILE
+    )
+    new_profile = TrackEmotionalProfile(
+        track_id="2", emotional_profile=EMOTIONAL_PROFILE
+    )
+    service = _emotional_profiles_service(
+        cached_profiles=[], calculated_profiles=[new_profile]
+    )
+    service.emotional_profile_repository.get_many_matrix.return_value = (
+        EmotionalProfileMatrix.from_profiles([stored_profile])
+    )
+    requests = [
+        TrackEmotionalProfileRequest(track_id="1", lyrics="lyrics"),
+        TrackEmotionalProfileRequest(track_id="2", lyrics="lyrics"),
+    ]
+
+    profile_matrix = await service.get_emotional_profile_matrix(requests)
+
+    assert profile_matrix.track_ids == ["1", "2"]
+    assert profile_matrix.values.shape == (2, 15)
+    assert profile_matrix.values[:, 0].tolist() == [1.0, 1.0]
+    service.emotional_profile_calculator.get_emotional_profiles.assert_awaited_once_with(
+        [requests[1]]
+    )
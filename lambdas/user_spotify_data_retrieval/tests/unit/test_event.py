@@ -0,0 +1,136 @@
+import datetime
+import json
+
+from src.models.enums import TimeRange
+from src.models.event import (
+    build_batch_response,
+    is_sqs_event,
+    is_migrate_event,
+    is_warmup_event,
+    parse_event,
+    parse_sqs_records,
+)
+
+
+def _record(message_id: str, body: str) -> dict:
+    return {"messageId": message_id, "body": body}
+
+
+def test_is_sqs_event_detects_records():
+    """Test that SQS events are distinguished from direct invocations"""
+    assert is_sqs_event({"Records": []})
+    assert not is_sqs_event({"access_token": "token", "time_range": "short_term"})
+
+
+def test_is_warmup_event():
+    """Test that warmup events are recognised by their type"""
+    assert is_warmup_event({"type": "warmup"})
+    assert not is_warmup_event({"access_token": "token"})
+    assert not is_warmup_event({"Records": []})
+
+
+def test_is_migrate_event():
+    """Test that migrate events are recognised by their type"""
+    assert is_migrate_event({"type": "migrate"})
+    assert not is_migrate_event({"type": "warmup"})
+    assert not is_migrate_event({"access_token": "token"})
+
+
+def test_parse_event_parses_a_direct_invocation():
+    """Test that a directly invoked event is the run config itself"""
+    config = parse_event({"access_token": "token", "time_range": "short_term"})
+
+    assert config.access_token == "token"
+    assert config.time_ranges == [TimeRange.SHORT_TERM]
+
+
+def test_parse_sqs_records_parses_every_record():
+    """Test that all records in the batch are parsed, not just the first"""
+    event = {
+        "Records": [
+            _record(
+                "msg1",
+                json.dumps(
+                    {
+                        "access_token": "token1",
+                        "time_range": "short_term",
+                        "collection_date": "2024-01-01",
+                    }
+                ),
+            ),
+            _record(
+                "msg2",
+                json.dumps({"access_token": "token2", "time_range": "long_term"}),
+            ),
+        ]
+    }
+
+    configs, failed_message_ids = parse_sqs_records(event)
+
+    assert failed_message_ids == []
+    assert list(configs) == ["msg1", "msg2"]
+    assert configs["msg1"].access_token == "token1"
+    assert configs["msg1"].time_range == TimeRange.SHORT_TERM
+    assert configs["msg1"].collection_date == datetime.date(2024, 1, 1)
+    assert configs["msg2"].access_token == "token2"
+    assert configs["msg2"].time_range == TimeRange.LONG_TERM
+
+
+def test_parse_sqs_records_reports_invalid_records_as_failures():
+    """Test that unparseable records are returned as failures without dropping valid ones"""
+    event = {
+        "Records": [
+            _record("msg1", "not json"),
+            _record(
+                "msg2",
+                json.dumps({"access_token": "token2", "time_range": "forever"}),
+            ),
+            _record(
+                "msg3",
+                json.dumps({"access_token": "token3", "time_range": "medium_term"}),
+            ),
+        ]
+    }
+
+    configs, failed_message_ids = parse_sqs_records(event)
+
+    assert failed_message_ids == ["msg1", "msg2"]
+    assert list(configs) == ["msg3"]
+
+
+def test_build_batch_response():
+    """Test that the partial batch response uses the SQS item identifier format"""
+    assert build_batch_response(["msg1", "msg2"]) == {
+        "batchItemFailures": [{"itemIdentifier": "msg1"}, {"itemIdentifier": "msg2"}]
+    }
+    assert build_batch_response([]) == {"batchItemFailures": []}
+
+
+def test_run_config_without_time_range_collects_every_range():
+    """Test that omitting time_range selects the multi-range mode"""
+    event = {"Records": [_record("msg1", json.dumps({"access_token": "token1"}))]}
+
+    configs, _ = parse_sqs_records(event)
+
+    assert configs["msg1"].time_range is None
+    assert configs["msg1"].time_ranges == [
+        TimeRange.SHORT_TERM,
+        TimeRange.MEDIUM_TERM,
+        TimeRange.LONG_TERM,
+    ]
+
+
+def test_run_config_with_time_range_collects_single_range():
+    """Test that a given time_range keeps the single-range behaviour"""
+    event = {
+        "Records": [
+            _record(
+                "msg1",
+                json.dumps({"access_token": "token1", "time_range": "medium_term"}),
+            )
+        ]
+    }
+
+    configs, _ = parse_sqs_records(event)
+
+    assert configs["msg1"].time_ranges == [TimeRange.MEDIUM_TERM]
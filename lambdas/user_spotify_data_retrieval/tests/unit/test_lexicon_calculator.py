@@ -0,0 +1,80 @@
+import pytest
+
+from src.models.domain import EmotionalProfile, TrackEmotionalProfileRequest
+from src.services.emotional_profiles.lexicon_calculator import (
+    LexiconCalculatorException,
+    LexiconEmotionalProfileCalculator,
+)
+
+LEXICON = {
+    "joy": "happy smile dance",
+    "sadness": "cry tear",
+    "love": "love heart",
+}
+
+
+@pytest.fixture
+def lexicon_calculator() -> LexiconEmotionalProfileCalculator:
+    return LexiconEmotionalProfileCalculator(LEXICON)
+
+
+async def test_profile_is_proportion_of_emotion_words(lexicon_calculator):
+    """Test each emotion gets its share of the matched words"""
+    profile = await lexicon_calculator.get_emotional_profile(
+        "I smile and dance<br/>Then I cry, my heart"
+    )
+
+    assert profile == EmotionalProfile(
+        **{name: 0.0 for name in EmotionalProfile.model_fields}
+        | {"joy": 0.5, "sadness": 0.25, "love": 0.25}
+    )
+
+
+async def test_inflections_and_markup_are_matched(lexicon_calculator):
+    """Test plurals, verb endings and dropped g's count as the base word"""
+    profile = await lexicon_calculator.get_emotional_profile(
+        "[Chorus]<br/><i>Dancin'</i> and SMILING, crying tears, loved"
+    )
+
+    assert (profile.joy, profile.sadness, profile.love) == (0.4, 0.4, 0.2)
+
+
+async def test_batch_matches_single_scores(lexicon_calculator):
+    """Test scoring a batch gives the same profiles as one at a time"""
+    lyrics = ["happy happy cry", "love hearts", "nothing here", "tears"]
+    requests = [
+        TrackEmotionalProfileRequest(track_id=str(index), lyrics=track_lyrics)
+        for index, track_lyrics in enumerate(lyrics)
+    ]
+
+    profiles = await lexicon_calculator.get_emotional_profiles(requests)
+
+    assert [profile.track_id for profile in profiles] == ["0", "1", "3"]
+    for profile in profiles:
+        assert profile.emotional_profile == (
+            await lexicon_calculator.get_emotional_profile(
+                lyrics[int(profile.track_id)]
+            )
+        )
+
+
+async def test_lyrics_without_lexicon_words_raise(lexicon_calculator):
+    """Test lyrics the lexicon can't score aren't given an all zero profile"""
+    with pytest.raises(LexiconCalculatorException):
+        await lexicon_calculator.get_emotional_profile("nothing to see here")
+
+
+def test_lexicon_change_changes_config():
+    """Test editing the lexicon gives a new config, so cached scores are redone"""
+    config = LexiconEmotionalProfileCalculator(LEXICON).config
+    changed_config = LexiconEmotionalProfileCalculator(
+        LEXICON | {"joy": "happy smile"}
+    ).config
+
+    assert config != changed_config
+    assert (
+        config
+        == LexiconEmotionalProfileCalculator(
+            {"love": "heart  love", "sadness": "tear cry", "joy": "dance smile happy"}
+        ).config
+    )
@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+from src.services.lyrics.lyrics_extractor import (
+    BeautifulSoupLyricsExtractor,
+    IncrementalLyricsExtractor,
+    ScanningLyricsExtractor,
+)
+
+FIXTURES_DIR = Path(__file__).parent.parent / "fixtures" / "lyrics_pages"
+FIXTURE_PATHS = sorted(FIXTURES_DIR.glob("*.html"))
+
+
+@pytest.mark.parametrize("fixture_path", FIXTURE_PATHS, ids=lambda path: path.stem)
+def test_scanner_matches_reference_extractor(fixture_path: Path):
+    """Test the scanner produces exactly what the bs4 reference does"""
+    html = fixture_path.read_text(encoding="utf-8")
+
+    assert ScanningLyricsExtractor().extract_lyrics(
+        html
+    ) == BeautifulSoupLyricsExtractor().extract_lyrics(html)
+
+
+def test_scanner_extracts_annotated_lyrics():
+    """Test annotations are unwrapped and non-lyrics elements are dropped"""
+    html = (FIXTURES_DIR / "annotated_song.html").read_text(encoding="utf-8")
+
+    lyrics = ScanningLyricsExtractor().extract_lyrics(html)
+
+    assert lyrics.startswith("[Verse 1]<br/>I walk the streets at night<br/>")
+    assert "Under the city's light<br/>Searching for what's right" in lyrics
+    assert "<b>alive <i>tonight</i></b>" in lyrics
+    assert "Contributors" not in lyrics
+    assert "noise" not in lyrics
+    assert lyrics.endswith("[Outro]<br/>Goodbye")
+
+
+def test_scanner_returns_none_without_lyrics_containers():
+    """Test pages without lyrics containers give no lyrics"""
+    html = (FIXTURES_DIR / "instrumental.html").read_text(encoding="utf-8")
+
+    assert ScanningLyricsExtractor().extract_lyrics(html) is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 4096])
+@pytest.mark.parametrize("fixture_path", FIXTURE_PATHS, ids=lambda path: path.stem)
+def test_incremental_extractor_matches_reference_extractor(
+    fixture_path: Path, chunk_size: int
+):
+    """Test chunked extraction gives the same lyrics wherever the chunks split"""
+    html = fixture_path.read_text(encoding="utf-8")
+    extractor = IncrementalLyricsExtractor()
+
+    for start in range(0, len(html), chunk_size):
+        if extractor.feed(html[start : start + chunk_size]):
+            break
+
+    assert extractor.close() == BeautifulSoupLyricsExtractor().extract_lyrics(html)
+
+
+def test_incremental_extractor_stops_after_last_container():
+    """Test the extractor is done once the lyrics root closes"""
+    html = (FIXTURES_DIR / "annotated_song.html").read_text(encoding="utf-8")
+    lyrics_root_end = html.index('<div class="RightSidebar">')
+    extractor = IncrementalLyricsExtractor()
+
+    assert not extractor.feed(html[: html.index("[Outro]")])
+    assert extractor.feed(html[:lyrics_root_end][html.index("[Outro]") :])
+    assert extractor.close().endswith("[Outro]<br/>Goodbye")
+    # nothing from the rest of the page is kept
+    assert extractor.buffer == ""
+
+
+NON_SIBLING_CONTAINERS_HTML = (
+    "<html><body>"
+    '<div class="Wrapper"><div data-lyrics-container="true">[Verse 1]<br/>One</div></div>'
+    '<div class="Ad"><div>Advertisement</div></div>'
+    '<div class="Wrapper"><div class="Inner">'
+    '<div data-lyrics-container="true">[Verse 2]<br/>Two</div></div></div>'
+    "</body></html>"
+)
+
+
+@pytest.mark.parametrize("lyrics_root", [False, True])
+def test_incremental_extractor_finds_containers_that_arent_siblings(lyrics_root: bool):
+    """Test containers under different parents are all kept, not just the first's siblings"""
+    html = NON_SIBLING_CONTAINERS_HTML
+    if lyrics_root:
+        html = html.replace("<body>", '<body><div id="lyrics-root">').replace(
+            "</body>", '</div><div class="Footer"></div></body>'
+        )
+    extractor = IncrementalLyricsExtractor()
+
+    # without a lyrics root the last container can't be known, so the page is read to the end
+    assert extractor.feed(html) == lyrics_root
+    assert extractor.close() == "[Verse 1]<br/>One<br/>[Verse 2]<br/>Two"
+    assert extractor.close() == BeautifulSoupLyricsExtractor().extract_lyrics(html)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.lyrics.lyrics_pacer import AdaptivePacer
+
+
+async def test_acquire_spaces_requests_at_rate():
+    """Test concurrent callers are given evenly spaced slots"""
+    pacer = AdaptivePacer(rate=20, min_rate=1, max_rate=20)
+
+    start = time.monotonic()
+    await asyncio.gather(*[pacer.acquire() for _ in range(5)])
+    elapsed = time.monotonic() - start
+
+    # first slot is immediate, the other four are 50ms apart
+    assert elapsed >= 0.19
+    assert pacer.metrics.requests == 5
+    assert pacer.metrics.wait_seconds > 0
+
+
+async def test_acquire_does_not_burst_after_idle():
+    """Test an idle pacer doesn't build up credit for a burst"""
+    pacer = AdaptivePacer(rate=10, min_rate=1, max_rate=10)
+    await pacer.acquire()
+    await asyncio.sleep(0.3)
+
+    start = time.monotonic()
+    await pacer.acquire()
+    await pacer.acquire()
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= 0.09
+
+
+def test_on_success_increases_rate_up_to_max():
+    """Test the rate grows additively and is capped"""
+    pacer = AdaptivePacer(rate=4, min_rate=1, max_rate=4.25, increase_step=0.1)
+
+    pacer.on_success()
+    assert pacer.rate == pytest.approx(4.1)
+
+    pacer.on_success()
+    pacer.on_success()
+    assert pacer.rate == 4.25
+
+
+def test_on_throttle_decreases_rate_down_to_min():
+    """Test the rate is cut multiplicatively and never drops below the minimum"""
+    pacer = AdaptivePacer(
+        rate=4, min_rate=1.5, max_rate=10, decrease_cooldown_seconds=0
+    )
+
+    pacer.on_throttle()
+    assert pacer.rate == 2
+
+    pacer.on_throttle()
+    assert pacer.rate == 1.5
+    assert pacer.metrics.throttled_responses == 2
+    assert pacer.metrics.rate_decreases == 2
+
+
+def test_throttles_within_cooldown_count_once():
+    """Test a burst of throttled in-flight requests only halves the rate once"""
+    pacer = AdaptivePacer(rate=8, min_rate=1, max_rate=10)
+
+    for _ in range(4):
+        pacer.on_throttle()
+
+    assert pacer.rate == 4
+    assert pacer.metrics.throttled_responses == 4
+    assert pacer.metrics.rate_decreases == 1
+
+
+async def test_retry_after_delays_next_slot():
+    """Test Retry-After holds back every caller, capped at the max pause"""
+    pacer = AdaptivePacer(rate=100, min_rate=1, max_rate=100, max_pause_seconds=0.2)
+
+    pacer.on_throttle(retry_after=60)
+
+    assert 0.1 < await pacer.acquire() <= 0.2
@@ -0,0 +1,183 @@
+import asyncio
+from contextlib import aclosing
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.models.domain import TrackLyrics, TrackLyricsFailure, TrackLyricsRequest
+from src.models.enums import LyricsFailureReason
+from src.services.lyrics.lyrics_scraper import LyricsScraperException
+from src.services.lyrics.lyrics_service import LyricsService
+
+
+def _request(track_id: str) -> TrackLyricsRequest:
+    return TrackLyricsRequest(
+        track_id=track_id, track_artist="Artist", track_name=f"Song {track_id}"
+    )
+
+
+def _lyrics_service(
+    cached_lyrics: list[TrackLyrics] | None = None,
+    blocked_track_ids: set[str] | None = None,
+    scrape_results: dict[str, str | Exception] | None = None,
+    write_batch_size: int = 10,
+) -> LyricsService:
+    lyrics_repository = AsyncMock()
+    lyrics_repository.get_many.return_value = cached_lyrics or []
+
+    lyrics_failures_repository = AsyncMock()
+    lyrics_failures_repository.get_blocked_track_ids.return_value = (
+        blocked_track_ids or set()
+    )
+
+    scrape_results = scrape_results or {}
+
+    async def get_lyrics(artist_name: str, track_title: str) -> str:
+        result = scrape_results[track_title.removeprefix("Song ")]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    lyrics_scraper = AsyncMock()
+    lyrics_scraper.get_lyrics.side_effect = get_lyrics
+
+    return LyricsService(
+        lyrics_repository=lyrics_repository,
+        lyrics_failures_repository=lyrics_failures_repository,
+        lyrics_scraper=lyrics_scraper,
+        write_batch_size=write_batch_size,
+    )
+
+
+async def test_blocked_tracks_are_not_scraped():
+    """Test tracks in the negative cache are skipped"""
+    lyrics_service = _lyrics_service(
+        blocked_track_ids={"2"}, scrape_results={"1": "lyrics 1"}
+    )
+
+    track_lyrics = await lyrics_service.get_many_lyrics([_request("1"), _request("2")])
+
+    assert track_lyrics == [TrackLyrics(track_id="1", lyrics="lyrics 1")]
+    assert lyrics_service.lyrics_scraper.get_lyrics.await_count == 1
+    lyrics_service.lyrics_failures_repository.get_blocked_track_ids.assert_awaited_once_with(
+        {"1", "2"}
+    )
+
+
+async def test_cached_lyrics_are_not_checked_against_negative_cache():
+    """Test the negative cache is only consulted for tracks without lyrics"""
+    lyrics_service = _lyrics_service(
+        cached_lyrics=[TrackLyrics(track_id="1", lyrics="lyrics 1")]
+    )
+
+    track_lyrics = await lyrics_service.get_many_lyrics([_request("1")])
+
+    assert track_lyrics == [TrackLyrics(track_id="1", lyrics="lyrics 1")]
+    lyrics_service.lyrics_failures_repository.get_blocked_track_ids.assert_awaited_once_with(
+        set()
+    )
+    lyrics_service.lyrics_scraper.get_lyrics.assert_not_awaited()
+
+
+async def test_only_permanent_failures_are_recorded():
+    """Test missing pages and lyrics are cached but transient errors aren't"""
+    lyrics_service = _lyrics_service(
+        scrape_results={
+            "1": LyricsScraperException(
+                "not found", reason=LyricsFailureReason.NOT_FOUND
+            ),
+            "2": LyricsScraperException(
+                "no lyrics", reason=LyricsFailureReason.NO_LYRICS
+            ),
+            "3": LyricsScraperException("request failed"),
+        }
+    )
+
+    track_lyrics = await lyrics_service.get_many_lyrics(
+        [_request("1"), _request("2"), _request("3")]
+    )
+
+    assert track_lyrics == []
+    lyrics_service.lyrics_repository.add_many.assert_not_awaited()
+    lyrics_service.lyrics_failures_repository.record_many.assert_awaited_once_with(
+        [
+            TrackLyricsFailure(track_id="1", reason=LyricsFailureReason.NOT_FOUND),
+            TrackLyricsFailure(track_id="2", reason=LyricsFailureReason.NO_LYRICS),
+        ]
+    )
+
+
+async def test_successful_scrapes_clear_failures():
+    """Test lyrics found on retry remove the track from the negative cache"""
+    lyrics_service = _lyrics_service(scrape_results={"1": "lyrics 1"})
+
+    await lyrics_service.get_many_lyrics([_request("1")])
+
+    lyrics_service.lyrics_repository.add_many.assert_awaited_once_with(
+        [TrackLyrics(track_id="1", lyrics="lyrics 1")]
+    )
+    lyrics_service.lyrics_failures_repository.delete_many.assert_awaited_once_with(
+        {"1"}
+    )
+
+
+async def test_stream_yields_cached_lyrics_then_stores_scrapes_in_batches():
+    """Test stored lyrics come first and scraped lyrics are written as they arrive"""
+    lyrics_service = _lyrics_service(
+        cached_lyrics=[TrackLyrics(track_id="1", lyrics="lyrics 1")],
+        scrape_results={"2": "lyrics 2", "3": "lyrics 3", "4": "lyrics 4"},
+        write_batch_size=2,
+    )
+
+    track_lyrics = [
+        lyrics
+        async for lyrics in lyrics_service.stream_lyrics(
+            [_request("1"), _request("2"), _request("3"), _request("4")]
+        )
+    ]
+
+    assert track_lyrics[0] == TrackLyrics(track_id="1", lyrics="lyrics 1")
+    assert sorted(lyrics.track_id for lyrics in track_lyrics) == ["1", "2", "3", "4"]
+    assert [
+        len(call.args[0])
+        for call in lyrics_service.lyrics_repository.add_many.await_args_list
+    ] == [2, 1]
+    # the full batch is written straight away, the rest with the stage's writes
+    lyrics_service.lyrics_repository.flush.assert_awaited_once()
+
+
+async def test_stream_closed_early_saves_finished_scrapes():
+    """Test lyrics and failures scraped before the stream is stopped are still stored"""
+    lyrics_service = _lyrics_service(
+        scrape_results={
+            "1": "lyrics 1",
+            "3": LyricsScraperException(
+                "not found", reason=LyricsFailureReason.NOT_FOUND
+            ),
+        }
+    )
+    get_lyrics = lyrics_service.lyrics_scraper.get_lyrics.side_effect
+
+    async def get_lyrics_or_hang(artist_name: str, track_title: str) -> str:
+        if track_title == "Song 2":
+            await asyncio.sleep(10)
+        return await get_lyrics(artist_name, track_title)
+
+    lyrics_service.lyrics_scraper.get_lyrics.side_effect = get_lyrics_or_hang
+
+    with pytest.raises(TimeoutError):
+        async with asyncio.timeout(0.1):
+            async with aclosing(
+                lyrics_service.stream_lyrics(
+                    [_request("1"), _request("2"), _request("3")]
+                )
+            ) as lyrics_stream:
+                async for _ in lyrics_stream:
+                    pass
+
+    lyrics_service.lyrics_repository.add_many.assert_awaited_once_with(
+        [TrackLyrics(track_id="1", lyrics="lyrics 1")]
+    )
+    lyrics_service.lyrics_failures_repository.record_many.assert_awaited_once_with(
+        [TrackLyricsFailure(track_id="3", reason=LyricsFailureReason.NOT_FOUND)]
+    )
@@ -0,0 +1,140 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from src.core.config import Settings
+from src.migrations.runner import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    MigrationException,
+    check_schema_version,
+)
+from src.migrations.versions import v0005_emotional_profile_result_cache
+from src.models.db import Base
+from src.models.domain import EmotionalProfileConfig
+from src.services.emotional_profiles.cached_calculator import get_config_key
+
+
+def _all_statements() -> str:
+    return "\n".join(
+        statement for migration in MIGRATIONS for statement in migration.STATEMENTS
+    )
+
+
+def test_migration_versions_are_sequential():
+    """Test migrations are numbered 1..n with no gaps or duplicates"""
+    versions = [migration.VERSION for migration in MIGRATIONS]
+
+    assert versions == list(range(1, len(MIGRATIONS) + 1))
+    assert SCHEMA_VERSION == versions[-1]
+
+
+def test_migrations_create_every_model_table():
+    """Test every table in the models is created by a migration"""
+    created_tables = set(
+        re.findall(r"CREATE TABLE IF NOT EXISTS (\w+)", _all_statements())
+    )
+
+    assert created_tables == set(Base.metadata.tables)
+
+
+def test_migrations_create_every_model_column():
+    """Test every column in the models is created or added by a migration"""
+    statements = _all_statements()
+
+    for name, table in Base.metadata.tables.items():
+        create_table = re.search(
+            rf"CREATE TABLE IF NOT EXISTS {name} \((.*?)\n\s*\)\s*$",
+            statements,
+            re.S | re.M,
+        ).group(1)
+        added_columns = re.findall(
+            rf"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS (\w+)", statements
+        )
+
+        for column in table.columns:
+            assert (
+                re.search(rf"^\s*{column.name} ", create_table, re.M)
+                or column.name in added_columns
+            ), f"{name}.{column.name}"
+
+
+def test_migrations_create_every_model_index():
+    """Test every index declared on the models is created by a migration"""
+    created_indexes = set(
+        re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", _all_statements())
+    )
+    model_indexes = {
+        index.name for table in Base.metadata.tables.values() for index in table.indexes
+    }
+
+    assert created_indexes == model_indexes
+
+
+def test_top_item_tables_have_snapshot_index():
+    """Test every top_* table is indexed on (user_id, time_range, collection_date)"""
+    for name, table in Base.metadata.tables.items():
+        if not name.startswith("top_"):
+            continue
+
+        assert any(
+            [column.name for column in index.columns]
+            == ["user_id", "time_range", "collection_date"]
+            for index in table.indexes
+        ), name
+
+
+def test_check_schema_version_raises_when_behind():
+    """Test an out of date schema is rejected"""
+    with pytest.raises(MigrationException):
+        check_schema_version(SCHEMA_VERSION - 1)
+
+
+def test_check_schema_version_accepts_current_or_newer():
+    """Test a current or newer schema is accepted"""
+    check_schema_version(SCHEMA_VERSION)
+    check_schema_version(SCHEMA_VERSION + 1)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed: list[tuple[str, dict]] = []
+
+    async def execute(self, statement, params: dict) -> None:
+        self.executed.append((str(statement), params))
+
+
+async def test_config_key_backfill_uses_the_deployed_model_config(tmp_path: Path):
+    """Test existing profiles get the key the cache looks up, so they aren't rescored"""
+    prompt_path = tmp_path / "prompt.txt"
+    prompt_path.write_text("Score these lyrics", encoding="utf-8")
+    settings = Settings(
+        spotify_base_url="http://localhost:8000",
+        db_connection_string="postgresql://localhost/test",
+        lyrics_base_url="http://localhost:8001",
+        lyrics_user_agent="test",
+        lyrics_max_concurrent_scrapes=5,
+        model_api_key="key",
+        model_name="model",
+        model_temp=0.0,
+        model_max_tokens=100,
+        model_top_p=1.0,
+        model_prompt_path=prompt_path,
+    )
+    connection = FakeConnection()
+
+    await v0005_emotional_profile_result_cache.backfill(connection, settings)
+
+    config_key = get_config_key(
+        EmotionalProfileConfig(
+            model_name="model", temperature=0.0, top_p=1.0, prompt="Score these lyrics"
+        )
+    )
+    (insert_config, config_params), (update_profiles, profile_params) = (
+        connection.executed
+    )
+    assert "INSERT INTO emotional_profile_config" in insert_config
+    assert config_params["config_key"] == config_key
+    assert "WHERE config_key IS NULL" in update_profiles
+    assert profile_params == {"config_key": config_key}
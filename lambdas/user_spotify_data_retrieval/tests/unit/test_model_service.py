@@ -0,0 +1,15 @@
+from src.services.emotional_profiles.model_service import ModelService
+
+
+def test_agent_is_created_once_and_reused():
+    """Test that the agent is built once rather than on every access"""
+    model_service = ModelService(
+        api_key="key",
+        model_name="gemini-2.5-flash",
+        temperature=0.0,
+        max_tokens=100,
+        top_p=1.0,
+        instructions="instructions",
+    )
+
+    assert model_service.agent is model_service.agent
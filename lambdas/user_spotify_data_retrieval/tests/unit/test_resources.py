@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.core import resources as resources_module
+from src.core.resources import Resources
+from src.migrations.runner import SCHEMA_VERSION, MigrationException
+
+
+def _resources(
+    schema_version: int | None, db_schema_version: int, monkeypatch
+) -> Resources:
+    """Resources with only what check_schema uses, reading the given DB version"""
+    resources = Resources.__new__(Resources)
+    resources.engine = None
+    resources.schema_version = schema_version
+    resources.run = asyncio.run
+
+    async def get_schema_version(engine) -> int:
+        resources.schema_version_reads += 1
+        return db_schema_version
+
+    resources.schema_version_reads = 0
+    monkeypatch.setattr(resources_module, "get_schema_version", get_schema_version)
+    return resources
+
+
+def test_check_schema_rereads_version_migrated_since_cold_start(monkeypatch):
+    """Test a warm container picks up a migration instead of failing until recycled"""
+    resources = _resources(SCHEMA_VERSION - 1, SCHEMA_VERSION, monkeypatch)
+
+    resources.check_schema()
+    resources.check_schema()
+
+    assert resources.schema_version == SCHEMA_VERSION
+    assert resources.schema_version_reads == 1
+
+
+def test_check_schema_raises_when_still_behind(monkeypatch):
+    """Test an unmigrated database is still rejected after re-reading its version"""
+    resources = _resources(SCHEMA_VERSION - 1, SCHEMA_VERSION - 1, monkeypatch)
+
+    with pytest.raises(MigrationException):
+        resources.check_schema()
+
+
+def test_check_schema_skips_db_when_current(monkeypatch):
+    """Test an up to date cached version doesn't query the database"""
+    resources = _resources(SCHEMA_VERSION, SCHEMA_VERSION, monkeypatch)
+
+    resources.check_schema()
+
+    assert resources.schema_version_reads == 0
+
+
+def test_check_schema_reads_version_on_first_check(monkeypatch):
+    """Test the version is read when first checked, not when the container starts"""
+    resources = _resources(None, SCHEMA_VERSION, monkeypatch)
+
+    resources.check_schema()
+    resources.check_schema()
+
+    assert resources.schema_version == SCHEMA_VERSION
+    assert resources.schema_version_reads == 1
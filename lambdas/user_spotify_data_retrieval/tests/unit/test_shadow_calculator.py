@@ -0,0 +1,60 @@
+from unittest.mock import AsyncMock
+
+from src.models.domain import (
+    EmotionalProfile,
+    TrackEmotionalProfile,
+    TrackEmotionalProfileRequest,
+)
+from src.services.emotional_profiles.shadow_calculator import (
+    ShadowEmotionalProfileCalculator,
+)
+
+EMOTIONAL_PROFILE = EmotionalProfile(
+    **{name: 0.0 for name in EmotionalProfile.model_fields} | {"joy": 1.0}
+)
+REQUESTS = [
+    TrackEmotionalProfileRequest(track_id="1", lyrics="lyrics"),
+    TrackEmotionalProfileRequest(track_id="2", lyrics="lyrics"),
+]
+
+
+def _shadow_calculator(
+    profiles: list[TrackEmotionalProfile],
+) -> ShadowEmotionalProfileCalculator:
+    calculator = AsyncMock()
+    calculator.get_emotional_profiles.return_value = profiles
+
+    return ShadowEmotionalProfileCalculator(
+        calculator=calculator, shadow_calculator=AsyncMock()
+    )
+
+
+async def test_shadow_only_scores_tracks_the_calculator_scored():
+    """Test the primary result is returned and compared on the same tracks"""
+    profiles = [
+        TrackEmotionalProfile(track_id="1", emotional_profile=EMOTIONAL_PROFILE)
+    ]
+    shadow_calculator = _shadow_calculator(profiles)
+    shadow_calculator.shadow_calculator.get_emotional_profiles.return_value = profiles
+
+    result = await shadow_calculator.get_emotional_profiles(REQUESTS)
+
+    assert result == profiles
+    shadow_calculator.shadow_calculator.get_emotional_profiles.assert_awaited_once_with(
+        [REQUESTS[0]]
+    )
+
+
+async def test_shadow_failure_does_not_change_result():
+    """Test an error in the shadow calculator is only logged"""
+    profiles = [
+        TrackEmotionalProfile(track_id="1", emotional_profile=EMOTIONAL_PROFILE)
+    ]
+    shadow_calculator = _shadow_calculator(profiles)
+    shadow_calculator.shadow_calculator.get_emotional_profiles.side_effect = (
+        RuntimeError("shadow failed")
+    )
+
+    result = await shadow_calculator.get_emotional_profiles(REQUESTS)
+
+    assert result == profiles
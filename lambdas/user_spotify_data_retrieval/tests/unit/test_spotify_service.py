@@ -0,0 +1,87 @@
+import httpx
+import pytest_asyncio
+from typing import AsyncGenerator
+
+from src.models.enums import TimeRange
+from src.services.music.spotify_service import SpotifyService
+
+BASE_URL = "http://localhost:8000"
+
+
+def _track_data(track_id: str) -> dict:
+    return {
+        "id": track_id,
+        "name": f"Song {track_id}",
+        "album": {"name": "Album", "images": [], "release_date": "2024-01-01"},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "explicit": False,
+        "duration_ms": 0,
+        "popularity": 0,
+        "artists": [{"id": "artist1", "name": "Artist"}],
+    }
+
+
+def _add_top_tracks_page(httpx_mock, offset: int, limit: int) -> None:
+    httpx_mock.add_response(
+        method="GET",
+        url=f"{BASE_URL}/me/top/tracks?time_range=short_term&limit={limit}&offset={offset}",
+        json={
+            "items": [_track_data(f"track{offset + index}") for index in range(limit)]
+        },
+    )
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncGenerator[httpx.AsyncClient, None]:
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+async def test_get_user_top_tracks_requests_every_page_in_rank_order(
+    httpx_mock, client
+):
+    """Test pages at known offsets are combined in rank order"""
+    _add_top_tracks_page(httpx_mock, offset=0, limit=50)
+    _add_top_tracks_page(httpx_mock, offset=50, limit=30)
+    spotify_service = SpotifyService(client=client, base_url=BASE_URL)
+
+    tracks = await spotify_service.get_user_top_tracks(
+        access_token="token", time_range=TimeRange.SHORT_TERM, limit=80
+    )
+
+    assert [track.id for track in tracks] == [f"track{index}" for index in range(80)]
+
+
+async def test_get_user_top_tracks_caps_limit_at_spotify_maximum(httpx_mock, client):
+    """Test asking for more than Spotify serves only requests the first 100"""
+    _add_top_tracks_page(httpx_mock, offset=0, limit=50)
+    _add_top_tracks_page(httpx_mock, offset=50, limit=50)
+    spotify_service = SpotifyService(
+        client=client, base_url=BASE_URL, top_items_limit=500
+    )
+
+    tracks = await spotify_service.get_user_top_tracks(
+        access_token="token", time_range=TimeRange.SHORT_TERM
+    )
+
+    assert len(tracks) == SpotifyService.TOP_ITEMS_MAX_LIMIT
+    assert len(httpx_mock.get_requests()) == 2
+
+
+async def test_stream_user_top_tracks_yields_each_page_with_its_offset(
+    httpx_mock, client
+):
+    """Test pages are yielded individually as they arrive"""
+    _add_top_tracks_page(httpx_mock, offset=0, limit=50)
+    _add_top_tracks_page(httpx_mock, offset=50, limit=50)
+    spotify_service = SpotifyService(client=client, base_url=BASE_URL)
+
+    pages = {
+        offset: tracks
+        async for offset, tracks in spotify_service.stream_user_top_tracks(
+            access_token="token", time_range=TimeRange.SHORT_TERM, limit=100
+        )
+    }
+
+    assert sorted(pages) == [0, 50]
+    assert pages[50][0].id == "track50"
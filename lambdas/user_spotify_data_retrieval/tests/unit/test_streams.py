@@ -0,0 +1,181 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from src.utils.streams import (
+    Channel,
+    ChannelClosedException,
+    batch_stream,
+    flatten_streams,
+    merge_streams,
+)
+
+
+async def _stream(items: list[str], delay: float):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+async def _failing_stream():
+    await asyncio.sleep(0)
+    raise RuntimeError("boom")
+    yield
+
+
+async def test_merge_streams_yields_items_as_they_arrive():
+    """Test items are interleaved in arrival order rather than stream order"""
+    items = [
+        item
+        async for item in merge_streams(
+            _stream(["slow"], delay=0.05), _stream(["fast1", "fast2"], delay=0.01)
+        )
+    ]
+
+    assert items == ["fast1", "fast2", "slow"]
+
+
+async def test_merge_streams_raises_first_failure():
+    """Test a failing stream stops the merge without waiting for the rest"""
+    with pytest.raises(RuntimeError):
+        async for _ in merge_streams(_stream(["slow"], delay=10), _failing_stream()):
+            pass
+
+
+async def test_batch_stream_groups_items_that_arrive_together():
+    """Test items waiting behind a busy consumer go out as one batch"""
+    batches = []
+
+    async for batch in batch_stream(
+        _stream(["a", "b", "c", "d"], delay=0.01), max_batch_size=2, max_buffered=10
+    ):
+        batches.append(batch)
+        # busy long enough for the rest of the stream to arrive
+        await asyncio.sleep(0.1)
+
+    assert batches == [["a"], ["b", "c"], ["d"]]
+
+
+async def test_batch_stream_stops_reading_when_buffer_is_full():
+    """Test a stalled consumer stops the stream being read ahead"""
+    read = []
+
+    async def stream():
+        for item in range(10):
+            read.append(item)
+            yield item
+
+    async for batch in batch_stream(stream(), max_batch_size=1, max_buffered=2):
+        await asyncio.sleep(0.01)
+        break
+
+    # one taken by the consumer, two buffered and one waiting to be put
+    assert read == [0, 1, 2, 3]
+
+
+async def test_batch_stream_waits_for_stream_cleanup_when_closed_early():
+    """Test the stream can save its work before a closed batch stream returns"""
+    events = []
+
+    async def stream():
+        try:
+            for item in range(10):
+                yield item
+                await asyncio.sleep(0.01)
+        finally:
+            await asyncio.sleep(0.01)
+            events.append("saved")
+
+    async with aclosing(
+        batch_stream(stream(), max_batch_size=1, max_buffered=1)
+    ) as batches:
+        async for batch in batches:
+            break
+
+    assert events == ["saved"]
+
+
+async def test_flatten_streams_reads_each_stream_as_soon_as_it_arrives():
+    """Test a stream's items aren't held back until later streams have arrived"""
+    events = []
+
+    async def streams():
+        yield _stream(["a1", "a2"], delay=0.01)
+        await asyncio.sleep(0.05)
+        events.append("second stream")
+        yield _stream(["b1"], delay=0)
+
+    async for item in flatten_streams(streams()):
+        events.append(item)
+
+    assert events == ["a1", "a2", "second stream", "b1"]
+
+
+async def test_flatten_streams_closes_unfinished_streams_when_stopped():
+    """Test streams still being read can save their work when the flatten is closed"""
+    events = []
+
+    async def stream():
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            events.append("saved")
+
+    async def streams():
+        yield stream()
+
+    async with aclosing(flatten_streams(streams())) as items:
+        async for _ in items:
+            break
+
+    assert events == ["saved"]
+
+
+async def test_flatten_streams_raises_first_failure():
+    """Test a failing stream stops the flatten"""
+
+    async def streams():
+        yield _stream(["slow"], delay=10)
+        yield _failing_stream()
+
+    with pytest.raises(RuntimeError):
+        async for _ in flatten_streams(streams()):
+            pass
+
+
+async def test_channel_yields_items_until_closed():
+    """Test the reader gets items put before and after it started waiting"""
+    channel: Channel[str] = Channel()
+    channel.put("a")
+
+    async def write():
+        await asyncio.sleep(0.01)
+        channel.put("b")
+        channel.close()
+
+    writer = asyncio.create_task(write())
+    items = [item async for item in channel]
+    await writer
+
+    assert items == ["a", "b"]
+
+    with pytest.raises(ChannelClosedException):
+        channel.put("c")
+
+
+async def test_channel_closed_with_an_error_raises_it_to_the_reader():
+    """Test a writer that stopped early isn't mistaken for one that finished"""
+    channel: Channel[str] = Channel()
+    channel.put("a")
+    channel.close(RuntimeError("boom"))
+
+    items = []
+    with pytest.raises(ChannelClosedException) as exc_info:
+        async for item in channel:
+            items.append(item)
+
+    assert items == ["a"]
+    assert isinstance(exc_info.value.__cause__, RuntimeError)
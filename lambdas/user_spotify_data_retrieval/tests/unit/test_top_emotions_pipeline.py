@@ -1,11 +1,77 @@
+import asyncio
+import numpy as np
 import pytest
 from datetime import date
-from unittest.mock import Mock
+from typing import AsyncIterator
+from unittest.mock import AsyncMock, Mock
 from collections import defaultdict
 
 from src.models.enums import TimeRange
-from src.models.domain import TrackEmotionalProfile, EmotionalProfile
-from src.pipelines.top_emotions_pipeline import TopEmotionsPipeline
+from src.models.domain import (
+    EMOTIONS,
+    EmotionalProfile,
+    EmotionalProfileMatrix,
+    Track,
+    TrackArtist,
+    TrackEmotionalProfile,
+    TrackLyrics,
+    TrackLyricsRequest,
+    TopEmotion,
+)
+from src.pipelines.top_emotions_pipeline import (
+    TopEmotionsPipeline,
+    TopEmotionsPipelineException,
+)
+from src.utils.calculations import average_emotions, rank_top_emotions
+from src.utils.streams import Channel
+
+
+def _average_emotions(profiles: list[TrackEmotionalProfile]) -> dict[str, float]:
+    """Average profiles the way the pipeline does, keyed by emotion"""
+    if not profiles:
+        return {}
+
+    averages = average_emotions(
+        EmotionalProfileMatrix.from_profiles(profiles),
+        [[profile.track_id for profile in profiles]],
+    )
+    return dict(zip(EMOTIONS, averages[0].tolist()))
+
+
+def _rank_emotions(average_emotions: dict[str, float], n: int) -> dict[str, float]:
+    """Rank averages given by emotion, any not given being 0, the way the pipeline does"""
+    order, shares = rank_top_emotions(
+        np.array([[average_emotions.get(emotion, 0.0) for emotion in EMOTIONS]]), n
+    )
+    top_emotions = TopEmotionsPipeline._create_top_emotions(
+        emotion_indices=order[0].tolist(),
+        shares=shares[0].tolist(),
+        user_id="user123",
+        time_range=TimeRange.SHORT_TERM,
+        collection_date=date(2024, 1, 1),
+    )
+    return {
+        top_emotion.emotion_id: top_emotion.percentage for top_emotion in top_emotions
+    }
+
+
+def _get_top_emotions(
+    emotional_profiles: list[TrackEmotionalProfile],
+    user_id: str,
+    time_range: TimeRange,
+    collection_date: date,
+    n: int = 5,
+) -> list[TopEmotion]:
+    """Top emotions of one time range whose tracks are the profiled ones"""
+    return TopEmotionsPipeline._get_top_emotions_by_time_range(
+        profile_matrix=EmotionalProfileMatrix.from_profiles(emotional_profiles),
+        tracks_by_time_range={
+            time_range: [_track(profile.track_id) for profile in emotional_profiles]
+        },
+        user_id=user_id,
+        collection_date=collection_date,
+        n=n,
+    )[time_range]
 
 
 def test_single_emotional_profile():
@@ -31,7 +97,7 @@ def test_single_emotional_profile():
         track_id="track1", emotional_profile=emotional_profile
     )
 
-    result = TopEmotionsPipeline._aggregate_emotions([profile_response])
+    result = _average_emotions([profile_response])
 
     assert result["joy"] == 0.3
     assert result["sadness"] == 0.4
@@ -104,7 +170,7 @@ def test_multiple_emotional_profiles_same_emotions():
         ),
     ]
 
-    result = TopEmotionsPipeline._aggregate_emotions(profiles)
+    result = _average_emotions(profiles)
 
     # Averages: joy=(0.2+0.4+0.0)/3=0.2, sadness=(0.3+0.1+0.2)/3=0.2, anger=(0.5+0.5+0.8)/3=0.6
     assert result["joy"] == pytest.approx(0.2, rel=1e-10)
@@ -177,7 +243,7 @@ def test_different_emotions_across_profiles():
         ),
     ]
 
-    result = TopEmotionsPipeline._aggregate_emotions(profiles)
+    result = _average_emotions(profiles)
 
     # joy: (0.5 + 0.1) / 2 = 0.3
     # sadness: 0.3 / 1 = 0.3
@@ -193,7 +259,7 @@ def test_different_emotions_across_profiles():
 
 def test_empty_profiles_list():
     """Test aggregation with empty profiles list"""
-    result = TopEmotionsPipeline._aggregate_emotions([])
+    result = _average_emotions([])
     assert result == {}
 
 
@@ -242,7 +308,7 @@ def test_single_emotion_across_profiles():
         ),
     ]
 
-    result = TopEmotionsPipeline._aggregate_emotions(profiles)
+    result = _average_emotions(profiles)
 
     assert len(result) == 1
     assert result["joy"] == pytest.approx(0.5, rel=1e-10)
@@ -293,7 +359,7 @@ def test_zero_values_included():
         ),
     ]
 
-    result = TopEmotionsPipeline._aggregate_emotions(profiles)
+    result = _average_emotions(profiles)
 
     assert result["joy"] == 0.0
     assert result["sadness"] == pytest.approx(0.4, rel=1e-10)
@@ -304,7 +370,7 @@ def test_basic_ranking_and_normalization():
     """Test basic ranking and normalization functionality"""
     average_emotions = {"joy": 0.3, "sadness": 0.5, "anger": 0.2}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=3)
+    result = _rank_emotions(average_emotions, n=3)
 
     # Should be ranked by value: sadness > joy > anger
     # Normalized: sadness=0.5/1.0=0.5, joy=0.3/1.0=0.3, anger=0.2/1.0=0.2
@@ -317,40 +383,40 @@ def test_basic_ranking_and_normalization():
 def test_n_parameter_limits_results():
     """Test that n parameter limits the number of results"""
     average_emotions = {
-        "emotion1": 0.1,
-        "emotion2": 0.2,
-        "emotion3": 0.3,
-        "emotion4": 0.4,
-        "emotion5": 0.5,
+        "joy": 0.1,
+        "sadness": 0.2,
+        "anger": 0.3,
+        "fear": 0.4,
+        "love": 0.5,
     }
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=3)
+    result = _rank_emotions(average_emotions, n=3)
 
     assert len(result) == 3
     # Should contain the top 3 emotions
-    assert "emotion5" in result
-    assert "emotion4" in result
-    assert "emotion3" in result
-    assert "emotion1" not in result
-    assert "emotion2" not in result
+    assert "love" in result
+    assert "fear" in result
+    assert "anger" in result
+    assert "joy" not in result
+    assert "sadness" not in result
 
 
 def test_n_larger_than_available_emotions():
     """Test when n is larger than available emotions"""
-    average_emotions = {"emotion1": 0.3, "emotion2": 0.7}
+    average_emotions = {"joy": 0.3, "sadness": 0.7}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=5)
+    result = _rank_emotions(average_emotions, n=len(EMOTIONS) + 5)
 
-    assert len(result) == 2
-    assert "emotion1" in result
-    assert "emotion2" in result
+    assert len(result) == len(EMOTIONS)
+    assert "joy" in result
+    assert "sadness" in result
 
 
 def test_tied_emotions():
     """Test handling of tied emotion values"""
-    average_emotions = {"emotion1": 0.3, "emotion2": 0.3, "emotion3": 0.4}
+    average_emotions = {"joy": 0.3, "sadness": 0.3, "anger": 0.4}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=3)
+    result = _rank_emotions(average_emotions, n=3)
 
     assert len(result) == 3
     # All should be included, normalization should work correctly
@@ -362,44 +428,46 @@ def test_single_emotion():
     """Test with single emotion"""
     average_emotions = {"joy": 0.8}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=5)
+    result = _rank_emotions(average_emotions, n=5)
 
-    assert len(result) == 1
     assert result["joy"] == 1.0  # Should be normalized to 1.0
+    # every other emotion averaged 0
+    assert all(share == 0.0 for emotion, share in result.items() if emotion != "joy")
 
 
 def test_empty_emotions_dict():
-    """Test with empty emotions dictionary"""
-    result = TopEmotionsPipeline._rank_and_normalise_emotions({}, n=5)
-    assert result == {}
+    """Test averages that are all 0 get shares of 0 rather than dividing by 0"""
+    result = _rank_emotions({}, n=5)
+    assert len(result) == 5
+    assert all(share == 0.0 for share in result.values())
 
 
 def test_rounding_to_two_decimal_places():
     """Test that results are rounded to 2 decimal places"""
-    average_emotions = {"emotion1": 1.0, "emotion2": 2.0, "emotion3": 3.0}
+    average_emotions = {"joy": 1.0, "sadness": 2.0, "anger": 3.0}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=3)
+    result = _rank_emotions(average_emotions, n=3)
 
     # Total = 6.0, so normalized values should be 1/6, 2/6, 3/6
     # 1/6 = 0.1666... -> 0.17
     # 2/6 = 0.3333... -> 0.33
     # 3/6 = 0.5 -> 0.5
-    assert result["emotion3"] == 0.5
-    assert result["emotion2"] == 0.33
-    assert result["emotion1"] == 0.17
+    assert result["anger"] == 0.5
+    assert result["sadness"] == 0.33
+    assert result["joy"] == 0.17
 
 
 def test_normalization_preserves_ranking():
     """Test that normalization preserves the original ranking order"""
-    average_emotions = {"low": 0.1, "medium": 0.5, "high": 0.9}
+    average_emotions = {"joy": 0.1, "sadness": 0.5, "anger": 0.9}
 
-    result = TopEmotionsPipeline._rank_and_normalise_emotions(average_emotions, n=3)
+    result = _rank_emotions(average_emotions, n=3)
 
-    # Should maintain the same order: high > medium > low
+    # Should maintain the same order: anger > sadness > joy
     emotions = list(result.keys())
-    assert emotions[0] == "high"
-    assert emotions[1] == "medium"
-    assert emotions[2] == "low"
+    assert emotions[0] == "anger"
+    assert emotions[1] == "sadness"
+    assert emotions[2] == "joy"
 
 
 def test_complete_emotion_processing_pipeline():
@@ -467,7 +535,7 @@ def test_complete_emotion_processing_pipeline():
         ),
     ]
 
-    result = TopEmotionsPipeline._get_top_emotions(
+    result = _get_top_emotions(
         emotional_profiles=emotional_profiles,
         user_id="user123",
         time_range=TimeRange.SHORT_TERM,
@@ -511,7 +579,7 @@ def test_default_n_parameter():
         )
     ]
 
-    result = TopEmotionsPipeline._get_top_emotions(
+    result = _get_top_emotions(
         emotional_profiles=emotional_profiles,
         user_id="user123",
         time_range=TimeRange.MEDIUM_TERM,
@@ -522,16 +590,28 @@ def test_default_n_parameter():
     assert all(item.position == i + 1 for i, item in enumerate(result))
 
 
-def test_empty_emotional_profiles():
-    """Test with empty emotional profiles list"""
-    result = TopEmotionsPipeline._get_top_emotions(
-        emotional_profiles=[],
+async def test_empty_emotional_profiles():
+    """Test a time range with no emotional profiles gets no top emotions"""
+    lyrics_service = Mock()
+    lyrics_service.stream_lyrics = Mock(side_effect=_stream_lyrics)
+    emotional_profile_service = Mock()
+    emotional_profile_service.get_emotional_profile_matrix = AsyncMock(
+        return_value=EmotionalProfileMatrix.from_profiles([])
+    )
+    top_emotions_repository = AsyncMock()
+    pipeline = TopEmotionsPipeline(
+        lyrics_service=lyrics_service,
+        emotional_profile_service=emotional_profile_service,
+        top_emotions_repository=top_emotions_repository,
+    )
+
+    await pipeline.run_many(
+        tracks_by_time_range={TimeRange.LONG_TERM: [_track("track1")]},
         user_id="user123",
-        time_range=TimeRange.LONG_TERM,
         collection_date=date(2024, 1, 1),
     )
 
-    assert len(result) == 0
+    top_emotions_repository.add_many.assert_not_awaited()
 
 
 def test_single_emotional_profile():
@@ -559,7 +639,7 @@ def test_single_emotional_profile():
         )
     ]
 
-    result = TopEmotionsPipeline._get_top_emotions(
+    result = _get_top_emotions(
         emotional_profiles=emotional_profiles,
         user_id="user123",
         time_range=TimeRange.SHORT_TERM,
@@ -600,7 +680,7 @@ def test_position_assignment():
         )
     ]
 
-    result = TopEmotionsPipeline._get_top_emotions(
+    result = _get_top_emotions(
         emotional_profiles=emotional_profiles,
         user_id="user123",
         time_range=TimeRange.SHORT_TERM,
@@ -612,3 +692,196 @@ def test_position_assignment():
     assert result[0].position == 1
     assert result[1].position == 2
     assert result[2].position == 3
+
+
+def _track(track_id: str) -> Track:
+    return Track(
+        id=track_id,
+        name=f"Song {track_id}",
+        images=[],
+        spotify_url="",
+        album_name="",
+        release_date="2024-01-01",
+        explicit=False,
+        duration_ms=0,
+        popularity=0,
+        artists=[TrackArtist(id="artist1", name="Artist")],
+    )
+
+
+def _profile(track_id: str, joy: float) -> TrackEmotionalProfile:
+    emotions = dict.fromkeys(EmotionalProfile.model_fields, 0.0)
+    emotions["joy"] = joy
+    emotions["sadness"] = 1 - joy
+    return TrackEmotionalProfile(
+        track_id=track_id, emotional_profile=EmotionalProfile(**emotions)
+    )
+
+
+async def _stream_lyrics(
+    requests: list[TrackLyricsRequest],
+) -> AsyncIterator[TrackLyrics]:
+    for request in requests:
+        yield TrackLyrics(track_id=request.track_id, lyrics="lyrics")
+
+
+async def test_run_many_fetches_lyrics_and_profiles_once_per_unique_track():
+    """Test that tracks shared between ranges are only processed once"""
+    lyrics_service = Mock()
+    lyrics_service.stream_lyrics = Mock(side_effect=_stream_lyrics)
+    emotional_profile_service = Mock()
+    emotional_profile_service.get_emotional_profile_matrix = AsyncMock(
+        side_effect=lambda requests: EmotionalProfileMatrix.from_profiles(
+            [_profile(request.track_id, joy=0.8) for request in requests]
+        )
+    )
+    top_emotions_repository = AsyncMock()
+    top_emotions_repository.get_previous_top_items.return_value = []
+
+    pipeline = TopEmotionsPipeline(
+        lyrics_service=lyrics_service,
+        emotional_profile_service=emotional_profile_service,
+        top_emotions_repository=top_emotions_repository,
+    )
+
+    await pipeline.run_many(
+        tracks_by_time_range={
+            TimeRange.SHORT_TERM: [_track("track1"), _track("track2")],
+            TimeRange.MEDIUM_TERM: [_track("track2"), _track("track3")],
+            TimeRange.LONG_TERM: [_track("track1"), _track("track3")],
+        },
+        user_id="user123",
+        collection_date=date(2024, 1, 1),
+    )
+
+    lyrics_service.stream_lyrics.assert_called_once()
+    lyrics_requests = lyrics_service.stream_lyrics.call_args.args[0]
+    assert sorted(request.track_id for request in lyrics_requests) == [
+        "track1",
+        "track2",
+        "track3",
+    ]
+    emotional_profile_service.get_emotional_profile_matrix.assert_awaited_once()
+
+    stored_time_ranges = [
+        call.args[0][0].time_range
+        for call in top_emotions_repository.add_many.call_args_list
+    ]
+    assert stored_time_ranges == [
+        TimeRange.SHORT_TERM,
+        TimeRange.MEDIUM_TERM,
+        TimeRange.LONG_TERM,
+    ]
+
+
+async def test_profiling_starts_before_slow_lyrics_arrive():
+    """Test lyrics that arrive early are profiled while slower scrapes continue"""
+    events = []
+
+    async def stream_lyrics(requests):
+        yield TrackLyrics(track_id="track1", lyrics="cached")
+        await asyncio.sleep(0.05)
+        events.append("slow lyrics")
+        yield TrackLyrics(track_id="track2", lyrics="scraped")
+
+    async def get_emotional_profile_matrix(requests):
+        events.append(f"profile {[request.track_id for request in requests]}")
+        return EmotionalProfileMatrix.from_profiles(
+            [_profile(request.track_id, joy=0.8) for request in requests]
+        )
+
+    lyrics_service = Mock()
+    lyrics_service.stream_lyrics = Mock(side_effect=stream_lyrics)
+    emotional_profile_service = Mock()
+    emotional_profile_service.get_emotional_profile_matrix = AsyncMock(
+        side_effect=get_emotional_profile_matrix
+    )
+    pipeline = TopEmotionsPipeline(
+        lyrics_service=lyrics_service,
+        emotional_profile_service=emotional_profile_service,
+        top_emotions_repository=AsyncMock(),
+    )
+
+    profile_matrix = await pipeline._get_emotional_profile_matrix(
+        pipeline._stream_lyrics([_track("track1"), _track("track2")])
+    )
+
+    assert events == ["profile ['track1']", "slow lyrics", "profile ['track2']"]
+    assert profile_matrix.track_ids == ["track1", "track2"]
+
+
+async def test_run_pages_starts_lyrics_before_the_last_page_arrives():
+    """Test each page's new tracks are sent for lyrics as soon as the page arrives"""
+    events = []
+    last_page_sent = asyncio.Event()
+
+    async def stream_lyrics(requests):
+        events.append(f"lyrics {[request.track_id for request in requests]}")
+        for request in requests:
+            yield TrackLyrics(track_id=request.track_id, lyrics="lyrics")
+
+    async def pages():
+        yield TimeRange.SHORT_TERM, 0, [_track("track1"), _track("track2")]
+        # the first page's lyrics are requested before the next page is fetched
+        await asyncio.sleep(0.01)
+        events.append("last page")
+        yield TimeRange.LONG_TERM, 0, [_track("track2"), _track("track3")]
+        last_page_sent.set()
+
+    lyrics_service = Mock()
+    lyrics_service.stream_lyrics = Mock(side_effect=stream_lyrics)
+    emotional_profile_service = Mock()
+    emotional_profile_service.get_emotional_profile_matrix = AsyncMock(
+        side_effect=lambda requests: EmotionalProfileMatrix.from_profiles(
+            [_profile(request.track_id, joy=0.8) for request in requests]
+        )
+    )
+    top_emotions_repository = AsyncMock()
+    top_emotions_repository.get_previous_top_items.return_value = []
+    pipeline = TopEmotionsPipeline(
+        lyrics_service=lyrics_service,
+        emotional_profile_service=emotional_profile_service,
+        top_emotions_repository=top_emotions_repository,
+    )
+
+    await pipeline.run_pages(
+        pages=pages(), user_id="user123", collection_date=date(2024, 1, 1)
+    )
+
+    assert last_page_sent.is_set()
+    # tracks shared between time ranges are only requested once
+    assert events == ["lyrics ['track1', 'track2']", "last page", "lyrics ['track3']"]
+    stored_time_ranges = [
+        call.args[0][0].time_range
+        for call in top_emotions_repository.add_many.call_args_list
+    ]
+    assert stored_time_ranges == [TimeRange.SHORT_TERM, TimeRange.LONG_TERM]
+
+
+async def test_run_pages_stores_nothing_when_pages_stop_early():
+    """Test top emotions aren't ranked from part of the top tracks"""
+    channel: Channel = Channel()
+    channel.put((TimeRange.SHORT_TERM, 0, [_track("track1")]))
+    channel.close(RuntimeError("spotify unavailable"))
+
+    lyrics_service = Mock()
+    lyrics_service.stream_lyrics = Mock(side_effect=_stream_lyrics)
+    emotional_profile_service = Mock()
+    emotional_profile_service.get_emotional_profile_matrix = AsyncMock(
+        side_effect=lambda requests: EmotionalProfileMatrix.from_profiles(
+            [_profile(request.track_id, joy=0.8) for request in requests]
+        )
+    )
+    top_emotions_repository = AsyncMock()
+    pipeline = TopEmotionsPipeline(
+        lyrics_service=lyrics_service,
+        emotional_profile_service=emotional_profile_service,
+        top_emotions_repository=top_emotions_repository,
+    )
+
+    with pytest.raises(TopEmotionsPipelineException):
+        await pipeline.run_pages(
+            pages=channel, user_id="user123", collection_date=date(2024, 1, 1)
+        )
+
+    top_emotions_repository.add_many.assert_not_awaited()
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+from src.models.domain import Artist, Track, TrackArtist
+from src.models.enums import TimeRange
+from src.pipelines.top_tracks_pipeline import TopTracksPipeline
+from src.services.music.artist_registry import ArtistRegistry
+
+
+def _artist(artist_id: str) -> Artist:
+    return Artist(
+        id=artist_id,
+        name=f"Artist {artist_id}",
+        images=[],
+        spotify_url="",
+        genres=[],
+        followers=0,
+        popularity=0,
+    )
+
+
+def _track(track_id: str, artist_ids: list[str]) -> Track:
+    return Track(
+        id=track_id,
+        name=f"Song {track_id}",
+        images=[],
+        spotify_url="",
+        album_name="",
+        release_date="2024-01-01",
+        explicit=False,
+        duration_ms=0,
+        popularity=0,
+        artists=[
+            TrackArtist(id=artist_id, name=f"Artist {artist_id}")
+            for artist_id in artist_ids
+        ],
+    )
+
+
+def _pipeline(
+    artist_cache_ttl: timedelta, artist_registry: ArtistRegistry | None = None
+) -> TopTracksPipeline:
+    spotify_service = AsyncMock()
+    spotify_service.get_artists_by_ids.side_effect = lambda access_token, artist_ids: [
+        _artist(id) for id in artist_ids
+    ]
+    artists_repository = AsyncMock()
+    artists_repository.get_fresh_by_ids.return_value = [_artist("fresh")]
+
+    return TopTracksPipeline(
+        spotify_service=spotify_service,
+        artists_repository=artists_repository,
+        tracks_repository=AsyncMock(),
+        top_tracks_repository=AsyncMock(),
+        artist_registry=artist_registry,
+        artist_cache_ttl=artist_cache_ttl,
+    )
+
+
+async def test_store_tracks_serves_fresh_artists_from_db():
+    """Test artists fetched within the TTL are neither refetched nor rewritten"""
+    pipeline = _pipeline(artist_cache_ttl=timedelta(hours=24))
+
+    await pipeline._store_tracks(
+        access_token="token", tracks=[_track("t1", ["fresh", "stale"])]
+    )
+
+    pipeline.spotify_service.get_artists_by_ids.assert_awaited_once_with(
+        access_token="token", artist_ids=["stale"]
+    )
+    stored_artists = pipeline.artists_repository.upsert_many.await_args.args[0]
+    assert [artist.id for artist in stored_artists] == ["stale"]
+
+
+async def test_store_tracks_skips_db_lookup_when_cache_disabled():
+    """Test a zero TTL fetches every artist from Spotify"""
+    pipeline = _pipeline(artist_cache_ttl=timedelta(0))
+
+    await pipeline._store_tracks(
+        access_token="token", tracks=[_track("t1", ["fresh", "stale"])]
+    )
+
+    pipeline.artists_repository.get_fresh_by_ids.assert_not_awaited()
+    fetched_ids = pipeline.spotify_service.get_artists_by_ids.await_args.kwargs[
+        "artist_ids"
+    ]
+    assert sorted(fetched_ids) == ["fresh", "stale"]
+
+
+async def test_store_tracks_reuses_but_still_stores_artists_from_top_artists_branch():
+    """Test top artists resolved this run aren't refetched but are stored with the tracks"""
+    artist_registry = ArtistRegistry()
+    artist_registry.register_top_artists([_artist("top")])
+    pipeline = _pipeline(artist_cache_ttl=timedelta(0), artist_registry=artist_registry)
+
+    await pipeline._store_tracks(
+        access_token="token", tracks=[_track("t1", ["top", "other"])]
+    )
+
+    pipeline.spotify_service.get_artists_by_ids.assert_awaited_once_with(
+        access_token="token", artist_ids=["other"]
+    )
+    # the top artists transaction may not have committed before track_artist is written
+    stored_artists = pipeline.artists_repository.upsert_many.await_args.args[0]
+    assert sorted(artist.id for artist in stored_artists) == ["other", "top"]
+
+
+async def test_fetch_many_hands_on_pages_as_they_arrive_and_ranks_in_offset_order():
+    """Test each page is passed on as it arrives and ranks follow page offsets"""
+    pipeline = _pipeline(artist_cache_ttl=timedelta(0))
+    received_pages = []
+
+    async def stream_user_top_tracks(access_token, time_range):
+        # second page arrives first
+        await asyncio.sleep(0)
+        yield 50, [_track("t3", ["a1"])]
+        yield 0, [_track("t1", ["a1"]), _track("t2", ["a2"])]
+
+    pipeline.spotify_service.stream_user_top_tracks = stream_user_top_tracks
+
+    tracks_by_time_range = await pipeline.fetch_many(
+        access_token="token",
+        time_ranges=[TimeRange.SHORT_TERM, TimeRange.LONG_TERM],
+        on_page=lambda time_range, offset, tracks: received_pages.append(
+            (time_range, offset, [track.id for track in tracks])
+        ),
+    )
+
+    for tracks in tracks_by_time_range.values():
+        assert [track.id for track in tracks] == ["t1", "t2", "t3"]
+    assert sorted(received_pages) == sorted(
+        [
+            (time_range, offset, track_ids)
+            for time_range in [TimeRange.SHORT_TERM, TimeRange.LONG_TERM]
+            for offset, track_ids in [(50, ["t3"]), (0, ["t1", "t2"])]
+        ]
+    )
+    # passed on in arrival order, not rank order
+    assert received_pages[0][1] == 50
+
+
+async def test_fetch_many_stores_nothing_and_store_many_stores_each_track_once():
+    """Test fetching is separate from storing and shared tracks are stored once"""
+    pipeline = _pipeline(artist_cache_ttl=timedelta(0))
+    pipeline.top_tracks_repository.get_previous_top_items.return_value = []
+
+    async def stream_user_top_tracks(access_token, time_range):
+        yield 0, [_track("t1", ["a1"]), _track("t2", ["a2"])]
+
+    pipeline.spotify_service.stream_user_top_tracks = stream_user_top_tracks
+
+    tracks_by_time_range = await pipeline.fetch_many(
+        access_token="token", time_ranges=[TimeRange.SHORT_TERM, TimeRange.LONG_TERM]
+    )
+
+    pipeline.tracks_repository.upsert_many.assert_not_awaited()
+    pipeline.spotify_service.get_artists_by_ids.assert_not_awaited()
+
+    await pipeline.store_many(
+        access_token="token",
+        user_id="user",
+        tracks_by_time_range=tracks_by_time_range,
+        collection_date=date(2024, 1, 1),
+    )
+
+    stored_tracks = pipeline.tracks_repository.upsert_many.await_args.args[0]
+    assert [track.id for track in stored_tracks] == ["t1", "t2"]
+    pipeline.tracks_repository.upsert_many.assert_awaited_once()
+    assert pipeline.top_tracks_repository.add_many.await_count == 2
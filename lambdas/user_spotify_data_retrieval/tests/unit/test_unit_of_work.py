@@ -0,0 +1,212 @@
+from unittest.mock import AsyncMock
+
+import pytest
+import sqlalchemy.exc
+from sqlalchemy.dialects.postgresql.psycopg import PGDialectAsync_psycopg
+
+from src.core.db import RoundTripCounter, SerializedAsyncSession
+from src.models.domain import Artist, Profile, Track
+from src.models.shared import TrackArtist
+from src.repositories.artists_repository import ArtistsRepository
+from src.repositories.profile_repository import ProfileRepository
+from src.repositories.tracks_repository import TracksRepository
+from src.repositories.unit_of_work import UnitOfWork, UnitOfWorkException
+
+
+class FakePipeline:
+    def __init__(self, driver_connection: "FakeDriverConnection"):
+        self.driver_connection = driver_connection
+
+    async def __aenter__(self) -> "FakePipeline":
+        self.driver_connection.pipelines += 1
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+
+class FakeDriverConnection:
+    """Stand-in for the psycopg connection that records pipelined queries"""
+
+    def __init__(self):
+        self.pipelines = 0
+        self.queries: list[tuple[str, dict]] = []
+
+    def pipeline(self) -> FakePipeline:
+        return FakePipeline(self)
+
+    def cursor(self) -> "FakeDriverConnection":
+        return self
+
+    async def __aenter__(self) -> "FakeDriverConnection":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def execute(self, query: str, params: dict) -> None:
+        self.queries.append((query, params))
+
+
+class FakeSession(SerializedAsyncSession):
+    """Serialized session whose statements reach a fake psycopg connection"""
+
+    def __init__(self):
+        super().__init__()
+        self.dialect = PGDialectAsync_psycopg(
+            dbapi=PGDialectAsync_psycopg.import_dbapi()
+        )
+        self.driver_connection = FakeDriverConnection()
+
+    def get_bind(self, *args, **kwargs) -> "FakeSession":
+        return self
+
+    async def connection(self, *args, **kwargs) -> "FakeSession":
+        return self
+
+    async def get_raw_connection(self) -> "FakeSession":
+        return self
+
+
+def _artist(artist_id: str, name: str = "Artist") -> Artist:
+    return Artist(
+        id=artist_id,
+        name=name,
+        images=[],
+        spotify_url=f"https://open.spotify.com/artist/{artist_id}",
+        genres=["rock"],
+        followers=1,
+        popularity=50,
+    )
+
+
+def _track(track_id: str, artist_id: str) -> Track:
+    return Track(
+        id=track_id,
+        name="Track",
+        images=[],
+        spotify_url=f"https://open.spotify.com/track/{track_id}",
+        album_name="Album",
+        release_date="2024-01-01",
+        explicit=False,
+        duration_ms=180000,
+        popularity=50,
+        artists=[TrackArtist(id=artist_id, name="Artist")],
+    )
+
+
+async def test_writes_wait_for_flush_and_artists_are_written_once():
+    """Test an artist stored by both branches is upserted once, with the latest details"""
+    session = FakeSession()
+    unit_of_work = UnitOfWork(session)
+    artists_repository = ArtistsRepository(session, unit_of_work=unit_of_work)
+
+    await artists_repository.upsert_many([_artist("a1", "Old"), _artist("a2")])
+    await artists_repository.upsert_many([_artist("a1", "New")])
+    assert session.driver_connection.queries == []
+
+    await unit_of_work.flush()
+
+    [(query, params)] = session.driver_connection.queries
+    assert query.startswith("INSERT INTO artist")
+    assert (params["id_m0"], params["name_m0"]) == ("a1", "New")
+    assert params["id_m1"] == "a2"
+    assert "id_m2" not in params
+
+
+async def test_flush_writes_tables_in_foreign_key_order():
+    """Test tracks are written after their artists, whatever order they were added in"""
+    session = FakeSession()
+    unit_of_work = UnitOfWork(session)
+
+    await TracksRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_track("t1", "a1")]
+    )
+    await ArtistsRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1")]
+    )
+    await ProfileRepository(session, unit_of_work=unit_of_work).upsert(
+        Profile(
+            id="user",
+            display_name="User",
+            email=None,
+            images=[],
+            spotify_url="https://open.spotify.com/user/user",
+            followers=0,
+        )
+    )
+    await unit_of_work.flush()
+
+    tables = [query.split()[2] for query, _ in session.driver_connection.queries]
+    assert tables.index("artist") < tables.index("track_artist")
+    assert tables.index("track") < tables.index("track_artist")
+    assert "profile" in tables
+
+
+async def test_flush_is_one_round_trip():
+    """Test every pending statement goes in one pipeline, counted as one round trip"""
+    session = FakeSession()
+    unit_of_work = UnitOfWork(session)
+
+    await TracksRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_track("t1", "a1"), _track("t2", "a2")]
+    )
+    await ArtistsRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1"), _artist("a2")]
+    )
+
+    with RoundTripCounter().track() as round_trips:
+        await unit_of_work.flush()
+        # nothing left to write
+        await unit_of_work.flush()
+
+    assert len(session.driver_connection.queries) == 3
+    assert session.driver_connection.pipelines == 1
+    assert round_trips.count == 1
+
+
+async def test_flush_copies_large_tables_between_pipelines():
+    """Test a table over the COPY threshold is written by the bulk writer in its turn"""
+    session = FakeSession()
+    unit_of_work = UnitOfWork(session, copy_threshold_rows=2)
+    copied_tables = []
+
+    async def copy_rows(table_, rows, **kwargs) -> None:
+        # written before its children reach the pipeline
+        assert not any(
+            query.startswith("INSERT INTO track_artist")
+            for query, _ in session.driver_connection.queries
+        )
+        copied_tables.append((table_.name, len(rows)))
+
+    unit_of_work.bulk_writer.upsert = AsyncMock(side_effect=copy_rows)
+
+    await TracksRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_track("t1", "a1")]
+    )
+    await ArtistsRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1"), _artist("a2")]
+    )
+    await unit_of_work.flush()
+
+    assert copied_tables == [("artist", 2)]
+    tables = [query.split()[2] for query, _ in session.driver_connection.queries]
+    assert sorted(tables) == ["track", "track_artist"]
+
+
+async def test_flush_raises_unit_of_work_exception_for_integrity_errors():
+    """Test a constraint violation at flush is raised as a UnitOfWorkException"""
+    session = FakeSession()
+    unit_of_work = UnitOfWork(session, copy_threshold_rows=1)
+    unit_of_work.bulk_writer.upsert = AsyncMock(
+        side_effect=sqlalchemy.exc.IntegrityError("INSERT", {}, Exception())
+    )
+
+    await ArtistsRepository(session, unit_of_work=unit_of_work).upsert_many(
+        [_artist("a1")]
+    )
+
+    with pytest.raises(UnitOfWorkException) as exc_info:
+        await unit_of_work.flush()
+
+    assert isinstance(exc_info.value.__cause__, sqlalchemy.exc.IntegrityError)